@@ -1,10 +1,11 @@
 
 import streamlit as st
+from config.settings import LOG_LEVEL
 from src.ui.pages import AppPages
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, 
+# Configure logging (LOG_LEVEL=DEBUG shows per-query retrieval details)
+logging.basicConfig(level=LOG_LEVEL, 
                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
@@ -25,11 +26,11 @@ def main():
     logger.info(f"SUPABASE_URL set: {'Yes' if SUPABASE_URL else 'No'}")
     
     # Initialize app pages
-    logger.info("Initializing application...")
+    logger.debug("Initializing application...")
     app = AppPages()
     
     # Render main page
-    logger.info("Rendering main page...")
+    logger.debug("Rendering main page...")
     app.main_page()
 
 if __name__ == "__main__":
@@ -0,0 +1,132 @@
+"""
+Retrieval latency under concurrent load: thread-per-request vs the async path.
+
+Each request runs ChatService.search (query embedding + match_documents +
+keyword_search) against local fake OpenAI and PostgREST servers, with
+--concurrency requests in flight at a time:
+
+  threads     one worker thread per in-flight request, blocking sync I/O
+              (RETRIEVAL_ASYNC=false)
+  threads+loop  the same threads, each handing its retrieval to the shared
+              background event loop (RETRIEVAL_ASYNC=true, what a Streamlit
+              session does)
+  asyncio     all requests as tasks on one event loop calling asearch
+
+Reports p50/p95/p99 latency and throughput per concurrency level. The fake
+servers run in their own processes so their request handling does not
+compete with the client for the GIL.
+
+Run from the repository root:
+    python -m benchmarks.bench_async_retrieval --concurrency 1 8 32 128 --latency 0.05
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import multiprocessing
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import numpy as np
+
+from benchmarks.fake_servers import FakeOpenAIServer, FakePostgrestServer, synthetic_texts
+
+
+def _serve(server_class, latency, urls, stop):
+    """Child process: run one fake server until stop is set"""
+    with server_class(latency=latency) as server:
+        urls.put(server.url)
+        stop.wait()
+
+
+def _start(server_class, latency):
+    context = multiprocessing.get_context("spawn")
+    urls, stop = context.Queue(), context.Event()
+    process = context.Process(target=_serve, args=(server_class, latency, urls, stop), daemon=True)
+    process.start()
+    return urls.get(timeout=60), stop, process
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--requests", type=int, default=256, help="Requests per level")
+    parser.add_argument("--latency", type=float, default=0.05, help="Fixed seconds per request")
+    parser.add_argument("--rows", type=int, default=500)
+    args = parser.parse_args()
+
+    openai_url, openai_stop, openai_process = _start(FakeOpenAIServer, args.latency)
+    postgrest_url, postgrest_stop, postgrest_process = _start(FakePostgrestServer, args.latency)
+    try:
+        os.environ["OPENAI_BASE_URL"] = f"{openai_url}/v1"
+        os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+        os.environ["SUPABASE_URL"] = postgrest_url
+        os.environ["SUPABASE_KEY"] = FakePostgrestServer.API_KEY
+        os.environ["VECTOR_STORE_BACKEND"] = "supabase"
+        os.environ["EMBEDDING_CACHE_ENABLED"] = "false"
+        os.environ["LEXICAL_SEARCH_ENABLED"] = "false"
+        os.environ["ANSWER_CACHE_ENABLED"] = "false"
+        os.environ["SERVICE_WARMUP"] = "false"
+        os.environ["MATCH_THRESHOLD"] = "-1"
+        from src.services.container import ServiceContainer
+        from utils.async_loop import run_async
+
+        rng = np.random.default_rng(0)
+        rows = [{"id": str(i), "content": text, "metadata": "{}",
+                 "embedding": rng.standard_normal(1536).astype(np.float32).tolist()}
+                for i, text in enumerate(synthetic_texts(args.rows, words_per_text=60))]
+        httpx.post(f"{postgrest_url}/rest/v1/pdf_documents", json=rows, timeout=60).raise_for_status()
+
+        container = ServiceContainer()
+        chat = container.chat_service
+        queries = [" ".join(text.split()[:8]) for text in synthetic_texts(args.requests, seed=1)]
+
+        def timed_sync(query):
+            start = time.perf_counter()
+            chat.search(query)
+            return time.perf_counter() - start
+
+        def run_threads(concurrency, use_loop):
+            chat.async_retrieval = use_loop
+            with ThreadPoolExecutor(concurrency) as pool:
+                return list(pool.map(timed_sync, queries))
+
+        async def run_tasks(concurrency):
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def timed(query):
+                async with semaphore:
+                    start = time.perf_counter()
+                    await chat.asearch(query)
+                    return time.perf_counter() - start
+
+            return await asyncio.gather(*(timed(query) for query in queries))
+
+        modes = (
+            ("threads", lambda c: run_threads(c, False)),
+            ("threads+loop", lambda c: run_threads(c, True)),
+            ("asyncio", lambda c: run_async(run_tasks(c))),
+        )
+        print(f"{args.requests} requests per level, {args.latency * 1000:.0f} ms per server call")
+        print(f"{'mode':<14}{'conc':>6}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>9}")
+        quiet = io.StringIO()
+        for concurrency in args.concurrency:
+            for name, run in modes:
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(quiet):
+                    latencies = np.array(run(concurrency)) * 1000
+                elapsed = time.perf_counter() - start
+                p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+                print(f"{name:<14}{concurrency:>6}{p50:>9.1f}{p95:>9.1f}{p99:>9.1f}"
+                      f"{args.requests / elapsed:>9.1f}")
+        container.close()
+    finally:
+        for stop, process in ((openai_stop, openai_process), (postgrest_stop, postgrest_process)):
+            stop.set()
+            process.join(10)
+
+
+if __name__ == "__main__":
+    main()
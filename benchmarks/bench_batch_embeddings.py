@@ -0,0 +1,72 @@
+"""
+Throughput of EmbeddingsService.generate_batch_embeddings against a local fake server.
+
+Compares the old one-request-per-chunk behaviour with batched, concurrent
+requests, with and without a server side rate limit.
+
+Run from the repository root:
+    python -m benchmarks.bench_batch_embeddings --chunks 2000 --latency 0.05
+"""
+import argparse
+import os
+import time
+
+from benchmarks.fake_servers import FakeOpenAIServer, synthetic_texts
+
+
+def run_case(server, texts, batch_size, concurrency):
+    from src.embeddings.embeddings_service import EmbeddingsService
+
+    service = EmbeddingsService()
+    service.batch_size = batch_size
+    service.concurrency = concurrency
+    service.rate_limiter.max_concurrency = concurrency
+    service.rate_limiter._limit = concurrency
+    chunks = [{"id": str(i), "text": text, "metadata": {}} for i, text in enumerate(texts)]
+
+    requests_before = server.stats["requests"]
+    limited_before = server.stats["rate_limited"]
+    start = time.perf_counter()
+    result = service.generate_batch_embeddings(chunks)
+    elapsed = time.perf_counter() - start
+
+    assert [chunk["id"] for chunk in result] == [str(i) for i in range(len(texts))]
+    assert all(chunk["embedding"] is not None for chunk in result)
+    return {
+        "seconds": elapsed,
+        "chunks_per_sec": len(texts) / elapsed,
+        "requests": server.stats["requests"] - requests_before,
+        "rate_limited": server.stats["rate_limited"] - limited_before,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.05, help="Fixed seconds per request")
+    parser.add_argument("--rpm", type=int, default=0, help="Server side requests per minute limit")
+    parser.add_argument("--serial-sample", type=int, default=100,
+                        help="Chunks used to measure the serial baseline")
+    args = parser.parse_args()
+
+    texts = synthetic_texts(args.chunks)
+    with FakeOpenAIServer(latency=args.latency, per_input_latency=0.0002, rpm_limit=args.rpm) as server:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+        os.environ["EMBEDDING_CACHE_ENABLED"] = "false"
+
+        cases = [
+            ("serial (1 per request)", texts[:args.serial_sample], 1, 1),
+            ("batched x1", texts, 256, 1),
+            ("batched x4", texts, 64, 4),
+            ("batched x8", texts, 32, 8),
+        ]
+        print(f"{'case':<24}{'chunks':>8}{'requests':>10}{'429s':>6}{'seconds':>10}{'chunks/s':>12}")
+        for name, case_texts, batch_size, concurrency in cases:
+            stats = run_case(server, case_texts, batch_size, concurrency)
+            print(f"{name:<24}{len(case_texts):>8}{stats['requests']:>10}{stats['rate_limited']:>6}"
+                  f"{stats['seconds']:>10.2f}{stats['chunks_per_sec']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
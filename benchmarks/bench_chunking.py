@@ -0,0 +1,63 @@
+"""
+Throughput and chunk shape of the character and token chunkers.
+
+Chunks a synthetic multi-page text with both strategies and reports MB/s,
+chunk count and the token-count distribution of the chunks. Token counts are
+measured with the embedding model's tokenizer (or the offline approximation,
+reported as "approximate").
+
+Run from the repository root:
+    python -m benchmarks.bench_chunking --pages 400
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from benchmarks.fake_servers import synthetic_texts
+from config.settings import CHUNK_TOKENS, EMBEDDING_MODEL
+from src.pdf.pdf_processor import PDFProcessor
+from utils.tokenizer import count_tokens, get_encoding
+
+
+def synthetic_pages(page_count, seed=0):
+    """Pages of sentences grouped into paragraphs"""
+    rng = random.Random(seed)
+    pages = []
+    for page in range(page_count):
+        sentences = synthetic_texts(40, words_per_text=rng.randint(8, 24), seed=seed + page)
+        paragraphs, current = [], []
+        for sentence in sentences:
+            current.append(sentence.capitalize() + ".")
+            if rng.random() < 0.15:
+                paragraphs.append(" ".join(current))
+                current = []
+        paragraphs.append(" ".join(current))
+        pages.append((page + 1, "\n\n".join(paragraphs) + "\n"))
+    return pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    pages = synthetic_pages(args.pages)
+    size_mb = sum(len(text) for _, text in pages) / 1e6
+    print(f"{args.pages} pages, {size_mb:.1f} MB text, tokenizer {get_encoding(EMBEDDING_MODEL).name}")
+    print(f"{'strategy':<10}{'chunks':>8}{'MB/s':>8}{'tok p50':>9}{'tok max':>9}{'over budget':>13}")
+    for strategy in ("chars", "tokens"):
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            chunks = list(PDFProcessor.iter_chunks(pages, "bench", strategy=strategy))
+            best = min(best, time.perf_counter() - start)
+        tokens = np.array([count_tokens(chunk["text"], EMBEDDING_MODEL) for chunk in chunks])
+        print(f"{strategy:<10}{len(chunks):>8}{size_mb / best:>8.2f}{np.median(tokens):>9.0f}"
+              f"{tokens.max():>9}{int((tokens > CHUNK_TOKENS).sum()):>13}")
+
+
+if __name__ == "__main__":
+    main()
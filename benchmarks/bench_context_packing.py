@@ -0,0 +1,88 @@
+"""
+Prompt tokens and retained text of truncated vs assembled context.
+
+Simulates retrieval over a chunked synthetic document: each query hits a
+random passage, so its top-k results are neighbouring, overlapping chunks
+(plus a verbatim copy from a second upload of the same file). "truncate" is
+the old flow, joining results and cutting at MAX_CONTEXT_LENGTH characters;
+"assemble" is ContextAssembler. Coverage is the share of distinct retrieved
+document characters that reach the prompt.
+
+Run from the repository root:
+    python -m benchmarks.bench_context_packing --queries 200 --top-k 8
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from benchmarks.bench_chunking import synthetic_pages
+from config.settings import CHAT_MODEL
+from src.chat.context_assembler import ContextAssembler
+from src.pdf.pdf_processor import PDFProcessor
+from utils.tokenizer import count_tokens
+
+MAX_CONTEXT_LENGTH = 4000  # character limit of the old flow
+
+
+def as_results(chunks, filename):
+    return [{"content": c["text"], "metadata": {**c["metadata"], "filename": filename}} for c in chunks]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=8)
+    parser.add_argument("--strategy", default="chars", choices=["chars", "tokens"])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    chunks = list(PDFProcessor.iter_chunks(synthetic_pages(50), "doc-a", strategy=args.strategy))
+    original = as_results(chunks, "report.pdf")
+    copy = [{**r, "metadata": {**r["metadata"], "document_id": "doc-b"}} for r in as_results(chunks, "report (1).pdf")]
+    assembler = ContextAssembler()
+    rng = random.Random(args.seed)
+
+    stats = {"truncate": ([], [], []), "assemble": ([], [], [])}
+    for _ in range(args.queries):
+        center = rng.randrange(len(chunks))
+        hits = [original[i] for i in range(max(0, center - 2), min(len(chunks), center + 3))]
+        hits.append(copy[center])
+        results = [{**r, "similarity": rng.uniform(0.3, 0.9)} for r in hits][:args.top_k]
+        results.sort(key=lambda r: r["similarity"], reverse=True)
+
+        ranges = {(r["metadata"]["char_start"], r["metadata"]["char_end"]) for r in results}
+        distinct = set()
+        for s, e in ranges:
+            distinct.update(range(s, e))
+
+        start = time.perf_counter()
+        context = "\n\n".join(f"Document: {r['metadata']['filename']}\n{r['content']}" for r in results)
+        truncated = context[:MAX_CONTEXT_LENGTH]
+        elapsed = time.perf_counter() - start
+        kept = [r for r in results if r["content"] in truncated]
+        covered = set()
+        for r in kept:
+            covered.update(range(r["metadata"]["char_start"], r["metadata"]["char_end"]))
+        for bucket, value in zip(stats["truncate"], (count_tokens(truncated, CHAT_MODEL), len(covered) / len(distinct), elapsed)):
+            bucket.append(value)
+
+        start = time.perf_counter()
+        assembled, _ = assembler.assemble(results)
+        elapsed = time.perf_counter() - start
+        covered = set()
+        for r in results:
+            if r["content"] in assembled:
+                covered.update(range(r["metadata"]["char_start"], r["metadata"]["char_end"]))
+        for bucket, value in zip(stats["assemble"], (count_tokens(assembled, CHAT_MODEL), len(covered) / len(distinct), elapsed)):
+            bucket.append(value)
+
+    print(f"{args.queries} queries, top_k={args.top_k}, {args.strategy} chunks, budget {assembler.max_tokens} tokens")
+    print(f"{'flow':<10}{'tokens':>8}{'coverage':>10}{'ms':>8}")
+    for name, (tokens, coverage, seconds) in stats.items():
+        print(f"{name:<10}{np.mean(tokens):>8.0f}{np.mean(coverage):>10.2f}{np.mean(seconds) * 1000:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Prompt size and latency of long chat sessions.
+
+Runs --turns questions through ChatService.process_query in one
+Conversation against the fake OpenAI server, and reports at checkpoints:
+
+  history tokens   tokens of history the answer prompt carries (rolling
+                   summary plus recent turns), against the tokens the full
+                   transcript would add
+  ms/turn          mean time per turn since the previous checkpoint,
+                   including condensing and the occasional summarizing call
+
+The bounded history levels off at CONVERSATION_HISTORY_TOKENS plus
+CONVERSATION_SUMMARY_TOKENS, where the full transcript grows with every turn.
+
+Run from the repository root:
+    python -m benchmarks.bench_conversation --turns 50
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.fake_servers import FakeOpenAIServer, synthetic_texts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--chunks", type=int, default=200)
+    parser.add_argument("--answer-words", type=int, default=80)
+    parser.add_argument("--chat-latency", type=float, default=0.0, help="Seconds to the first answer token")
+    args = parser.parse_args()
+
+    with FakeOpenAIServer(dimension=256, chat_latency=args.chat_latency,
+                          completion_tokens=args.answer_words) as server, tempfile.TemporaryDirectory() as path:
+        # Settings are read at import time: configure before the app's modules are loaded
+        os.environ.update({
+            "OPENAI_BASE_URL": server.base_url,
+            "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY") or "sk-fake",
+            "VECTOR_STORE_BACKEND": "local",
+            "VECTOR_DIMENSION": "256",
+            "MATCH_THRESHOLD": "-1",
+            "LOCAL_VECTOR_STORE_PATH": os.path.join(path, "vector_store"),
+            "LEXICAL_INDEX_PATH": os.path.join(path, "lexical_index"),
+            "EMBEDDING_CACHE_ENABLED": "false",
+            "ANSWER_CACHE_ENABLED": "false",
+        })
+        from src.chat.chat_service import ChatService
+        from src.chat.conversation import Conversation
+
+        service = ChatService()
+        texts = synthetic_texts(args.chunks, seed=1)
+        embeddings = service.embeddings_service.embed_texts(texts)
+        service.db_client.store_document_chunks([
+            {"id": str(i), "text": text, "embedding": embedding,
+             "metadata": {"document_id": "bench", "filename": "bench.pdf"}}
+            for i, (text, embedding) in enumerate(zip(texts, embeddings))
+        ])
+
+        conversation = Conversation()
+        questions = synthetic_texts(args.turns, seed=2)
+        transcript_tokens = 0
+        checkpoints = {turn for turn in (1, 5, 10, 20, 50, 100, 200, 500) if turn <= args.turns} | {args.turns}
+        print(f"{'turn':>6}{'history tokens':>16}{'transcript tokens':>19}{'ms/turn':>10}")
+        start, since = time.perf_counter(), 0
+        for turn, question in enumerate(questions, start=1):
+            question = " ".join(question.split()[:12]) + "?"
+            history = service._messages(question, "", conversation)[1:-1]
+            history_tokens = sum(service.context_assembler.count_tokens(message["content"]) for message in history)
+            response = service.process_query(question, conversation=conversation)
+            if turn in checkpoints:
+                elapsed = (time.perf_counter() - start) / (turn - since)
+                print(f"{turn:>6}{history_tokens:>16}{transcript_tokens:>19}{elapsed * 1000:>10.1f}")
+                start, since = time.perf_counter(), turn
+            transcript_tokens += (service.context_assembler.count_tokens(question)
+                                  + service.context_assembler.count_tokens(response["answer"]))
+
+
+if __name__ == "__main__":
+    main()
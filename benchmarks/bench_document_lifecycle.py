@@ -0,0 +1,119 @@
+"""
+Document lifecycle operations against the local store and a fake Supabase.
+
+Stores --docs documents of --chunks-per-doc chunks, then times:
+
+  list         DocumentRegistry.list_documents (registry rows with chunk counts)
+  delete       deleting the largest document, in batches of DELETE_BATCH_SIZE
+  reindex      re-embedding every chunk with another model and swapping it in,
+               while a thread keeps searching; reports the search latency
+               before and during the re-index and how many searches came back
+               empty (none should: the old version is served until the swap)
+
+Run from the repository root:
+    python -m benchmarks.bench_document_lifecycle --docs 200 --chunks-per-doc 50
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from benchmarks.fake_servers import FakeOpenAIServer, FakePostgrestServer, synthetic_texts
+
+
+def percentiles(seconds):
+    milliseconds = np.array(seconds) * 1000
+    return " ".join(f"{name} {np.percentile(milliseconds, q):>6.1f}" for name, q in (("p50", 50), ("p95", 95)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--chunks-per-doc", type=int, default=50)
+    parser.add_argument("--dimension", type=int, default=256)
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds per OpenAI request")
+    args = parser.parse_args()
+
+    with FakeOpenAIServer(dimension=args.dimension, latency=args.latency) as openai_server, \
+            FakePostgrestServer() as postgrest_server, tempfile.TemporaryDirectory() as path:
+        # Settings are read at import time: configure before the app's modules are loaded
+        os.environ.update({
+            "OPENAI_BASE_URL": openai_server.base_url,
+            "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY") or "sk-fake",
+            "SUPABASE_URL": postgrest_server.url,
+            "SUPABASE_KEY": FakePostgrestServer.API_KEY,
+            "VECTOR_DIMENSION": str(args.dimension),
+            "EMBEDDING_CACHE_ENABLED": "false",
+            "LEXICAL_SEARCH_ENABLED": "false",
+            "INGEST_INCREMENTAL": "false",
+        })
+        from src.database.local_vector_store import LocalVectorStore
+        from src.database.supabase_client import SupabaseClient
+        from src.embeddings.embedding_versions import EmbeddingVersionTracker
+        from src.embeddings.embeddings_service import EmbeddingsService
+        from src.ingestion.document_registry import DocumentRegistry
+        from src.ingestion.reindexer import Reindexer
+
+        embeddings = EmbeddingsService()
+        texts = synthetic_texts(args.chunks_per_doc * 4, words_per_text=60, seed=1)
+        vectors = embeddings.embed_texts(texts)
+        # Chunks every document has, so searches keep matching after the delete
+        queries = embeddings.embed_texts([" ".join(text.split()[:8]) for text in texts[:args.chunks_per_doc]])
+        print(f"{args.docs} docs x {args.chunks_per_doc} chunks, one document {args.chunks_per_doc * 4} chunks")
+
+        for name, store in (("local", LocalVectorStore(path=os.path.join(path, "local"), dimension=args.dimension)),
+                            ("supabase", SupabaseClient())):
+            for doc in range(args.docs):
+                count = args.chunks_per_doc * (4 if doc == 0 else 1)
+                store.store_document(f"doc{doc:05}", f"doc{doc}.pdf", [
+                    {"id": f"doc{doc:05}-{i}", "text": texts[i], "embedding": vectors[i],
+                     "metadata": {"document_id": f"doc{doc:05}", "filename": f"doc{doc}.pdf"}}
+                    for i in range(count)
+                ])
+            # The stored vectors come from the default model (the other store's swap switched `embeddings`)
+            EmbeddingVersionTracker(EmbeddingsService(), store).sync(force=True)
+            registry = DocumentRegistry(store)
+            print(f"\n{name}")
+
+            start = time.perf_counter()
+            documents = registry.list_documents()
+            print(f"   list      {(time.perf_counter() - start) * 1000:>8.1f} ms  {len(documents)} documents")
+
+            start = time.perf_counter()
+            deleted = registry.delete_document("doc00000")
+            print(f"   delete    {(time.perf_counter() - start) * 1000:>8.1f} ms  {deleted} chunks")
+
+            def search(seconds, empty, until):
+                i = 0
+                while not until():
+                    start = time.perf_counter()
+                    if not store.similarity_search(queries[i % len(queries)], 5):
+                        empty[0] += 1
+                    seconds.append(time.perf_counter() - start)
+                    i += 1
+
+            seconds, empty = [], [0]
+            search(seconds, empty, lambda: len(seconds) >= 200)
+            print(f"   searches before re-index: {len(seconds)}, ms {percentiles(seconds)}, empty {empty[0]}")
+
+            searching = threading.Event()
+            seconds, empty = [], [0]
+            searcher = threading.Thread(target=search, args=(seconds, empty, searching.is_set), daemon=True)
+            searcher.start()
+            reindexer = Reindexer(store, EmbeddingsService(), model="text-embedding-3-large",
+                                  dimensions=args.dimension)
+            progress = reindexer.run()
+            searching.set()
+            searcher.join()
+            rate = progress["embedded"] / progress["seconds"]
+            print(f"   reindex   {progress['seconds'] * 1000:>8.1f} ms  {progress['embedded']} chunks "
+                  f"({rate:.0f}/s), version {progress['version']}")
+            print(f"   searches during re-index: {len(seconds)}, ms {percentiles(seconds)}, empty {empty[0]}")
+            print(f"   active model: {store.get_embedding_versions()['active']['model']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Work skipped when re-ingesting a renamed file or a lightly edited revision.
+
+Ingests a synthetic document, then re-uploads:
+
+  renamed   the same bytes under another name (recognised by file hash)
+  revision  a new revision with --edited pages rewritten and the last page removed
+  full      the same revision into a fresh store without a manifest (the old flow)
+
+and reports pages extracted, chunks embedded and chunks deleted for each.
+
+Run from the repository root:
+    python -m benchmarks.bench_incremental_ingest --pages 200 --edited 5
+"""
+import argparse
+import io
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.fake_servers import FakeOpenAIServer, synthetic_texts
+from benchmarks.synthetic_pdfs import build_pdf
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--edited", type=int, default=5, help="Pages rewritten in the revision")
+    parser.add_argument("--lines", type=int, default=40, help="Lines per page")
+    args = parser.parse_args()
+
+    lines = synthetic_texts(args.pages * args.lines, words_per_text=12, seed=0)
+    pages = [lines[page * args.lines:(page + 1) * args.lines] for page in range(args.pages)]
+    edits = synthetic_texts(args.edited, words_per_text=12, seed=1)
+    revised = [list(page) for page in pages[:-1]]
+    for edit, page in zip(edits, random.Random(0).sample(range(len(revised)), args.edited)):
+        revised[page][args.lines // 2] = edit
+    original_pdf, revised_pdf = build_pdf(pages), build_pdf(revised)
+
+    with FakeOpenAIServer() as server, tempfile.TemporaryDirectory() as path:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+        os.environ["EMBEDDING_CACHE_ENABLED"] = "false"
+        os.environ["LEXICAL_SEARCH_ENABLED"] = "false"
+        os.environ["INGEST_INCREMENTAL"] = "false"
+        from src.database.local_vector_store import LocalVectorStore
+        from src.embeddings.embeddings_service import EmbeddingsService
+        from src.ingestion.ingestion_pipeline import IngestionPipeline
+        from src.ingestion.manifest import DocumentManifest
+
+        embeddings = EmbeddingsService()
+        incremental = IngestionPipeline(embeddings, LocalVectorStore(path=os.path.join(path, "incremental")),
+                                        manifest=DocumentManifest(os.path.join(path, "manifest.sqlite3")))
+        full = IngestionPipeline(embeddings, LocalVectorStore(path=os.path.join(path, "full")))
+
+        runs = [
+            ("initial", incremental, original_pdf, "manual.pdf"),
+            ("renamed", incremental, original_pdf, "manual (copy).pdf"),
+            ("revision", incremental, revised_pdf, "manual.pdf"),
+            ("full", full, revised_pdf, "manual.pdf"),
+        ]
+        print(f"{args.pages} pages; revision edits {args.edited} and drops the last one")
+        print(f"{'upload':<10}{'seconds':>9}{'extracted':>11}{'reused':>8}{'chunks':>8}"
+              f"{'embedded':>10}{'unchanged':>11}{'deleted':>9}")
+        for name, pipeline, data, filename in runs:
+            start = time.perf_counter()
+            result = pipeline.ingest(io.BytesIO(data), filename)
+            elapsed = time.perf_counter() - start
+            extracted = result.get("pages_extracted", len(revised) if name == "full" else 0)
+            print(f"{name:<10}{elapsed:>9.2f}{extracted:>11}{result.get('pages_reused', 0):>8}"
+                  f"{result['chunks']:>8}{result['embedded']:>10}{result['unchanged']:>11}{result['deleted']:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Per-interaction overhead of building services on every rerun vs the shared container.
+
+Each interaction resolves the services the page needs and runs one retrieval
+(query embedding + match_documents) against local fake OpenAI and PostgREST
+servers. "per-rerun" rebuilds the services like AppPages used to (a vector
+store and embeddings service for the page plus another pair inside
+ChatService); "container" takes them from the process-wide ServiceContainer.
+--connect-latency delays every new TCP connection to mimic a TLS handshake
+to a remote endpoint.
+
+Run from the repository root:
+    python -m benchmarks.bench_interaction_overhead --interactions 50 --connect-latency 0.05
+"""
+import argparse
+import contextlib
+import io
+import os
+import time
+
+import numpy as np
+
+from benchmarks.fake_servers import FakeOpenAIServer, FakePostgrestServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--interactions", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.0, help="Fixed seconds per request")
+    parser.add_argument("--connect-latency", type=float, default=0.0, help="Seconds per new connection")
+    args = parser.parse_args()
+
+    with FakeOpenAIServer(latency=args.latency) as openai_server, \
+            FakePostgrestServer(latency=args.latency) as postgrest_server:
+        os.environ["OPENAI_BASE_URL"] = openai_server.base_url
+        os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+        os.environ["SUPABASE_URL"] = postgrest_server.url
+        os.environ["SUPABASE_KEY"] = FakePostgrestServer.API_KEY
+        os.environ["VECTOR_STORE_BACKEND"] = "supabase"
+        os.environ["EMBEDDING_CACHE_ENABLED"] = "false"
+        os.environ["LEXICAL_SEARCH_ENABLED"] = "false"
+        os.environ["ANSWER_CACHE_ENABLED"] = "false"
+        os.environ["SERVICE_WARMUP"] = "false"
+        os.environ["MATCH_THRESHOLD"] = "-1"
+        from src.chat.chat_service import ChatService
+        from src.database.vector_store import get_vector_store
+        from src.embeddings.embeddings_service import EmbeddingsService
+        from src.services.container import ServiceContainer
+
+        for server in (openai_server, postgrest_server):
+            server.connect_latency = args.connect_latency
+        rng = np.random.default_rng(0)
+        table = postgrest_server.table("pdf_documents")
+        for i in range(200):
+            table[str(i)] = {"id": str(i), "content": f"chunk {i}", "metadata": "{}",
+                             "embedding": rng.standard_normal(1536).astype(np.float32).tolist()}
+
+        def per_rerun():
+            EmbeddingsService()
+            get_vector_store()
+            return ChatService()
+
+        container = ServiceContainer()
+
+        def shared():
+            container.embeddings_service
+            container.vector_store
+            return container.chat_service
+
+        print(f"{args.interactions} interactions, connect latency {args.connect_latency * 1000:.0f} ms")
+        print(f"{'services':<11}{'first ms':>10}{'mean ms':>10}{'p95 ms':>9}{'conns/interaction':>19}")
+        for name, resolve in (("per-rerun", per_rerun), ("container", shared)):
+            latencies = []
+            connections = openai_server.connections + postgrest_server.connections
+            for i in range(args.interactions):
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    resolve().search(f"question number {i}")
+                latencies.append((time.perf_counter() - start) * 1000)
+            connections = openai_server.connections + postgrest_server.connections - connections
+            steady = np.array(latencies[1:] or latencies)
+            print(f"{name:<11}{latencies[0]:>10.1f}{steady.mean():>10.1f}{np.percentile(steady, 95):>9.1f}"
+                  f"{connections / args.interactions:>19.2f}")
+        container.close()
+
+
+if __name__ == "__main__":
+    main()
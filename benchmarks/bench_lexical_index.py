@@ -0,0 +1,95 @@
+"""
+Build throughput and query latency of the local BM25 lexical index.
+
+Indexes synthetic chunks, each carrying a unique part number, in ingestion
+sized batches, then measures:
+
+  identifier  exact part-number lookups ("PN-0012345"), reporting how often
+              the chunk holding it ranks first
+  words       five-word natural-language queries over a uniform vocabulary
+              (the worst case: every term has long postings)
+
+for the BM25 ranking alone (search_rows) and with chunk text fetched from
+SQLite (search). The index is reopened at the end to time loading it.
+
+Run from the repository root:
+    python -m benchmarks.bench_lexical_index --chunks 1000000 --queries 500
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.fake_servers import synthetic_texts
+from src.database.lexical_index import BM25Index
+
+
+def percentiles(latencies):
+    latencies = np.array(latencies) * 1000
+    return np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=200000)
+    parser.add_argument("--words", type=int, default=120, help="Words per chunk")
+    parser.add_argument("--batch", type=int, default=256, help="Chunks per add() call")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as path:
+        vocabulary = sorted(set(" ".join(synthetic_texts(500, seed=0)).replace(".", "").split()))
+        rng = random.Random(0)
+        index = BM25Index(path)
+        start = time.perf_counter()
+        for first in range(0, args.chunks, args.batch):
+            count = min(args.batch, args.chunks - first)
+            index.add({"id": f"chunk-{first + i}",
+                       "text": " ".join(rng.choices(vocabulary, k=args.words)) + f". Part PN-{first + i:07d}.",
+                       "metadata": {"document_id": f"doc-{(first + i) // 100}"}}
+                      for i in range(count))
+        index.flush()
+        build = time.perf_counter() - start
+        stats = index.stats()
+        on_disk = sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)
+                      if name.endswith(".npz"))
+        print(f"{args.chunks} chunks of {args.words} words: built in {build:.1f}s "
+              f"({args.chunks / build:.0f} chunks/s), {stats['terms']} terms, {stats['segments']} segment(s)")
+        print(f"postings {stats['bytes'] / 2**20:.1f} MiB in memory, segments {on_disk / 2**20:.1f} MiB on disk "
+              f"({stats['bytes'] / args.chunks:.1f} bytes/chunk)")
+
+        rng = random.Random(1)
+        targets = [rng.randrange(args.chunks) for _ in range(args.queries)]
+        workloads = {
+            "identifier": [f"PN-{target:07d}" for target in targets],
+            "words": [" ".join(rng.sample(vocabulary, 5)) for _ in range(args.queries)],
+        }
+
+        print(f"{'queries':<12}{'ranking p50 ms':>16}{'p99 ms':>9}{'with text p50 ms':>18}{'p99 ms':>9}{'top-1':>8}")
+        for name, queries in workloads.items():
+            ranking, full, first_hits = [], [], 0
+            for i, query in enumerate(queries):
+                started = time.perf_counter()
+                index.search_rows(query, args.top_k)
+                ranking.append(time.perf_counter() - started)
+                started = time.perf_counter()
+                results = index.search(query, args.top_k)
+                full.append(time.perf_counter() - started)
+                if name == "identifier" and results and results[0]["id"] == f"chunk-{targets[i]}":
+                    first_hits += 1
+            top1 = f"{first_hits / len(queries):.3f}" if name == "identifier" else "-"
+            print(f"{name:<12}{'%.3f' % percentiles(ranking)[0]:>16}{'%.3f' % percentiles(ranking)[1]:>9}"
+                  f"{'%.3f' % percentiles(full)[0]:>18}{'%.3f' % percentiles(full)[1]:>9}{top1:>8}")
+        index.close()
+
+        start = time.perf_counter()
+        BM25Index(path).close()
+        print(f"reopened in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Multi-document ingestion throughput (docs/sec) against the number of parse workers.
+
+Ingests a corpus of synthetic PDFs through IngestionOrchestrator into a
+temporary local vector store, with a fake embeddings server, for each
+worker count.
+
+Run from the repository root:
+    python -m benchmarks.bench_parallel_ingest --docs 16 --pages 40 --workers 1 2 4 8
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.fake_servers import FakeOpenAIServer
+from benchmarks.synthetic_pdfs import synthetic_corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=12)
+    parser.add_argument("--pages", type=int, default=30)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--latency", type=float, default=0.02, help="Fixed seconds per embedding request")
+    args = parser.parse_args()
+
+    corpus = synthetic_corpus([args.pages] * args.docs)
+    files = [(f"doc{i}.pdf", data) for i, data in enumerate(corpus)]
+
+    with FakeOpenAIServer(latency=args.latency) as server, tempfile.TemporaryDirectory() as path:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+        os.environ["EMBEDDING_CACHE_ENABLED"] = "false"
+        os.environ["LEXICAL_SEARCH_ENABLED"] = "false"
+        from src.database.local_vector_store import LocalVectorStore
+        from src.embeddings.embeddings_service import EmbeddingsService
+        from src.ingestion.orchestrator import IngestionOrchestrator
+
+        print(f"{args.docs} docs x {args.pages} pages, {os.cpu_count()} CPUs")
+        print(f"{'workers':>8}{'seconds':>10}{'docs/s':>10}{'pages/s':>10}")
+        for workers in args.workers:
+            store = LocalVectorStore(path=os.path.join(path, f"w{workers}"))
+            orchestrator = IngestionOrchestrator(EmbeddingsService(), store, parse_workers=workers, io_workers=2)
+            orchestrator._process_pool().submit(int).result()  # exclude process start-up
+            start = time.perf_counter()
+            results = orchestrator.run(files)
+            elapsed = time.perf_counter() - start
+            orchestrator.shutdown()
+            failed = [name for name, result in results.items() if "error" in result]
+            assert not failed, failed
+            print(f"{workers:>8}{elapsed:>10.2f}{args.docs / elapsed:>10.2f}{args.docs * args.pages / elapsed:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Text extraction speed of each installed PDF backend.
+
+1. Sequential: pages/sec of every backend available here (PyPDF2 always;
+   pypdfium2, pypdf and pdfminer.six when installed) over a synthetic
+   corpus, with the characters extracted as a sanity check.
+2. Page-parallel: the configured backend extracting the largest document as
+   page ranges in a process pool, the way the ingestion orchestrator splits
+   PDFs of PDF_PARALLEL_MIN_PAGES pages or more.
+
+Run from the repository root:
+    python -m benchmarks.bench_pdf_extractors --sizes 5 20 80 200 --workers 4
+"""
+import argparse
+import io
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.synthetic_pdfs import synthetic_corpus
+from src.ingestion.orchestrator import extract_page_range
+from src.pdf.extractors import available_extractors, get_extractor
+from src.pdf.pdf_processor import PDFProcessor
+
+
+def extract_all(corpus, extractor):
+    pages = chars = 0
+    for data in corpus:
+        for _, text in PDFProcessor.iter_pages(io.BytesIO(data), extractor=extractor):
+            pages += 1
+            chars += len(text)
+    return pages, chars
+
+
+def extract_parallel(pool, path, page_count, workers, pages_per_task):
+    size = max(pages_per_task, -(-page_count // workers))
+    futures = [pool.submit(extract_page_range, path, first, min(first + size, page_count))
+               for first in range(0, page_count, size)]
+    return sum(len(future.result()[0]) for future in futures)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5, 20, 80, 200], help="Pages per document")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--pages-per-task", type=int, default=32)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    corpus = synthetic_corpus(args.sizes)
+    total_pages = sum(args.sizes)
+    print(f"corpus: {len(corpus)} documents, {total_pages} pages, {sum(map(len, corpus)) / 2**20:.1f} MB")
+
+    print(f"\n{'backend':<12}{'pages/s':>10}{'ms/page':>10}{'chars':>12}")
+    for name in available_extractors():
+        extractor = get_extractor(name)
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            pages, chars = extract_all(corpus, extractor)
+            best = min(best, time.perf_counter() - start)
+        print(f"{name:<12}{pages / best:>10.0f}{best / pages * 1000:>10.2f}{chars:>12}")
+
+    largest = max(corpus, key=len)
+    page_count = PDFProcessor.count_pages(io.BytesIO(largest))
+    print(f"\npage-parallel, {page_count}-page document, backend {get_extractor().name}")
+    print(f"{'workers':<12}{'pages/s':>10}{'seconds':>10}")
+    with tempfile.NamedTemporaryFile(suffix=".pdf") as spill:
+        spill.write(largest)
+        spill.flush()
+        for workers in sorted({1, args.workers}):
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+                extract_parallel(pool, spill.name, page_count, workers, args.pages_per_task)  # warm up
+                best = float("inf")
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    extract_parallel(pool, spill.name, page_count, workers, args.pages_per_task)
+                    best = min(best, time.perf_counter() - start)
+            print(f"{workers:<12}{page_count / best:>10.0f}{best:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
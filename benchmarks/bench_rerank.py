@@ -0,0 +1,83 @@
+"""
+Diversity and latency of the over-fetch + MMR re-ranking stage.
+
+The corpus has --topics topics, each stored as --duplicates near-identical
+chunks (the way overlapping chunks and repeated boilerplate look to the
+vector search). For queries close to a topic it compares:
+
+  top-k          the TOP_K_RESULTS nearest chunks (retrieval without re-ranking)
+  mmr N          N nearest chunks re-ranked by Reranker to the same top-k
+
+reporting the distinct topics among the top-k (more is more evidence per
+prompt token), the mean relevance of what was kept, and the re-ranking time
+per query. With sentence-transformers installed, --cross-encoder adds the
+cross-encoder's time for scoring the same candidates in one batch.
+
+Run from the repository root:
+    python -m benchmarks.bench_rerank --topics 500 --duplicates 5 --candidates 10 20 50
+"""
+import argparse
+import time
+
+import numpy as np
+
+from src.chat.reranker import Reranker
+from utils.vectors import normalize
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--topics", type=int, default=500)
+    parser.add_argument("--duplicates", type=int, default=5, help="Near-identical chunks per topic")
+    parser.add_argument("--dimension", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--candidates", type=int, nargs="+", default=[10, 20, 50])
+    parser.add_argument("--lambda", dest="diversity_lambda", type=float, default=0.7)
+    parser.add_argument("--cross-encoder", default="", help="Cross-encoder model to time as well")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    topics = normalize(rng.standard_normal((args.topics, args.dimension)).astype(np.float32))
+    noise = rng.standard_normal((args.topics, args.duplicates, args.dimension)).astype(np.float32) * 0.01
+    corpus = normalize((topics[:, None, :] + noise).reshape(-1, args.dimension))
+    topic_of = np.repeat(np.arange(args.topics), args.duplicates)
+
+    # Queries sit near one topic and partly towards a second, so both are relevant evidence
+    first = rng.integers(0, args.topics, size=args.queries)
+    second = rng.integers(0, args.topics, size=args.queries)
+    queries = normalize(topics[first] + 0.8 * topics[second]
+                        + rng.standard_normal((args.queries, args.dimension)).astype(np.float32) * 0.02)
+
+    print(f"{'ranking':<16}{'topics in top-' + str(args.k):>18}{'relevance':>12}{'rerank ms':>12}")
+    for candidates in [args.k] + args.candidates:
+        reranker = Reranker(top_k=args.k, diversity_lambda=args.diversity_lambda if candidates > args.k else 1.0,
+                            cross_encoder=None)
+        distinct, relevance, seconds = [], [], []
+        for query in queries:
+            scores = corpus @ query
+            hits = np.argsort(-scores)[:candidates]
+            results = [{"id": str(row), "content": "", "similarity": float(scores[row])} for row in hits]
+            embeddings = {str(row): corpus[row] for row in hits}
+            start = time.perf_counter()
+            kept = reranker.rerank("", query, results, embeddings)
+            seconds.append(time.perf_counter() - start)
+            rows = [int(result["id"]) for result in kept]
+            distinct.append(len(set(topic_of[rows])))
+            relevance.append(float(np.mean(scores[rows])))
+        name = "top-k" if candidates == args.k else f"mmr {candidates}"
+        print(f"{name:<16}{np.mean(distinct):>18.2f}{np.mean(relevance):>12.3f}{np.mean(seconds) * 1000:>12.3f}")
+
+    if args.cross_encoder:
+        reranker = Reranker(top_k=args.k, diversity_lambda=1.0, cross_encoder=args.cross_encoder)
+        results = [{"id": str(i), "content": " ".join(["passage text"] * 60)} for i in range(max(args.candidates))]
+        reranker.relevance("warm up", results[:2])
+        print(f"\n{'cross-encoder':<16}{'candidates':>18}{'ms':>12}")
+        for candidates in args.candidates:
+            start = time.perf_counter()
+            reranker.relevance("what does the document say about the topic?", results[:candidates])
+            print(f"{args.cross_encoder[-16:]:<16}{candidates:>18}{(time.perf_counter() - start) * 1000:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
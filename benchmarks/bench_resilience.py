@@ -0,0 +1,139 @@
+"""
+Behaviour of the resilience layer against fault-injecting fake servers.
+
+1. Hedging: query embeddings while --stall-rate of OpenAI requests stall
+   for --stall-seconds. Compares latency percentiles with hedging off and
+   with a duplicate request after --hedge-delay.
+2. Deadline: a question while every OpenAI request stalls for 10 seconds.
+   The query embedding times out within its share of the deadline, the
+   search falls back to keywords, and the answer's request times out
+   with what is left; the reply (an error) arrives within the deadline.
+3. Circuit breaker: query embeddings while OpenAI is down. Without a
+   breaker every call pays for its retries; with one, calls fail at once
+   after the threshold is reached.
+4. Retries: vector searches while --error-rate of Supabase requests fail,
+   with and without retries.
+
+Run from the repository root:
+    python -m benchmarks.bench_resilience --queries 200 --stall-rate 0.05
+"""
+import argparse
+import logging
+import os
+import time
+
+import numpy as np
+
+from benchmarks.fake_servers import FakeOpenAIServer, FakePostgrestServer, synthetic_texts
+
+
+def percentiles(seconds):
+    milliseconds = np.array(seconds) * 1000
+    return " ".join(f"{name} {np.percentile(milliseconds, q):>7.1f}"
+                    for name, q in (("p50", 50), ("p95", 95), ("p99", 99), ("max", 100)))
+
+
+def counter(telemetry, name):
+    return sum(entry["value"] for entry in telemetry.snapshot()["counters"] if entry["name"] == name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds per OpenAI request")
+    parser.add_argument("--stall-rate", type=float, default=0.05)
+    parser.add_argument("--stall-seconds", type=float, default=1.0)
+    parser.add_argument("--hedge-delay", type=float, default=0.1)
+    parser.add_argument("--deadline", type=float, default=2.0)
+    parser.add_argument("--error-rate", type=float, default=0.3, help="Share of failing Supabase requests")
+    args = parser.parse_args()
+    # Every injected failure is logged; keep the output to the results
+    logging.disable(logging.CRITICAL)
+
+    with FakeOpenAIServer(dimension=256, latency=args.latency) as openai_server, \
+            FakePostgrestServer() as postgrest_server:
+        # Settings are read at import time: configure before the app's modules are loaded
+        os.environ.update({
+            "OPENAI_BASE_URL": openai_server.base_url,
+            "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY") or "sk-fake",
+            "SUPABASE_URL": postgrest_server.url,
+            "SUPABASE_KEY": FakePostgrestServer.API_KEY,
+            "VECTOR_STORE_BACKEND": "supabase",
+            "VECTOR_DIMENSION": "256",
+            "EMBEDDING_CACHE_ENABLED": "false",
+            "ANSWER_CACHE_ENABLED": "false",
+            "LEXICAL_SEARCH_ENABLED": "false",
+            "RETRY_BASE_DELAY": "0.05",
+            "QUERY_DEADLINE_SECONDS": str(args.deadline),
+        })
+        from src.chat.chat_service import ChatService
+        from utils.resilience import get_circuit_breaker
+
+        service = ChatService()
+        embeddings = service.embeddings_service
+        breaker = get_circuit_breaker("openai")
+        queries = [" ".join(text.split()[:10]) for text in synthetic_texts(args.queries, seed=3)]
+        texts = synthetic_texts(100, seed=1) + ["The report says revenue grew by a fifth."]
+        service.db_client.store_document_chunks([
+            {"id": str(i), "text": text, "embedding": embedding,
+             "metadata": {"document_id": "bench", "filename": "bench.pdf"}}
+            for i, (text, embedding) in enumerate(zip(texts, embeddings.embed_texts(texts)))
+        ])
+
+        print(f"1. hedging: {args.stall_rate:.0%} of requests stall {args.stall_seconds}s")
+        openai_server.stall_rate, openai_server.stall_seconds = args.stall_rate, args.stall_seconds
+        for delay in (0.0, args.hedge_delay):
+            embeddings.hedge_delay = delay
+            requests = openai_server.stats["requests"]
+            seconds = []
+            for i, query in enumerate(queries):
+                start = time.perf_counter()
+                embeddings.generate_query_embedding(f"{query} {delay} {i}")
+                seconds.append(time.perf_counter() - start)
+            sent = (openai_server.stats["requests"] - requests) / len(queries)
+            name = f"hedge {delay}s" if delay else "no hedging"
+            print(f"   {name:<14} ms {percentiles(seconds)}   requests/query {sent:.2f}")
+        openai_server.stall_rate = 0.0
+        embeddings.hedge_delay = 0.0
+
+        print(f"\n2. deadline: every OpenAI request stalls 10s, QUERY_DEADLINE_SECONDS={args.deadline}")
+        openai_server.stall_rate, openai_server.stall_seconds = 1.0, 10.0
+        start = time.perf_counter()
+        response = service.process_query("What does the report say about revenue?")
+        print(f"   answered in {time.perf_counter() - start:.2f}s: {response['answer'][:90]}")
+        openai_server.stall_rate = 0.0
+        breaker.record_success()
+
+        print("\n3. circuit breaker: OpenAI down")
+        openai_server.down = True
+        embeddings.max_retries = 3
+        for threshold in (0, 5):
+            breaker.failure_threshold = threshold
+            breaker.record_success()
+            requests = openai_server.faults["outage_errors"]
+            seconds = []
+            for query in queries[:50]:
+                start = time.perf_counter()
+                service.embed_query(query)
+                seconds.append(time.perf_counter() - start)
+            name = f"threshold {threshold}" if threshold else "no breaker"
+            print(f"   {name:<14} ms {percentiles(seconds)}   "
+                  f"requests sent {openai_server.faults['outage_errors'] - requests}")
+        openai_server.down = False
+        breaker.record_success()
+
+        print(f"\n4. retries: {args.error_rate:.0%} of Supabase requests fail")
+        get_circuit_breaker("supabase").failure_threshold = 0
+        postgrest_server.error_rate = args.error_rate
+        vectors = embeddings.embed_texts(queries[:50])
+        for retries in (0, 2):
+            service.db_client.search_retries = retries
+            failed = counter(service.telemetry, "search_errors")
+            for vector in vectors:
+                service.db_client.similarity_search(vector, 5)
+            failed = counter(service.telemetry, "search_errors") - failed
+            print(f"   retries {retries}      failed searches {failed}/{len(vectors)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Peak memory and wall time of whole-document vs streaming ingestion.
+
+"list" is the old flow: extract every page, chunk, embed every chunk, then
+store. "streaming" is IngestionPipeline: pages are chunked as they are read and
+batches flow through bounded embed/store queues.
+
+Run from the repository root:
+    python -m benchmarks.bench_streaming_ingest --pages 400
+"""
+import argparse
+import io
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.fake_servers import FakeOpenAIServer
+from benchmarks.synthetic_pdfs import synthetic_pdf
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.0, help="Fixed seconds per embedding request")
+    args = parser.parse_args()
+
+    pdf_bytes = synthetic_pdf(args.pages)
+    with FakeOpenAIServer(latency=args.latency) as server, tempfile.TemporaryDirectory() as path:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+        os.environ["EMBEDDING_CACHE_ENABLED"] = "false"
+        os.environ["LEXICAL_SEARCH_ENABLED"] = "false"
+        from src.database.local_vector_store import LocalVectorStore
+        from src.embeddings.embeddings_service import EmbeddingsService
+        from src.ingestion.ingestion_pipeline import IngestionPipeline
+        from src.pdf.pdf_processor import PDFProcessor
+
+        embeddings = EmbeddingsService()
+
+        def list_flow(store):
+            chunks = PDFProcessor.process_pdf(io.BytesIO(pdf_bytes), "bench.pdf")
+            chunks = embeddings.generate_batch_embeddings(chunks)
+            store.store_document_chunks(chunks)
+            return len(chunks)
+
+        def streaming_flow(store):
+            return IngestionPipeline(embeddings, store).ingest(io.BytesIO(pdf_bytes), "bench.pdf")["chunks"]
+
+        print(f"{args.pages} pages, {len(pdf_bytes) / 1e6:.1f} MB PDF")
+        print(f"{'flow':<12}{'chunks':>8}{'seconds':>10}{'peak MB':>10}")
+        for name, flow in (("list", list_flow), ("streaming", streaming_flow)):
+            store = LocalVectorStore(path=os.path.join(path, name))
+            tracemalloc.start()
+            start = time.perf_counter()
+            count = flow(store)
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"{name:<12}{count:>8}{elapsed:>10.2f}{peak / 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Memory of ingesting large uploads.
+
+Ingests --docs PDFs of --pages pages at once through IngestionOrchestrator
+into a temporary local vector store, with a fake embeddings server. Each PDF
+is padded with --padding-mb of unreferenced binary data, standing in for
+the page images of a scan. Flows:
+
+  in-memory    file contents handed over as bytes, as uploads used to be
+  mapped       files handed over by path and read through memory maps
+  mapped+limit the same, with an ingestion memory budget of --limit-mb
+
+and for this process (parsing runs in worker processes, not included):
+
+  heap MB      peak of Python allocations (tracemalloc)
+  kept MB      allocations still held at the end, mostly the vectors in the
+               store; heap minus kept is what ingestion held on the way
+  RSS MB       peak resident set size above the start, sampled every 10 ms
+  budget MB    peak bytes of chunks and embeddings reserved in the budget
+  waits        batches that waited for room in the budget
+
+Run from the repository root:
+    python -m benchmarks.bench_upload_memory --docs 4 --pages 200 --padding-mb 50
+"""
+import argparse
+import gc
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from benchmarks.fake_servers import FakeOpenAIServer
+from benchmarks.synthetic_pdfs import synthetic_pdf
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=4)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--padding-mb", type=float, default=50)
+    parser.add_argument("--limit-mb", type=int, default=4, help="INGEST_MEMORY_LIMIT_MB of the last flow")
+    parser.add_argument("--latency", type=float, default=0.02, help="Fixed seconds per embedding request")
+    args = parser.parse_args()
+
+    with FakeOpenAIServer(dimension=1536, latency=args.latency) as server, tempfile.TemporaryDirectory() as path:
+        # Settings are read at import time: configure before the app's modules are loaded
+        os.environ.update({
+            "OPENAI_BASE_URL": server.base_url,
+            "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY") or "sk-fake",
+            "EMBEDDING_CACHE_ENABLED": "false",
+            "LEXICAL_SEARCH_ENABLED": "false",
+            "INGEST_INCREMENTAL": "false",
+        })
+        from src.database.local_vector_store import LocalVectorStore
+        from src.embeddings.embeddings_service import EmbeddingsService
+        from src.ingestion.orchestrator import IngestionOrchestrator
+        from utils.memory import MemoryBudget, rss_bytes
+
+        paths = []
+        for i in range(args.docs):
+            paths.append(os.path.join(path, f"doc{i}.pdf"))
+            with open(paths[-1], "wb") as file:
+                file.write(synthetic_pdf(args.pages, seed=i, padding=int(args.padding_mb * 2**20)))
+        size = sum(os.path.getsize(p) for p in paths)
+        print(f"{args.docs} docs x {args.pages} pages, {size / 2**20:.0f} MB in total")
+        print(f"{'flow':<14}{'chunks':>8}{'seconds':>9}{'heap MB':>9}{'kept MB':>9}{'RSS MB':>8}{'budget MB':>11}{'waits':>7}")
+
+        # The first run fills one-time caches (tokenizer, the fake server's vectors); it is not reported
+        for name, mapped, limit in (("warm-up", True, 0), ("in-memory", False, 0), ("mapped", True, 0),
+                                    ("mapped+limit", True, args.limit_mb)):
+            store = LocalVectorStore(path=os.path.join(path, name))
+            orchestrator = IngestionOrchestrator(EmbeddingsService(), store, io_workers=args.docs)
+            budget = orchestrator.pipeline.memory_budget = MemoryBudget(limit * 2**20)
+            orchestrator._process_pool().submit(int).result()  # exclude process start-up
+
+            def files():
+                for p in paths:
+                    if mapped:
+                        yield os.path.basename(p), p
+                    else:
+                        with open(p, "rb") as file:
+                            yield os.path.basename(p), file.read()
+
+            gc.collect()
+            baseline = rss_bytes()
+            peak_rss = [baseline]
+            done = threading.Event()
+
+            def sample():
+                while not done.wait(0.01):
+                    peak_rss[0] = max(peak_rss[0], rss_bytes())
+
+            sampler = threading.Thread(target=sample, daemon=True)
+            sampler.start()
+            tracemalloc.start()
+            start = time.perf_counter()
+            results = orchestrator.run(files())
+            elapsed = time.perf_counter() - start
+            gc.collect()
+            kept, peak_heap = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            done.set()
+            sampler.join()
+            orchestrator.shutdown()
+            failed = [filename for filename, result in results.items() if "error" in result]
+            assert not failed, results
+            chunks = sum(result["chunks"] for result in results.values())
+            stats = budget.stats()
+            if name == "warm-up":
+                continue
+            print(f"{name:<14}{chunks:>8}{elapsed:>9.2f}{peak_heap / 2**20:>9.1f}{kept / 2**20:>9.1f}"
+                  f"{(peak_rss[0] - baseline) / 2**20:>8.1f}{stats['peak'] / 2**20:>11.1f}{stats['waits']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Memory, payload size and recall of compact embedding representations.
+
+1. Memory per vector: Python list of floats vs NumPy float32, int8 and
+   binary codes, and Matryoshka-shortened float32.
+2. Payload per vector: JSON array (what was sent to Supabase), pgvector text
+   (what is sent now) and base64 float32 (what the OpenAI API returns), with
+   the time to build each.
+3. Recall@k and query latency of the local store's exact scan over float32,
+   int8 and binary codes, with and without full-precision rescoring, and over
+   Matryoshka-truncated vectors, against the float32 top-k. "scan MB" is what
+   each query reads.
+
+The synthetic vectors are a Gaussian mixture, not real embeddings. Truncating
+them keeps random dimensions rather than the most informative ones, so the
+Matryoshka rows understate the recall of text-embedding-3 models.
+
+Run from the repository root:
+    python -m benchmarks.bench_vector_quantization --rows 100000 --dimension 1536
+"""
+import argparse
+import base64
+import json
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.bench_vector_search import clustered_vectors, measure
+from src.database.local_vector_store import LocalVectorStore
+from utils.vectors import BinaryCodec, Int8Codec, normalize, to_pgvector, truncate
+
+
+def timed(build, vectors):
+    start = time.perf_counter()
+    sizes = [len(build(vector)) for vector in vectors]
+    return float(np.mean(sizes)), (time.perf_counter() - start) / len(vectors) * 1e6
+
+
+def load(path, data, **options):
+    store = LocalVectorStore(path=path, dimension=data.shape[1], index_type="exact", **options)
+    for offset in range(0, len(data), 5000):
+        store.store_document_chunks([
+            {"id": str(i), "text": "", "embedding": data[i], "metadata": {}}
+            for i in range(offset, min(offset + 5000, len(data)))
+        ])
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--dimension", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--clusters", type=int, default=200)
+    args = parser.parse_args()
+
+    data = normalize(clustered_vectors(args.rows, args.dimension, args.clusters))
+    rng = np.random.default_rng(1)
+    queries = data[rng.integers(0, args.rows, size=args.queries)]
+    queries = normalize(queries + rng.standard_normal(queries.shape).astype(np.float32) * 0.02)
+
+    sample = data[:200]
+    as_list = sample[0].tolist()
+    print(f"{'representation':<24}{'bytes/vector':>14}")
+    print(f"{'python list[float]':<24}{sys.getsizeof(as_list) + sum(map(sys.getsizeof, as_list)):>14}")
+    print(f"{'float32':<24}{sample[0].nbytes:>14}")
+    for dimensions in (512, 256):
+        print(f"{f'float32 {dimensions}d':<24}{truncate(sample[0], dimensions).nbytes:>14}")
+    print(f"{'int8 (+scale)':<24}{Int8Codec(args.dimension).code_size:>14}")
+    print(f"{'binary':<24}{BinaryCodec(args.dimension).code_size:>14}")
+
+    print(f"\n{'payload':<24}{'bytes/vector':>14}{'us/vector':>12}")
+    for name, build in (("json array", lambda v: json.dumps(v.tolist())),
+                        ("pgvector text", to_pgvector),
+                        ("base64 float32", lambda v: base64.b64encode(v.tobytes()))):
+        size, micros = timed(build, sample)
+        print(f"{name:<24}{size:>14.0f}{micros:>12.1f}")
+
+    cases = [
+        ("float32", {}, args.dimension),
+        ("int8", {"quantization": "int8", "rescore_factor": 0}, args.dimension),
+        ("int8 + rescore x4", {"quantization": "int8", "rescore_factor": 4}, args.dimension),
+        ("binary", {"quantization": "binary", "rescore_factor": 0}, args.dimension),
+        ("binary + rescore x4", {"quantization": "binary", "rescore_factor": 4}, args.dimension),
+        ("binary + rescore x10", {"quantization": "binary", "rescore_factor": 10}, args.dimension),
+        ("float32 512d", {}, 512),
+        ("float32 256d", {}, 256),
+    ]
+    print(f"\n{'scan':<24}{'scan MB':>10}{'recall@' + str(args.k):>10}{'mean ms':>10}{'p95 ms':>10}")
+    with tempfile.TemporaryDirectory() as path:
+        exact = load(f"{path}/exact", data)
+        truth = [exact.search_rows(query, args.k)[0] for query in queries]
+        for name, options, dimensions in cases:
+            if options or dimensions != args.dimension:
+                store = load(f"{path}/{len(name)}-{name.replace(' ', '')}",
+                             normalize(data[:, :dimensions]), **options)
+            else:
+                store = exact
+            case_queries = [truncate(query, dimensions) for query in queries]
+            codec = store.codec
+            scan_bytes = args.rows * (codec.code_size if codec else dimensions * 4)
+            recall, mean, p95 = measure(lambda q: store.search_rows(q, args.k), case_queries, truth, args.k)
+            print(f"{name:<24}{scan_bytes / 2**20:>10.1f}{recall:>10.3f}{mean:>10.2f}{p95:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
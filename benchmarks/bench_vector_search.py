@@ -0,0 +1,98 @@
+"""
+Recall vs latency of the local vector store: exact scan, IVF and (if installed) HNSW.
+
+Builds a LocalVectorStore over clustered synthetic embeddings, then measures
+recall@k of each approximate index against the exact top-k, together with
+the mean and p95 query latency.
+
+Run from the repository root:
+    python -m benchmarks.bench_vector_search --rows 100000 --dimension 1536
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from src.database.ann_index import HNSWIndex, IVFIndex, hnswlib
+from src.database.local_vector_store import LocalVectorStore
+
+
+def clustered_vectors(rows, dimension, clusters, seed=0):
+    """Gaussian mixture, which is closer to real embeddings than uniform noise"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dimension)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=rows)
+    noise = rng.standard_normal((rows, dimension)).astype(np.float32) * 0.8
+    return centers[labels] + noise
+
+
+def measure(search, queries, truth, k):
+    latencies = []
+    hits = 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        rows, _ = search(query)
+        latencies.append(time.perf_counter() - start)
+        hits += len(set(rows[:k].tolist()) & set(expected.tolist()))
+    latencies = np.array(latencies) * 1000
+    return hits / (len(queries) * k), latencies.mean(), np.percentile(latencies, 95)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--dimension", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--clusters", type=int, default=200)
+    args = parser.parse_args()
+
+    data = clustered_vectors(args.rows, args.dimension, args.clusters)
+    rng = np.random.default_rng(1)
+    queries = data[rng.integers(0, args.rows, size=args.queries)]
+    queries = queries + rng.standard_normal(queries.shape).astype(np.float32) * 0.5
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    with tempfile.TemporaryDirectory() as path:
+        store = LocalVectorStore(path=path, dimension=args.dimension, index_type="exact")
+        start = time.perf_counter()
+        batch = 5000
+        for offset in range(0, args.rows, batch):
+            store.store_document_chunks([
+                {"id": str(i), "text": "", "embedding": data[i], "metadata": {}}
+                for i in range(offset, min(offset + batch, args.rows))
+            ])
+        print(f"loaded {args.rows} x {args.dimension} vectors in {time.perf_counter() - start:.1f}s")
+
+        matrix = store._matrix[:args.rows]
+        truth = [store.search_rows(query, args.k, exact=True)[0] for query in queries]
+
+        print(f"\n{'index':<22}{'recall@' + str(args.k):>10}{'mean ms':>10}{'p95 ms':>10}")
+        recall, mean, p95 = measure(lambda q: store.search_rows(q, args.k, exact=True), queries, truth, args.k)
+        print(f"{'exact (argpartition)':<22}{recall:>10.3f}{mean:>10.2f}{p95:>10.2f}")
+
+        ivf = IVFIndex()
+        start = time.perf_counter()
+        ivf.train(matrix)
+        print(f"{'ivf build':<22}{'':>10}{(time.perf_counter() - start) * 1000:>10.0f}")
+        for nprobe in (1, 4, 8, 16, 32):
+            recall, mean, p95 = measure(lambda q: ivf.search(matrix, q, args.k, nprobe=nprobe),
+                                        queries, truth, args.k)
+            print(f"{'ivf nprobe=' + str(nprobe):<22}{recall:>10.3f}{mean:>10.2f}{p95:>10.2f}")
+
+        if hnswlib is None:
+            print("hnsw                   skipped (pip install hnswlib)")
+            return
+        hnsw = HNSWIndex(args.dimension)
+        start = time.perf_counter()
+        hnsw.train(matrix)
+        print(f"{'hnsw build':<22}{'':>10}{(time.perf_counter() - start) * 1000:>10.0f}")
+        for ef in (16, 64, 128):
+            recall, mean, p95 = measure(lambda q: hnsw.search(matrix, q, args.k, ef=ef),
+                                        queries, truth, args.k)
+            print(f"{'hnsw ef=' + str(ef):<22}{recall:>10.3f}{mean:>10.2f}{p95:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
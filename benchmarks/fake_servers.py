@@ -0,0 +1,699 @@
+"""
+Local stand-ins for the OpenAI API and Supabase (PostgREST) used by the benchmarks.
+
+The servers speak just enough of the real HTTP protocol for the official
+client libraries to talk to them, are deterministic, and can inject latency,
+rate limits and failures. Both also inject the faults the resilience layer
+handles: a share of requests stalling (stall_rate, stall_seconds), and
+outages in which every request fails (down).
+"""
+import base64
+import hashlib
+import json
+import random
+import re
+import socket
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+import numpy as np
+
+_WORD = re.compile(r"\w+")
+
+
+class FakeEmbedder:
+    """
+    Deterministic bag-of-words embedder.
+
+    Every word maps to a fixed pseudo-random unit vector and a text embeds to
+    the normalized sum of its words, so texts sharing vocabulary end up close
+    together, which keeps retrieval benchmarks meaningful.
+    """
+
+    def __init__(self, dimension: int = 1536):
+        self.dimension = dimension
+        self._word_vectors: Dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def _word_vector(self, word: str) -> np.ndarray:
+        vector = self._word_vectors.get(word)
+        if vector is None:
+            seed = int.from_bytes(hashlib.blake2b(word.encode(), digest_size=8).digest(), "little")
+            vector = np.random.default_rng(seed).standard_normal(self.dimension).astype(np.float32)
+            with self._lock:
+                self._word_vectors[word] = vector
+        return vector
+
+    def embed(self, text: str) -> np.ndarray:
+        words = _WORD.findall(text.lower()) or [""]
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for word in words:
+            vector += self._word_vector(word)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class _SlidingWindow:
+    """Counts events over the last 60 seconds"""
+
+    def __init__(self):
+        self.events = deque()
+        self.total = 0
+
+    def add(self, now: float, amount: int) -> None:
+        self.events.append((now, amount))
+        self.total += amount
+
+    def prune(self, now: float) -> None:
+        while self.events and self.events[0][0] <= now - 60.0:
+            self.total -= self.events.popleft()[1]
+
+    def reset_in(self, now: float) -> float:
+        return max(0.0, self.events[0][0] + 60.0 - now) if self.events else 0.0
+
+
+class EventStream:
+    """Server-sent events payload: handle() returns one to stream its events"""
+
+    def __init__(self, events: Iterable[Dict[str, Any]], first_delay: float = 0.0, delay: float = 0.0):
+        """
+        Args:
+            events: JSON events, sent as "data:" lines followed by "data: [DONE]"
+            first_delay: Seconds before the first event
+            delay: Seconds between events
+        """
+        self.events = events
+        self.first_delay = first_delay
+        self.delay = delay
+
+
+class _FakeHTTPServer:
+    """Threaded JSON HTTP server; subclasses implement handle()"""
+
+    def __init__(self):
+        self._httpd: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+        # New TCP connections accepted, and seconds each one is delayed to mimic a TLS handshake
+        self.connections = 0
+        self.connect_latency = 0.0
+        # Injected faults: a share of requests stall before being handled; while down, all fail with 503
+        self.stall_rate = 0.0
+        self.stall_seconds = 0.0
+        self.down = False
+        self.faults = {"stalls": 0, "outage_errors": 0}
+        self._fault_random = random.Random(0)
+        self._fault_lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._httpd.server_address[1]}"
+
+    def handle(self, method: str, path: str, query: Dict[str, str], headers, body: Any):
+        """Dispatch a request, returning (status, payload, headers)"""
+        raise NotImplementedError
+
+    def inject_faults(self):
+        """Stall or fail a request as configured, returning the error response to send instead, if any"""
+        with self._fault_lock:
+            if self.down:
+                self.faults["outage_errors"] += 1
+                message = "Injected outage"
+                return 503, {"message": message, "code": "503", "error": {"message": message, "type": "server_error"}}, {}
+            stall = self.stall_rate and self._fault_random.random() < self.stall_rate
+            if stall:
+                self.faults["stalls"] += 1
+        if stall:
+            time.sleep(self.stall_seconds)
+        return None
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                server.connections += 1
+                if server.connect_latency:
+                    time.sleep(server.connect_latency)
+
+            def log_message(self, *args):
+                pass
+
+            def _dispatch(self):
+                length = int(self.headers.get("Content-Length", 0))
+                raw = self.rfile.read(length) if length else b""
+                body = json.loads(raw) if raw else None
+                parts = urlsplit(self.path)
+                query = dict(parse_qsl(parts.query, keep_blank_values=True))
+                status, payload, headers = server.inject_faults() or server.handle(
+                    self.command, unquote(parts.path), query, self.headers, body
+                )
+                if isinstance(payload, EventStream):
+                    self._stream(status, payload, headers)
+                    return
+                data = b"" if payload is None else json.dumps(payload).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(data)))
+                    for key, value in headers.items():
+                        self.send_header(key, value)
+                    self.end_headers()
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client gave up on a stalled request
+                    self.close_connection = True
+
+            def _stream(self, status, payload, headers):
+                self.send_response(status)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                time.sleep(payload.first_delay)
+                try:
+                    for index, event in enumerate([*payload.events, "[DONE]"]):
+                        if index and payload.delay:
+                            time.sleep(payload.delay)
+                        line = event if isinstance(event, str) else json.dumps(event)
+                        data = f"data: {line}\n\n".encode()
+                        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                        self.wfile.flush()
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client closed a cancelled stream
+                    self.close_connection = True
+
+            do_GET = do_POST = do_PATCH = do_DELETE = _dispatch
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+class FakeOpenAIServer(_FakeHTTPServer):
+    """
+    OpenAI-compatible HTTP server for /v1/embeddings, /v1/chat/completions and /v1/models.
+
+    Chat answers are built from words of the prompt, chosen by a hash of the
+    messages, so the same question gets the same answer on every run. With
+    stream=true they are sent as server-sent events, one word per chunk.
+
+    Usage:
+        with FakeOpenAIServer(latency=0.05, rpm_limit=600) as server:
+            os.environ["OPENAI_BASE_URL"] = server.base_url
+    """
+
+    def __init__(self, dimension: int = 1536, latency: float = 0.0, per_input_latency: float = 0.0,
+                 rpm_limit: int = 0, tpm_limit: int = 0, error_rate: float = 0.0, seed: int = 0,
+                 chat_latency: float = 0.0, token_latency: float = 0.0, completion_tokens: int = 64):
+        """
+        Configure the fake server
+
+        Args:
+            dimension: Embedding dimension returned
+            latency: Fixed seconds added to every request
+            per_input_latency: Extra seconds per input text
+            rpm_limit: Requests per minute before answering 429, 0 disables
+            tpm_limit: Tokens per minute before answering 429, 0 disables
+            error_rate: Probability of answering 500
+            seed: Seed for the failure injection
+            chat_latency: Seconds before the first token of a chat completion
+            token_latency: Seconds per further completion token
+            completion_tokens: Words in each chat answer
+        """
+        super().__init__()
+        self.embedder = FakeEmbedder(dimension)
+        self.latency = latency
+        self.per_input_latency = per_input_latency
+        self.chat_latency = chat_latency
+        self.token_latency = token_latency
+        self.completion_tokens = completion_tokens
+        self.rpm_limit = rpm_limit
+        self.tpm_limit = tpm_limit
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.stats = {"requests": 0, "inputs": 0, "chat_requests": 0, "rate_limited": 0, "errors": 0}
+        self._requests = _SlidingWindow()
+        self._tokens = _SlidingWindow()
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        return f"{self.url}/v1"
+
+    def _admit(self, tokens: int):
+        """Apply the rate limits, returning (allowed, headers)"""
+        with self._lock:
+            now = time.monotonic()
+            self._requests.prune(now)
+            self._tokens.prune(now)
+            over_rpm = self.rpm_limit and self._requests.total + 1 > self.rpm_limit
+            over_tpm = self.tpm_limit and self._tokens.total + tokens > self.tpm_limit
+            if over_rpm or over_tpm:
+                self.stats["rate_limited"] += 1
+                window = self._requests if over_rpm else self._tokens
+                return False, {"retry-after": f"{max(window.reset_in(now), 0.05):.3f}"}
+            self._requests.add(now, 1)
+            self._tokens.add(now, tokens)
+            headers = {}
+            if self.rpm_limit:
+                headers["x-ratelimit-remaining-requests"] = str(self.rpm_limit - self._requests.total)
+                headers["x-ratelimit-reset-requests"] = f"{self._requests.reset_in(now):.3f}s"
+            if self.tpm_limit:
+                headers["x-ratelimit-remaining-tokens"] = str(self.tpm_limit - self._tokens.total)
+                headers["x-ratelimit-reset-tokens"] = f"{self._tokens.reset_in(now):.3f}s"
+            return True, headers
+
+    def handle(self, method, path, query, headers, body):
+        if method == "POST" and path.rstrip("/").endswith("/embeddings"):
+            return self._embeddings(body or {})
+        if method == "POST" and path.rstrip("/").endswith("/chat/completions"):
+            return self._chat(body or {})
+        if method == "GET" and path.rstrip("/").endswith("/models"):
+            return 200, {"object": "list", "data": [{"id": "fake", "object": "model", "owned_by": "fake"}]}, {}
+        return 404, {"error": {"message": f"Unknown path {path}"}}, {}
+
+    def _error(self, status: int, message: str, kind: str):
+        return status, {"error": {"message": message, "type": kind, "code": None, "param": None}}
+
+    def _embeddings(self, body: dict):
+        inputs = body.get("input", [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        tokens = sum(len(_WORD.findall(text)) for text in inputs)
+
+        allowed, headers = self._admit(tokens)
+        if not allowed:
+            return (*self._error(429, "Rate limit reached", "requests"), headers)
+
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["inputs"] += len(inputs)
+            failed = self.error_rate and self.random.random() < self.error_rate
+            if failed:
+                self.stats["errors"] += 1
+        time.sleep(self.latency + self.per_input_latency * len(inputs))
+        if failed:
+            return (*self._error(500, "Injected failure", "server_error"), headers)
+
+        dimensions = body.get("dimensions")
+        data = []
+        for index, text in enumerate(inputs):
+            vector = self.embedder.embed(text)
+            if dimensions:
+                vector = vector[:dimensions] / np.linalg.norm(vector[:dimensions])
+            if body.get("encoding_format") == "base64":
+                embedding = base64.b64encode(vector.astype(np.float32).tobytes()).decode()
+            else:
+                embedding = vector.tolist()
+            data.append({"object": "embedding", "index": index, "embedding": embedding})
+
+        payload = {
+            "object": "list",
+            "data": data,
+            "model": body.get("model", "fake"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+        return 200, payload, headers
+
+    def _chat(self, body: dict):
+        messages = body.get("messages", [])
+        prompt = " ".join(str(message.get("content", "")) for message in messages)
+        words = _WORD.findall(prompt)
+        tokens = len(words)
+
+        allowed, headers = self._admit(tokens)
+        if not allowed:
+            return (*self._error(429, "Rate limit reached", "requests"), headers)
+        with self._lock:
+            self.stats["chat_requests"] += 1
+            failed = self.error_rate and self.random.random() < self.error_rate
+            if failed:
+                self.stats["errors"] += 1
+        if failed:
+            time.sleep(self.latency)
+            return (*self._error(500, "Injected failure", "server_error"), headers)
+
+        seed = int.from_bytes(hashlib.blake2b(json.dumps(messages).encode(), digest_size=8).digest(), "little")
+        rng = random.Random(seed)
+        answer = [rng.choice(words) if words else "ok" for _ in range(min(self.completion_tokens,
+                                                                         body.get("max_tokens") or 1 << 30))]
+        model = body.get("model", "fake")
+        completion_id = f"chatcmpl-{seed:016x}"
+        usage = {"prompt_tokens": tokens, "completion_tokens": len(answer), "total_tokens": tokens + len(answer)}
+
+        if body.get("stream"):
+            def chunk(delta, finish_reason=None):
+                return {"id": completion_id, "object": "chat.completion.chunk", "created": 0, "model": model,
+                        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+
+            events = [chunk({"role": "assistant", "content": ""})]
+            events += [chunk({"content": word if index == 0 else f" {word}"}) for index, word in enumerate(answer)]
+            events.append(chunk({}, "stop"))
+            return 200, EventStream(events, self.latency + self.chat_latency, self.token_latency), headers
+
+        time.sleep(self.latency + self.chat_latency + self.token_latency * max(len(answer) - 1, 0))
+        payload = {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": 0,
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": " ".join(answer)},
+                         "finish_reason": "stop"}],
+            "usage": usage,
+        }
+        return 200, payload, headers
+
+
+def _parse_vector(value) -> np.ndarray:
+    """pgvector columns arrive either as JSON arrays or as "[1,2,3]" strings"""
+    if isinstance(value, str):
+        value = json.loads(value)
+    return np.asarray(value, dtype=np.float32)
+
+
+class FakePostgrestServer(_FakeHTTPServer):
+    """
+    In-memory PostgREST-compatible server for the Supabase client.
+
+    Supports insert/upsert (on_conflict + merge-duplicates), select with
+    eq/gt/in filters, order and limit, update, delete, and registered RPC
+    functions. match_documents and keyword_search functions with the
+    schemas from the README (including their filter_* arguments) are built
+    in, as are the embedding version table and functions used to re-index
+    and the trigger filling the document change log. Like PostgREST's
+    db-max-rows, selects return at most max_rows rows whatever their limit.
+
+    Usage:
+        with FakePostgrestServer(latency=0.02) as server:
+            os.environ["SUPABASE_URL"] = server.url
+            os.environ["SUPABASE_KEY"] = FakePostgrestServer.API_KEY
+    """
+
+    # Shaped like a JWT so supabase-py's key validation accepts it
+    API_KEY = "fake.eyJyb2xlIjoic2VydmljZV9yb2xlIn0.signature"
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, seed: int = 0, max_rows: int = 1000):
+        """
+        Configure the fake server
+
+        Args:
+            latency: Fixed seconds added to every request
+            error_rate: Probability of answering 503
+            seed: Seed for the failure injection
+            max_rows: Most rows a select returns (Supabase's default API setting)
+        """
+        super().__init__()
+        self.latency = latency
+        self.max_rows = max_rows
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.tables: Dict[str, Dict[Any, Dict[str, Any]]] = {}
+        self.rpc_functions: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+            "match_documents": self._match_documents,
+            "keyword_search": self._keyword_search,
+            "begin_embedding_version": self._begin_embedding_version,
+            "reindex_batch": self._reindex_batch,
+            "set_next_embeddings": self._set_next_embeddings,
+            "activate_embedding_version": self._activate_embedding_version,
+        }
+        self.stats = {"requests": 0, "rows_written": 0, "errors": 0}
+        self._lock = threading.Lock()
+        self._parsed: Dict[Any, Any] = {}
+
+    def table(self, name: str) -> Dict[Any, Dict[str, Any]]:
+        return self.tables.setdefault(name, {})
+
+    @staticmethod
+    def _filters(query: Dict[str, str]):
+        """Turn PostgREST query parameters into row predicates"""
+        predicates = []
+        for column, expression in query.items():
+            if column in ("select", "limit", "offset", "order", "on_conflict", "columns"):
+                continue
+            operator, _, value = expression.partition(".")
+            if operator == "eq":
+                predicates.append(lambda row, c=column, v=value: str(row.get(c)) == v)
+            elif operator == "neq":
+                predicates.append(lambda row, c=column, v=value: str(row.get(c)) != v)
+            elif operator == "gt":
+                predicates.append(lambda row, c=column, v=value: row.get(c) is not None and (
+                    row[c] > int(v) if isinstance(row[c], int) else str(row[c]) > v))
+            elif operator == "in":
+                values = {item.strip('"') for item in value.strip("()").split(",") if item}
+                predicates.append(lambda row, c=column, v=values: str(row.get(c)) in v)
+            elif operator == "is" and value == "null":
+                predicates.append(lambda row, c=column: row.get(c) is None)
+        return predicates
+
+    @staticmethod
+    def _project(rows: List[Dict[str, Any]], select: Optional[str]) -> List[Dict[str, Any]]:
+        if not select or select == "*":
+            return [dict(row) for row in rows]
+        columns = [column.strip() for column in select.split(",")]
+        return [{column: row.get(column) for column in columns} for row in rows]
+
+    def handle(self, method, path, query, headers, body):
+        time.sleep(self.latency)
+        with self._lock:
+            self.stats["requests"] += 1
+            if self.error_rate and self.random.random() < self.error_rate:
+                self.stats["errors"] += 1
+                return 503, {"message": "Injected failure", "code": "503"}, {}
+
+        prefix = "/rest/v1/"
+        if not path.startswith(prefix):
+            return 404, {"message": f"Unknown path {path}"}, {}
+        name = path[len(prefix):]
+        prefer = headers.get("Prefer", "") or ""
+
+        if name.startswith("rpc/"):
+            function = self.rpc_functions.get(name[4:])
+            if function is None:
+                return 404, {"message": f"Unknown function {name[4:]}"}, {}
+            return 200, function(body or {}), {}
+
+        with self._lock:
+            table = self.table(name)
+            predicates = self._filters(query)
+            matches = [row for row in table.values() if all(p(row) for p in predicates)]
+
+            if method == "GET":
+                if "order" in query:
+                    column, _, direction = query["order"].partition(".")
+                    matches.sort(key=lambda row: (0, row[column], "") if isinstance(row.get(column), int)
+                                 else (1, 0, str(row.get(column))), reverse=direction.startswith("desc"))
+                offset = int(query.get("offset", 0))
+                rows = matches[offset:]
+                if "limit" in query:
+                    rows = rows[:int(query["limit"])]
+                rows = rows[:self.max_rows]
+                return 200, self._project(rows, query.get("select")), {}
+
+            if method == "POST":
+                rows = body if isinstance(body, list) else [body]
+                key = query.get("on_conflict") or "id"
+                merge = "resolution=merge-duplicates" in prefer
+                if name == "pdf_embedding_versions":
+                    # SERIAL primary key, and the unique index on the active version
+                    key = "version"
+                    if any(row.get("status") == "active" for row in table.values()) and \
+                            any(row.get("status") == "active" for row in rows):
+                        return 409, {"message": "duplicate key value violates unique constraint",
+                                     "code": "23505"}, {}
+                    rows = [{**row, "version": max(table, default=0) + 1 + i} for i, row in enumerate(rows)]
+                for row in rows:
+                    if row.get(key) in table and not merge:
+                        return 409, {"message": "duplicate key value violates unique constraint",
+                                     "code": "23505"}, {}
+                for row in rows:
+                    if merge and row.get(key) in table:
+                        table[row[key]].update(row)
+                    else:
+                        table[row.get(key)] = dict(row)
+                self.stats["rows_written"] += len(rows)
+                payload = None if "return=minimal" in prefer else rows
+                return 201, payload, {}
+
+            if method == "PATCH":
+                for row in matches:
+                    row.update(body or {})
+                    if name == "pdf_document_status" and "status" in (body or {}) and row["status"] == "committed":
+                        self._log_document_change(row["document_id"])
+                return 200, None if "return=minimal" in prefer else matches, {}
+
+            if method == "DELETE":
+                for row in matches:
+                    for row_key, value in list(table.items()):
+                        if value is row:
+                            del table[row_key]
+                    if name == "pdf_document_status":
+                        self._log_document_change(row["document_id"])
+                return 200, None if "return=minimal" in prefer else matches, {}
+
+        return 405, {"message": f"Unsupported method {method}"}, {}
+
+    def _log_document_change(self, document_id: str) -> None:
+        """Stand-in for the README's log_document_change trigger; called with the lock held"""
+        changes = self.table("pdf_document_changes")
+        seq = max(changes, default=0) + 1
+        changes[seq] = {"seq": seq, "document_id": document_id,
+                        "changed_at": datetime.now(timezone.utc).isoformat()}
+
+    def _row_vector(self, row: Dict[str, Any]) -> np.ndarray:
+        """Parsed embedding of a row, reparsed only when the row's embedding is replaced"""
+        embedding = row["embedding"]
+        cached = self._parsed.get(row["id"])
+        if cached is None or cached[0] is not embedding:
+            cached = self._parsed[row["id"]] = (embedding, _parse_vector(embedding))
+        return cached[1]
+
+    @staticmethod
+    def _in_scope(row: Dict[str, Any], params: Dict[str, Any]) -> bool:
+        """The filter_* arguments of match_documents and keyword_search, as the README's SQL applies them"""
+        if params.get("filter_document_ids") is not None and row.get("document_id") not in params["filter_document_ids"]:
+            return False
+        if params.get("filter_filenames") is not None and row.get("filename") not in params["filter_filenames"]:
+            return False
+        if params.get("filter_page_last") is not None and not (row.get("page_start") or 0) <= params["filter_page_last"]:
+            return False
+        if params.get("filter_page_first") is not None and not (row.get("page_end") or 0) >= params["filter_page_first"]:
+            return False
+        metadata = row.get("metadata") if isinstance(row.get("metadata"), dict) else {}
+        return all(metadata.get(key) == value for key, value in (params.get("filter_metadata") or {}).items())
+
+    def _match_documents(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Stand-in for the match_documents SQL function"""
+        with self._lock:
+            rows = [row for row in self.table("pdf_documents").values()
+                    if row.get("embedding") is not None and self._in_scope(row, params)]
+        if not rows:
+            return []
+        query = _parse_vector(params["query_embedding"])
+        matrix = np.stack([self._row_vector(row) for row in rows])
+        norms = np.linalg.norm(matrix, axis=1) * (np.linalg.norm(query) or 1.0)
+        scores = matrix @ query / np.where(norms == 0, 1.0, norms)
+        threshold = params.get("match_threshold")
+        order = np.argsort(-scores)[:int(params.get("match_count", 5))]
+        return [
+            {
+                "id": rows[i]["id"],
+                "content": rows[i].get("content"),
+                "metadata": rows[i].get("metadata"),
+                "similarity": float(scores[i]),
+            }
+            for i in order
+            if threshold is None or scores[i] > threshold
+        ]
+
+
+    def _begin_embedding_version(self, params: Dict[str, Any]) -> int:
+        """Stand-in for begin_embedding_version: resume a build of the same model or start over"""
+        model, dimensions = params["new_model"], params.get("new_dimensions") or 0
+        with self._lock:
+            versions = self.table("pdf_embedding_versions")
+            for row in versions.values():
+                if row["status"] == "building" and (row["model"], row.get("dimensions") or 0) == (model, dimensions):
+                    return row["version"]
+                if row["status"] == "building":
+                    row["status"] = "abandoned"
+            for row in self.table("pdf_documents").values():
+                row["embedding_next"] = None
+            version = max(versions, default=0) + 1
+            versions[version] = {"version": version, "model": model, "dimensions": dimensions, "status": "building"}
+            return version
+
+    def _reindex_batch(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Stand-in for reindex_batch: chunks without embedding_next, by ID"""
+        after = params.get("after_id") or ""
+        with self._lock:
+            rows = sorted((row for row in self.table("pdf_documents").values()
+                           if row.get("embedding_next") is None and row["id"] > after), key=lambda row: row["id"])
+        return [{"id": row["id"], "content": row.get("content")} for row in rows[:int(params["batch_size"])]]
+
+    def _set_next_embeddings(self, params: Dict[str, Any]) -> int:
+        """Stand-in for set_next_embeddings"""
+        table = self.table("pdf_documents")
+        with self._lock:
+            updated = 0
+            for row in params["embeddings"]:
+                if row["id"] in table:
+                    table[row["id"]]["embedding_next"] = row["embedding"]
+                    updated += 1
+            return updated
+
+    def _activate_embedding_version(self, params: Dict[str, Any]) -> bool:
+        """Stand-in for activate_embedding_version: swap the columns once every chunk has a new vector"""
+        with self._lock:
+            rows = list(self.table("pdf_documents").values())
+            if any(row.get("embedding_next") is None for row in rows):
+                return False
+            for row in rows:
+                row["embedding"], row["embedding_next"] = row["embedding_next"], row["embedding"]
+            for row in self.table("pdf_embedding_versions").values():
+                if row["status"] == "active":
+                    row["status"] = "retired"
+                elif row["version"] == params["target"]:
+                    row["status"] = "active"
+            return True
+
+    def _keyword_search(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Stand-in for the keyword_search SQL function: rank by shared terms"""
+        terms = set(_WORD.findall(str(params.get("query_text", "")).lower()))
+        with self._lock:
+            rows = [row for row in self.table("pdf_documents").values() if self._in_scope(row, params)]
+        ranked = []
+        for row in rows:
+            content = row.get("content")
+            cached = self._parsed.get(("words", row["id"]))
+            if cached is None or cached[0] is not content:
+                counts = Counter(_WORD.findall(str(content or "").lower()))
+                cached = self._parsed[("words", row["id"])] = (content, counts, sum(counts.values()))
+            hits = sum(cached[1].get(term, 0) for term in terms)
+            if hits:
+                ranked.append((hits / cached[2], row))
+        ranked.sort(key=lambda item: -item[0])
+        return [
+            {"id": row["id"], "content": row.get("content"), "metadata": row.get("metadata"), "keyword_rank": rank}
+            for rank, row in ranked[:int(params.get("match_count", 5))]
+        ]
+
+def synthetic_texts(count: int, words_per_text: int = 150, seed: int = 0) -> List[str]:
+    """
+    Generate reproducible pseudo-English texts
+
+    Args:
+        count: Number of texts
+        words_per_text: Words in each text
+        seed: Random seed
+
+    Returns:
+        List[str]: Generated texts
+    """
+    rng = random.Random(seed)
+    vocabulary = [f"{rng.choice('bcdfghklmnprstvz')}{rng.choice('aeiou')}{rng.choice('lmnrst')}{i}"
+                  for i in range(5000)]
+    return [" ".join(rng.choices(vocabulary, k=words_per_text)) + "." for _ in range(count)]
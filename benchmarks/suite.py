@@ -0,0 +1,323 @@
+"""
+End-to-end benchmark suite with JSON results.
+
+Runs the hot paths of the app against the local fake OpenAI and PostgREST
+servers, so no API keys or network are needed:
+
+  process_pdf/<N>p            PDFProcessor.process_pdf on synthetic PDFs of N pages
+  generate_batch_embeddings   EmbeddingsService.generate_batch_embeddings
+  store_document_chunks       SupabaseClient.store_document_chunks
+  process_query               ChatService.process_query: query embedding, match_documents,
+                              keyword_search, context packing and a streamed answer
+
+Inputs are reproducible (seeded corpus, deterministic embeddings and answers)
+and server latencies are fixed, so differences between runs come from the
+code. Each case runs once to warm up, then --repeat times; the JSON output
+has the median, minimum, p95 and throughput of every case plus the
+environment it ran in. With --baseline, cases whose median got slower than
+the baseline's by more than --tolerance are reported and the exit status is 1.
+
+Run from the repository root:
+    python -m benchmarks.suite --output bench.json
+    python -m benchmarks.suite --quick --baseline bench.json --tolerance 0.15
+"""
+import argparse
+import datetime
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from benchmarks.fake_servers import FakeOpenAIServer, FakePostgrestServer, synthetic_texts
+from benchmarks.synthetic_pdfs import synthetic_pdf
+
+# Format of the result file; bump when fields change meaning
+RESULTS_VERSION = 1
+
+# Case sizes: (full run, --quick)
+PDF_PAGES = ([1, 10, 50, 200], [1, 10, 50])
+EMBED_CHUNKS = (2000, 300)
+STORE_CHUNKS = (2000, 300)
+QUERIES = (20, 5)
+
+
+def summarize(samples: List[float], units: float = 0.0, unit: str = "") -> Dict[str, Any]:
+    """
+    Summary statistics of timing samples
+
+    Args:
+        samples: Seconds per run
+        units: Work done per run (pages, chunks, queries), for the throughput
+        unit: Name of the work unit
+
+    Returns:
+        Dict: median, min, p95, mean (seconds), samples and throughput per second
+    """
+    ordered = sorted(samples)
+    result = {
+        "median": statistics.median(ordered),
+        "min": ordered[0],
+        "p95": ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))],
+        "mean": statistics.fmean(ordered),
+        "samples": [round(sample, 6) for sample in samples],
+    }
+    if units:
+        result["throughput"] = {f"{unit}_per_sec": units / result["median"]}
+    return result
+
+
+def measure(run: Callable[[], Optional[Dict[str, Any]]], repeat: int,
+            setup: Optional[Callable[[], None]] = None) -> Tuple[List[float], Dict[str, Any]]:
+    """
+    Time a case: one warm-up run, then repeat timed runs
+
+    Args:
+        run: The work to time; may return details about the run
+        repeat: Timed runs
+        setup: Called before every run, outside the timing
+
+    Returns:
+        Tuple: Seconds per timed run, and the details returned by the last run
+    """
+    samples = []
+    details: Dict[str, Any] = {}
+    for index in range(repeat + 1):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        details = run() or {}
+        elapsed = time.perf_counter() - start
+        if index:
+            samples.append(elapsed)
+    return samples, details
+
+
+def bench_process_pdf(args) -> Dict[str, Dict[str, Any]]:
+    from src.pdf.pdf_processor import PDFProcessor
+
+    cases = {}
+    for pages in PDF_PAGES[args.quick]:
+        data = synthetic_pdf(pages, seed=pages)
+        samples, details = measure(
+            lambda: {"chunks": len(PDFProcessor.process_pdf(io.BytesIO(data), f"bench-{pages}.pdf"))}, args.repeat
+        )
+        cases[f"process_pdf/{pages}p"] = {**summarize(samples, pages, "pages"), "details": {"bytes": len(data),
+                                                                                             **details}}
+    return cases
+
+
+def bench_embeddings(args, openai_server) -> Dict[str, Dict[str, Any]]:
+    from src.embeddings.embeddings_service import EmbeddingsService
+
+    texts = synthetic_texts(EMBED_CHUNKS[args.quick], seed=1)
+    chunks = [{"id": str(i), "text": text, "metadata": {}} for i, text in enumerate(texts)]
+    service = EmbeddingsService()
+    before = dict(openai_server.stats)
+
+    def run():
+        result = service.generate_batch_embeddings([dict(chunk) for chunk in chunks])
+        assert all(chunk["embedding"] is not None for chunk in result)
+
+    samples, _ = measure(run, args.repeat)
+    details = {"chunks": len(chunks), **{key: (openai_server.stats[key] - before[key]) // (args.repeat + 1)
+                                         for key in ("requests", "rate_limited")}}
+    return {"generate_batch_embeddings": {**summarize(samples, len(chunks), "chunks"), "details": details}}
+
+
+def bench_store(args, postgrest_server) -> Dict[str, Dict[str, Any]]:
+    from src.database.supabase_client import SupabaseClient
+    from src.pdf.pdf_processor import PDFProcessor
+
+    count = STORE_CHUNKS[args.quick]
+    vectors = np.random.default_rng(2).standard_normal((count, args.dimension)).astype(np.float32)
+    texts = synthetic_texts(count, seed=2)
+    chunks = [
+        {"id": PDFProcessor.make_chunk_id("bench-store", i), "text": texts[i], "embedding": vectors[i].tolist(),
+         "metadata": {"chunk_index": i, "document_id": "bench-store", "filename": "bench-store.pdf"}}
+        for i in range(count)
+    ]
+    client = SupabaseClient()
+    before = postgrest_server.stats["requests"]
+
+    def run():
+        if not client.store_document_chunks(chunks):
+            raise RuntimeError("store_document_chunks failed")
+
+    samples, _ = measure(run, args.repeat, setup=lambda: postgrest_server.tables.pop(client.table_name, None))
+    details = {"chunks": count, "requests": (postgrest_server.stats["requests"] - before) // (args.repeat + 1)}
+    return {"store_document_chunks": {**summarize(samples, count, "chunks"), "details": details}}
+
+
+def bench_query(args, postgrest_server) -> Dict[str, Dict[str, Any]]:
+    from src.chat.chat_service import ChatService
+    from src.embeddings.embeddings_service import EmbeddingsService
+    from src.pdf.pdf_processor import PDFProcessor
+    from src.database.supabase_client import SupabaseClient
+
+    # Index a mid-sized document, then ask questions made of words from its chunks
+    postgrest_server.tables.clear()
+    embeddings_service = EmbeddingsService()
+    store = SupabaseClient()
+    data = synthetic_pdf(40, seed=3)
+    chunks = embeddings_service.generate_batch_embeddings(PDFProcessor.process_pdf(io.BytesIO(data), "bench-query.pdf"))
+    store.store_document(chunks[0]["metadata"]["document_id"], "bench-query.pdf", chunks)
+    rng = np.random.default_rng(3)
+    queries = []
+    for index in rng.choice(len(chunks), QUERIES[args.quick], replace=False):
+        words = chunks[int(index)]["text"].split()
+        start = int(rng.integers(0, max(len(words) - 8, 1)))
+        queries.append("What does the document say about " + " ".join(words[start:start + 8]) + "?")
+
+    chat_service = ChatService(embeddings_service, store)
+    latencies, first_tokens, context_chunks = [], [], []
+
+    def run():
+        for query in queries:
+            start = time.perf_counter()
+            response = chat_service.process_query(query)
+            latencies.append(time.perf_counter() - start)
+            metrics = response.get("metrics")
+            if not metrics:
+                raise RuntimeError(response["answer"])
+            first_tokens.append(metrics["ttft_seconds"])
+            context_chunks.append(metrics["context"]["chunks"])
+
+    samples, _ = measure(run, args.repeat)
+    # Per-query figures from the timed runs only; the warm-up run's queries come first
+    timed = slice(len(queries), None)
+    per_query = summarize(latencies[timed])
+    del per_query["samples"]
+    details = {
+        "queries": len(queries),
+        "query_seconds": per_query,
+        "ttft_seconds": {"median": statistics.median(first_tokens[timed])},
+        "context_chunks": statistics.fmean(context_chunks[timed]),
+    }
+    return {"process_query": {**summarize(samples, len(queries), "queries"), "details": details}}
+
+
+def environment() -> Dict[str, Any]:
+    """Where the results come from: interpreter, machine and code revision"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "commit": commit,
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Cases slower than the baseline
+
+    Args:
+        results: Results of this run
+        baseline: Results of an earlier run
+        tolerance: Allowed relative slowdown of the median (0.1 = 10%)
+
+    Returns:
+        List[str]: One line per regressed case
+    """
+    regressions = []
+    for name, case in results["cases"].items():
+        previous = baseline.get("cases", {}).get(name)
+        if previous is None:
+            continue
+        ratio = case["median"] / previous["median"]
+        if ratio > 1 + tolerance:
+            regressions.append(f"{name}: median {previous['median'] * 1000:.1f}ms -> "
+                               f"{case['median'] * 1000:.1f}ms ({ratio - 1:+.0%})")
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", help="Write results as JSON to this file (default: stdout)")
+    parser.add_argument("--baseline", help="Earlier results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed slowdown of a case's median")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per case")
+    parser.add_argument("--quick", action="store_true", help="Smaller inputs, for CI")
+    parser.add_argument("--only", nargs="+", choices=["pdf", "embed", "store", "query"],
+                        default=["pdf", "embed", "store", "query"], help="Cases to run")
+    parser.add_argument("--dimension", type=int, default=1536, help="Embedding dimension")
+    parser.add_argument("--openai-latency", type=float, default=0.02, help="Seconds per OpenAI request")
+    parser.add_argument("--chat-latency", type=float, default=0.2, help="Seconds to the first answer token")
+    parser.add_argument("--token-latency", type=float, default=0.005, help="Seconds per further answer token")
+    parser.add_argument("--db-latency", type=float, default=0.01, help="Seconds per PostgREST request")
+    args = parser.parse_args(argv)
+
+    with FakeOpenAIServer(dimension=args.dimension, latency=args.openai_latency, chat_latency=args.chat_latency,
+                          token_latency=args.token_latency) as openai_server, \
+            FakePostgrestServer(latency=args.db_latency) as postgrest_server:
+        # Settings are read at import time: configure before the app's modules are loaded
+        os.environ.update({
+            "OPENAI_BASE_URL": openai_server.base_url,
+            "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY") or "sk-fake",
+            "SUPABASE_URL": postgrest_server.url,
+            "SUPABASE_KEY": FakePostgrestServer.API_KEY,
+            "VECTOR_STORE_BACKEND": "supabase",
+            "VECTOR_DIMENSION": str(args.dimension),
+            # Caches would turn every run after the warm-up into a lookup
+            "EMBEDDING_CACHE_ENABLED": "false",
+            "ANSWER_CACHE_ENABLED": "false",
+            "LEXICAL_SEARCH_ENABLED": "false",
+            "SERVICE_WARMUP": "false",
+        })
+
+        cases: Dict[str, Dict[str, Any]] = {}
+        if "pdf" in args.only:
+            cases.update(bench_process_pdf(args))
+        if "embed" in args.only:
+            cases.update(bench_embeddings(args, openai_server))
+        if "store" in args.only:
+            cases.update(bench_store(args, postgrest_server))
+        if "query" in args.only:
+            cases.update(bench_query(args, postgrest_server))
+
+    results = {
+        "version": RESULTS_VERSION,
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "environment": environment(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+        "cases": cases,
+    }
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+
+    print(f"\n{'case':<28}{'median ms':>12}{'p95 ms':>10}{'throughput':>22}", file=sys.stderr)
+    for name, case in cases.items():
+        throughput = ", ".join(f"{value:.1f} {unit.replace('_per_sec', '/s')}"
+                               for unit, value in case.get("throughput", {}).items())
+        print(f"{name:<28}{case['median'] * 1000:>12.1f}{case['p95'] * 1000:>10.1f}{throughput:>22}",
+              file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"No case slower than the baseline by more than {args.tolerance:.0%}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
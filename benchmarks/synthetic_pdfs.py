@@ -0,0 +1,107 @@
+"""
+Generate simple text PDFs without third-party libraries.
+
+The files are valid PDF 1.4 documents using the built-in Helvetica font, so
+every extractor can read them back. Content is reproducible for a given seed.
+"""
+import io
+import random
+from typing import List
+
+from benchmarks.fake_servers import synthetic_texts
+
+_LINES_PER_PAGE = 60
+_WORDS_PER_LINE = 14
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def build_pdf(pages: List[List[str]], padding: int = 0) -> bytes:
+    """
+    Build a PDF with one page per list of text lines
+
+    Args:
+        pages: Lines of text for each page
+        padding: Bytes of an unreferenced binary stream to add, standing in for
+            the images of a scan; text extraction never reads it
+
+    Returns:
+        bytes: PDF file contents
+    """
+    objects = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(b"")
+    pages_obj = add(b"")
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    page_ids = []
+    for lines in pages:
+        ops = ["BT", "/F1 9 Tf", "11 TL", "40 800 Td"]
+        ops += [f"({_escape(line)}) '" for line in lines]
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1", "replace")
+        content = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (pages_obj, font, content)
+        ))
+    if padding:
+        add(b"<< /Length %d >>\nstream\n" % padding + random.Random(padding).randbytes(padding) + b"\nendstream")
+    objects[catalog - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_obj
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    objects[pages_obj - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref))
+    return out.getvalue()
+
+
+def synthetic_pdf(page_count: int, seed: int = 0, padding: int = 0) -> bytes:
+    """
+    Build a PDF of pseudo-English text
+
+    Args:
+        page_count: Number of pages
+        seed: Random seed
+        padding: Bytes of unreferenced binary data to add (see build_pdf)
+
+    Returns:
+        bytes: PDF file contents
+    """
+    lines = synthetic_texts(page_count * _LINES_PER_PAGE, words_per_text=_WORDS_PER_LINE, seed=seed)
+    rng = random.Random(seed)
+    pages = []
+    for page in range(page_count):
+        page_lines = lines[page * _LINES_PER_PAGE:(page + 1) * _LINES_PER_PAGE]
+        # Sprinkle identifiers so lexical search has something exact to find
+        page_lines[0] = f"Section {page + 1}.{rng.randint(1, 9)} part number PN-{seed:03d}-{page:05d}"
+        pages.append(page_lines)
+    return build_pdf(pages, padding)
+
+
+def synthetic_corpus(sizes: List[int], seed: int = 0) -> List[bytes]:
+    """
+    Build several PDFs of the given page counts
+
+    Args:
+        sizes: Page count of each document
+        seed: Base random seed
+
+    Returns:
+        List[bytes]: PDF file contents
+    """
+    return [synthetic_pdf(pages, seed=seed + i) for i, pages in enumerate(sizes)]
@@ -6,19 +6,149 @@ load_dotenv()
 
 # OpenAI Configuration
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-EMBEDDING_MODEL = "text-embedding-3-small"
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")  # re-index after changing (see README)
 CHAT_MODEL = "gpt-4o-mini"
 
+# HTTP Connection Pooling (shared, keep-alive clients for OpenAI and Supabase)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "32"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "16"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "60"))
+SERVICE_WARMUP = os.getenv("SERVICE_WARMUP", "true").lower() == "true"
+
+# Resilience Configuration (deadlines, retries, hedging and circuit breaking for OpenAI and Supabase)
+QUERY_DEADLINE_SECONDS = float(os.getenv("QUERY_DEADLINE_SECONDS", "30"))  # per question, split across stages; 0 = none
+CHAT_MAX_RETRIES = int(os.getenv("CHAT_MAX_RETRIES", "2"))
+SEARCH_MAX_RETRIES = int(os.getenv("SEARCH_MAX_RETRIES", "2"))
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "0.5"))  # first backoff ceiling, doubled per retry
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "30"))
+EMBEDDING_HEDGE_DELAY = float(os.getenv("EMBEDDING_HEDGE_DELAY", "0.5"))  # duplicate a slow query embedding; 0 = off
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))  # 0 = no circuit breaking
+CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+
+# Embedding Batching Configuration
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "256"))
+EMBEDDING_BATCH_MAX_TOKENS = int(os.getenv("EMBEDDING_BATCH_MAX_TOKENS", "100000"))
+EMBEDDING_CONCURRENCY = int(os.getenv("EMBEDDING_CONCURRENCY", "4"))
+EMBEDDING_MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", "6"))
+EMBEDDING_RPM_LIMIT = int(os.getenv("EMBEDDING_RPM_LIMIT", "0"))
+EMBEDDING_TPM_LIMIT = int(os.getenv("EMBEDDING_TPM_LIMIT", "0"))
+# Matryoshka dimensions requested from text-embedding-3-* models; 0 = the model's full size
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", "0"))
+
+# Embedding Cache Configuration
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "data/embedding_cache.sqlite3")
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+
+# Vector Store Configuration
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "supabase")
+MATCH_THRESHOLD = float(os.getenv("MATCH_THRESHOLD", "0.1"))
+LOCAL_VECTOR_STORE_PATH = os.getenv("LOCAL_VECTOR_STORE_PATH", "data/vector_store")
+LOCAL_INDEX_TYPE = os.getenv("LOCAL_INDEX_TYPE", "exact")
+LOCAL_ANN_MIN_ROWS = int(os.getenv("LOCAL_ANN_MIN_ROWS", "20000"))
+LOCAL_IVF_NLIST = int(os.getenv("LOCAL_IVF_NLIST", "0"))
+LOCAL_IVF_NPROBE = int(os.getenv("LOCAL_IVF_NPROBE", "8"))
+LOCAL_HNSW_EF = int(os.getenv("LOCAL_HNSW_EF", "64"))
+LOCAL_QUANTIZATION = os.getenv("LOCAL_QUANTIZATION", "none")  # "none", "int8" or "binary"
+LOCAL_RESCORE_FACTOR = int(os.getenv("LOCAL_RESCORE_FACTOR", "10"))  # candidates per result rescored; 0 = off
+
+# Lexical Search Configuration (local BM25 index fused with vector results)
+LEXICAL_SEARCH_ENABLED = os.getenv("LEXICAL_SEARCH_ENABLED", "true").lower() == "true"
+LEXICAL_INDEX_PATH = os.getenv("LEXICAL_INDEX_PATH", "data/lexical_index")
+LEXICAL_TOP_K = int(os.getenv("LEXICAL_TOP_K", "5"))
+LEXICAL_SEGMENT_ROWS = int(os.getenv("LEXICAL_SEGMENT_ROWS", "50000"))
+LEXICAL_MAX_SEGMENTS = int(os.getenv("LEXICAL_MAX_SEGMENTS", "8"))
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+
 # Supabase Configuration
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 VECTOR_COLLECTION_NAME = os.getenv("VECTOR_COLLECTION_NAME", "pdf_documents")
-VECTOR_DIMENSION = int(os.getenv("VECTOR_DIMENSION", "1536"))
+VECTOR_DIMENSION = int(os.getenv("VECTOR_DIMENSION", str(EMBEDDING_DIMENSIONS or 1536)))
+DOCUMENTS_TABLE_NAME = os.getenv("DOCUMENTS_TABLE_NAME", "pdf_document_status")
+EMBEDDING_VERSIONS_TABLE_NAME = os.getenv("EMBEDDING_VERSIONS_TABLE_NAME", "pdf_embedding_versions")
+DOCUMENT_CHANGES_TABLE_NAME = os.getenv("DOCUMENT_CHANGES_TABLE_NAME", "pdf_document_changes")
+UPSERT_BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", "100"))
+UPSERT_CONCURRENCY = int(os.getenv("UPSERT_CONCURRENCY", "4"))
+UPSERT_MAX_RETRIES = int(os.getenv("UPSERT_MAX_RETRIES", "4"))
 
 # Text Processing Configuration
 CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1000"))
 CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "200"))
+CHUNKING_STRATEGY = os.getenv("CHUNKING_STRATEGY", "tokens")  # "tokens" or "chars"
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "256"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "50"))
+
+# PDF Extraction Configuration
+PDF_EXTRACTOR = os.getenv("PDF_EXTRACTOR", "auto")  # "auto", "pypdfium2", "pypdf", "pypdf2" or "pdfminer"
+PDF_PAGE_TIMEOUT = float(os.getenv("PDF_PAGE_TIMEOUT", "30"))  # seconds per page; 0 = no limit
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "64"))  # split larger PDFs across workers
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "32"))  # smallest page range per worker task
+
+# Ingestion Pipeline Configuration
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "64"))
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "4"))
+INGEST_PARSE_WORKERS = int(os.getenv("INGEST_PARSE_WORKERS", str(os.cpu_count() or 1)))
+INGEST_IO_WORKERS = int(os.getenv("INGEST_IO_WORKERS", "2"))
+INGEST_INCREMENTAL = os.getenv("INGEST_INCREMENTAL", "true").lower() == "true"
+INGEST_MANIFEST_PATH = os.getenv("INGEST_MANIFEST_PATH", "data/ingest_manifest.sqlite3")
+# Share of an earlier same-name upload's pages a new file must contain to replace it as a revision
+INGEST_REVISION_MIN_OVERLAP = float(os.getenv("INGEST_REVISION_MIN_OVERLAP", "0.5"))
+INGEST_QUEUE_PATH = os.getenv("INGEST_QUEUE_PATH", "data/ingest_queue.sqlite3")
+INGEST_UPLOAD_DIR = os.getenv("INGEST_UPLOAD_DIR", "data/uploads")
+INGEST_JOB_LEASE_SECONDS = float(os.getenv("INGEST_JOB_LEASE_SECONDS", "300"))
+INGEST_JOB_MAX_ATTEMPTS = int(os.getenv("INGEST_JOB_MAX_ATTEMPTS", "3"))
+INGEST_MAX_IN_FLIGHT = int(os.getenv("INGEST_MAX_IN_FLIGHT", "0"))  # 0 = twice the parse plus I/O workers
+INGEST_POLL_SECONDS = float(os.getenv("INGEST_POLL_SECONDS", "1.0"))
+INGEST_EMBEDDED_WORKER = os.getenv("INGEST_EMBEDDED_WORKER", "true").lower() == "true"
+INGEST_MEMORY_LIMIT_MB = int(os.getenv("INGEST_MEMORY_LIMIT_MB", "512"))  # chunks and embeddings in flight; 0 = no limit
+INGEST_SESSION_MAX_MB = int(os.getenv("INGEST_SESSION_MAX_MB", "256"))  # one session's uploads in the queue; 0 = no limit
+
+# Document Lifecycle Configuration (document registry, deletes and re-indexing)
+DELETE_BATCH_SIZE = int(os.getenv("DELETE_BATCH_SIZE", "1000"))  # IDs per delete round or listing page (at most max-rows)
+REINDEX_BATCH_SIZE = int(os.getenv("REINDEX_BATCH_SIZE", "256"))  # chunks read and re-embedded per round
+EMBEDDING_VERSION_CHECK_SECONDS = float(os.getenv("EMBEDDING_VERSION_CHECK_SECONDS", "30"))  # pick up swapped-in models
+DOCUMENT_CHANGES_CHECK_SECONDS = float(os.getenv("DOCUMENT_CHANGES_CHECK_SECONDS", "5"))  # other processes' ingests and deletes
 
 # Chat Configuration
-MAX_CONTEXT_LENGTH = int(os.getenv("MAX_CONTEXT_LENGTH", "4000"))
+MAX_CONTEXT_TOKENS = int(os.getenv("MAX_CONTEXT_TOKENS", "1000"))
+CONTEXT_DEDUP_THRESHOLD = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.8"))
 TOP_K_RESULTS = 5
+RETRIEVAL_ASYNC = os.getenv("RETRIEVAL_ASYNC", "true").lower() == "true"
+KEYWORD_SEARCH_ENABLED = os.getenv("KEYWORD_SEARCH_ENABLED", "true").lower() == "true"
+KEYWORD_TOP_K = int(os.getenv("KEYWORD_TOP_K", "3"))
+
+# Re-ranking Configuration (over-fetch, then keep a diverse TOP_K_RESULTS)
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "true").lower() == "true"
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))  # vector hits fetched before re-ranking
+RERANK_MMR_LAMBDA = float(os.getenv("RERANK_MMR_LAMBDA", "0.7"))  # 1.0 = relevance only, lower = more diverse
+RERANK_CROSS_ENCODER = os.getenv("RERANK_CROSS_ENCODER", "")  # e.g. cross-encoder/ms-marco-MiniLM-L-6-v2
+
+# Conversation Configuration (multi-turn chat)
+CONVERSATION_ENABLED = os.getenv("CONVERSATION_ENABLED", "true").lower() == "true"
+CONVERSATION_HISTORY_TOKENS = int(os.getenv("CONVERSATION_HISTORY_TOKENS", "1000"))  # recent turns sent verbatim
+CONVERSATION_SUMMARY_TOKENS = int(os.getenv("CONVERSATION_SUMMARY_TOKENS", "250"))  # rolling summary of older turns
+CONVERSATION_REWRITE = os.getenv("CONVERSATION_REWRITE", "true").lower() == "true"  # condense follow-ups
+CONVERSATION_REUSE_THRESHOLD = float(os.getenv("CONVERSATION_REUSE_THRESHOLD", "0.9"))  # > 1 = never reuse context
+CHAT_RENDER_MESSAGES = int(os.getenv("CHAT_RENDER_MESSAGES", "20"))  # messages shown before "show earlier"
+
+# Answer Cache Configuration
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+RETRIEVAL_CACHE_MAX_ENTRIES = int(os.getenv("RETRIEVAL_CACHE_MAX_ENTRIES", "1000"))
+RETRIEVAL_CACHE_TTL_SECONDS = float(os.getenv("RETRIEVAL_CACHE_TTL_SECONDS", "3600"))
+
+# Observability Configuration
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+TELEMETRY_ENABLED = os.getenv("TELEMETRY_ENABLED", "true").lower() == "true"
+TELEMETRY_RECENT_QUERIES = int(os.getenv("TELEMETRY_RECENT_QUERIES", "20"))
+TELEMETRY_JSONL_PATH = os.getenv("TELEMETRY_JSONL_PATH", "")  # e.g. data/telemetry.jsonl
+TELEMETRY_FLUSH_SECONDS = float(os.getenv("TELEMETRY_FLUSH_SECONDS", "60"))
+TELEMETRY_PROMETHEUS_PORT = int(os.getenv("TELEMETRY_PROMETHEUS_PORT", "0"))  # 0 = no /metrics endpoint
+DEBUG_PANEL_ENABLED = os.getenv("DEBUG_PANEL_ENABLED", "true").lower() == "true"
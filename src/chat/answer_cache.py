@@ -0,0 +1,280 @@
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Set
+import threading
+import time
+import numpy as np
+from config.settings import (
+    VECTOR_DIMENSION, ANSWER_CACHE_THRESHOLD, ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_TTL_SECONDS,
+    RETRIEVAL_CACHE_MAX_ENTRIES, RETRIEVAL_CACHE_TTL_SECONDS
+)
+from src.database.vector_store import add_document_listener, add_embedding_version_listener
+from src.embeddings.embedding_cache import normalize_text
+
+
+class SemanticAnswerCache:
+    """
+    In-memory answer cache looked up by query embedding.
+
+    Query embeddings are kept as unit rows of a preallocated float32 matrix,
+    so a lookup is one matrix-vector product; the most similar entry is a hit
+    if its cosine similarity reaches threshold and it is younger than
+    ttl_seconds. When full, the least recently used entry is replaced. Each
+    entry remembers the document IDs its answer was built from and is dropped
+    when any of them changes; answers built from no documents at all are
+    dropped whenever any document changes, since a new document may now
+    answer them. Answers only hit queries of the same search scope.
+    """
+
+    def __init__(self, dimension: int, threshold: float, max_entries: int, ttl_seconds: float):
+        """
+        Initialize the cache
+
+        Args:
+            dimension: Embedding dimension
+            threshold: Minimum cosine similarity of a hit
+            max_entries: Number of answers kept
+            ttl_seconds: Age after which an entry no longer hits (0 disables expiry)
+        """
+        self.threshold = threshold
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._vectors = np.zeros((self.max_entries, dimension), dtype=np.float32)
+        self._entries: List[Dict[str, Any]] = []
+        # Whether any scoped answer was ever cached; until then lookups skip the scope check
+        self._scoped = False
+        self._lock = threading.Lock()
+
+    def _expired(self, entry: Dict[str, Any], now: float) -> bool:
+        return self.ttl_seconds > 0 and now - entry["created"] > self.ttl_seconds
+
+    def _remove(self, row: int) -> None:
+        """Delete a row by moving the last entry into its place"""
+        last = len(self._entries) - 1
+        if row != last:
+            self._vectors[row] = self._vectors[last]
+            self._entries[row] = self._entries[last]
+        self._entries.pop()
+
+    def get(self, query_embedding: np.ndarray, scope: str = "") -> Optional[Dict[str, Any]]:
+        """
+        Find a cached answer for a similar query
+
+        Args:
+            query_embedding: Embedding of the new query
+            scope: Search scope of the query (search_filters.scope_key)
+
+        Returns:
+            Dict: Entry with answer, context, document_ids and similarity, or None
+        """
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        with self._lock:
+            count = len(self._entries)
+            if count == 0 or norm == 0:
+                self.misses += 1
+                return None
+            scores = self._vectors[:count] @ (query / norm)
+            if self._scoped or scope:
+                scores[[entry["scope"] != scope for entry in self._entries]] = -np.inf
+            row = int(np.argmax(scores))
+            entry = self._entries[row]
+            now = time.time()
+            if self._expired(entry, now):
+                self._remove(row)
+                self.misses += 1
+                return None
+            if scores[row] < self.threshold:
+                self.misses += 1
+                return None
+            entry["last_used"] = now
+            self.hits += 1
+            return {**entry, "similarity": float(scores[row])}
+
+    def put(self, query_embedding: np.ndarray, answer: str, context: str, document_ids: Iterable[str],
+            scope: str = "") -> None:
+        """
+        Cache an answer
+
+        Args:
+            query_embedding: Embedding of the query that was answered
+            answer: Generated answer
+            context: Context the answer was generated from
+            document_ids: IDs of the documents the context came from
+            scope: Search scope of the query (search_filters.scope_key)
+        """
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return
+        now = time.time()
+        entry = {"answer": answer, "context": context, "document_ids": set(document_ids),
+                 "scope": scope, "created": now, "last_used": now}
+        with self._lock:
+            self._scoped = self._scoped or bool(scope)
+            for row in range(len(self._entries) - 1, -1, -1):
+                if self._expired(self._entries[row], now):
+                    self._remove(row)
+            if len(self._entries) >= self.max_entries:
+                self._remove(min(range(len(self._entries)), key=lambda i: self._entries[i]["last_used"]))
+            self._vectors[len(self._entries)] = query / norm
+            self._entries.append(entry)
+
+    def invalidate_documents(self, document_ids: Iterable[str]) -> int:
+        """
+        Drop answers that depend on changed documents
+
+        Args:
+            document_ids: IDs of ingested or deleted documents
+
+        Returns:
+            int: Number of entries dropped
+        """
+        changed: Set[str] = set(document_ids)
+        dropped = 0
+        with self._lock:
+            for row in range(len(self._entries) - 1, -1, -1):
+                depends = self._entries[row]["document_ids"]
+                if not depends or depends & changed:
+                    self._remove(row)
+                    dropped += 1
+        return dropped
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0,
+                "entries": len(self._entries)}
+
+
+class RetrievalCache:
+    """
+    Exact-match cache of similarity search results keyed by normalized query text.
+
+    Lets a repeated question skip both the query embedding and the vector
+    search. LRU eviction with a TTL, and the same document-based
+    invalidation as SemanticAnswerCache.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        """
+        Initialize the cache
+
+        Args:
+            max_entries: Number of result lists kept
+            ttl_seconds: Age after which an entry no longer hits (0 disables expiry)
+        """
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(query: str, top_k: int, scope: str) -> str:
+        return f"{top_k}:{scope}:{normalize_text(query).lower()}"
+
+    def get(self, query: str, top_k: int, scope: str = "") -> Optional[List[Dict[str, Any]]]:
+        """
+        Look up the results of an identical earlier query
+
+        Args:
+            query: User query
+            top_k: Number of results requested
+            scope: Search scope of the query (search_filters.scope_key)
+
+        Returns:
+            List[Dict]: Cached search results, or None
+        """
+        key = self._key(query, top_k, scope)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (self.ttl_seconds > 0 and time.time() - entry["created"] > self.ttl_seconds):
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry["results"]
+
+    def put(self, query: str, top_k: int, results: List[Dict[str, Any]], document_ids: Iterable[str],
+            scope: str = "") -> None:
+        """
+        Cache the results of a query
+
+        Args:
+            query: User query
+            top_k: Number of results requested
+            results: Search results
+            document_ids: IDs of the documents the results came from
+            scope: Search scope of the query (search_filters.scope_key)
+        """
+        key = self._key(query, top_k, scope)
+        with self._lock:
+            self._entries[key] = {"results": results, "document_ids": set(document_ids), "created": time.time()}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_documents(self, document_ids: Iterable[str]) -> int:
+        """
+        Drop results that depend on changed documents
+
+        Args:
+            document_ids: IDs of ingested or deleted documents
+
+        Returns:
+            int: Number of entries dropped
+        """
+        changed: Set[str] = set(document_ids)
+        with self._lock:
+            stale = [key for key, entry in self._entries.items()
+                     if not entry["document_ids"] or entry["document_ids"] & changed]
+            for key in stale:
+                del self._entries[key]
+        return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0,
+                "entries": len(self._entries)}
+
+
+@lru_cache(maxsize=None)
+def get_answer_cache() -> SemanticAnswerCache:
+    """
+    Process-wide answer cache, invalidated by document changes and embedding model switches
+
+    Returns:
+        SemanticAnswerCache: Shared cache instance
+    """
+    cache = SemanticAnswerCache(VECTOR_DIMENSION, ANSWER_CACHE_THRESHOLD,
+                                ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_TTL_SECONDS)
+    add_document_listener(cache.invalidate_documents)
+    # Entries are keyed by query embeddings, which another model makes meaningless
+    add_embedding_version_listener(lambda version: cache.clear())
+    return cache
+
+
+@lru_cache(maxsize=None)
+def get_retrieval_cache() -> RetrievalCache:
+    """
+    Process-wide retrieval cache, invalidated by document changes and embedding model switches
+
+    Returns:
+        RetrievalCache: Shared cache instance
+    """
+    cache = RetrievalCache(RETRIEVAL_CACHE_MAX_ENTRIES, RETRIEVAL_CACHE_TTL_SECONDS)
+    add_document_listener(cache.invalidate_documents)
+    add_embedding_version_listener(lambda version: cache.clear())
+    return cache
@@ -0,0 +1,59 @@
+from typing import Any, Dict, Generator, Iterator, Optional
+import threading
+import time
+
+
+class AnswerStream:
+    """
+    Iterator over the text deltas of one answer.
+
+    Records time to first token and total latency (both measured from
+    creation, so retrieval time is included) and can be cancelled from any
+    thread; cancellation takes effect before the next delta is delivered and
+    closes the underlying model response.
+    """
+
+    def __init__(self, deltas: Iterator[str], cancel_event: Optional[threading.Event] = None):
+        """
+        Initialize the stream
+
+        Args:
+            deltas: Generator of text deltas; closed when the stream ends or is cancelled
+            cancel_event: Event that cancels the stream when set
+        """
+        self._deltas = deltas
+        self.cancel_event = cancel_event or threading.Event()
+        self.started = time.perf_counter()
+        self.text = ""
+        self.context = ""
+        self.metrics: Dict[str, Any] = {"ttft_seconds": None, "total_seconds": None, "cancelled": False}
+
+    def cancel(self) -> None:
+        """Stop the stream before its next delta"""
+        self.cancel_event.set()
+
+    def close(self) -> None:
+        """Cancel the stream and release the model response, e.g. when the consumer is interrupted"""
+        self.cancel()
+        self._deltas.close()
+        if self.metrics["total_seconds"] is None:
+            self.metrics["cancelled"] = True
+            self.metrics["total_seconds"] = time.perf_counter() - self.started
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def __iter__(self) -> Generator[str, None, None]:
+        try:
+            for delta in self._deltas:
+                if self.cancel_event.is_set():
+                    self.metrics["cancelled"] = True
+                    break
+                if delta and self.metrics["ttft_seconds"] is None:
+                    self.metrics["ttft_seconds"] = time.perf_counter() - self.started
+                self.text += delta
+                yield delta
+        finally:
+            self._deltas.close()
+            self.metrics["total_seconds"] = time.perf_counter() - self.started
@@ -1,81 +1,538 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Generator, Optional
+import logging
+import asyncio
+import threading
+import time
+import numpy as np
 import openai
-from config.settings import OPENAI_API_KEY, CHAT_MODEL, MAX_CONTEXT_LENGTH, TOP_K_RESULTS
-from src.database.supabase_client import SupabaseClient
-from src.embeddings.embeddings_service import EmbeddingsService
+from config.settings import (
+    OPENAI_API_KEY, CHAT_MODEL, TOP_K_RESULTS, ANSWER_CACHE_ENABLED,
+    RETRIEVAL_ASYNC, KEYWORD_SEARCH_ENABLED, KEYWORD_TOP_K, LEXICAL_SEARCH_ENABLED, LEXICAL_TOP_K, RRF_K,
+    RERANK_ENABLED, RERANK_CANDIDATES, CONVERSATION_REWRITE, CONVERSATION_REUSE_THRESHOLD,
+    QUERY_DEADLINE_SECONDS, CHAT_MAX_RETRIES
+)
+from src.chat.answer_cache import get_answer_cache, get_retrieval_cache
+from src.chat.answer_stream import AnswerStream
+from src.chat.context_assembler import ContextAssembler, parse_metadata
+from src.chat.conversation import Conversation
+from src.chat.reranker import Reranker
+from src.database.document_changes import DocumentChangeFeed
+from src.database.lexical_index import BM25Index, get_lexical_index
+from src.database.search_filters import SearchFilters, scope_key, validate_filters
+from src.database.vector_store import VectorStore, get_vector_store
+from src.embeddings.embeddings_service import EmbeddingsService, is_retryable
+from utils.async_loop import run_async
+from utils.resilience import Deadline, call_with_retry, deadline_scope, request_timeout, stage_deadline
+from utils.telemetry import Trace, get_telemetry
+
+logger = logging.getLogger(__name__)
+
+# Characters of the question kept with its telemetry trace
+TRACE_QUERY_CHARS = 80
+
+NO_CONTEXT_ANSWER = "I don't have enough information to answer that question based on the documents you've uploaded."
+
+SYSTEM_PROMPT = (
+    "You are a helpful assistant that answers questions based on the provided document context. "
+    "If the answer cannot be found in the context, say that you don't know. "
+    "Don't make up information. Provide accurate answers based only on the context given."
+)
+
+CONDENSE_PROMPT = (
+    "Rewrite the user's follow-up question as a standalone question that can be understood "
+    "without the conversation, resolving references such as pronouns to what they mean. "
+    "Keep the question's language and intent; if it already stands alone, return it unchanged. "
+    "Reply with the question only."
+)
+
+SUMMARY_PROMPT = (
+    "Update the running summary of a conversation about the user's documents with the new exchanges. "
+    "Keep the topics, names, figures and conclusions the user may refer back to. "
+    "Reply with the summary only, in at most {words} words."
+)
+
+# Completion tokens allowed for a condensed question
+CONDENSE_MAX_TOKENS = 128
+
+# Most of the query deadline each stage may use; they add up to 0.65, so at
+# least a third of it is always left for the answer's first token
+STAGE_DEADLINE_SHARES = {
+    "summarize": 0.05, "condense": 0.1, "query_embed": 0.1, "search": 0.3, "rerank": 0.1
+}
 
 class ChatService:
     """
     Service for handling chat interactions with the PDF documents
     """
     
-    def __init__(self):
-        """Initialize the chat service with dependencies"""
+    def __init__(self, embeddings_service: Optional[EmbeddingsService] = None,
+                 vector_store: Optional[VectorStore] = None, client: Optional[openai.OpenAI] = None,
+                 lexical_index: Optional[BM25Index] = None):
+        """
+        Initialize the chat service with dependencies
+        
+        Args:
+            embeddings_service: Shared embeddings service, created if not given
+            vector_store: Shared vector store, created if not given
+            client: Shared OpenAI client, created if not given
+            lexical_index: Shared BM25 index, the process-wide one if not given and LEXICAL_SEARCH_ENABLED
+        """
         openai.api_key = OPENAI_API_KEY
-        self.db_client = SupabaseClient()
-        self.embeddings_service = EmbeddingsService()
+        self.db_client = vector_store or get_vector_store()
+        self.embeddings_service = embeddings_service or EmbeddingsService(client)
+        # Retries, timeouts and circuit breaking are done by utils.resilience; the HTTP connection pool is shared
+        self.client = (client or self.embeddings_service.client).with_options(max_retries=0)
+        self.max_retries = CHAT_MAX_RETRIES
+        self.deadline_seconds = QUERY_DEADLINE_SECONDS
         self.model = CHAT_MODEL
+        self.context_assembler = ContextAssembler(self.model)
+        self.last_context_stats: Dict[str, int] = {}
+        self.answer_cache = get_answer_cache() if ANSWER_CACHE_ENABLED else None
+        self.retrieval_cache = get_retrieval_cache() if ANSWER_CACHE_ENABLED else None
+        # Ingests and deletes by other processes invalidate the caches through the store's change log
+        self.document_changes = DocumentChangeFeed(self.db_client)
+        self.async_retrieval = RETRIEVAL_ASYNC
+        self.lexical_index = lexical_index or (get_lexical_index() if LEXICAL_SEARCH_ENABLED else None)
+        # With re-ranking, over-fetch vector hits and keep a diverse TOP_K_RESULTS of the fused candidates
+        self.reranker = Reranker() if RERANK_ENABLED else None
+        self.vector_top_k = max(RERANK_CANDIDATES, TOP_K_RESULTS) if self.reranker else TOP_K_RESULTS
+        self.rewrite_queries = CONVERSATION_REWRITE
+        self.context_reuse_threshold = CONVERSATION_REUSE_THRESHOLD
+        self.telemetry = get_telemetry()
     
-    def get_relevant_context(self, query: str) -> str:
+    @staticmethod
+    def document_ids(results: List[Dict[str, Any]]) -> List[str]:
         """
-        Get relevant context from the database based on the query
+        IDs of the documents a set of search results came from
+        
+        Args:
+            results: Similarity search results
+            
+        Returns:
+            List[str]: Distinct document IDs (results without one are ignored)
+        """
+        ids = {parse_metadata(result.get("metadata")).get("document_id") for result in results}
+        ids.discard(None)
+        return sorted(ids)
+    
+    @staticmethod
+    def fuse_results(result_lists: List[List[Dict[str, Any]]], k: int = RRF_K) -> List[Dict[str, Any]]:
+        """
+        Combine ranked result lists with reciprocal rank fusion
+        
+        Each chunk scores the sum of 1 / (k + rank) over the lists it appears
+        in, so chunks found by several retrievers rise to the top without
+        having to compare cosine similarities with BM25 scores.
+        
+        Args:
+            result_lists: Ranked results of each retriever, best first
+            k: Rank damping constant
+            
+        Returns:
+            List[Dict]: Unique chunks with an rrf_score, best first
+        """
+        fused: Dict[str, Dict[str, Any]] = {}
+        for results in result_lists:
+            for rank, result in enumerate(results, start=1):
+                entry = fused.get(result.get("id"))
+                if entry is None:
+                    entry = fused[result.get("id")] = {**result, "rrf_score": 0.0}
+                else:
+                    # Keep every retriever's score (similarity, keyword_rank, bm25_score)
+                    entry.update({key: value for key, value in result.items() if key not in entry})
+                entry["rrf_score"] += 1.0 / (k + rank)
+        return sorted(fused.values(), key=lambda result: result["rrf_score"], reverse=True)
+    
+    def lexical_search(self, query: str, filters: Optional[SearchFilters] = None) -> List[Dict[str, Any]]:
+        """
+        BM25 search of the local lexical index (empty if it is disabled or fails)
+        
+        Args:
+            query: User query
+            filters: Scope of the search
+            
+        Returns:
+            List[Dict]: Matching chunks with bm25_score
+        """
+        if self.lexical_index is None:
+            return []
+        try:
+            return self.lexical_index.search(query, LEXICAL_TOP_K, filters)
+        except Exception as e:
+            logger.error("Error in lexical search: %s", e)
+            return []
+    
+    def embed_query(self, query: str) -> Optional[np.ndarray]:
+        """
+        Embed a query within its share of the query deadline, degrading instead of failing
+        
+        Args:
+            query: Query text
+            
+        Returns:
+            np.ndarray: Query embedding, or None if OpenAI is down, too slow or failing
+        """
+        with stage_deadline(STAGE_DEADLINE_SHARES["query_embed"]):
+            try:
+                return self.embeddings_service.generate_query_embedding(query)
+            except Exception as e:
+                logger.warning("Could not embed the query, searching by keywords only: %s", e)
+                self.telemetry.inc("degraded_queries", stage="query_embed")
+                return None
+    
+    async def aembed_query(self, query: str) -> Optional[np.ndarray]:
+        """
+        Async embed_query
+        
+        Args:
+            query: Query text
+            
+        Returns:
+            np.ndarray: Query embedding, or None if OpenAI is down, too slow or failing
+        """
+        with stage_deadline(STAGE_DEADLINE_SHARES["query_embed"]):
+            try:
+                return await self.embeddings_service.agenerate_query_embedding(query)
+            except Exception as e:
+                logger.warning("Could not embed the query, searching by keywords only: %s", e)
+                self.telemetry.inc("degraded_queries", stage="query_embed")
+                return None
+    
+    def rerank(self, query: str, query_embedding: Optional[np.ndarray],
+               results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Re-rank fused candidates down to TOP_K_RESULTS (timed as the "rerank" stage)
+        
+        Args:
+            query: User query
+            query_embedding: Embedding of the query (None if it could not be embedded)
+            results: Fused search candidates
+            
+        Returns:
+            List[Dict]: Selected results with rerank_score; the best-fused ones if re-ranking fails
+        """
+        if query_embedding is None and self.reranker.cross_encoder is None:
+            return results[:TOP_K_RESULTS]
+        with self.telemetry.span("rerank"), stage_deadline(STAGE_DEADLINE_SHARES["rerank"]):
+            try:
+                embeddings = None
+                if self.reranker.needs_embeddings:
+                    embeddings = self.db_client.get_embeddings([result.get("id") for result in results])
+                return self.reranker.rerank(query, query_embedding, results, embeddings)
+            except Exception as e:
+                logger.error("Error re-ranking results: %s", e)
+                return results[:TOP_K_RESULTS]
+    
+    async def arerank(self, query: str, query_embedding: Optional[np.ndarray],
+                      results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Async rerank: embeddings are fetched over async I/O, the cross-encoder runs in a worker thread
+        
+        Args:
+            query: User query
+            query_embedding: Embedding of the query (None if it could not be embedded)
+            results: Fused search candidates
+            
+        Returns:
+            List[Dict]: Selected results with rerank_score; the best-fused ones if re-ranking fails
+        """
+        if query_embedding is None and self.reranker.cross_encoder is None:
+            return results[:TOP_K_RESULTS]
+        with self.telemetry.span("rerank"), stage_deadline(STAGE_DEADLINE_SHARES["rerank"]):
+            try:
+                embeddings = None
+                if self.reranker.needs_embeddings:
+                    embeddings = await self.db_client.aget_embeddings([result.get("id") for result in results])
+                if self.reranker.cross_encoder is not None:
+                    return await asyncio.to_thread(self.reranker.rerank, query, query_embedding, results, embeddings)
+                return self.reranker.rerank(query, query_embedding, results, embeddings)
+            except Exception as e:
+                logger.error("Error re-ranking results: %s", e)
+                return results[:TOP_K_RESULTS]
+    
+    def search(self, query: str, query_embedding: Optional[np.ndarray] = None,
+               filters: Optional[SearchFilters] = None, vector_search: bool = True) -> List[Dict[str, Any]]:
+        """
+        Find the chunks most relevant to a query, reusing results of identical earlier queries
+        
+        With RETRIEVAL_ASYNC the lookups run concurrently on the shared
+        background event loop (see asearch); otherwise they run one after
+        another on the calling thread. If the query cannot be embedded, the
+        keyword and BM25 results are used on their own.
+        
+        Args:
+            query: User query
+            query_embedding: Embedding of the query, computed if needed and not given
+            filters: Scope of the search (document IDs, filenames, pages, metadata values),
+                applied by every retriever before ranking
+            vector_search: False skips embedding and vector search (e.g. the query could not be embedded)
+            
+        Returns:
+            List[Dict]: Search results
+        """
+        if self.async_retrieval:
+            return run_async(self.asearch(query, query_embedding, filters, vector_search))
+        
+        filters = validate_filters(filters)
+        scope = scope_key(filters)
+        # Query embedding is timed as its own stage, nested in this one
+        with self.telemetry.span("search"):
+            if self.retrieval_cache is not None:
+                results = self.retrieval_cache.get(query, TOP_K_RESULTS, scope)
+                if results is not None:
+                    return results
+            
+            if query_embedding is None and vector_search:
+                query_embedding = self.embed_query(query)
+            with stage_deadline(STAGE_DEADLINE_SHARES["search"]):
+                result_lists = [self.lexical_search(query, filters)]
+                if query_embedding is not None:
+                    result_lists.insert(0, self.db_client.similarity_search(query_embedding, self.vector_top_k, filters))
+                if KEYWORD_SEARCH_ENABLED:
+                    result_lists.append(self.db_client.keyword_search(query, KEYWORD_TOP_K, filters))
+            results = self.fuse_results(result_lists)
+            # Keyword and BM25 hits are fused in even without re-ranking: keep the same TOP_K_RESULTS either way
+            if self.reranker is not None:
+                results = self.rerank(query, query_embedding, results)
+            else:
+                results = results[:TOP_K_RESULTS]
+            
+            # Empty results may be a failed search, keyword-only ones a degraded one; don't remember them
+            if self.retrieval_cache is not None and results and query_embedding is not None:
+                self.retrieval_cache.put(query, TOP_K_RESULTS, results, self.document_ids(results), scope)
+            return results
+    
+    async def asearch(self, query: str, query_embedding: Optional[np.ndarray] = None,
+                      filters: Optional[SearchFilters] = None, vector_search: bool = True) -> List[Dict[str, Any]]:
+        """
+        Async search: the keyword search runs while the query is embedded and vector-searched
+        
+        Vector, keyword and lexical (BM25) results are fused by reciprocal rank,
+        then re-ranked when RERANK_ENABLED; either way TOP_K_RESULTS are returned.
+        
+        Args:
+            query: User query
+            query_embedding: Embedding of the query, computed if needed and not given
+            filters: Scope of the search, applied by every retriever before ranking
+            vector_search: False skips embedding and vector search (e.g. the query could not be embedded)
+            
+        Returns:
+            List[Dict]: Search results
+        """
+        filters = validate_filters(filters)
+        scope = scope_key(filters)
+        with self.telemetry.span("search"):
+            if self.retrieval_cache is not None:
+                results = self.retrieval_cache.get(query, TOP_K_RESULTS, scope)
+                if results is not None:
+                    return results
+            
+            with stage_deadline(STAGE_DEADLINE_SHARES["query_embed"] + STAGE_DEADLINE_SHARES["search"]):
+                keyword_task = (
+                    asyncio.ensure_future(self.db_client.akeyword_search(query, KEYWORD_TOP_K, filters))
+                    if KEYWORD_SEARCH_ENABLED else None
+                )
+            try:
+                if query_embedding is None and vector_search:
+                    query_embedding = await self.aembed_query(query)
+                result_lists = []
+                if query_embedding is not None:
+                    with stage_deadline(STAGE_DEADLINE_SHARES["search"]):
+                        result_lists.append(
+                            await self.db_client.asimilarity_search(query_embedding, self.vector_top_k, filters)
+                        )
+                # Sub-millisecond and CPU-bound: no point handing it to a thread
+                result_lists.append(self.lexical_search(query, filters))
+                if keyword_task is not None:
+                    result_lists.append(await keyword_task)
+                results = self.fuse_results(result_lists)
+            finally:
+                if keyword_task is not None and not keyword_task.done():
+                    keyword_task.cancel()
+            # Keyword and BM25 hits are fused in even without re-ranking: keep the same TOP_K_RESULTS either way
+            if self.reranker is not None:
+                results = await self.arerank(query, query_embedding, results)
+            else:
+                results = results[:TOP_K_RESULTS]
+            
+            # Empty results may be a failed search, keyword-only ones a degraded one; don't remember them
+            if self.retrieval_cache is not None and results and query_embedding is not None:
+                self.retrieval_cache.put(query, TOP_K_RESULTS, results, self.document_ids(results), scope)
+            return results
+    
+    def cache_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Get answer and retrieval cache counters
+        
+        Returns:
+            Dict: Stats per cache; empty when caching is disabled
+        """
+        if self.answer_cache is None:
+            return {}
+        return {"answer": self.answer_cache.stats(), "retrieval": self.retrieval_cache.stats()}
+    
+    async def aget_relevant_context(self, query: str, filters: Optional[SearchFilters] = None) -> str:
+        """
+        Async get_relevant_context, for callers already running in an event loop
         
         Args:
             query: User query
+            filters: Scope of the search
             
         Returns:
             str: Relevant context from documents
         """
         try:
-            # Generate embedding for the query
-            query_embedding = self.embeddings_service.generate_query_embedding(query)
+            results = await self.asearch(query, filters=filters)
+            with self.telemetry.span("pack"):
+                context, _ = self.context_assembler.assemble(results)
+            return context
+        except Exception as e:
+            logger.error("Error in aget_relevant_context: %s", e)
+            raise Exception(f"Error retrieving context: {str(e)}")
+    
+    def get_relevant_context(self, query: str, query_embedding: Optional[np.ndarray] = None,
+                             filters: Optional[SearchFilters] = None) -> str:
+        """
+        Get relevant context from the database based on the query
+        
+        Args:
+            query: User query
+            query_embedding: Embedding of the query, computed if needed and not given
+            filters: Scope of the search
             
+        Returns:
+            str: Relevant context from documents
+        """
+        try:
             # Perform similarity search
-            results = self.db_client.similarity_search(query_embedding, TOP_K_RESULTS)
-            
-            # Debug: Print out the results
-            print(f"Retrieved {len(results)} results from similarity search")
+            results = self.search(query, query_embedding, filters)
             
-            # Extract and combine the text from the results
-            context_parts = []
-            for result in results:
-                # Debug: Print each result's similarity score
-                print(f"Similarity: {result.get('similarity', 'N/A')}")
-                
-                # Handle different result structures
-                content = result.get('content')
-                if not content and isinstance(result, dict):
-                    # Try to get content from different fields
-                    content = result.get('text', '')
-                
-                # Get metadata
-                metadata = result.get('metadata', {})
-                if isinstance(metadata, str):
-                    try:
-                        metadata = json.loads(metadata)
-                    except:
-                        metadata = {"source": "unknown"}
-                
-                filename = metadata.get('filename', 'unknown_file')
-                context_parts.append(f"Document: {filename}\n{content}")
+            logger.debug("Retrieved %d results from similarity search", len(results))
             
-            context = "\n\n".join(context_parts)
+            # Merge overlapping chunks, drop near-duplicates and pack into the token budget
+            with self.telemetry.span("pack"):
+                context, stats = self.context_assembler.assemble(results)
+            self.last_context_stats = stats
             
-            # Debug: Print context length
-            print(f"Context length: {len(context)} characters")
+            logger.debug("Context: %d passages from %d chunks, %d tokens",
+                         stats["packed"], stats["chunks"], stats["tokens"])
             
             return context
         except Exception as e:
-            print(f"Error in get_relevant_context: {str(e)}")
+            logger.error("Error in get_relevant_context: %s", e)
             raise Exception(f"Error retrieving context: {str(e)}")
     
-    def generate_answer(self, query: str, context: str) -> str:
+    def _messages(self, query: str, context: str,
+                  conversation: Optional[Conversation] = None) -> List[Dict[str, str]]:
+        """Build the chat messages for a query, its context and the conversation so far"""
+        user_prompt = f"Context:\n{context}\n\nQuestion: {query}\n\nAnswer:"
+        history = conversation.history_messages() if conversation is not None else []
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            *history,
+            {"role": "user", "content": user_prompt}
+        ]
+    
+    def _complete(self, messages: List[Dict[str, str]], max_tokens: int, temperature: float = 0.0) -> str:
+        """
+        Run a non-streaming chat completion, counting the call and its tokens
+        
+        Bounded by the current query deadline, retried on transient errors and
+        failed fast while the OpenAI circuit is open.
+        
+        Args:
+            messages: Chat messages
+            max_tokens: Completion token limit
+            temperature: Sampling temperature
+            
+        Returns:
+            str: Completion text
+        """
+        def attempt():
+            start = time.perf_counter()
+            try:
+                response = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    timeout=request_timeout()
+                )
+            except Exception:
+                self.telemetry.record_openai_call("chat", "error", time.perf_counter() - start)
+                raise
+            usage = response.usage
+            self.telemetry.record_openai_call("chat", "ok", time.perf_counter() - start,
+                                              usage.prompt_tokens if usage else 0,
+                                              usage.completion_tokens if usage else 0)
+            return response.choices[0].message.content or ""
+        
+        return call_with_retry(attempt, is_retryable, self.max_retries, "openai")
+    
+    def condense_query(self, query: str, conversation: Optional[Conversation]) -> str:
+        """
+        Rewrite a follow-up question as a standalone search query (timed as the "condense" stage)
+        
+        Args:
+            query: Question as the user asked it
+            conversation: Conversation it belongs to
+            
+        Returns:
+            str: Standalone question; the question itself without history, when disabled or on error
+        """
+        if conversation is None or conversation.empty or not self.rewrite_queries:
+            return query
+        with conversation.lock:
+            summary = f"Summary of the earlier conversation: {conversation.summary}\n\n" if conversation.summary else ""
+            transcript = conversation.transcript(conversation.turns)
+        with self.telemetry.span("condense"), stage_deadline(STAGE_DEADLINE_SHARES["condense"]):
+            try:
+                condensed = self._complete([
+                    {"role": "system", "content": CONDENSE_PROMPT},
+                    {"role": "user", "content": f"{summary}Conversation:\n{transcript}\n\nFollow-up question: {query}"}
+                ], CONDENSE_MAX_TOKENS).strip()
+            except Exception as e:
+                logger.warning("Could not condense follow-up question, searching for it as asked: %s", e)
+                return query
+        logger.debug("Condensed %r to %r", query, condensed)
+        return condensed or query
+    
+    def summarize(self, conversation: Conversation) -> None:
+        """
+        Fold the turns that no longer fit the history budget into the rolling summary
+        
+        Timed as the "summarize" stage; does nothing while the history is within
+        budget. If summarizing fails, the folded turns are dropped and the old
+        summary is kept.
+        
+        Args:
+            conversation: Conversation to compact
+        """
+        folded = conversation.overflow()
+        if not folded:
+            return
+        previous = f"Summary so far: {conversation.summary}\n\n" if conversation.summary else ""
+        prompt = SUMMARY_PROMPT.format(words=max(1, conversation.summary_tokens * 3 // 4))
+        with self.telemetry.span("summarize"), stage_deadline(STAGE_DEADLINE_SHARES["summarize"]):
+            try:
+                summary = self._complete([
+                    {"role": "system", "content": prompt},
+                    {"role": "user", "content": f"{previous}New exchanges:\n{conversation.transcript(folded)}"}
+                ], conversation.summary_tokens)
+            except Exception as e:
+                logger.warning("Could not summarize %d earlier turns, dropping them: %s", len(folded), e)
+                return
+        conversation.set_summary(summary)
+    
+    def generate_answer(self, query: str, context: str, conversation: Optional[Conversation] = None) -> str:
         """
         Generate an answer to the user query based on the provided context
         
         Args:
             query: User query
             context: Relevant context from documents
+            conversation: Conversation whose history goes into the prompt
             
         Returns:
             str: Generated answer
@@ -83,62 +540,202 @@ class ChatService:
         try:
             # Check if context is empty
             if not context or context.strip() == "":
-                return "I don't have enough information to answer that question based on the documents you've uploaded."
-            
-            # Truncate context if it's too long
-            if len(context) > MAX_CONTEXT_LENGTH:
-                context = context[:MAX_CONTEXT_LENGTH]
-            
-            # Create the prompt for the language model
-            system_prompt = (
-                "You are a helpful assistant that answers questions based on the provided document context. "
-                "If the answer cannot be found in the context, say that you don't know. "
-                "Don't make up information. Provide accurate answers based only on the context given."
-            )
-            
-            user_prompt = f"Context:\n{context}\n\nQuestion: {query}\n\nAnswer:"
+                return NO_CONTEXT_ANSWER
             
             # Make the API call
-            response = openai.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.3,
-                max_tokens=1000
-            )
-            
-            return response.choices[0].message.content
+            with self.telemetry.span("generate"):
+                return self._complete(self._messages(query, context, conversation), 1000, temperature=0.3)
         except Exception as e:
-            print(f"Error in generate_answer: {str(e)}")
+            logger.error("Error in generate_answer: %s", e)
             raise Exception(f"Error generating answer: {str(e)}")
     
-    def process_query(self, query: str) -> Dict[str, Any]:
+    def stream_answer(self, query: str, context: str, conversation: Optional[Conversation] = None,
+                      deadline: Optional[Deadline] = None) -> Generator[str, None, None]:
         """
-        Process a user query and generate a response
+        Generate an answer as a stream of text deltas
         
         Args:
             query: User query
+            context: Relevant context from documents
+            conversation: Conversation whose history goes into the prompt
+            deadline: Query deadline; the request, and every wait for the next delta, must fit in what is left
             
-        Returns:
-            Dict: Response with answer and sources
+        Yields:
+            str: Answer text as it is generated
         """
+        if not context or context.strip() == "":
+            yield NO_CONTEXT_ANSWER
+            return
+        
+        messages = self._messages(query, context, conversation)
+        start = time.perf_counter()
         try:
-            import json
+            with deadline_scope(deadline):
+                response = call_with_retry(lambda: self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=0.3,
+                    max_tokens=1000,
+                    stream=True,
+                    timeout=request_timeout()
+                ), is_retryable, self.max_retries, "openai")
+        except Exception as e:
+            self.telemetry.record_openai_call("chat", "error", time.perf_counter() - start)
+            logger.error("Error in stream_answer: %s", e)
+            raise Exception(f"Error generating answer: {str(e)}")
+        
+        answer = []
+        outcome = "cancelled"
+        try:
+            for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    answer.append(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
+            outcome = "ok"
+        except Exception as e:
+            outcome = "error"
+            logger.error("Error in stream_answer: %s", e)
+            raise Exception(f"Error generating answer: {str(e)}")
+        finally:
+            # Closing the response aborts generation when the consumer stops early
+            response.close()
+            if self.telemetry.enabled:
+                # Streamed responses carry no usage; count with the chat model's tokenizer
+                self.telemetry.record_openai_call(
+                    "chat", outcome, time.perf_counter() - start,
+                    sum(self.context_assembler.count_tokens(message["content"]) for message in messages),
+                    self.context_assembler.count_tokens("".join(answer))
+                )
+    
+    def stream_query(self, query: str, cancel_event: Optional[threading.Event] = None,
+                     filters: Optional[SearchFilters] = None,
+                     conversation: Optional[Conversation] = None) -> AnswerStream:
+        """
+        Process a user query, streaming the answer as it is generated
+        
+        Retrieval runs when the stream is first iterated, so the recorded
+        time to first token covers the whole query. In a conversation, a
+        follow-up is first condensed into a standalone question, which is what
+        gets embedded and searched; when it is close enough to the question the
+        previous retrieval served, that context is reused without searching.
+        The answer sees the conversation history, and a completed answer is
+        added to it.
+        
+        Args:
+            query: User query
+            cancel_event: Event that stops generation when set (e.g. on a new question)
+            filters: Scope of the search; cached answers are only reused within the same scope
+            conversation: Conversation the query continues, or None for a single question
             
-            # Get relevant context
-            context = self.get_relevant_context(query)
+        Returns:
+            AnswerStream: Iterable of answer deltas with context, metrics and cancel()
+        """
+        filters = validate_filters(filters)
+        scope = scope_key(filters)
+        trace = Trace("query", query=query[:TRACE_QUERY_CHARS])
+        
+        def deltas() -> Generator[str, None, None]:
+            generation = None
+            deadline = Deadline(self.deadline_seconds) if self.deadline_seconds > 0 else None
+            try:
+                with self.telemetry.activate(trace), deadline_scope(deadline):
+                    start = time.perf_counter()
+                    self.document_changes.sync()
+                    search_query = query
+                    if conversation is not None:
+                        self.summarize(conversation)
+                        search_query = self.condense_query(query, conversation)
+                        if search_query != query:
+                            stream.metrics["search_query"] = search_query
+                            trace.attributes["rewritten"] = search_query[:TRACE_QUERY_CHARS]
+                    query_embedding = self.embed_query(search_query)
+                    if query_embedding is None:
+                        stream.metrics["degraded"] = trace.attributes["degraded"] = "keyword_only"
+                    cached = None
+                    if self.answer_cache is not None and query_embedding is not None:
+                        cached = self.answer_cache.get(query_embedding, scope)
+                    reused = None
+                    if cached is None and conversation is not None and query_embedding is not None:
+                        reused = conversation.reusable_retrieval(query_embedding, scope, self.context_reuse_threshold)
+                    if reused is not None:
+                        # A follow-up about the same passages: answer from the previous turn's context
+                        results = reused["results"]
+                        stream.context, stream.metrics["context"] = reused["context"], reused["stats"]
+                        stream.metrics["cache"] = trace.attributes["cache"] = "context"
+                    elif cached is None:
+                        try:
+                            results = self.search(search_query, query_embedding, filters,
+                                                  vector_search=query_embedding is not None)
+                            with self.telemetry.span("pack"):
+                                stream.context, stream.metrics["context"] = self.context_assembler.assemble(results)
+                        except Exception as e:
+                            logger.error("Error in stream_query: %s", e)
+                            raise Exception(f"Error retrieving context: {str(e)}")
+                        if conversation is not None and query_embedding is not None:
+                            conversation.remember_retrieval(query_embedding, scope, results, stream.context,
+                                                            stream.metrics["context"], self.document_ids(results))
+                    stream.metrics["retrieval_seconds"] = time.perf_counter() - start
+                
+                # A close enough earlier question is answered from the cache
+                if cached is not None:
+                    stream.context = cached["context"]
+                    stream.metrics["cache"] = trace.attributes["cache"] = "answer"
+                    yield cached["answer"]
+                    if conversation is not None and not stream.cancelled:
+                        conversation.add_turn(query, cached["answer"])
+                    return
+                
+                document_ids = self.document_ids(results)
+                if stream.cancelled:
+                    return
+                
+                answer = []
+                generation = self.telemetry.iterate(self.stream_answer(query, stream.context, conversation, deadline),
+                                                    "generate", per_item=False, trace=trace)
+                for delta in generation:
+                    answer.append(delta)
+                    yield delta
+                
+                # Only complete answers are cached and become conversation history
+                if not stream.cancelled:
+                    if self.answer_cache is not None and query_embedding is not None:
+                        self.answer_cache.put(query_embedding, "".join(answer), stream.context, document_ids, scope)
+                    if conversation is not None:
+                        conversation.add_turn(query, "".join(answer))
+            finally:
+                # Close the generation first so its time is in the trace even when cancelled
+                if generation is not None:
+                    generation.close()
+                trace.attributes["cancelled"] = stream.cancelled
+                self.telemetry.finish(trace)
+        
+        stream = AnswerStream(deltas(), cancel_event)
+        return stream
+    
+    def process_query(self, query: str, filters: Optional[SearchFilters] = None,
+                      conversation: Optional[Conversation] = None) -> Dict[str, Any]:
+        """
+        Process a user query and generate a response
+        
+        Args:
+            query: User query
+            filters: Scope of the search
+            conversation: Conversation the query continues, or None for a single question
             
-            # Generate answer
-            answer = self.generate_answer(query, context)
+        Returns:
+            Dict: Response with answer, sources and latency metrics
+        """
+        try:
+            stream = self.stream_query(query, filters=filters, conversation=conversation)
+            answer = "".join(stream)
             
             return {
                 "answer": answer,
-                "context": context
+                "context": stream.context,
+                "metrics": stream.metrics
             }
         except Exception as e:
-            print(f"Error in process_query: {str(e)}")
+            logger.error("Error in process_query: %s", e)
             return {
                 "answer": f"I encountered an error while processing your question: {str(e)}",
                 "context": ""
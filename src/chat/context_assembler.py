@@ -0,0 +1,278 @@
+import json
+import re
+from functools import reduce
+from typing import Any, Dict, List, Optional, Set, Tuple
+from config.settings import CHAT_MODEL, EMBEDDING_MODEL, MAX_CONTEXT_TOKENS, CONTEXT_DEDUP_THRESHOLD
+from utils.tokenizer import get_encoding
+
+_WORD = re.compile(r"\w+")
+_SEPARATOR = "\n\n"
+
+
+def parse_metadata(metadata: Any) -> Dict[str, Any]:
+    """
+    Normalize chunk metadata, which PostgREST may return as a JSON string
+
+    Args:
+        metadata: Metadata dict, JSON string or None
+
+    Returns:
+        Dict: Parsed metadata ({"source": "unknown"} if unparseable)
+    """
+    if isinstance(metadata, dict):
+        return metadata
+    if isinstance(metadata, str):
+        try:
+            parsed = json.loads(metadata)
+            if isinstance(parsed, dict):
+                return parsed
+        except ValueError:
+            pass
+    return {"source": "unknown"}
+
+
+def _shingles(text: str, size: int = 3) -> Set[int]:
+    """Hashed word n-grams used for near-duplicate detection"""
+    words = _WORD.findall(text.lower())
+    if len(words) < size:
+        return {hash(tuple(words))}
+    return {hash(tuple(words[i:i + size])) for i in range(len(words) - size + 1)}
+
+
+class _Passage:
+    """A contiguous span of one document, built from one or more retrieved chunks"""
+
+    def __init__(self, text: str, similarity: float, filename: str, document: str,
+                 start: Optional[int], end: Optional[int], parts: Optional[List["_Passage"]] = None,
+                 tokens: Optional[int] = None):
+        self.text = text
+        self.similarity = similarity
+        self.filename = filename
+        self.document = document
+        self.start = start
+        self.end = end
+        self.parts = parts or [self]
+        self.tokens = tokens  # of the text, without the header; None until known
+
+    @classmethod
+    def from_result(cls, result: Dict[str, Any], stored_tokens: bool = False) -> "_Passage":
+        metadata = parse_metadata(result.get("metadata"))
+        filename = metadata.get("filename", "unknown_file")
+        # Re-ranked results rank by relevance, fused ones by RRF score, plain vector results by similarity
+        score = result.get("rerank_score", result.get("rrf_score", result.get("similarity")))
+        document = metadata.get("document_id") or filename
+        if metadata.get("offsets") == "page":
+            # Page-relative offsets only line up within one page
+            document = f"{document}:{metadata.get('page_start')}"
+        tokens = metadata.get("token_count") if stored_tokens else None
+        return cls(result.get("content") or result.get("text") or "", score or 0.0,
+                   filename, document, metadata.get("char_start"), metadata.get("char_end"),
+                   tokens=tokens if isinstance(tokens, int) else None)
+
+    def merge(self, other: "_Passage") -> "_Passage":
+        """Join a later chunk of the same document that overlaps or touches this span"""
+        text, end = self.text, self.end
+        if other.end > end:
+            text += other.text[end - other.start:]
+            end = other.end
+        return _Passage(text, max(self.similarity, other.similarity), self.filename, self.document,
+                        self.start, end, self.parts + other.parts)
+
+    def header(self) -> str:
+        return f"Document: {self.filename}\n"
+
+    def render(self) -> str:
+        return self.header() + self.text
+
+
+class ContextAssembler:
+    """
+    Builds the prompt context from similarity search results.
+
+    Chunks of the same document whose character ranges overlap or touch are
+    merged into one passage, so text repeated by chunk overlap is sent once.
+    Passages that are near-duplicates of a more similar passage (word
+    3-gram Jaccard similarity at or above dedup_threshold) are dropped. The
+    rest are packed whole, most similar first, into max_tokens tokens of the
+    chat model's tokenizer. Text is never cut mid-chunk: a merged passage
+    that does not fit is split back along its chunk boundaries.
+
+    Passages are costed without re-tokenizing what is already known: a
+    chunk's stored token_count, a header's count per file name, and the
+    tokens each chunk adds to a merged passage. Token counts of adjoining
+    texts can differ from the count of their concatenation by a token, so
+    the assembled context is counted once at the end and trimmed to the
+    exact budget.
+    """
+
+    def __init__(self, model: str = CHAT_MODEL, max_tokens: int = MAX_CONTEXT_TOKENS,
+                 dedup_threshold: float = CONTEXT_DEDUP_THRESHOLD):
+        """
+        Initialize the assembler
+
+        Args:
+            model: Chat model whose tokenizer defines the budget
+            max_tokens: Token budget of the assembled context
+            dedup_threshold: Jaccard similarity at which passages count as duplicates
+        """
+        self.encoding = get_encoding(model)
+        self.max_tokens = max_tokens
+        self.dedup_threshold = dedup_threshold
+        # Chunks store token counts of the embedding model's tokenizer (TokenChunker). When the chat model
+        # uses another one (o200k_base for gpt-4o models, cl100k_base for the embedding models), those counts
+        # would misjudge the budget, so such passages are counted here, once each.
+        self.stored_tokens = get_encoding(EMBEDDING_MODEL).name == self.encoding.name
+        self._header_tokens: Dict[str, int] = {}
+
+    def count_tokens(self, text: str) -> int:
+        return len(self.encoding.encode_ordinary(text))
+
+    def _text_tokens(self, passage: _Passage) -> int:
+        if passage.tokens is None:
+            passage.tokens = self.count_tokens(passage.text)
+        return passage.tokens
+
+    def _header(self, passage: _Passage) -> int:
+        tokens = self._header_tokens.get(passage.filename)
+        if tokens is None:
+            tokens = self._header_tokens[passage.filename] = self.count_tokens(passage.header())
+        return tokens
+
+    def _tokens(self, passage: _Passage) -> int:
+        """Tokens of a rendered passage: its text's plus its header's"""
+        return self._header(passage) + self._text_tokens(passage)
+
+    def _passages(self, results: List[Dict[str, Any]]) -> List[_Passage]:
+        """Turn search results into passages, merging overlapping chunks per document"""
+        passages = []
+        spans: Dict[str, List[_Passage]] = {}
+        for result in results:
+            passage = _Passage.from_result(result, self.stored_tokens)
+            if not passage.text.strip():
+                continue
+            if isinstance(passage.start, int) and isinstance(passage.end, int):
+                spans.setdefault(passage.document, []).append(passage)
+            else:
+                passages.append(passage)
+
+        for document_spans in spans.values():
+            document_spans.sort(key=lambda p: (p.start, p.end))
+            current = document_spans[0]
+            for passage in document_spans[1:]:
+                if passage.start <= current.end:
+                    current = current.merge(passage)
+                else:
+                    passages.append(current)
+                    current = passage
+            passages.append(current)
+
+        passages.sort(key=lambda p: p.similarity, reverse=True)
+        return passages
+
+    def _deduplicate(self, passages: List[_Passage]) -> Tuple[List[_Passage], int]:
+        """Drop passages that nearly repeat a more similar one"""
+        kept: List[Tuple[_Passage, Set[int]]] = []
+        dropped = 0
+        for passage in passages:
+            shingles = _shingles(passage.text)
+            if any(len(shingles & other) / len(shingles | other) >= self.dedup_threshold
+                   for _, other in kept):
+                dropped += 1
+                continue
+            kept.append((passage, shingles))
+        return [passage for passage, _ in kept], dropped
+
+    def _split(self, passage: _Passage, room: int) -> List[_Passage]:
+        """
+        Break a merged passage that does not fit into smaller contiguous passages
+
+        Grows a window from the most similar chunk towards its more similar
+        neighbour while the window still fits in room; the chunks left of and
+        right of the window become passages of their own. Window sizes are
+        running totals of the tokens each chunk adds beyond the text it
+        shares with the previous one, so no window is tokenized whole.
+        """
+        parts = passage.parts
+        full = [self._text_tokens(part) for part in parts]
+        added = full[:1]
+        end = parts[0].end
+        for part, tokens in zip(parts[1:], full[1:]):
+            if part.end <= end:
+                added.append(0)
+            else:
+                added.append(self.count_tokens(part.text[end - part.start:]) if end > part.start else tokens)
+                end = part.end
+
+        def merged(first: int, last: int) -> _Passage:
+            piece = reduce(_Passage.merge, parts[first:last + 1])
+            piece.tokens = full[first] + sum(added[first + 1:last + 1])
+            return piece
+
+        header = self._header(passage)
+        low = high = max(range(len(parts)), key=lambda i: parts[i].similarity)
+        window = full[low]
+        while True:
+            options = []
+            if low > 0:
+                options.append((parts[low - 1].similarity, low - 1, high,
+                                full[low - 1] + added[low] + window - full[low]))
+            if high < len(parts) - 1:
+                options.append((parts[high + 1].similarity, low, high + 1, window + added[high + 1]))
+            for _, first, last, tokens in sorted(options, reverse=True):
+                if header + tokens <= room:
+                    low, high, window = first, last, tokens
+                    break
+            else:
+                break
+
+        pieces = [merged(low, high)]
+        if low > 0:
+            pieces.append(merged(0, low - 1))
+        if high < len(parts) - 1:
+            pieces.append(merged(high + 1, len(parts) - 1))
+        return sorted(pieces, key=lambda p: p.similarity, reverse=True)
+
+    def assemble(self, results: List[Dict[str, Any]]) -> Tuple[str, Dict[str, int]]:
+        """
+        Build the context string for a set of search results
+
+        Args:
+            results: Similarity search results (content, metadata, similarity)
+
+        Returns:
+            Tuple[str, Dict]: Context and counters (chunks, passages, duplicates, packed, tokens)
+        """
+        passages = self._passages(results)
+        merged = len(passages)
+        passages, duplicates = self._deduplicate(passages)
+
+        separator_tokens = self.count_tokens(_SEPARATOR)
+        selected: List[str] = []
+        used = 0
+        candidates = list(passages)
+        while candidates:
+            passage = candidates.pop(0)
+            cost = self._tokens(passage) + (separator_tokens if selected else 0)
+            if used + cost <= self.max_tokens:
+                selected.append(passage.render())
+                used += cost
+            elif len(passage.parts) > 1:
+                # Too long once merged: retry with the best-fitting contiguous piece
+                room = self.max_tokens - used - (separator_tokens if selected else 0)
+                candidates[:0] = self._split(passage, room)
+
+        context = _SEPARATOR.join(selected)
+        # Tokens can merge across headers, chunks and separators; recount so the budget is exact
+        tokens = self.count_tokens(context)
+        while tokens > self.max_tokens and selected:
+            selected.pop()
+            context = _SEPARATOR.join(selected)
+            tokens = self.count_tokens(context)
+
+        return context, {
+            "chunks": len(results),
+            "passages": merged,
+            "duplicates": duplicates,
+            "packed": len(selected),
+            "tokens": tokens
+        }
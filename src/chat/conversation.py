@@ -0,0 +1,214 @@
+"""
+State of one multi-turn chat session.
+
+A conversation keeps its most recent turns verbatim, within
+CONVERSATION_HISTORY_TOKENS, plus a rolling summary of everything older,
+within CONVERSATION_SUMMARY_TOKENS. The text sent to the model for history
+stays bounded however long the session runs. ChatService uses the history
+to condense follow-up questions into standalone queries and writes the
+summary when turns overflow. It also remembers the last retrieval, so a
+follow-up about the same passages reuses that context instead of searching
+again; like the answer and retrieval caches, that retrieval is dropped when
+a document it came from changes or the embedding model is switched.
+"""
+from typing import Any, Dict, Iterable, List, Optional
+import threading
+import weakref
+import numpy as np
+from config.settings import CHAT_MODEL, CONVERSATION_HISTORY_TOKENS, CONVERSATION_SUMMARY_TOKENS
+from src.database.vector_store import add_document_listener, add_embedding_version_listener
+from utils.tokenizer import get_encoding
+from utils.vectors import normalize
+
+# Live conversations; weak so that ended sessions are not kept alive by the listeners
+_conversations: "weakref.WeakSet[Conversation]" = weakref.WeakSet()
+_conversations_lock = threading.Lock()
+_listening = False
+
+
+def _documents_changed(document_ids: List[str]) -> None:
+    with _conversations_lock:
+        conversations = list(_conversations)
+    for conversation in conversations:
+        conversation.forget_documents(document_ids)
+
+
+def _embedding_version_changed(version: Dict[str, Any]) -> None:
+    with _conversations_lock:
+        conversations = list(_conversations)
+    for conversation in conversations:
+        conversation.forget_retrieval()
+
+
+def _track(conversation: "Conversation") -> None:
+    """Register a conversation for document and embedding version changes"""
+    global _listening
+    with _conversations_lock:
+        if not _listening:
+            add_document_listener(_documents_changed)
+            add_embedding_version_listener(_embedding_version_changed)
+            _listening = True
+        _conversations.add(conversation)
+
+
+class Conversation:
+    """
+    Recent turns, rolling summary and last retrieval of one chat session.
+
+    Turns are only added once their answer is complete. When the recent
+    turns exceed history_tokens, overflow() hands back the oldest ones (down
+    to half the budget, so summarizing is needed every few turns rather than
+    on every one) for ChatService to fold into the summary.
+    """
+
+    def __init__(self, model: str = CHAT_MODEL, history_tokens: int = CONVERSATION_HISTORY_TOKENS,
+                 summary_tokens: int = CONVERSATION_SUMMARY_TOKENS):
+        """
+        Start an empty conversation
+
+        Args:
+            model: Chat model whose tokenizer measures the history
+            history_tokens: Token budget of the turns kept verbatim
+            summary_tokens: Token budget of the summary of older turns
+        """
+        self.encoding = get_encoding(model)
+        self.history_tokens = history_tokens
+        self.summary_tokens = summary_tokens
+        self.summary = ""
+        self.turns: List[Dict[str, Any]] = []
+        self.last_retrieval: Optional[Dict[str, Any]] = None
+        self.lock = threading.RLock()
+        _track(self)
+
+    @property
+    def empty(self) -> bool:
+        """Whether there is no history to condense against"""
+        return not self.turns and not self.summary
+
+    def add_turn(self, question: str, answer: str) -> None:
+        """
+        Record a completed question and answer
+
+        Args:
+            question: Question as the user asked it
+            answer: Complete answer
+        """
+        tokens = len(self.encoding.encode_ordinary(question)) + len(self.encoding.encode_ordinary(answer))
+        with self.lock:
+            self.turns.append({"question": question, "answer": answer, "tokens": tokens})
+
+    def overflow(self) -> List[Dict[str, Any]]:
+        """
+        Remove and return the oldest turns once the recent ones exceed the budget
+
+        Returns:
+            List[Dict]: Turns to fold into the summary, oldest first; empty while within budget
+        """
+        with self.lock:
+            used = sum(turn["tokens"] for turn in self.turns)
+            if used <= self.history_tokens:
+                return []
+            folded = []
+            # Always keep the latest turn, whatever its size
+            while len(self.turns) > 1 and used > self.history_tokens // 2:
+                turn = self.turns.pop(0)
+                used -= turn["tokens"]
+                folded.append(turn)
+            return folded
+
+    def set_summary(self, summary: str) -> None:
+        """
+        Replace the rolling summary, cut to summary_tokens
+
+        Args:
+            summary: New summary of all turns no longer kept verbatim
+        """
+        tokens = self.encoding.encode_ordinary(summary.strip())
+        with self.lock:
+            self.summary = self.encoding.decode(tokens[:self.summary_tokens])
+
+    @staticmethod
+    def transcript(turns: List[Dict[str, Any]]) -> str:
+        """
+        Render turns as plain text, for the condensing and summarizing prompts
+
+        Args:
+            turns: Turns to render
+
+        Returns:
+            str: "User: ...\\nAssistant: ..." lines
+        """
+        return "\n".join(f"User: {turn['question']}\nAssistant: {turn['answer']}" for turn in turns)
+
+    def history_messages(self) -> List[Dict[str, str]]:
+        """
+        The history as chat messages to put between the system prompt and the new question
+
+        Returns:
+            List[Dict]: Summary as a system message, then the recent turns as user/assistant messages
+        """
+        with self.lock:
+            messages = []
+            if self.summary:
+                messages.append({"role": "system", "content": f"Summary of the earlier conversation: {self.summary}"})
+            for turn in self.turns:
+                messages.append({"role": "user", "content": turn["question"]})
+                messages.append({"role": "assistant", "content": turn["answer"]})
+            return messages
+
+    def reusable_retrieval(self, query_embedding: np.ndarray, scope: str,
+                           threshold: float) -> Optional[Dict[str, Any]]:
+        """
+        The previous turn's retrieval, if the new query is close enough to reuse it
+
+        Args:
+            query_embedding: Embedding of the (standalone) query
+            scope: Search scope of the query (search_filters.scope_key)
+            threshold: Minimum cosine similarity to the query the context was retrieved for
+
+        Returns:
+            Dict: Retrieval with results, context, stats and similarity, or None
+        """
+        with self.lock:
+            retrieval = self.last_retrieval
+        if retrieval is None or retrieval["scope"] != scope:
+            return None
+        similarity = float(retrieval["embedding"] @ normalize(query_embedding))
+        if similarity < threshold:
+            return None
+        return {**retrieval, "similarity": similarity}
+
+    def remember_retrieval(self, query_embedding: np.ndarray, scope: str, results: List[Dict[str, Any]],
+                           context: str, stats: Dict[str, int], document_ids: Iterable[str]) -> None:
+        """
+        Keep a fresh retrieval for later follow-ups
+
+        Args:
+            query_embedding: Embedding of the query it was retrieved for
+            scope: Search scope of the query
+            results: Search results
+            context: Context assembled from them
+            stats: Context assembly counters
+            document_ids: IDs of the documents the results came from
+        """
+        with self.lock:
+            self.last_retrieval = {"embedding": normalize(query_embedding), "scope": scope, "results": results,
+                                   "context": context, "stats": stats, "document_ids": set(document_ids)}
+
+    def forget_documents(self, document_ids: Iterable[str]) -> None:
+        """
+        Drop the last retrieval if it came from changed documents
+
+        Args:
+            document_ids: IDs of ingested or deleted documents
+        """
+        changed = set(document_ids)
+        with self.lock:
+            retrieval = self.last_retrieval
+            if retrieval is not None and (not retrieval["document_ids"] or retrieval["document_ids"] & changed):
+                self.last_retrieval = None
+
+    def forget_retrieval(self) -> None:
+        """Drop the last retrieval, e.g. when query embeddings come from another model"""
+        with self.lock:
+            self.last_retrieval = None
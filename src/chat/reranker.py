@@ -0,0 +1,154 @@
+"""
+Re-ranking of over-fetched search candidates.
+
+Retrieval asks for RERANK_CANDIDATES vector hits instead of TOP_K_RESULTS;
+the fused candidates are then scored for relevance and diversified with
+maximal marginal relevance (MMR), and only the best TOP_K_RESULTS reach the
+prompt. Near-duplicate chunks no longer crowd out other evidence, so fewer
+prompt tokens carry more distinct information.
+"""
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+import numpy as np
+from config.settings import RERANK_CROSS_ENCODER, RERANK_MMR_LAMBDA, TOP_K_RESULTS
+from utils.vectors import normalize
+
+try:
+    from sentence_transformers import CrossEncoder
+except ImportError:  # optional dependency
+    CrossEncoder = None
+
+# Tokens of query plus passage the cross-encoder reads
+_CROSS_ENCODER_MAX_LENGTH = 512
+
+
+def mmr(relevance: np.ndarray, embeddings: np.ndarray, k: int, diversity_lambda: float) -> List[int]:
+    """
+    Select candidates by maximal marginal relevance
+
+    Each step takes the candidate maximizing
+    lambda * relevance - (1 - lambda) * (highest similarity to any candidate taken),
+    keeping the highest similarities as one vector updated per step, so the
+    selection costs one n x n product and k vector operations.
+
+    Args:
+        relevance: Relevance of each candidate to the query
+        embeddings: Unit-length candidate embeddings, one row per candidate
+        k: Candidates to select
+        diversity_lambda: 1.0 ranks by relevance alone, lower values favour diversity
+
+    Returns:
+        List[int]: Indices of the selected candidates, in selection order
+    """
+    count = len(relevance)
+    similarity = embeddings @ embeddings.T
+    redundancy = np.zeros(count, dtype=np.float32)
+    available = np.ones(count, dtype=bool)
+    selected: List[int] = []
+    for _ in range(min(k, count)):
+        scores = diversity_lambda * relevance - (1.0 - diversity_lambda) * redundancy
+        best = int(np.argmax(np.where(available, scores, -np.inf)))
+        selected.append(best)
+        available[best] = False
+        np.maximum(redundancy, similarity[best], out=redundancy)
+    return selected
+
+
+@lru_cache(maxsize=None)
+def get_cross_encoder(model: str):
+    """
+    Load a cross-encoder once per process
+
+    Args:
+        model: sentence-transformers cross-encoder name, e.g. cross-encoder/ms-marco-MiniLM-L-6-v2
+
+    Returns:
+        CrossEncoder: Model running on the CPU
+    """
+    if CrossEncoder is None:
+        raise ImportError("sentence-transformers is required for RERANK_CROSS_ENCODER (pip install sentence-transformers)")
+    return CrossEncoder(model, max_length=_CROSS_ENCODER_MAX_LENGTH, device="cpu")
+
+
+class Reranker:
+    """
+    Scores search candidates and picks a diverse top-k.
+
+    Relevance is the cross-encoder's probability that a passage answers the
+    query when RERANK_CROSS_ENCODER names a model (all candidates in one
+    batch), otherwise the cosine similarity of the candidate's embedding to
+    the query embedding. MMR then trades relevance against similarity to the
+    candidates already chosen.
+    """
+
+    def __init__(self, top_k: int = TOP_K_RESULTS, diversity_lambda: float = RERANK_MMR_LAMBDA,
+                 cross_encoder: Optional[str] = RERANK_CROSS_ENCODER):
+        """
+        Configure the reranker
+
+        Args:
+            top_k: Results kept
+            diversity_lambda: MMR trade-off; 1.0 disables diversification
+            cross_encoder: Cross-encoder model name; empty to rank by embedding similarity
+        """
+        self.top_k = top_k
+        self.diversity_lambda = diversity_lambda
+        self.cross_encoder = get_cross_encoder(cross_encoder) if cross_encoder else None
+
+    @property
+    def needs_embeddings(self) -> bool:
+        """Whether rerank needs the candidates' embeddings"""
+        return self.cross_encoder is None or self.diversity_lambda < 1.0
+
+    def relevance(self, query: str, results: List[Dict[str, Any]]) -> np.ndarray:
+        """
+        Score candidates with the cross-encoder in a single batch
+
+        Args:
+            query: User query
+            results: Candidates
+
+        Returns:
+            np.ndarray: Probability of relevance per candidate
+        """
+        pairs = [(query, result.get("content") or result.get("text") or "") for result in results]
+        logits = self.cross_encoder.predict(pairs, batch_size=len(pairs), show_progress_bar=False,
+                                            convert_to_numpy=True)
+        return 1.0 / (1.0 + np.exp(-np.asarray(logits, dtype=np.float32)))
+
+    def rerank(self, query: str, query_embedding: Optional[np.ndarray], results: List[Dict[str, Any]],
+               embeddings: Optional[Dict[str, np.ndarray]] = None) -> List[Dict[str, Any]]:
+        """
+        Pick the top_k candidates to send to the prompt
+
+        Args:
+            query: User query
+            query_embedding: Embedding of the query
+            results: Fused search candidates
+            embeddings: Candidate embeddings by chunk ID; candidates without one count
+                as unrelated to the query and to each other
+
+        Returns:
+            List[Dict]: Selected candidates with a rerank_score, in selection order
+        """
+        if not results:
+            return []
+        vectors = np.zeros((len(results), len(query_embedding) if query_embedding is not None else 1),
+                           dtype=np.float32)
+        if embeddings:
+            for i, result in enumerate(results):
+                embedding = embeddings.get(result.get("id"))
+                if embedding is not None and len(embedding) == vectors.shape[1]:
+                    vectors[i] = embedding
+            vectors = normalize(vectors)
+
+        if self.cross_encoder is not None:
+            relevance = self.relevance(query, results)
+        else:
+            relevance = vectors @ normalize(query_embedding)
+
+        if self.diversity_lambda < 1.0:
+            order = mmr(relevance, vectors, self.top_k, self.diversity_lambda)
+        else:
+            order = np.argsort(-relevance, kind="stable")[:self.top_k].tolist()
+        return [{**results[i], "rerank_score": float(relevance[i])} for i in order]
@@ -0,0 +1,220 @@
+from typing import List, Optional
+import numpy as np
+
+try:
+    import hnswlib
+except ImportError:  # optional dependency
+    hnswlib = None
+
+# Rows scored per matrix product when assigning vectors to IVF lists
+_ASSIGN_BLOCK = 16384
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k highest scores, best first
+
+    Uses argpartition so only the k winners are sorted.
+
+    Args:
+        scores: 1-D array of scores
+        k: Number of results
+
+    Returns:
+        np.ndarray: Indices into scores
+    """
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(scores):
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+class IVFIndex:
+    """
+    Inverted-file ANN index over unit-normalized vectors.
+
+    A spherical k-means coarse quantizer splits the rows into nlist lists;
+    a query scores only the rows of its nprobe closest lists. The vectors
+    themselves stay in the caller's (memory-mapped) matrix.
+    """
+
+    def __init__(self, nlist: int = 0, nprobe: int = 8, train_iterations: int = 10,
+                 max_train_rows: int = 50000, seed: int = 0):
+        """
+        Configure the index
+
+        Args:
+            nlist: Number of lists, 0 picks about 4*sqrt(rows)
+            nprobe: Lists scanned per query
+            train_iterations: k-means iterations
+            max_train_rows: Sample size used to train the centroids
+            seed: Random seed for the training sample
+        """
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_iterations = train_iterations
+        self.max_train_rows = max_train_rows
+        self.seed = seed
+        self.centroids: Optional[np.ndarray] = None
+        self.trained_rows = 0
+        self._lists: List[List[np.ndarray]] = []
+        self._packed: List[Optional[np.ndarray]] = []
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        labels = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), _ASSIGN_BLOCK):
+            block = np.asarray(vectors[start:start + _ASSIGN_BLOCK], dtype=np.float32)
+            labels[start:start + len(block)] = np.argmax(block @ self.centroids.T, axis=1)
+        return labels
+
+    def train(self, matrix: np.ndarray) -> None:
+        """
+        Learn the coarse centroids and assign every row
+
+        Args:
+            matrix: (rows, dim) unit-normalized vectors
+        """
+        rows = len(matrix)
+        nlist = self.nlist or max(1, int(4 * np.sqrt(rows)))
+        nlist = min(nlist, rows)
+        rng = np.random.default_rng(self.seed)
+        sample_ids = rng.choice(rows, size=min(rows, self.max_train_rows), replace=False)
+        sample = np.asarray(matrix[np.sort(sample_ids)], dtype=np.float32)
+
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+        for _ in range(self.train_iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            order = np.argsort(labels, kind="stable")
+            present, starts = np.unique(labels[order], return_index=True)
+            sums = np.zeros_like(centroids)
+            sums[present] = np.add.reduceat(sample[order], starts, axis=0)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            empty = norms[:, 0] == 0
+            sums[empty] = centroids[empty]
+            norms[empty] = 1.0
+            centroids = sums / norms
+
+        self.centroids = centroids
+        labels = self._assign(matrix)
+        order = np.argsort(labels, kind="stable")
+        bounds = np.searchsorted(labels[order], np.arange(nlist + 1))
+        self._lists = [[order[bounds[i]:bounds[i + 1]]] for i in range(nlist)]
+        self._packed = [None] * nlist
+        self.trained_rows = rows
+
+    def add(self, row_ids: np.ndarray, vectors: np.ndarray) -> None:
+        """
+        Append rows to their closest lists without retraining
+
+        Args:
+            row_ids: Row numbers of the vectors
+            vectors: (n, dim) unit-normalized vectors
+        """
+        labels = self._assign(vectors)
+        for label in np.unique(labels):
+            self._lists[label].append(np.asarray(row_ids)[labels == label])
+            self._packed[label] = None
+
+    def _list(self, label: int) -> np.ndarray:
+        packed = self._packed[label]
+        if packed is None:
+            packed = np.concatenate(self._lists[label]) if self._lists[label] else np.empty(0, dtype=np.int64)
+            self._lists[label] = [packed]
+            self._packed[label] = packed
+        return packed
+
+    def search(self, matrix: np.ndarray, query: np.ndarray, k: int, nprobe: int = None):
+        """
+        Approximate top-k search
+
+        Args:
+            matrix: (rows, dim) vectors the index was built over
+            query: Unit-normalized query vector
+            k: Number of results
+            nprobe: Lists to scan, defaults to the configured value
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Row numbers and scores, best first
+        """
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        probes = top_k_indices(self.centroids @ query, nprobe)
+        candidates = np.concatenate([self._list(label) for label in probes])
+        if len(candidates) == 0:
+            return candidates, np.empty(0, dtype=np.float32)
+        candidates.sort()  # sequential access into the memory map
+        scores = matrix[candidates] @ query
+        best = top_k_indices(scores, k)
+        return candidates[best], scores[best]
+
+
+class HNSWIndex:
+    """
+    Graph ANN index backed by hnswlib (optional dependency)
+    """
+
+    def __init__(self, dimension: int, ef: int = 64, M: int = 16, ef_construction: int = 200):
+        """
+        Configure the index
+
+        Args:
+            dimension: Vector dimension
+            ef: Search breadth, higher is slower and more accurate
+            M: Graph degree
+            ef_construction: Build-time search breadth
+        """
+        if hnswlib is None:
+            raise ImportError("hnswlib is required for LOCAL_INDEX_TYPE=hnsw (pip install hnswlib)")
+        self.dimension = dimension
+        self.ef = ef
+        self.M = M
+        self.ef_construction = ef_construction
+        self.trained_rows = 0
+        self._index = None
+
+    def train(self, matrix: np.ndarray) -> None:
+        """
+        Build the graph over every row
+
+        Args:
+            matrix: (rows, dim) unit-normalized vectors
+        """
+        self._index = hnswlib.Index(space="ip", dim=self.dimension)
+        self._index.init_index(max_elements=max(len(matrix), 1) * 2, ef_construction=self.ef_construction, M=self.M)
+        self._index.add_items(np.asarray(matrix, dtype=np.float32), np.arange(len(matrix)))
+        self.trained_rows = len(matrix)
+
+    def add(self, row_ids: np.ndarray, vectors: np.ndarray) -> None:
+        """
+        Insert rows into the graph
+
+        Args:
+            row_ids: Row numbers of the vectors
+            vectors: (n, dim) unit-normalized vectors
+        """
+        needed = self._index.get_current_count() + len(row_ids)
+        if needed > self._index.get_max_elements():
+            self._index.resize_index(needed * 2)
+        self._index.add_items(np.asarray(vectors, dtype=np.float32), np.asarray(row_ids))
+
+    def search(self, matrix: np.ndarray, query: np.ndarray, k: int, ef: int = None):
+        """
+        Approximate top-k search
+
+        Args:
+            matrix: Unused, kept for interface parity with IVFIndex
+            query: Unit-normalized query vector
+            k: Number of results
+            ef: Search breadth, defaults to the configured value
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Row numbers and scores, best first
+        """
+        k = min(k, self._index.get_current_count())
+        self._index.set_ef(max(ef or self.ef, k))
+        labels, distances = self._index.knn_query(query, k=k)
+        # hnswlib's "ip" distance is 1 - inner product
+        return labels[0].astype(np.int64), (1.0 - distances[0]).astype(np.float32)
@@ -0,0 +1,65 @@
+import logging
+import threading
+import time
+from typing import List, Optional
+from config.settings import DOCUMENT_CHANGES_CHECK_SECONDS
+from src.database.vector_store import VectorStore, notify_documents_changed
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentChangeFeed:
+    """
+    Passes documents committed or deleted by other processes to this process's listeners.
+
+    The document listeners only hear about ingests and deletes made in this
+    process; a CLI run or another app instance writing to the same store
+    would otherwise leave answers and retrievals cached from the old
+    documents in place. The feed reads the store's change log at most every
+    DOCUMENT_CHANGES_CHECK_SECONDS and notifies the listeners of what
+    changed since its last read. Changes made in this process come back
+    through the log as well, which only invalidates their entries twice.
+    """
+
+    def __init__(self, vector_store: VectorStore, check_seconds: float = DOCUMENT_CHANGES_CHECK_SECONDS):
+        """
+        Initialize the feed
+
+        Args:
+            vector_store: Store whose change log is followed
+            check_seconds: Minimum seconds between two reads of the log
+        """
+        self.vector_store = vector_store
+        self.check_seconds = check_seconds
+        self.position: Optional[int] = None
+        self._checked = float("-inf")
+        self._lock = threading.Lock()
+
+    def sync(self, force: bool = False) -> List[str]:
+        """
+        Notify the document listeners of changes logged since the last read
+
+        The first read only takes the current end of the log: nothing is
+        cached from before it.
+
+        Args:
+            force: Read the log even if it was read less than check_seconds ago
+
+        Returns:
+            List[str]: IDs of the documents changed since the last read
+        """
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._checked < self.check_seconds:
+                return []
+            self._checked = now
+            try:
+                self.position, changed = self.vector_store.get_document_changes(self.position)
+            except Exception as e:
+                # Supabase projects set up before the log lack the table; only local changes are seen
+                logger.warning("Could not read the document change log: %s", e)
+                return []
+        if changed:
+            logger.info("%d documents changed in other processes", len(changed))
+            notify_documents_changed(changed)
+        return changed
@@ -0,0 +1,686 @@
+from array import array
+from collections import Counter
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import atexit
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import numpy as np
+from config.settings import (
+    LEXICAL_INDEX_PATH, LEXICAL_SEGMENT_ROWS, LEXICAL_MAX_SEGMENTS, BM25_K1, BM25_B
+)
+from src.database.ann_index import top_k_indices
+from src.database.search_filters import SQLITE_FILTER_INDEXES, SearchFilters, sqlite_filter_clause, validate_filters
+
+# Words joined by . - _ / stay one token, so "3.2.1", "AB-1234" and "x_max" match exactly
+_TOKEN = re.compile(r"[a-z0-9]+(?:[._\-/][a-z0-9]+)*")
+_PART = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have if in into is it its of on or "
+    "that the their there these this to was were which will with".split()
+)
+
+# Posting widths: deltas and term frequencies use the narrowest type that holds them
+_WIDTHS = {1: np.uint8, 2: np.uint16, 4: np.uint32, 8: np.uint64}
+
+# Rows fetched per SELECT ... IN (...) statement
+_QUERY_BATCH = 500
+
+# Removals kept in the log other processes catch up from
+_REMOVED_LOG_ROWS = 100_000
+
+
+def _tokens(text: str) -> Iterator[Tuple[str, List[str]]]:
+    """Yield each non-stopword token with its parts (empty unless it is a compound)"""
+    for token in _TOKEN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        parts = [] if token.isalnum() else [
+            part for part in _PART.findall(token) if len(part) > 1 and part not in STOPWORDS
+        ]
+        yield token, parts
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into index terms
+
+    Compound tokens such as part numbers and clause numbers are kept whole and
+    additionally indexed by their parts (of two or more characters), so
+    "AB-1234" matches both "ab-1234" and "1234".
+
+    Args:
+        text: Text to tokenize
+
+    Returns:
+        List[str]: Lowercase terms without stopwords
+    """
+    terms = []
+    for token, parts in _tokens(text):
+        terms.append(token)
+        terms.extend(parts)
+    return terms
+
+
+def _pack(values: np.ndarray) -> Tuple[bytes, int]:
+    """Encode non-negative integers with the narrowest width that holds them"""
+    largest = int(values.max()) if len(values) else 0
+    width = 1 if largest < 1 << 8 else 2 if largest < 1 << 16 else 4 if largest < 1 << 32 else 8
+    return values.astype(_WIDTHS[width]).tobytes(), width
+
+
+class _Segment:
+    """
+    Immutable block of postings.
+
+    Each term's rows are stored as its first row plus delta-encoded gaps,
+    and its term frequencies alongside, both in shared byte blobs at the
+    narrowest integer width the term needs. Decoding is a zero-copy
+    np.frombuffer and a cumulative sum.
+    """
+
+    def __init__(self, terms: List[str], bases: np.ndarray, counts: np.ndarray,
+                 row_offsets: np.ndarray, row_widths: np.ndarray, tf_offsets: np.ndarray,
+                 tf_widths: np.ndarray, row_blob: bytes, tf_blob: bytes):
+        self.term_list = terms
+        self.terms = {term: i for i, term in enumerate(terms)}
+        self.bases = bases
+        self.counts = counts
+        self.row_offsets = row_offsets
+        self.row_widths = row_widths
+        self.tf_offsets = tf_offsets
+        self.tf_widths = tf_widths
+        self.row_blob = row_blob
+        self.tf_blob = tf_blob
+
+    @classmethod
+    def build(cls, postings: Iterable[Tuple[str, np.ndarray, np.ndarray]]) -> "_Segment":
+        """
+        Encode postings
+
+        Args:
+            postings: (term, ascending rows, term frequencies) in term order
+
+        Returns:
+            _Segment: Encoded segment
+        """
+        terms, bases, counts = [], [], []
+        row_offsets, row_widths, tf_offsets, tf_widths = [], [], [], []
+        row_blob, tf_blob = bytearray(), bytearray()
+        for term, rows, tfs in postings:
+            if not len(rows):
+                continue
+            terms.append(term)
+            bases.append(rows[0])
+            counts.append(len(rows))
+            data, width = _pack(np.diff(rows, prepend=rows[0]))
+            row_offsets.append(len(row_blob))
+            row_widths.append(width)
+            row_blob += data
+            data, width = _pack(tfs)
+            tf_offsets.append(len(tf_blob))
+            tf_widths.append(width)
+            tf_blob += data
+        return cls(terms, np.asarray(bases, dtype=np.int64), np.asarray(counts, dtype=np.int64),
+                   np.asarray(row_offsets, dtype=np.int64), np.asarray(row_widths, dtype=np.uint8),
+                   np.asarray(tf_offsets, dtype=np.int64), np.asarray(tf_widths, dtype=np.uint8),
+                   bytes(row_blob), bytes(tf_blob))
+
+    def postings(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Decode a term's postings
+
+        Args:
+            term: Index term
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Rows and term frequencies, or None if absent
+        """
+        i = self.terms.get(term)
+        if i is None:
+            return None
+        count = int(self.counts[i])
+        deltas = np.frombuffer(self.row_blob, dtype=_WIDTHS[int(self.row_widths[i])],
+                               count=count, offset=int(self.row_offsets[i]))
+        tfs = np.frombuffer(self.tf_blob, dtype=_WIDTHS[int(self.tf_widths[i])],
+                            count=count, offset=int(self.tf_offsets[i]))
+        return self.bases[i] + np.cumsum(deltas, dtype=np.int64), tfs
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.row_blob) + len(self.tf_blob) + 40 * len(self.term_list)
+
+    def save(self, path: str) -> None:
+        temporary = path + ".tmp"
+        with open(temporary, "wb") as file:
+            np.savez(
+                file,
+                terms=np.frombuffer("\n".join(self.term_list).encode(), dtype=np.uint8),
+                bases=self.bases, counts=self.counts,
+                row_offsets=self.row_offsets, row_widths=self.row_widths,
+                tf_offsets=self.tf_offsets, tf_widths=self.tf_widths,
+                row_blob=np.frombuffer(self.row_blob, dtype=np.uint8),
+                tf_blob=np.frombuffer(self.tf_blob, dtype=np.uint8)
+            )
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path: str) -> "_Segment":
+        with np.load(path) as data:
+            text = data["terms"].tobytes().decode()
+            return cls(text.split("\n") if text else [], data["bases"], data["counts"],
+                       data["row_offsets"], data["row_widths"], data["tf_offsets"], data["tf_widths"],
+                       data["row_blob"].tobytes(), data["tf_blob"].tobytes())
+
+
+class BM25Index:
+    """
+    Local inverted index over chunk text, scored with BM25.
+
+    Catches exact identifiers, part numbers and clause numbers that
+    embeddings tend to miss. New chunks go into an in-memory buffer of
+    array-backed postings; every segment_rows chunks (and on flush()) the
+    buffer is frozen into an immutable, delta-encoded segment on disk, and
+    once there are more than max_segments they are merged into one. Chunk
+    text and metadata live in SQLite next to the segments; chunks added
+    since the last flush are re-indexed from there when the index is
+    reopened. Deleted or replaced chunks are masked at query time and
+    dropped from postings when segments merge.
+
+    Several processes can share an index directory (the app and CLI
+    workers). Row numbers and the segment list live in SQLite and change
+    only under its write lock. Before a search or a write, a process that
+    sees commits by another (PRAGMA data_version) indexes the rows added
+    since, masks the rows removed since (from a log of removals) and loads
+    new segments.
+    """
+
+    def __init__(self, path: Optional[str] = LEXICAL_INDEX_PATH, k1: float = BM25_K1, b: float = BM25_B,
+                 segment_rows: int = LEXICAL_SEGMENT_ROWS, max_segments: int = LEXICAL_MAX_SEGMENTS):
+        """
+        Open (or create) an index
+
+        Args:
+            path: Directory holding the index files, None for a throwaway in-memory index
+            k1: BM25 term frequency saturation
+            b: BM25 length normalization
+            segment_rows: Chunks buffered before a segment is written
+            max_segments: Segments allowed before they are merged
+        """
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.segment_rows = max(1, segment_rows)
+        self.max_segments = max(1, max_segments)
+        self._lock = threading.RLock()
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(path, "chunks.sqlite3") if path else ":memory:",
+                                   timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            " row INTEGER PRIMARY KEY,"
+            " id TEXT UNIQUE NOT NULL,"
+            " document_id TEXT,"
+            " content TEXT,"
+            " metadata TEXT,"
+            " length INTEGER);"
+            "CREATE INDEX IF NOT EXISTS chunks_document_id ON chunks (document_id);"
+            + SQLITE_FILTER_INDEXES +
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value);"
+            "CREATE TABLE IF NOT EXISTS removed_rows (seq INTEGER PRIMARY KEY AUTOINCREMENT, row INTEGER NOT NULL);"
+        )
+        self._db.commit()
+
+        self._segments: List[_Segment] = []
+        self._segment_names: List[str] = []
+        # Segment files to remove once the transaction that dropped them commits
+        self._obsolete: List[str] = []
+        with self._transaction():
+            self._migrate()
+        self._load()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Write transaction; BEGIN IMMEDIATE takes the write lock up front, serializing writers across processes"""
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            yield self._db
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            self._obsolete.clear()
+            # The in-memory state may be ahead of the database; read it all again on the next sync
+            self._data_version = None
+            raise
+        self._db.execute("COMMIT")
+        for name in self._obsolete:
+            try:
+                os.remove(os.path.join(self.path, name))
+            except FileNotFoundError:
+                pass
+        self._obsolete.clear()
+
+    @contextmanager
+    def _snapshot(self) -> Iterator[sqlite3.Connection]:
+        """Read transaction, so that reads of several tables see the same commits"""
+        if self._db.in_transaction:
+            yield self._db
+            return
+        self._db.execute("BEGIN")
+        try:
+            yield self._db
+        finally:
+            self._db.execute("COMMIT")
+
+    def _migrate(self) -> None:
+        """Record the row counter and segment list, taking them from the manifest.json of older indexes"""
+        if self._db.execute("SELECT 1 FROM meta WHERE key = 'manifest'").fetchone():
+            return
+        manifest = {"segments": [], "next_segment": 0, "rows": 0}
+        if self.path is not None and os.path.exists(os.path.join(self.path, "manifest.json")):
+            with open(os.path.join(self.path, "manifest.json")) as file:
+                manifest.update(json.load(file))
+            self._obsolete.append("manifest.json")
+        next_row = self._db.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM chunks").fetchone()[0]
+        self._db.executemany("INSERT INTO meta (key, value) VALUES (?, ?)",
+                             [("manifest", json.dumps(manifest)), ("next_row", max(next_row, manifest["rows"]))])
+
+    def _meta(self) -> Dict[str, Any]:
+        return dict(self._db.execute("SELECT key, value FROM meta").fetchall())
+
+    def _save_manifest(self) -> None:
+        self._db.execute("UPDATE meta SET value = ? WHERE key = 'manifest'", (json.dumps(
+            {"segments": self._segment_names, "next_segment": self._next_segment, "rows": self._segment_end}
+        ),))
+
+    def _load(self) -> None:
+        """Read the whole index: live rows, segments and the buffer of rows not in a segment"""
+        self._data_version = self._db.execute("PRAGMA data_version").fetchone()[0]
+        with self._snapshot():
+            meta = self._meta()
+            self._lengths = np.zeros(1024, dtype=np.int32)
+            self._alive = np.zeros(1024, dtype=bool)
+            self._live_count = 0
+            self._total_length = 0
+            for row, length in self._db.execute("SELECT row, length FROM chunks"):
+                self._track(row, length)
+            self._rows = meta["next_row"]
+            self._removed_seq = self._db.execute("SELECT COALESCE(MAX(seq), 0) FROM removed_rows").fetchone()[0]
+            self._load_segments(json.loads(meta["manifest"]))
+
+    def _load_segments(self, manifest: Dict[str, Any]) -> None:
+        """Switch to a segment list, loading the segments not loaded yet, and rebuild the buffer"""
+        loaded = dict(zip(self._segment_names, self._segments))
+        self._segments = [loaded.get(name) or _Segment.load(os.path.join(self.path, name))
+                          for name in manifest["segments"]]
+        self._segment_names = list(manifest["segments"])
+        self._next_segment = manifest["next_segment"]
+        self._segment_end = manifest["rows"]
+        self._buffer: Dict[str, Tuple[array, array]] = {}
+        self._buffer_rows = 0
+        # Chunks added after the last freeze are only in SQLite; index them again
+        for row, content in self._db.execute(
+                "SELECT row, content FROM chunks WHERE row >= ? ORDER BY row", (self._segment_end,)).fetchall():
+            self._buffer_add(row, Counter(tokenize(content or "")))
+
+    def _sync(self) -> None:
+        """Catch up with the changes other processes committed (called with the lock held)"""
+        for _ in range(3):
+            try:
+                self._catch_up()
+                return
+            except FileNotFoundError:
+                # A merge removed segments after they were listed; read the list again
+                self._data_version = None
+        raise RuntimeError(f"Lexical index segments under {self.path} keep changing; cannot load them")
+
+    def _catch_up(self) -> None:
+        version = self._db.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._data_version:
+            return
+        if self._data_version is None:
+            self._load()
+            return
+        with self._snapshot():
+            first_removed = self._db.execute("SELECT MIN(seq) FROM removed_rows").fetchone()[0]
+            if first_removed is not None and first_removed > self._removed_seq + 1:
+                # Removals not seen yet were pruned from the log
+                self._load()
+                return
+            meta = self._meta()
+            manifest = json.loads(meta["manifest"])
+            segments_changed = manifest["segments"] != self._segment_names
+            for row, length, content in self._db.execute(
+                    "SELECT row, length, content FROM chunks WHERE row >= ? ORDER BY row", (self._rows,)).fetchall():
+                self._track(row, length)
+                if not segments_changed:
+                    self._buffer_add(row, Counter(tokenize(content or "")))
+            if segments_changed:
+                self._load_segments(manifest)
+            removed = self._db.execute("SELECT seq, row FROM removed_rows WHERE seq > ? ORDER BY seq",
+                                       (self._removed_seq,)).fetchall()
+            if removed:
+                self._untrack(row for _, row in removed)
+                self._removed_seq = removed[-1][0]
+            self._rows = meta["next_row"]
+        self._data_version = version
+
+    def _track(self, row: int, length: int) -> None:
+        """Record a live row's length, growing the per-row arrays by doubling"""
+        if row >= len(self._lengths):
+            size = len(self._lengths)
+            capacity = max(row + 1, 2 * size)
+            self._lengths = np.resize(self._lengths, capacity)
+            self._alive = np.resize(self._alive, capacity)
+            self._lengths[size:] = 0
+            self._alive[size:] = False
+        self._lengths[row] = length
+        self._alive[row] = True
+        self._live_count += 1
+        self._total_length += length
+
+    def _untrack(self, rows: Iterable[int]) -> None:
+        for row in rows:
+            # Rows removed by another process may never have been tracked here
+            if row < len(self._alive) and self._alive[row]:
+                self._alive[row] = False
+                self._live_count -= 1
+                self._total_length -= int(self._lengths[row])
+
+    def _buffer_add(self, row: int, counts: Counter) -> None:
+        for term, tf in counts.items():
+            postings = self._buffer.get(term)
+            if postings is None:
+                postings = self._buffer[term] = (array("q"), array("I"))
+            postings[0].append(row)
+            postings[1].append(tf)
+        self._buffer_rows += 1
+
+    def add(self, chunks: Iterable[Dict[str, Any]]) -> int:
+        """
+        Index chunks, replacing earlier chunks with the same ID
+
+        Args:
+            chunks: Chunks with id, text (or content) and metadata
+
+        Returns:
+            int: Number of chunks indexed
+        """
+        records, tokenized = [], []
+        for chunk in chunks:
+            text = chunk.get("text") if chunk.get("text") is not None else chunk.get("content") or ""
+            metadata = chunk.get("metadata")
+            document_id = metadata.get("document_id") if isinstance(metadata, dict) else None
+            counts = Counter(tokenize(text))
+            records.append((chunk["id"], document_id, text,
+                            json.dumps(metadata) if isinstance(metadata, dict) else metadata,
+                            sum(counts.values())))
+            tokenized.append(counts)
+        if not records:
+            return 0
+
+        with self._lock, self._transaction():
+            self._sync()
+            self._remove_ids([record[0] for record in records])
+            start = self._rows
+            self._db.executemany(
+                "INSERT INTO chunks (row, id, document_id, content, metadata, length) VALUES (?, ?, ?, ?, ?, ?)",
+                [(start + i, *record) for i, record in enumerate(records)]
+            )
+            self._rows = start + len(records)
+            self._db.execute("UPDATE meta SET value = ? WHERE key = 'next_row'", (self._rows,))
+            for i, (record, counts) in enumerate(zip(records, tokenized)):
+                self._track(start + i, record[4])
+                self._buffer_add(start + i, counts)
+            if self._buffer_rows >= self.segment_rows:
+                self._freeze()
+        return len(records)
+
+    def _remove_ids(self, chunk_ids: List[str]) -> int:
+        """Delete chunks and log their rows for other processes (in a write transaction)"""
+        rows = []
+        for start in range(0, len(chunk_ids), _QUERY_BATCH):
+            batch = chunk_ids[start:start + _QUERY_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            rows += [row for (row,) in self._db.execute(
+                f"SELECT row FROM chunks WHERE id IN ({placeholders})", batch)]
+        if rows:
+            for start in range(0, len(rows), _QUERY_BATCH):
+                batch = rows[start:start + _QUERY_BATCH]
+                self._db.execute(f"DELETE FROM chunks WHERE row IN ({','.join('?' * len(batch))})", batch)
+            self._db.executemany("INSERT INTO removed_rows (row) VALUES (?)", [(row,) for row in rows])
+            # Synced under the write lock, so every earlier removal has been seen
+            self._removed_seq = self._db.execute("SELECT MAX(seq) FROM removed_rows").fetchone()[0]
+            self._untrack(rows)
+        return len(rows)
+
+    def remove(self, chunk_ids: Iterable[str]) -> int:
+        """
+        Remove chunks from the index
+
+        Args:
+            chunk_ids: IDs of the chunks to remove
+
+        Returns:
+            int: Number of chunks removed
+        """
+        with self._lock, self._transaction():
+            self._sync()
+            return self._remove_ids(list(chunk_ids))
+
+    def remove_document(self, document_id: str) -> int:
+        """
+        Remove every chunk of a document
+
+        Args:
+            document_id: Document content hash
+
+        Returns:
+            int: Number of chunks removed
+        """
+        with self._lock, self._transaction():
+            self._sync()
+            ids = [chunk_id for (chunk_id,) in self._db.execute(
+                "SELECT id FROM chunks WHERE document_id = ?", (document_id,))]
+            return self._remove_ids(ids)
+
+    def _freeze(self) -> None:
+        """Turn the buffer into a segment, merging segments when there are too many (in a write transaction)"""
+        if self._buffer:
+            buffer = self._buffer
+            segment = _Segment.build(
+                (term, np.frombuffer(buffer[term][0], dtype=np.int64), np.frombuffer(buffer[term][1], dtype=np.uint32))
+                for term in sorted(buffer)
+            )
+            self._add_segment(segment)
+        self._buffer = {}
+        self._buffer_rows = 0
+        self._segment_end = self._rows
+        if len(self._segments) > self.max_segments:
+            self._merge()
+        self._save_manifest()
+
+    def _add_segment(self, segment: _Segment) -> None:
+        name = f"segment-{self._next_segment:06d}.npz"
+        self._next_segment += 1
+        if self.path is not None:
+            segment.save(os.path.join(self.path, name))
+        self._segments.append(segment)
+        self._segment_names.append(name)
+
+    def _merge(self) -> None:
+        """Merge every segment into one, dropping postings of removed chunks"""
+        old_names = self._segment_names
+        segments = self._segments
+        alive = self._alive
+
+        def merged():
+            for term in sorted(set().union(*(segment.terms for segment in segments))):
+                parts = [postings for postings in (segment.postings(term) for segment in segments) if postings]
+                rows = np.concatenate([rows for rows, _ in parts])
+                tfs = np.concatenate([tfs for _, tfs in parts])
+                keep = alive[rows]
+                yield term, rows[keep], tfs[keep]
+
+        segment = _Segment.build(merged())
+        self._segments, self._segment_names = [], []
+        self._add_segment(segment)
+        if self.path is not None:
+            self._obsolete.extend(old_names)
+        # Processes further behind than the log reaches read the whole index again
+        self._db.execute("DELETE FROM removed_rows WHERE seq <= ?", (self._removed_seq - _REMOVED_LOG_ROWS,))
+
+    def flush(self) -> None:
+        """Write buffered postings to a segment"""
+        with self._lock:
+            self._sync()
+            if not self._buffer_rows:
+                return
+            with self._transaction():
+                self._sync()
+                if self._buffer_rows:
+                    self._freeze()
+
+    def _postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        parts = [postings for postings in (segment.postings(term) for segment in self._segments) if postings]
+        buffered = self._buffer.get(term)
+        if buffered is not None:
+            parts.append((np.frombuffer(buffered[0], dtype=np.int64).copy(),
+                          np.frombuffer(buffered[1], dtype=np.uint32).copy()))
+        if not parts:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        if len(parts) == 1:
+            return parts[0]
+        return np.concatenate([rows for rows, _ in parts]), np.concatenate([tfs for _, tfs in parts])
+
+    def _has_term(self, term: str) -> bool:
+        return term in self._buffer or any(term in segment.terms for segment in self._segments)
+
+    def filtered_rows(self, filters: SearchFilters) -> np.ndarray:
+        """
+        Find the rows inside a search scope
+
+        Args:
+            filters: Validated filter
+
+        Returns:
+            np.ndarray: Row numbers
+        """
+        clause, params = sqlite_filter_clause(filters)
+        with self._lock:
+            self._sync()
+            cursor = self._db.execute(f"SELECT row FROM chunks WHERE {clause}", params)
+            return np.fromiter((row for (row,) in cursor), dtype=np.int64)
+
+    def search_rows(self, query: str, top_k: int, scope: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Rank rows against a query with BM25
+
+        Args:
+            query: Search text
+            top_k: Number of results
+            scope: Row numbers allowed in the results, all live rows if None
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Row numbers and BM25 scores, best first
+        """
+        with self._lock:
+            self._sync()
+            allowed = self._alive
+            if scope is not None:
+                # Postings outside the scope are dropped before scoring, like deleted rows
+                allowed = np.zeros_like(self._alive)
+                allowed[scope[scope < len(allowed)]] = True
+                allowed &= self._alive
+            # A compound that is indexed is matched exactly; its parts only stand in for unknown compounds
+            terms = set()
+            for token, parts in _tokens(query):
+                if parts and not self._has_term(token):
+                    terms.update(parts)
+                else:
+                    terms.add(token)
+            if not terms or not self._live_count:
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+            documents = self._live_count
+            average_length = self._total_length / documents or 1.0
+            row_parts, score_parts = [], []
+            for term in terms:
+                rows, tfs = self._postings(term)
+                keep = allowed[rows]
+                rows, tfs = rows[keep], tfs[keep]
+                if not len(rows):
+                    continue
+                idf = math.log(1.0 + (documents - len(rows) + 0.5) / (len(rows) + 0.5))
+                tfs = tfs.astype(np.float64)
+                norm = self.k1 * (1.0 - self.b + self.b * self._lengths[rows] / average_length)
+                row_parts.append(rows)
+                score_parts.append(idf * tfs * (self.k1 + 1.0) / (tfs + norm))
+            if not row_parts:
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+            rows = np.concatenate(row_parts)
+            scores = np.concatenate(score_parts)
+        if len(row_parts) > 1:
+            rows, inverse = np.unique(rows, return_inverse=True)
+            scores = np.bincount(inverse, weights=scores)
+        best = top_k_indices(scores, top_k)
+        return rows[best], scores[best]
+
+    def search(self, query: str, top_k: int = 5, filters: Optional[SearchFilters] = None) -> List[Dict[str, Any]]:
+        """
+        Find chunks matching the query terms
+
+        Args:
+            query: Search text
+            top_k: Number of top results to return
+            filters: Scope of the search, applied before ranking
+
+        Returns:
+            List[Dict]: Chunks with id, content, metadata and bm25_score, best first
+        """
+        filters = validate_filters(filters)
+        rows, scores = self.search_rows(query, top_k, self.filtered_rows(filters) if filters else None)
+        if not len(rows):
+            return []
+        rows, scores = rows.tolist(), scores.tolist()
+        with self._lock:
+            placeholders = ",".join("?" * len(rows))
+            records = {row: (chunk_id, content, metadata) for row, chunk_id, content, metadata in self._db.execute(
+                f"SELECT row, id, content, metadata FROM chunks WHERE row IN ({placeholders})", rows)}
+        return [
+            {"id": records[row][0], "content": records[row][1],
+             "metadata": json.loads(records[row][2] or "{}"), "bm25_score": score}
+            for row, score in zip(rows, scores) if row in records
+        ]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            self._sync()
+            return {"chunks": self._live_count, "segments": len(self._segments),
+                    "buffered": self._buffer_rows, "terms": sum(len(s.term_list) for s in self._segments),
+                    "bytes": sum(segment.nbytes for segment in self._segments)}
+
+    def close(self) -> None:
+        """Flush the buffer and close the database"""
+        with self._lock:
+            self.flush()
+            self._db.close()
+
+
+@lru_cache(maxsize=None)
+def get_lexical_index() -> BM25Index:
+    """
+    Process-wide lexical index
+
+    Returns:
+        BM25Index: Shared index stored under LEXICAL_INDEX_PATH, flushed at exit
+    """
+    index = BM25Index()
+    atexit.register(index.close)
+    return index
@@ -0,0 +1,752 @@
+from typing import Iterator, List, Dict, Any, Optional, Tuple
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import logging
+import json
+import os
+import sqlite3
+import threading
+import numpy as np
+from config.settings import (
+    LOCAL_VECTOR_STORE_PATH, VECTOR_DIMENSION, LOCAL_INDEX_TYPE, LOCAL_ANN_MIN_ROWS,
+    LOCAL_IVF_NLIST, LOCAL_IVF_NPROBE, LOCAL_HNSW_EF, LOCAL_QUANTIZATION, LOCAL_RESCORE_FACTOR, MATCH_THRESHOLD,
+    DELETE_BATCH_SIZE
+)
+from src.database.ann_index import IVFIndex, HNSWIndex, top_k_indices
+from src.database.search_filters import (
+    SQLITE_FILTER_INDEXES, SearchFilters, sqlite_filter_clause, validate_filters
+)
+from src.database.vector_store import VectorStore
+from utils.vectors import make_codec, normalize
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched per SELECT ... IN (...) statement
+_QUERY_BATCH = 500
+
+# Bytes of float32 temporaries per block of a quantized scan; small enough to stay in cache
+_SCAN_BLOCK_BYTES = 4 * 2**20
+
+# Filtered searches matching at most this share of rows gather them; larger scopes mask a full scan
+_GATHER_FRACTION = 0.25
+
+class LocalVectorStore(VectorStore):
+    """
+    In-process vector store for offline use and low-latency retrieval.
+
+    Unit-normalized embeddings live in a memory-mapped float32 matrix
+    (vectors.f32) so cosine similarity is a single matrix-vector product;
+    chunk text, metadata and document markers live in SQLite. Large
+    corpora can use an IVF (NumPy) or HNSW (hnswlib) index instead of the
+    exact scan.
+
+    With quantization, the exact scan reads int8 or binary codes kept in a
+    second memory-mapped file (vectors.int8 / vectors.binary) instead of the
+    float32 matrix, and the best candidates are rescored at full precision,
+    so only their float32 rows are paged in.
+
+    Filtered searches look up the rows in scope in SQLite (document_id and
+    expression indexes on filename and page) and rank only those rows
+    exactly, bypassing the ANN index and the quantized codes.
+
+    A re-index to another embedding model writes a second matrix
+    (vectors.next.f32), recording re-embedded rows in SQLite, and replaces
+    vectors.f32 with it in one rename; searches already running keep
+    reading the old file through their memory map.
+
+    Several processes can share a store directory (the app and CLI
+    workers). Row numbers are handed out from a counter in SQLite, and
+    writes to the vector files happen under SQLite's write lock. A process
+    that sees commits by another (PRAGMA data_version) maps the grown or
+    replaced files and brings its ANN index up to date before it searches.
+    """
+
+    def __init__(self, path: str = LOCAL_VECTOR_STORE_PATH, dimension: int = VECTOR_DIMENSION,
+                 index_type: str = LOCAL_INDEX_TYPE, quantization: str = LOCAL_QUANTIZATION,
+                 rescore_factor: int = LOCAL_RESCORE_FACTOR):
+        """
+        Open (or create) a local store
+
+        Args:
+            path: Directory holding the store files
+            dimension: Embedding dimension
+            index_type: "exact", "ivf" or "hnsw"
+            quantization: Codes the exact scan reads: "none", "int8" or "binary"
+            rescore_factor: Quantized candidates per result rescored in float32; 0 returns quantized scores
+        """
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.dimension = dimension
+        self.index_type = index_type.lower()
+        self.codec = make_codec(quantization, dimension)
+        self.rescore_factor = rescore_factor
+        self._vectors_path = os.path.join(path, "vectors.f32")
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(os.path.join(path, "chunks.sqlite3"), timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            " row INTEGER PRIMARY KEY,"
+            " id TEXT UNIQUE NOT NULL,"
+            " document_id TEXT,"
+            " content TEXT,"
+            " metadata TEXT);"
+            "CREATE INDEX IF NOT EXISTS chunks_document_id ON chunks (document_id);"
+            + SQLITE_FILTER_INDEXES +
+            "CREATE TABLE IF NOT EXISTS documents ("
+            " document_id TEXT PRIMARY KEY,"
+            " filename TEXT,"
+            " chunk_count INTEGER,"
+            " status TEXT NOT NULL DEFAULT 'pending',"
+            " updated_at TEXT);"
+            "CREATE TABLE IF NOT EXISTS embedding_versions ("
+            " version INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " model TEXT NOT NULL,"
+            " dimensions INTEGER NOT NULL DEFAULT 0,"
+            " status TEXT NOT NULL DEFAULT 'building',"
+            " created_at TEXT,"
+            " activated_at TEXT);"
+            "CREATE TABLE IF NOT EXISTS reindexed_rows (row INTEGER PRIMARY KEY);"
+            # next_row: row counter; rewrites: overwrites and deletes; swaps: embedding version swaps
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS document_changes ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " document_id TEXT NOT NULL,"
+            " changed_at TEXT);"
+        )
+        self._db.commit()
+
+        self._capacity = 0
+        self._matrix: Optional[np.memmap] = None
+        self._codes: Optional[np.memmap] = None
+        if self.codec is not None:
+            self._codes_path = os.path.join(path, f"vectors.{self.codec.kind}")
+        self._index = None
+        self._index_dirty = False
+        self._next_path = os.path.join(path, "vectors.next.f32")
+        self._next: Optional[np.memmap] = None
+        with self._lock, self._transaction():
+            # Stores written before rows were counted in SQLite continue after their last row
+            self._db.execute("INSERT OR IGNORE INTO meta (key, value) "
+                             "SELECT 'next_row', COALESCE(MAX(row) + 1, 0) FROM chunks")
+            self._db.executemany("INSERT OR IGNORE INTO meta (key, value) VALUES (?, 0)", [("rewrites",), ("swaps",)])
+            self._read_meta()
+            self._map_files()
+            if self.codec is not None:
+                self._open_codes()
+            self._data_version = self._db.execute("PRAGMA data_version").fetchone()[0]
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Write transaction; BEGIN IMMEDIATE takes the write lock up front, serializing writers across processes"""
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            yield self._db
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            # The in-memory state may be ahead of the database; map everything again on the next sync
+            self._data_version = None
+            raise
+        self._db.execute("COMMIT")
+
+    def _read_meta(self) -> None:
+        meta = dict(self._db.execute("SELECT key, value FROM meta").fetchall())
+        self._rows, self._rewrites, self._swaps = meta["next_row"], meta["rewrites"], meta["swaps"]
+
+    def _bump(self, key: str) -> None:
+        """Count an overwrite, delete or swap, so other processes know their ANN index is stale (in a transaction)"""
+        self._db.execute("UPDATE meta SET value = value + 1 WHERE key = ?", (key,))
+        if key == "rewrites":
+            self._rewrites += 1
+        else:
+            self._swaps += 1
+
+    def _map_files(self) -> None:
+        """Map the vector and code files at their current size, unless already mapped at that size"""
+        size = os.path.getsize(self._vectors_path) if os.path.exists(self._vectors_path) else 0
+        capacity = size // (4 * self.dimension)
+        if self._matrix is not None and capacity == self._capacity:
+            return
+        if self._matrix is not None:
+            self._matrix.flush()
+        self._capacity = capacity
+        self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r+",
+                                 shape=(capacity, self.dimension)) if capacity else None
+        if self.codec is not None:
+            self._codes = self._map_codes()
+
+    def _map_codes(self) -> Optional[np.memmap]:
+        size = os.path.getsize(self._codes_path) if os.path.exists(self._codes_path) else 0
+        rows = min(size // self.codec.code_size, self._capacity)
+        if not rows:
+            return None
+        return np.memmap(self._codes_path, dtype=np.uint8, mode="r+", shape=(rows, self.codec.code_size))
+
+    def _sync(self) -> None:
+        """Catch up with the chunks other processes wrote (called with the lock held)"""
+        version = self._db.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._data_version:
+            return
+        rows, rewrites, swaps = self._rows, self._rewrites, self._swaps
+        self._read_meta()
+        if self._data_version is None or self._swaps != swaps:
+            # Re-indexed by another process (or rolled back here): the files were replaced
+            self._matrix = None
+            self._index_dirty = True
+        elif self._rewrites != rewrites:
+            # Overwritten vectors may belong to a different list/graph neighbourhood
+            self._index_dirty = True
+        self._map_files()
+        if self._index is not None and not self._index_dirty and self._rows > rows:
+            added = np.arange(rows, self._rows)
+            self._index.add(added, np.asarray(self._matrix[added]))
+        # The staging matrix of a re-index may have been replaced too; it is mapped again when used
+        self._next = None
+        self._data_version = version
+
+    def _open_codes(self) -> None:
+        """Map the quantized codes, encoding them from the float32 matrix if missing or stale"""
+        # A size mismatch means the matrix was written without them
+        if self._codes is None or len(self._codes) != self._capacity or (
+                os.path.getsize(self._codes_path) != self._capacity * self.codec.code_size):
+            self._encode_codes(self._codes_path)
+        self._codes = self._map_codes()
+
+    def _encode_codes(self, path: str) -> None:
+        """Write the codes of every row to a file (with the write lock held)"""
+        with open(path, "ab"):
+            pass
+        os.truncate(path, self._capacity * self.codec.code_size)
+        if not self._capacity:
+            return
+        codes = np.memmap(path, dtype=np.uint8, mode="r+", shape=(self._capacity, self.codec.code_size))
+        # New store with an existing matrix, quantization switched on since, or a re-indexed matrix
+        block = self._scan_block()
+        for start in range(0, self._rows, block):
+            end = min(start + block, self._rows)
+            codes[start:end] = self.codec.encode(self._matrix[start:end])
+        codes.flush()
+
+    def _ensure_capacity(self, rows: int) -> None:
+        """Grow the vector (and code) files by doubling so they can hold the given number of rows"""
+        if rows <= self._capacity:
+            return
+        capacity = max(rows, self._capacity * 2, 1024)
+        if self._matrix is not None:
+            self._matrix.flush()
+        # Under the write lock the files are at the mapped capacity, so growing never truncates rows
+        with open(self._vectors_path, "ab"):
+            pass
+        os.truncate(self._vectors_path, capacity * self.dimension * 4)
+        if self.codec is not None:
+            if self._codes is not None:
+                self._codes.flush()
+            with open(self._codes_path, "ab"):
+                pass
+            os.truncate(self._codes_path, capacity * self.codec.code_size)
+        self._map_files()
+
+    def _next_matrix(self) -> np.memmap:
+        """Map the matrix of the version being built, grown to the capacity of the active one"""
+        if self._next is None or len(self._next) < self._capacity:
+            if self._next is not None:
+                self._next.flush()
+            with open(self._next_path, "ab"):
+                pass
+            if os.path.getsize(self._next_path) < self._capacity * self.dimension * 4:
+                os.truncate(self._next_path, self._capacity * self.dimension * 4)
+            self._next = np.memmap(self._next_path, dtype=np.float32, mode="r+", shape=(self._capacity, self.dimension))
+        return self._next
+
+    def _forget_reindexed(self, rows: List[int]) -> None:
+        """Mark rows as needing a vector of the version being built again"""
+        for start in range(0, len(rows), _QUERY_BATCH):
+            batch = rows[start:start + _QUERY_BATCH]
+            self._db.execute(f"DELETE FROM reindexed_rows WHERE row IN ({','.join('?' * len(batch))})", batch)
+
+    def _existing_rows(self, ids: List[str]) -> Dict[str, int]:
+        found = {}
+        for start in range(0, len(ids), _QUERY_BATCH):
+            batch = ids[start:start + _QUERY_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            found.update(self._db.execute(
+                f"SELECT id, row FROM chunks WHERE id IN ({placeholders})", batch
+            ).fetchall())
+        return found
+
+    def store_document_chunks(self, chunks: List[Dict[str, Any]]) -> bool:
+        """
+        Store (upsert) document chunks with embeddings
+
+        Args:
+            chunks: List of chunks with embeddings
+
+        Returns:
+            bool: Success status
+        """
+        if not chunks:
+            return True
+        try:
+            with self._lock, self._transaction():
+                self._sync()
+                existing = self._existing_rows([chunk["id"] for chunk in chunks])
+                rows = []
+                next_row = self._rows
+                for chunk in chunks:
+                    row = existing.get(chunk["id"])
+                    if row is None:
+                        row = next_row
+                        existing[chunk["id"]] = row
+                        next_row += 1
+                    rows.append(row)
+
+                vectors = normalize(np.stack([np.asarray(chunk["embedding"], dtype=np.float32) for chunk in chunks]))
+                self._ensure_capacity(next_row)
+                row_ids = np.asarray(rows, dtype=np.int64)
+                self._matrix[row_ids] = vectors
+                self._matrix.flush()
+                if self._codes is not None:
+                    self._codes[row_ids] = self.codec.encode(vectors)
+                    self._codes.flush()
+
+                self._db.executemany(
+                    "INSERT INTO chunks (row, id, document_id, content, metadata) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(id) DO UPDATE SET document_id = excluded.document_id, "
+                    "content = excluded.content, metadata = excluded.metadata",
+                    [
+                        (
+                            row,
+                            chunk["id"],
+                            chunk["metadata"].get("document_id") if isinstance(chunk["metadata"], dict) else None,
+                            chunk["text"],
+                            json.dumps(chunk["metadata"]) if isinstance(chunk["metadata"], dict) else chunk["metadata"]
+                        )
+                        for row, chunk in zip(rows, chunks)
+                    ]
+                )
+                overwritten = [row for row in rows if row < self._rows]
+                if overwritten:
+                    # Overwritten chunks need re-embedding by a re-index in progress
+                    self._forget_reindexed(overwritten)
+                    self._bump("rewrites")
+                self._db.execute("UPDATE meta SET value = ? WHERE key = 'next_row'", (next_row,))
+
+                new_rows = row_ids >= self._rows
+                self._rows = next_row
+                if self._index is not None:
+                    if new_rows.any():
+                        self._index.add(row_ids[new_rows], vectors[new_rows])
+                    if not new_rows.all():
+                        # Overwritten vectors may belong to a different list/graph neighbourhood
+                        self._index_dirty = True
+            return True
+        except Exception as e:
+            raise Exception(f"Error storing chunks locally: {str(e)}")
+
+    def delete_chunks(self, chunk_ids: List[str]) -> int:
+        """
+        Delete chunks by ID
+
+        Rows are not reused; their vectors are zeroed so they score 0 until
+        the ANN index is rebuilt without them.
+
+        Args:
+            chunk_ids: IDs of the chunks to delete
+
+        Returns:
+            int: Number of IDs submitted for deletion
+        """
+        with self._lock, self._transaction():
+            self._sync()
+            rows = list(self._existing_rows(chunk_ids).values())
+            if not rows:
+                return len(chunk_ids)
+            for start in range(0, len(rows), _QUERY_BATCH):
+                batch = rows[start:start + _QUERY_BATCH]
+                self._db.execute(f"DELETE FROM chunks WHERE row IN ({','.join('?' * len(batch))})", batch)
+            self._forget_reindexed(rows)
+            self._bump("rewrites")
+            self._matrix[np.asarray(rows, dtype=np.int64)] = 0
+            self._matrix.flush()
+            if self._next is not None:
+                self._next[np.asarray([row for row in rows if row < len(self._next)], dtype=np.int64)] = 0
+            if self._codes is not None:
+                # Deleted rows may still surface as quantized candidates; rescoring gives them 0
+                self._codes[np.asarray(rows, dtype=np.int64)] = 0
+                self._codes.flush()
+            if self._index is not None:
+                self._index_dirty = True
+        return len(chunk_ids)
+
+    def _ann_index(self):
+        """Return the ANN index, (re)building it when missing, stale or outgrown"""
+        if self._index is None or self._index_dirty or (
+                isinstance(self._index, IVFIndex) and self._rows > 2 * self._index.trained_rows):
+            if self.index_type == "hnsw":
+                index = HNSWIndex(self.dimension, ef=LOCAL_HNSW_EF)
+            else:
+                index = IVFIndex(nlist=LOCAL_IVF_NLIST, nprobe=LOCAL_IVF_NPROBE)
+            index.train(self._matrix[:self._rows])
+            self._index = index
+            self._index_dirty = False
+        return self._index
+
+    def search_rows(self, query_embedding: np.ndarray, top_k: int, exact: bool = None):
+        """
+        Rank stored rows against a query
+
+        Args:
+            query_embedding: Vector embedding of the query
+            top_k: Number of results
+            exact: Force (True) or forbid (False) the exact scan; None follows the configuration
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Row numbers and cosine similarities, best first
+        """
+        query = normalize(query_embedding)
+        with self._lock:
+            self._sync()
+            rows = self._rows
+            if rows == 0:
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+            if exact is None:
+                exact = self.index_type == "exact" or rows < LOCAL_ANN_MIN_ROWS
+            if not exact:
+                return self._ann_index().search(self._matrix, query, top_k)
+            matrix = self._matrix[:rows]
+            codes = self._codes[:rows] if self._codes is not None and len(self._codes) >= rows else None
+        if codes is None:
+            scores = matrix @ query
+            best = top_k_indices(scores, top_k)
+            return best, scores[best]
+        return self._quantized_search(matrix, codes, query, top_k)
+
+    def filtered_rows(self, filters: SearchFilters) -> np.ndarray:
+        """
+        Find the rows inside a search scope
+
+        Args:
+            filters: Validated filter
+
+        Returns:
+            np.ndarray: Sorted row numbers
+        """
+        clause, params = sqlite_filter_clause(filters)
+        with self._lock:
+            cursor = self._db.execute(f"SELECT row FROM chunks WHERE {clause}", params)
+            rows = np.fromiter((row for (row,) in cursor), dtype=np.int64)
+        rows.sort()
+        return rows
+
+    def search_scoped_rows(self, query_embedding: np.ndarray, top_k: int, scope: np.ndarray):
+        """
+        Rank a subset of rows against a query by exact scan
+
+        Args:
+            query_embedding: Vector embedding of the query
+            top_k: Number of results
+            scope: Sorted row numbers to rank
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Row numbers and cosine similarities, best first
+        """
+        query = normalize(query_embedding)
+        with self._lock:
+            self._sync()
+            rows = self._rows
+            matrix = self._matrix[:rows] if rows else None
+        if matrix is None or not len(scope):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        if len(scope) <= _GATHER_FRACTION * rows:
+            # Sorted rows read the memory-mapped matrix sequentially
+            scores = matrix[scope] @ query
+            best = top_k_indices(scores, top_k)
+            return scope[best], scores[best]
+        scores = np.full(rows, -np.inf, dtype=np.float32)
+        scores[scope] = (matrix @ query)[scope]
+        best = top_k_indices(scores, min(top_k, len(scope)))
+        return best, scores[best]
+
+    def _scan_block(self) -> int:
+        return max(1, _SCAN_BLOCK_BYTES // (4 * self.dimension))
+
+    def _quantized_search(self, matrix: np.ndarray, codes: np.ndarray, query: np.ndarray, top_k: int):
+        """Score the codes block by block, then rescore the best candidates against the float32 rows"""
+        scores = np.empty(len(codes), dtype=np.float32)
+        block = self._scan_block()
+        for start in range(0, len(codes), block):
+            scores[start:start + block] = self.codec.scores(codes[start:start + block], query)
+        if not self.rescore_factor:
+            best = top_k_indices(scores, top_k)
+            return best, scores[best]
+        # Sorted row order reads the memory-mapped matrix sequentially
+        rows = np.sort(top_k_indices(scores, top_k * self.rescore_factor))
+        scores = matrix[rows] @ query
+        best = top_k_indices(scores, top_k)
+        return rows[best], scores[best]
+
+    def _fetch_rows(self, rows: List[int]) -> Dict[int, Dict[str, Any]]:
+        found = {}
+        with self._lock:
+            for start in range(0, len(rows), _QUERY_BATCH):
+                batch = rows[start:start + _QUERY_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                for row, chunk_id, content, metadata in self._db.execute(
+                        f"SELECT row, id, content, metadata FROM chunks WHERE row IN ({placeholders})", batch):
+                    found[row] = {"id": chunk_id, "content": content, "metadata": json.loads(metadata or "{}")}
+        return found
+
+    def similarity_search(self, query_embedding: np.ndarray, top_k: int = 5,
+                          filters: Optional[SearchFilters] = None) -> List[Dict[str, Any]]:
+        """
+        Perform similarity search using vector embedding
+
+        Args:
+            query_embedding: Vector embedding of the query
+            top_k: Number of top results to return
+            filters: Scope of the search, applied before ranking
+
+        Returns:
+            List[Dict]: Similar document chunks
+        """
+        filters = validate_filters(filters)
+        try:
+            if filters:
+                rows, scores = self.search_scoped_rows(query_embedding, top_k, self.filtered_rows(filters))
+            else:
+                rows, scores = self.search_rows(query_embedding, top_k)
+            keep = scores > MATCH_THRESHOLD
+            rows, scores = rows[keep].tolist(), scores[keep].tolist()
+            records = self._fetch_rows(rows)
+            results = []
+            for row, score in zip(rows, scores):
+                if row in records:
+                    results.append({**records[row], "similarity": score})
+            return results
+        except Exception as e:
+            logger.error("Error in local similarity search: %s", e)
+            return []
+
+    def get_embeddings(self, chunk_ids: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Look up the stored embeddings of chunks
+
+        Args:
+            chunk_ids: Chunk IDs
+
+        Returns:
+            Dict[str, np.ndarray]: Unit-length embedding by chunk ID
+        """
+        with self._lock:
+            self._sync()
+            rows = self._existing_rows(list(chunk_ids))
+            return {chunk_id: np.array(self._matrix[row]) for chunk_id, row in rows.items()}
+
+    def get_document_by_id(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Retrieve a document by ID
+
+        Args:
+            doc_id: Document ID
+
+        Returns:
+            Dict: Document data
+        """
+        with self._lock:
+            self._sync()
+            row = self._db.execute(
+                "SELECT row, id, document_id, content, metadata FROM chunks WHERE id = ?", (doc_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            embedding = np.array(self._matrix[row[0]])
+        return {
+            "id": row[1],
+            "document_id": row[2],
+            "content": row[3],
+            "metadata": json.loads(row[4] or "{}"),
+            "embedding": embedding
+        }
+
+    def get_document_status(self, document_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT document_id, filename, chunk_count, status, updated_at FROM documents WHERE document_id = ?",
+                (document_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("document_id", "filename", "chunk_count", "status", "updated_at"), row))
+
+    def mark_document_pending(self, document_id: str, filename: str, chunk_count: int) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO documents (document_id, filename, chunk_count, status, updated_at) "
+                "VALUES (?, ?, ?, 'pending', ?) ON CONFLICT(document_id) DO UPDATE SET "
+                "filename = excluded.filename, chunk_count = excluded.chunk_count, "
+                "status = 'pending', updated_at = excluded.updated_at",
+                (document_id, filename, chunk_count, datetime.now(timezone.utc).isoformat())
+            )
+            self._db.commit()
+
+    def mark_document_committed(self, document_id: str, chunk_count: int = None) -> None:
+        now = datetime.now(timezone.utc).isoformat()
+        with self._lock:
+            self._db.execute(
+                "UPDATE documents SET status = 'committed', updated_at = ?, "
+                "chunk_count = COALESCE(?, chunk_count) WHERE document_id = ?",
+                (now, chunk_count, document_id)
+            )
+            self._db.execute("INSERT INTO document_changes (document_id, changed_at) VALUES (?, ?)", (document_id, now))
+            self._db.commit()
+
+    def get_stored_chunk_ids(self, document_id: str) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._db.execute(
+                "SELECT id FROM chunks WHERE document_id = ?", (document_id,)
+            )]
+
+    def list_incomplete_documents(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT document_id, filename, chunk_count, status, updated_at FROM documents WHERE status = 'pending'"
+            ).fetchall()
+        return [dict(zip(("document_id", "filename", "chunk_count", "status", "updated_at"), row)) for row in rows]
+
+    def list_documents(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT document_id, filename, chunk_count, status, updated_at FROM documents ORDER BY document_id"
+            ).fetchall()
+        return [dict(zip(("document_id", "filename", "chunk_count", "status", "updated_at"), row)) for row in rows]
+
+    def delete_document(self, document_id: str) -> int:
+        with self._lock:
+            self._db.execute("UPDATE documents SET status = 'deleting', updated_at = ? WHERE document_id = ?",
+                             (datetime.now(timezone.utc).isoformat(), document_id))
+            self._db.commit()
+        deleted = 0
+        while True:
+            # The lock is released between batches so searches are not held up by a large document
+            with self._lock:
+                chunk_ids = [row[0] for row in self._db.execute(
+                    "SELECT id FROM chunks WHERE document_id = ? LIMIT ?", (document_id, DELETE_BATCH_SIZE)
+                )]
+            if not chunk_ids:
+                break
+            deleted += self.delete_chunks(chunk_ids)
+        with self._lock:
+            self._db.execute("DELETE FROM documents WHERE document_id = ?", (document_id,))
+            self._db.execute("INSERT INTO document_changes (document_id, changed_at) VALUES (?, ?)",
+                             (document_id, datetime.now(timezone.utc).isoformat()))
+            self._db.commit()
+        return deleted
+
+    def get_document_changes(self, after: Optional[int]) -> Tuple[int, List[str]]:
+        with self._lock:
+            if after is None:
+                return self._db.execute("SELECT COALESCE(MAX(seq), 0) FROM document_changes").fetchone()[0], []
+            rows = self._db.execute("SELECT seq, document_id FROM document_changes WHERE seq > ? ORDER BY seq",
+                                    (after,)).fetchall()
+        return (rows[-1][0] if rows else after), sorted({document_id for _, document_id in rows})
+
+    def _version_rows(self, where: str, params=()) -> List[Dict[str, Any]]:
+        columns = ("version", "model", "dimensions", "status", "created_at", "activated_at")
+        with self._lock:
+            rows = self._db.execute(f"SELECT {', '.join(columns)} FROM embedding_versions WHERE {where}",
+                                    params).fetchall()
+        return [dict(zip(columns, row)) for row in rows]
+
+    def get_embedding_versions(self) -> Dict[str, Optional[Dict[str, Any]]]:
+        versions = {"active": None, "building": None}
+        for row in self._version_rows("status IN ('active', 'building')"):
+            versions[row["status"]] = row
+        return versions
+
+    def register_embedding_version(self, model: str, dimensions: int) -> Optional[Dict[str, Any]]:
+        now = datetime.now(timezone.utc).isoformat()
+        with self._lock:
+            if not self._version_rows("status = 'active'"):
+                self._db.execute(
+                    "INSERT INTO embedding_versions (model, dimensions, status, created_at, activated_at) "
+                    "VALUES (?, ?, 'active', ?, ?)", (model, dimensions, now, now)
+                )
+                self._db.commit()
+        return self.get_embedding_versions()["active"]
+
+    def begin_embedding_version(self, model: str, dimensions: int) -> int:
+        with self._lock, self._transaction():
+            building = self._version_rows("status = 'building'")
+            if building and (building[0]["model"], building[0]["dimensions"]) == (model, dimensions):
+                return building[0]["version"]
+            # A build for another model is abandoned, with the vectors it wrote
+            self._db.execute("UPDATE embedding_versions SET status = 'abandoned' WHERE status = 'building'")
+            self._db.execute("DELETE FROM reindexed_rows")
+            version = self._db.execute(
+                "INSERT INTO embedding_versions (model, dimensions, status, created_at) VALUES (?, ?, 'building', ?)",
+                (model, dimensions, datetime.now(timezone.utc).isoformat())
+            ).lastrowid
+            self._next = None
+            if os.path.exists(self._next_path):
+                os.remove(self._next_path)
+            return version
+
+    def get_reindex_batch(self, after: Optional[str], limit: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT chunks.id, chunks.content FROM chunks LEFT JOIN reindexed_rows USING (row) "
+                "WHERE reindexed_rows.row IS NULL AND chunks.id > ? ORDER BY chunks.id LIMIT ?",
+                (after or "", limit)
+            ).fetchall()
+        return [{"id": chunk_id, "content": content} for chunk_id, content in rows]
+
+    def store_next_embeddings(self, embeddings: Dict[str, np.ndarray]) -> None:
+        with self._lock, self._transaction():
+            self._sync()
+            rows = self._existing_rows(list(embeddings))
+            if not rows:
+                return
+            matrix = self._next_matrix()
+            row_ids = np.asarray(list(rows.values()), dtype=np.int64)
+            matrix[row_ids] = normalize(np.stack([np.asarray(embeddings[chunk_id], dtype=np.float32)
+                                                  for chunk_id in rows]))
+            matrix.flush()
+            self._db.executemany("INSERT OR IGNORE INTO reindexed_rows (row) VALUES (?)",
+                                 [(row,) for row in rows.values()])
+
+    def activate_embedding_version(self, version: int) -> bool:
+        with self._lock, self._transaction():
+            self._sync()
+            if not self._version_rows("version = ? AND status = 'building'", (version,)):
+                raise ValueError(f"Embedding version {version} is not being built")
+            pending = self._db.execute(
+                "SELECT COUNT(*) FROM chunks LEFT JOIN reindexed_rows USING (row) WHERE reindexed_rows.row IS NULL"
+            ).fetchone()[0]
+            if pending:
+                return False
+            if self._capacity:
+                matrix = self._next_matrix()
+                # Rows deleted by a process without the staging matrix mapped still hold new vectors
+                live = np.zeros(self._rows, dtype=bool)
+                live[np.fromiter((row for (row,) in self._db.execute("SELECT row FROM chunks")), dtype=np.int64)] = True
+                matrix[np.flatnonzero(~live)] = 0
+                matrix.flush()
+                self._next = None
+                self._matrix.flush()
+                # Searches holding the old map keep reading the old file until they finish
+                os.replace(self._next_path, self._vectors_path)
+                self._matrix = None
+                self._map_files()
+                if self.codec is not None:
+                    # Other processes map the codes file whole, so it is replaced rather than rewritten
+                    self._encode_codes(self._codes_path + ".next")
+                    os.replace(self._codes_path + ".next", self._codes_path)
+                    self._codes = self._map_codes()
+                self._index_dirty = True
+            now = datetime.now(timezone.utc).isoformat()
+            self._db.execute("UPDATE embedding_versions SET status = 'retired' WHERE status = 'active'")
+            self._db.execute("UPDATE embedding_versions SET status = 'active', activated_at = ? WHERE version = ?",
+                             (now, version))
+            self._db.execute("DELETE FROM reindexed_rows")
+            self._bump("swaps")
+            return True
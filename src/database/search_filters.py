@@ -0,0 +1,156 @@
+"""
+Filters that scope a search to part of the corpus.
+
+A filter is a dict with any of these keys, all of which must match:
+
+    document_ids  chunks of these documents (content hashes)
+    filenames     chunks of files with these names
+    pages         [first, last]: chunks overlapping this inclusive page range
+    metadata      {key: value}: chunks whose metadata has these scalar values,
+                  e.g. {"tenant": "acme"}
+
+Every store applies the filter before ranking, so a scoped query returns
+its top_k from inside the scope instead of whatever survives from the
+global top_k.
+"""
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+SearchFilters = Dict[str, Any]
+
+_KEYS = ("document_ids", "filenames", "pages", "metadata")
+
+
+def validate_filters(filters: Optional[SearchFilters]) -> Optional[SearchFilters]:
+    """
+    Check a filter and drop its empty parts
+
+    Args:
+        filters: Filter dict, or None
+
+    Returns:
+        Optional[SearchFilters]: The filter, or None when nothing is filtered
+    """
+    if not filters:
+        return None
+    unknown = set(filters) - set(_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown search filter(s) {', '.join(sorted(unknown))}; expected {', '.join(_KEYS)}")
+    cleaned = {key: value for key, value in filters.items() if value is not None}
+    for key in ("document_ids", "filenames"):
+        if key in cleaned:
+            if isinstance(cleaned[key], str):
+                raise ValueError(f"Search filter {key} must be a list, not a string")
+            cleaned[key] = list(cleaned[key])
+    if "pages" in cleaned:
+        first, last = cleaned["pages"]
+        cleaned["pages"] = [int(first), int(last)]
+    if "metadata" in cleaned:
+        if any(isinstance(value, (dict, list)) for value in cleaned["metadata"].values()):
+            raise ValueError("Search filter metadata values must be scalars")
+        if not cleaned["metadata"]:
+            del cleaned["metadata"]
+    return cleaned or None
+
+
+def scope_key(filters: Optional[SearchFilters]) -> str:
+    """
+    Canonical text of a filter, for keying caches by search scope
+
+    Args:
+        filters: Validated filter, or None
+
+    Returns:
+        str: "" when unfiltered
+    """
+    return json.dumps(filters, sort_keys=True, separators=(",", ":")) if filters else ""
+
+
+def matches_filters(metadata: Dict[str, Any], filters: Optional[SearchFilters]) -> bool:
+    """
+    Check one chunk's metadata against a filter in Python
+
+    Args:
+        metadata: Chunk metadata
+        filters: Validated filter, or None
+
+    Returns:
+        bool: Whether the chunk is in scope
+    """
+    if not filters:
+        return True
+    if "document_ids" in filters and metadata.get("document_id") not in filters["document_ids"]:
+        return False
+    if "filenames" in filters and metadata.get("filename") not in filters["filenames"]:
+        return False
+    if "pages" in filters:
+        first, last = filters["pages"]
+        page_start, page_end = metadata.get("page_start"), metadata.get("page_end")
+        if page_start is None or page_end is None or page_start > last or page_end < first:
+            return False
+    return all(metadata.get(key) == value for key, value in filters.get("metadata", {}).items())
+
+
+def sqlite_filter_clause(filters: Optional[SearchFilters]) -> Tuple[str, List[Any]]:
+    """
+    Express a filter as a WHERE clause over a local store's chunks table
+
+    The table needs document_id and JSON metadata columns; filename and
+    page lookups match the expression indexes the local stores create.
+
+    Args:
+        filters: Validated filter, or None
+
+    Returns:
+        Tuple[str, List]: SQL condition ("1" when unfiltered) and its parameters
+    """
+    if not filters:
+        return "1", []
+    conditions, params = [], []
+    if "document_ids" in filters:
+        conditions.append(f"document_id IN ({','.join('?' * len(filters['document_ids']))})")
+        params.extend(filters["document_ids"])
+    if "filenames" in filters:
+        conditions.append(f"json_extract(metadata, '$.filename') IN ({','.join('?' * len(filters['filenames']))})")
+        params.extend(filters["filenames"])
+    if "pages" in filters:
+        conditions.append("json_extract(metadata, '$.page_start') <= ? AND json_extract(metadata, '$.page_end') >= ?")
+        params.extend([filters["pages"][1], filters["pages"][0]])
+    for key, value in filters.get("metadata", {}).items():
+        conditions.append("json_extract(metadata, ?) = ?")
+        # json_extract returns SQLite integers for booleans
+        params.extend([f"$.{json.dumps(key)}", int(value) if isinstance(value, bool) else value])
+    if not conditions:
+        return "1", []
+    return " AND ".join(f"({condition})" for condition in conditions), params
+
+
+# SQL for the expression indexes sqlite_filter_clause relies on
+SQLITE_FILTER_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS chunks_filename ON chunks (json_extract(metadata, '$.filename'));"
+    "CREATE INDEX IF NOT EXISTS chunks_page_start ON chunks (json_extract(metadata, '$.page_start'));"
+)
+
+
+def rpc_filter_params(filters: Optional[SearchFilters]) -> Dict[str, Any]:
+    """
+    Express a filter as arguments of the match_documents and keyword_search SQL functions
+
+    Args:
+        filters: Validated filter, or None
+
+    Returns:
+        Dict: filter_* arguments; empty when unfiltered, so older function signatures keep working
+    """
+    if not filters:
+        return {}
+    params: Dict[str, Any] = {}
+    if "document_ids" in filters:
+        params["filter_document_ids"] = filters["document_ids"]
+    if "filenames" in filters:
+        params["filter_filenames"] = filters["filenames"]
+    if "pages" in filters:
+        params["filter_page_first"], params["filter_page_last"] = filters["pages"]
+    if "metadata" in filters:
+        params["filter_metadata"] = filters["metadata"]
+    return params
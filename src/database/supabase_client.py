@@ -1,9 +1,52 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import logging
+import httpx
+import numpy as np
 from supabase import create_client
-import json
-from config.settings import SUPABASE_URL, SUPABASE_KEY, VECTOR_COLLECTION_NAME
+from postgrest.exceptions import APIError
+from postgrest.types import ReturnMethod
+from postgrest.utils import SyncClient
+from config.settings import (
+    SUPABASE_URL, SUPABASE_KEY, VECTOR_COLLECTION_NAME, DOCUMENTS_TABLE_NAME, EMBEDDING_VERSIONS_TABLE_NAME,
+    DOCUMENT_CHANGES_TABLE_NAME, UPSERT_BATCH_SIZE, UPSERT_CONCURRENCY, UPSERT_MAX_RETRIES, MATCH_THRESHOLD, SEARCH_MAX_RETRIES, DELETE_BATCH_SIZE
+)
+from src.database.search_filters import SearchFilters, rpc_filter_params, validate_filters
+from src.database.vector_store import VectorStore
+from utils.http_pool import create_transport, create_async_http_client
+from utils.resilience import acall_with_retry, call_with_retry, request_timeout
+from utils.telemetry import get_telemetry
+from utils.vectors import as_vector, to_pgvector
 
-class SupabaseClient:
+logger = logging.getLogger(__name__)
+
+# SQLSTATE classes of errors that may pass on their own: connection exceptions,
+# transaction rollbacks (e.g. serialization failures), insufficient resources,
+# operator intervention (e.g. statement timeouts)
+_TRANSIENT_SQLSTATE_CLASSES = ("08", "40", "53", "57")
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """
+    Whether a Supabase request failed in a way worth retrying
+
+    Args:
+        error: Raised exception
+
+    Returns:
+        bool: True for network errors, timeouts, 429 and 5xx responses and transient SQL errors
+    """
+    if isinstance(error, httpx.TransportError):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    if isinstance(error, APIError):
+        code = str(error.code or "")
+        return (code.isdigit() and len(code) == 3 and code >= "500") or code[:2] in _TRANSIENT_SQLSTATE_CLASSES
+    return False
+
+class SupabaseClient(VectorStore):
     """
     Client for interacting with Supabase vector database
     """
@@ -11,12 +54,116 @@ class SupabaseClient:
     def __init__(self):
         """Initialize Supabase client with credentials"""
         self.client = create_client(SUPABASE_URL, SUPABASE_KEY)
+        self._use_pooled_session()
         self.table_name = VECTOR_COLLECTION_NAME
+        self.documents_table = DOCUMENTS_TABLE_NAME
+        self.versions_table = EMBEDDING_VERSIONS_TABLE_NAME
+        self.changes_table = DOCUMENT_CHANGES_TABLE_NAME
+        self.batch_size = UPSERT_BATCH_SIZE
+        self.delete_batch_size = DELETE_BATCH_SIZE
+        self.concurrency = UPSERT_CONCURRENCY
+        self.max_retries = UPSERT_MAX_RETRIES
+        self.search_retries = SEARCH_MAX_RETRIES
+        self._async_client = None
+        self.telemetry = get_telemetry()
+    
+    def _use_pooled_session(self) -> None:
+        """Swap the PostgREST session for one on the shared keep-alive transport settings"""
+        postgrest = self.client.postgrest
+        session = postgrest.session
+        postgrest.session = SyncClient(
+            base_url=session.base_url,
+            headers=session.headers,
+            timeout=session.timeout,
+            transport=create_transport()
+        )
+        session.close()
+    
+    @staticmethod
+    def _chunk_row(chunk: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Convert a processed chunk into a table row
+        
+        Metadata is sent as a JSON object (stored as JSONB, so it can be
+        filtered and indexed), and the fields searches are scoped by are
+        copied into their own indexed columns.
+        """
+        metadata = chunk["metadata"] if isinstance(chunk["metadata"], dict) else {}
+        return {
+            "id": chunk["id"],
+            "document_id": metadata.get("document_id"),
+            "filename": metadata.get("filename"),
+            "page_start": metadata.get("page_start"),
+            "page_end": metadata.get("page_end"),
+            "content": chunk["text"],
+            # pgvector text is half the size of a JSON array of the same floats
+            "embedding": to_pgvector(chunk["embedding"]),
+            "metadata": metadata
+        }
+    
+    def _execute_with_retry(self, build_request, max_retries: Optional[int] = None):
+        """
+        Execute a PostgREST request, retrying transient failures with jittered backoff
+        
+        Calls go through the Supabase circuit breaker, so they fail at once
+        while Supabase is down.
+        
+        Args:
+            build_request: Callable returning the request builder to execute
+            max_retries: Retries after the first attempt; UPSERT_MAX_RETRIES if not given
+            
+        Returns:
+            APIResponse: Response of the successful attempt
+        """
+        return call_with_retry(lambda: build_request().execute(), is_transient_error,
+                               self.max_retries if max_retries is None else max_retries, "supabase")
+    
+    def _rpc(self, function: str, params: Dict[str, Any], max_retries: Optional[int] = None) -> Any:
+        """
+        Call a PostgREST RPC function within the query deadline
+        
+        Goes through the pooled PostgREST session directly, since request
+        builders cannot set a timeout per request.
+        
+        Args:
+            function: SQL function name
+            params: Function arguments
+            max_retries: Retries after the first attempt; SEARCH_MAX_RETRIES if not given
+            
+        Returns:
+            Any: Decoded JSON response
+        """
+        def call():
+            response = self.client.postgrest.session.post(f"/rpc/{function}", json=params, timeout=request_timeout())
+            response.raise_for_status()
+            return response.json()
+        
+        return call_with_retry(call, is_transient_error, self.search_retries if max_retries is None else max_retries,
+                               "supabase")
+    
+    def _upsert_batch(self, rows: List[Dict[str, Any]]) -> None:
+        """
+        Upsert one batch of rows
+        
+        Upserting on the primary key makes every attempt idempotent, so a
+        retry after a lost response can't create duplicates.
+        
+        Args:
+            rows: Table rows to write
+        """
+        self._execute_with_retry(lambda: self.client.table(self.table_name).upsert(
+            rows,
+            on_conflict="id",
+            returning=ReturnMethod.minimal
+        ))
     
     def store_document_chunks(self, chunks: List[Dict[str, Any]]) -> bool:
         """
         Store document chunks with embeddings in Supabase
         
+        Chunks are written as bulk upserts of batch_size rows, with up to
+        concurrency batches in flight.
+        
         Args:
             chunks: List of chunks with embeddings
             
@@ -24,64 +171,497 @@ class SupabaseClient:
             bool: Success status
         """
         try:
-            for chunk in chunks:
-                chunk_data = {
-                    "id": chunk["id"],
-                    "content": chunk["text"],
-                    "embedding": chunk["embedding"],
-                    "metadata": json.dumps(chunk["metadata"]) if isinstance(chunk["metadata"], dict) else chunk["metadata"]
-                }
-                
-                result = self.client.table(self.table_name).insert(chunk_data).execute()
-                
-                # Safely check the response
-                if hasattr(result, 'data') and result.data:
-                    print(f"Inserted chunk {chunk['id']} successfully.")
-                else:
-                    print(f"Failed to insert chunk {chunk['id']}: {result}")
+            rows = [self._chunk_row(chunk) for chunk in chunks]
+            batches = [rows[i:i + self.batch_size] for i in range(0, len(rows), self.batch_size)]
+            
+            if len(batches) <= 1 or self.concurrency <= 1:
+                for batch in batches:
+                    self._upsert_batch(batch)
+            else:
+                with ThreadPoolExecutor(max_workers=min(self.concurrency, len(batches))) as executor:
+                    list(executor.map(self._upsert_batch, batches))
             
             return True
         except Exception as e:
-            print(f"Error storing chunks in Supabase: {str(e)}")
+            logger.error("Error storing chunks in Supabase: %s", e)
             raise Exception(f"Error storing chunks in Supabase: {str(e)}")
-
     
-    def similarity_search(self, query_embedding: List[float], top_k: int = 5) -> List[Dict[str, Any]]:
+    def get_document_status(self, document_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the commit marker of a document
+        
+        Args:
+            document_id: Document content hash
+            
+        Returns:
+            Dict: Marker row with status "pending" or "committed", None if unknown
+        """
+        response = self._execute_with_retry(
+            lambda: self.client.table(self.documents_table).select("*").eq("document_id", document_id)
+        )
+        return response.data[0] if response.data else None
+    
+    def mark_document_pending(self, document_id: str, filename: str, chunk_count: int) -> None:
+        """
+        Record that a document is being written
+        
+        Args:
+            document_id: Document content hash
+            filename: Original file name
+            chunk_count: Number of chunks that will be written
+        """
+        marker = {
+            "document_id": document_id,
+            "filename": filename,
+            "chunk_count": chunk_count,
+            "status": "pending",
+            "updated_at": datetime.now(timezone.utc).isoformat()
+        }
+        self._execute_with_retry(lambda: self.client.table(self.documents_table).upsert(
+            marker,
+            on_conflict="document_id",
+            returning=ReturnMethod.minimal
+        ))
+    
+    def mark_document_committed(self, document_id: str, chunk_count: int = None) -> None:
+        """
+        Record that every chunk of a document has been written
+        
+        Args:
+            document_id: Document content hash
+            chunk_count: Final number of chunks, if it wasn't known when the document was marked pending
+        """
+        update = {"status": "committed", "updated_at": datetime.now(timezone.utc).isoformat()}
+        if chunk_count is not None:
+            update["chunk_count"] = chunk_count
+        self._execute_with_retry(
+            lambda: self.client.table(self.documents_table).update(update).eq("document_id", document_id)
+        )
+    
+    def get_stored_chunk_ids(self, document_id: str) -> List[str]:
+        """
+        List the IDs of chunks already stored for a document, DELETE_BATCH_SIZE IDs per request
+        
+        Pages by chunk ID, so documents larger than PostgREST's max-rows cap
+        are listed in full.
+        
+        Args:
+            document_id: Document content hash
+            
+        Returns:
+            List[str]: Stored chunk IDs
+        """
+        chunk_ids = []
+        last = None
+        while True:
+            def build(last=last):
+                request = self.client.table(self.table_name).select("id").eq("document_id", document_id).order("id")
+                if last is not None:
+                    request = request.gt("id", last)
+                return request.limit(self.delete_batch_size)
+            page = self._execute_with_retry(build).data or []
+            chunk_ids.extend(row["id"] for row in page)
+            if len(page) < self.delete_batch_size:
+                return chunk_ids
+            last = page[-1]["id"]
+    
+    def delete_chunks(self, chunk_ids: List[str]) -> int:
+        """
+        Delete chunks by ID, UPSERT_BATCH_SIZE IDs per request
+        
+        Args:
+            chunk_ids: IDs of the chunks to delete
+            
+        Returns:
+            int: Number of IDs submitted for deletion
+        """
+        for start in range(0, len(chunk_ids), self.batch_size):
+            batch = chunk_ids[start:start + self.batch_size]
+            self._execute_with_retry(lambda batch=batch: self.client.table(self.table_name).delete(
+                returning=ReturnMethod.minimal
+            ).in_("id", batch))
+        return len(chunk_ids)
+    
+    def list_incomplete_documents(self) -> List[Dict[str, Any]]:
+        """
+        Find documents whose ingestion started but never committed
+        
+        Returns:
+            List[Dict]: Marker rows with status "pending"
+        """
+        response = self.client.table(self.documents_table).select("*").eq("status", "pending").execute()
+        return response.data or []
+    
+    def list_documents(self) -> List[Dict[str, Any]]:
+        """
+        List every document with a commit marker, DELETE_BATCH_SIZE markers per request
+        
+        Pages by document ID rather than offset, so each page is an index range scan.
+        
+        Returns:
+            List[Dict]: Marker rows (document_id, filename, chunk_count, status, updated_at)
+        """
+        documents = []
+        last = None
+        while True:
+            def build(last=last):
+                request = self.client.table(self.documents_table).select("*").order("document_id")
+                if last is not None:
+                    request = request.gt("document_id", last)
+                return request.limit(self.delete_batch_size)
+            page = self._execute_with_retry(build).data or []
+            documents.extend(page)
+            if len(page) < self.delete_batch_size:
+                return documents
+            last = page[-1]["document_id"]
+    
+    def delete_document(self, document_id: str) -> int:
+        """
+        Delete a document's chunks in batches, then its commit marker
+        
+        Each round looks up DELETE_BATCH_SIZE of the document's chunk IDs and
+        deletes them UPSERT_BATCH_SIZE per request, so no single statement
+        has to delete a whole large document.
+        
+        Args:
+            document_id: Document ID
+            
+        Returns:
+            int: Number of chunks deleted
+        """
+        self._execute_with_retry(lambda: self.client.table(self.documents_table).update({
+            "status": "deleting", "updated_at": datetime.now(timezone.utc).isoformat()
+        }).eq("document_id", document_id))
+        deleted = 0
+        previous = None
+        while True:
+            response = self._execute_with_retry(
+                lambda: self.client.table(self.table_name).select("id").eq("document_id", document_id)
+                .limit(self.delete_batch_size)
+            )
+            chunk_ids = [row["id"] for row in response.data or []]
+            if not chunk_ids:
+                break
+            if chunk_ids == previous:
+                # Row-level security filters out deletes without an error
+                raise Exception(f"Chunks of {document_id} were not deleted; check the DELETE policy")
+            deleted += self.delete_chunks(chunk_ids)
+            previous = chunk_ids
+        self._execute_with_retry(lambda: self.client.table(self.documents_table).delete(
+            returning=ReturnMethod.minimal
+        ).eq("document_id", document_id))
+        return deleted
+    
+    def get_document_changes(self, after: Optional[int]) -> Tuple[int, List[str]]:
+        """
+        Read the documents committed or deleted since a position in the change log
+        
+        The log is filled by a trigger on the commit markers (see the README),
+        so every process writing to the project publishes its changes.
+        
+        Args:
+            after: Log position returned by an earlier call, or None to start from the end
+            
+        Returns:
+            Tuple: The new log position, and the IDs of documents changed after `after`
+        """
+        if after is None:
+            response = self._execute_with_retry(
+                lambda: self.client.table(self.changes_table).select("seq").order("seq", desc=True).limit(1)
+            )
+            return (response.data[0]["seq"] if response.data else 0), []
+        changed = set()
+        while True:
+            def build(after=after):
+                return self.client.table(self.changes_table).select("seq, document_id").gt("seq", after) \
+                    .order("seq").limit(self.delete_batch_size)
+            page = self._execute_with_retry(build).data or []
+            changed.update(row["document_id"] for row in page)
+            if page:
+                after = page[-1]["seq"]
+            if len(page) < self.delete_batch_size:
+                return after, sorted(changed)
+    
+    def get_embedding_versions(self) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Look up the active embedding version and the one being built, if any
+        
+        Returns:
+            Dict: "active" and "building" version rows, or None
+        """
+        response = self._execute_with_retry(
+            lambda: self.client.table(self.versions_table).select("*").in_("status", ["active", "building"])
+        )
+        versions = {"active": None, "building": None}
+        for row in response.data or []:
+            versions[row["status"]] = row
+        return versions
+    
+    def register_embedding_version(self, model: str, dimensions: int) -> Optional[Dict[str, Any]]:
+        """
+        Record the model of the stored vectors as the active version, unless one is active already
+        
+        A unique index allows one active version, so when two processes race
+        the second insert fails and the winner's row is returned.
+        
+        Args:
+            model: Embedding model
+            dimensions: Requested Matryoshka dimensions (0 for the model's full size)
+            
+        Returns:
+            Dict: The active version row
+        """
+        try:
+            self._execute_with_retry(lambda: self.client.table(self.versions_table).insert({
+                "model": model, "dimensions": dimensions, "status": "active",
+                "activated_at": datetime.now(timezone.utc).isoformat()
+            }, returning=ReturnMethod.minimal))
+        except APIError as e:
+            if str(e.code) != "23505":
+                raise
+        return self.get_embedding_versions()["active"]
+    
+    def begin_embedding_version(self, model: str, dimensions: int) -> int:
+        """
+        Start (or resume) building vectors of another model in the embedding_next column
+        
+        Args:
+            model: Embedding model
+            dimensions: Requested Matryoshka dimensions (0 for the model's full size)
+            
+        Returns:
+            int: Version being built
+        """
+        return self._rpc("begin_embedding_version", {"new_model": model, "new_dimensions": dimensions},
+                         self.max_retries)
+    
+    def get_reindex_batch(self, after: Optional[str], limit: int) -> List[Dict[str, Any]]:
+        """
+        Read chunks whose embedding_next is still empty
+        
+        Args:
+            after: Chunk ID to continue after, None to start over
+            limit: Maximum number of chunks
+            
+        Returns:
+            List[Dict]: Chunks with id and content, ordered by ID
+        """
+        return self._rpc("reindex_batch", {"after_id": after, "batch_size": limit}, self.max_retries) or []
+    
+    def store_next_embeddings(self, embeddings: Dict[str, np.ndarray]) -> None:
+        """
+        Write embedding_next in bulk updates of batch_size rows, with up to concurrency in flight
+        
+        Args:
+            embeddings: Embedding by chunk ID
+        """
+        rows = [{"id": chunk_id, "embedding": to_pgvector(embedding)} for chunk_id, embedding in embeddings.items()]
+        batches = [rows[i:i + self.batch_size] for i in range(0, len(rows), self.batch_size)]
+        
+        def update(batch):
+            self._rpc("set_next_embeddings", {"embeddings": batch}, self.max_retries)
+        
+        if len(batches) <= 1 or self.concurrency <= 1:
+            for batch in batches:
+                update(batch)
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.concurrency, len(batches))) as executor:
+                list(executor.map(update, batches))
+    
+    def activate_embedding_version(self, version: int) -> bool:
+        """
+        Swap embedding_next in as embedding, in one transaction
+        
+        Args:
+            version: Version from begin_embedding_version
+            
+        Returns:
+            bool: False, with nothing swapped, while some chunk still lacks a new vector
+        """
+        return bool(self._rpc("activate_embedding_version", {"target": version}, self.max_retries))
+    
+    def similarity_search(self, query_embedding: np.ndarray, top_k: int = 5,
+                          filters: Optional[SearchFilters] = None) -> List[Dict[str, Any]]:
         """
         Perform similarity search using vector embedding
         
         Args:
             query_embedding: Vector embedding of the query
             top_k: Number of top results to return
+            filters: Scope of the search, applied by match_documents before ranking
             
         Returns:
             List[Dict]: Similar document chunks
         """
+        filters = validate_filters(filters)
+        try:
+            logger.debug("Performing similarity search with top_k=%d", top_k)
+            
+            # No match is an empty result; hybrid retrieval's keyword leg carries such queries
+            return self._rpc("match_documents", {
+                "query_embedding": to_pgvector(query_embedding),
+                "match_count": top_k,
+                "match_threshold": MATCH_THRESHOLD,
+                **rpc_filter_params(filters)
+            }) or []
+        except Exception as e:
+            # A failed search is not an empty one: it is counted
+            logger.error("Error in similarity search: %s", e)
+            self.telemetry.inc("search_errors", store="supabase", search="vector")
+            return []
+    
+    def keyword_search(self, query: str, top_k: int = 5,
+                       filters: Optional[SearchFilters] = None) -> List[Dict[str, Any]]:
+        """
+        Full-text search over chunk content using the keyword_search SQL function
+        
+        Args:
+            query: Search text
+            top_k: Number of top results to return
+            filters: Scope of the search, applied before ranking
+            
+        Returns:
+            List[Dict]: Matching chunks ranked by keyword_rank
+        """
+        params = {"query_text": query, "match_count": top_k, **rpc_filter_params(validate_filters(filters))}
         try:
-            print(f"Performing similarity search with top_k={top_k}")
-            
-            # Try with a more lenient threshold
-            response = self.client.rpc(
-                "match_documents",
-                {
-                    "query_embedding": query_embedding,
-                    "match_count": top_k,
-                    "match_threshold": 0.1  # Lower threshold to get more results
+            return self._rpc("keyword_search", params) or []
+        except Exception as e:
+            logger.error("Error in keyword search: %s", e)
+            self.telemetry.inc("search_errors", store="supabase", search="keyword")
+            return []
+    
+    @property
+    def async_client(self):
+        """Async HTTP client for PostgREST, created on first use inside the event loop"""
+        if self._async_client is None:
+            self._async_client = create_async_http_client(
+                base_url=f"{SUPABASE_URL}/rest/v1",
+                headers={
+                    "apikey": SUPABASE_KEY,
+                    "Authorization": f"Bearer {SUPABASE_KEY}",
+                    "Content-Type": "application/json",
+                    "Accept": "application/json"
                 }
-            ).execute()
-            
-            if not response.data:
-                print("No results from similarity search, trying direct table query")
-                # Fallback: If no results, try to get the most recent documents
-                fallback = self.client.table(self.table_name).select("*").limit(top_k).execute()
-                return fallback.data
-                
-            return response.data
+            )
+        return self._async_client
+    
+    async def _arpc(self, function: str, params: Dict[str, Any]) -> Any:
+        """
+        Call a PostgREST RPC function without blocking the event loop
+        
+        Bounded by the query deadline, retried and circuit-broken like _rpc.
+        
+        Args:
+            function: SQL function name
+            params: Function arguments
+            
+        Returns:
+            Any: Decoded JSON response
+        """
+        async def call():
+            response = await self.async_client.post(f"/rpc/{function}", json=params, timeout=request_timeout())
+            response.raise_for_status()
+            return response.json()
+        
+        return await acall_with_retry(call, is_transient_error, self.search_retries, "supabase")
+    
+    async def asimilarity_search(self, query_embedding: np.ndarray, top_k: int = 5,
+                                 filters: Optional[SearchFilters] = None) -> List[Dict[str, Any]]:
+        """
+        Async similarity search over native async HTTP
+        
+        Args:
+            query_embedding: Vector embedding of the query
+            top_k: Number of top results to return
+            filters: Scope of the search, applied by match_documents before ranking
+            
+        Returns:
+            List[Dict]: Similar document chunks
+        """
+        params = {
+            "query_embedding": to_pgvector(query_embedding),
+            "match_count": top_k,
+            "match_threshold": MATCH_THRESHOLD,
+            **rpc_filter_params(validate_filters(filters))
+        }
+        try:
+            return await self._arpc("match_documents", params) or []
         except Exception as e:
-            print(f"Error in similarity search: {str(e)}")
-            # Fallback: return an empty list instead of raising an exception
+            logger.error("Error in async similarity search: %s", e)
+            self.telemetry.inc("search_errors", store="supabase", search="vector")
             return []
     
+    async def akeyword_search(self, query: str, top_k: int = 5,
+                              filters: Optional[SearchFilters] = None) -> List[Dict[str, Any]]:
+        """
+        Async full-text search over native async HTTP
+        
+        Args:
+            query: Search text
+            top_k: Number of top results to return
+            filters: Scope of the search, applied before ranking
+            
+        Returns:
+            List[Dict]: Matching chunks ranked by keyword_rank
+        """
+        params = {"query_text": query, "match_count": top_k, **rpc_filter_params(validate_filters(filters))}
+        try:
+            return await self._arpc("keyword_search", params) or []
+        except Exception as e:
+            logger.error("Error in async keyword search: %s", e)
+            self.telemetry.inc("search_errors", store="supabase", search="keyword")
+            return []
+    
+    def get_embeddings(self, chunk_ids: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Look up the stored embeddings of chunks in one request
+        
+        Args:
+            chunk_ids: Chunk IDs
+            
+        Returns:
+            Dict[str, np.ndarray]: Embedding by chunk ID; empty if the lookup fails
+        """
+        if not chunk_ids:
+            return {}
+        try:
+            response = self._execute_with_retry(
+                lambda: self.client.table(self.table_name).select("id, embedding").in_("id", list(chunk_ids)),
+                self.search_retries
+            )
+            return {row["id"]: as_vector(row["embedding"]) for row in response.data or [] if row.get("embedding")}
+        except Exception as e:
+            logger.error("Error fetching embeddings: %s", e)
+            return {}
+    
+    async def aget_embeddings(self, chunk_ids: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Async get_embeddings over native async HTTP
+        
+        Args:
+            chunk_ids: Chunk IDs
+            
+        Returns:
+            Dict[str, np.ndarray]: Embedding by chunk ID; empty if the lookup fails
+        """
+        if not chunk_ids:
+            return {}
+        async def call():
+            response = await self.async_client.get(f"/{self.table_name}", params={
+                "select": "id,embedding",
+                "id": f"in.({','.join(chunk_ids)})"
+            }, timeout=request_timeout())
+            response.raise_for_status()
+            return response.json()
+        
+        try:
+            rows = await acall_with_retry(call, is_transient_error, self.search_retries, "supabase")
+            return {row["id"]: as_vector(row["embedding"]) for row in rows or [] if row.get("embedding")}
+        except Exception as e:
+            logger.error("Error fetching embeddings: %s", e)
+            return {}
+    
     def get_document_by_id(self, doc_id: str) -> Dict[str, Any]:
         """
         Retrieve a document by ID
@@ -98,5 +678,5 @@ class SupabaseClient:
                 return response.data[0]
             return None
         except Exception as e:
-            print(f"Error retrieving document: {str(e)}")
+            logger.error("Error retrieving document: %s", e)
             return None
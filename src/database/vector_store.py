@@ -0,0 +1,405 @@
+from abc import ABC, abstractmethod
+import asyncio
+import threading
+from typing import Callable, List, Dict, Any, Iterable, Optional, Tuple
+import numpy as np
+from config.settings import VECTOR_STORE_BACKEND
+from src.database.search_filters import SearchFilters
+
+# Callbacks run with the IDs of documents that were ingested or deleted in this process
+_document_listeners: List[Callable[[List[str]], None]] = []
+# Callbacks run with the new active embedding version when this process switches models
+_embedding_version_listeners: List[Callable[[Dict[str, Any]], None]] = []
+_listeners_lock = threading.Lock()
+
+
+def add_document_listener(callback: Callable[[List[str]], None]) -> None:
+    """
+    Register a callback for document changes, e.g. to invalidate caches
+
+    Args:
+        callback: Called with the list of changed document IDs
+    """
+    with _listeners_lock:
+        _document_listeners.append(callback)
+
+
+def notify_documents_changed(document_ids: Iterable[str]) -> None:
+    """
+    Tell registered listeners that documents were ingested or deleted
+
+    Args:
+        document_ids: IDs of the changed documents
+    """
+    document_ids = list(document_ids)
+    with _listeners_lock:
+        listeners = list(_document_listeners)
+    for callback in listeners:
+        callback(document_ids)
+
+
+def add_embedding_version_listener(callback: Callable[[Dict[str, Any]], None]) -> None:
+    """
+    Register a callback for embedding model switches, e.g. to drop cached query embeddings
+
+    Args:
+        callback: Called with the new active embedding version (model and dimensions)
+    """
+    with _listeners_lock:
+        _embedding_version_listeners.append(callback)
+
+
+def notify_embedding_version_changed(version: Dict[str, Any]) -> None:
+    """
+    Tell registered listeners that stored vectors now come from another embedding model
+
+    Args:
+        version: The new active embedding version
+    """
+    with _listeners_lock:
+        listeners = list(_embedding_version_listeners)
+    for callback in listeners:
+        callback(version)
+
+class VectorStore(ABC):
+    """
+    Interface for storing document chunks and searching them by embedding
+    """
+
+    @abstractmethod
+    def store_document_chunks(self, chunks: List[Dict[str, Any]]) -> bool:
+        """
+        Store (upsert) document chunks with embeddings
+
+        Args:
+            chunks: List of chunks with embeddings
+
+        Returns:
+            bool: Success status
+        """
+
+    @abstractmethod
+    def delete_chunks(self, chunk_ids: List[str]) -> int:
+        """
+        Delete chunks by ID
+
+        Args:
+            chunk_ids: IDs of the chunks to delete
+
+        Returns:
+            int: Number of IDs submitted for deletion
+        """
+
+    @abstractmethod
+    def similarity_search(self, query_embedding: np.ndarray, top_k: int = 5,
+                          filters: Optional[SearchFilters] = None) -> List[Dict[str, Any]]:
+        """
+        Find the chunks most similar to a query embedding
+
+        Args:
+            query_embedding: Vector embedding of the query
+            top_k: Number of top results to return
+            filters: Scope of the search (see search_filters), applied before ranking
+
+        Returns:
+            List[Dict]: Chunks with id, content, metadata and similarity
+        """
+
+    def keyword_search(self, query: str, top_k: int = 5,
+                       filters: Optional[SearchFilters] = None) -> List[Dict[str, Any]]:
+        """
+        Find chunks by full-text match on their content
+
+        Args:
+            query: Search text
+            top_k: Number of top results to return
+            filters: Scope of the search, applied before ranking
+
+        Returns:
+            List[Dict]: Chunks with id, content, metadata and keyword_rank; empty if unsupported
+        """
+        return []
+
+    async def asimilarity_search(self, query_embedding: np.ndarray, top_k: int = 5,
+                                 filters: Optional[SearchFilters] = None) -> List[Dict[str, Any]]:
+        """
+        Async similarity_search; backends without native async I/O run it in a worker thread
+
+        Args:
+            query_embedding: Vector embedding of the query
+            top_k: Number of top results to return
+            filters: Scope of the search, applied before ranking
+
+        Returns:
+            List[Dict]: Chunks with id, content, metadata and similarity
+        """
+        return await asyncio.to_thread(self.similarity_search, query_embedding, top_k, filters)
+
+    async def akeyword_search(self, query: str, top_k: int = 5,
+                              filters: Optional[SearchFilters] = None) -> List[Dict[str, Any]]:
+        """
+        Async keyword_search; backends without native async I/O run it in a worker thread
+
+        Args:
+            query: Search text
+            top_k: Number of top results to return
+            filters: Scope of the search, applied before ranking
+
+        Returns:
+            List[Dict]: Chunks with id, content, metadata and keyword_rank
+        """
+        return await asyncio.to_thread(self.keyword_search, query, top_k, filters)
+
+    def get_embeddings(self, chunk_ids: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Look up the stored embeddings of chunks
+
+        Args:
+            chunk_ids: Chunk IDs
+
+        Returns:
+            Dict[str, np.ndarray]: Embedding by chunk ID; unknown IDs are left out, empty if unsupported
+        """
+        return {}
+
+    async def aget_embeddings(self, chunk_ids: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Async get_embeddings; backends without native async I/O run it in a worker thread
+
+        Args:
+            chunk_ids: Chunk IDs
+
+        Returns:
+            Dict[str, np.ndarray]: Embedding by chunk ID
+        """
+        return await asyncio.to_thread(self.get_embeddings, chunk_ids)
+
+    @abstractmethod
+    def get_document_by_id(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Retrieve a chunk by ID
+
+        Args:
+            doc_id: Chunk ID
+
+        Returns:
+            Dict: Chunk data, or None if not found
+        """
+
+    @abstractmethod
+    def get_document_status(self, document_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the commit marker of a document
+
+        Args:
+            document_id: Document content hash
+
+        Returns:
+            Dict: Marker row with status "pending" or "committed", None if unknown
+        """
+
+    @abstractmethod
+    def mark_document_pending(self, document_id: str, filename: str, chunk_count: int) -> None:
+        """
+        Record that a document is being written
+
+        Args:
+            document_id: Document content hash
+            filename: Original file name
+            chunk_count: Number of chunks that will be written
+        """
+
+    @abstractmethod
+    def mark_document_committed(self, document_id: str, chunk_count: int = None) -> None:
+        """
+        Record that every chunk of a document has been written
+
+        Args:
+            document_id: Document content hash
+            chunk_count: Final number of chunks, if it wasn't known when the document was marked pending
+        """
+
+    @abstractmethod
+    def get_stored_chunk_ids(self, document_id: str) -> List[str]:
+        """
+        List the IDs of chunks already stored for a document
+
+        The list must be complete, however many chunks the document has
+        (paged past any row cap of the backend): resuming a pending document
+        writes every chunk it leaves out again.
+
+        Args:
+            document_id: Document content hash
+
+        Returns:
+            List[str]: Stored chunk IDs
+        """
+
+    @abstractmethod
+    def list_incomplete_documents(self) -> List[Dict[str, Any]]:
+        """
+        Find documents whose ingestion started but never committed
+
+        Returns:
+            List[Dict]: Marker rows with status "pending"
+        """
+
+    @abstractmethod
+    def list_documents(self) -> List[Dict[str, Any]]:
+        """
+        List every document with a commit marker
+
+        Returns:
+            List[Dict]: Marker rows (document_id, filename, chunk_count, status, updated_at)
+        """
+
+    @abstractmethod
+    def delete_document(self, document_id: str) -> int:
+        """
+        Delete a document's chunks in batches, then its commit marker
+
+        The marker is set to "deleting" first, so an interrupted delete is
+        neither listed as committed nor skipped by a later upload.
+
+        Args:
+            document_id: Document ID
+
+        Returns:
+            int: Number of chunks deleted
+        """
+
+    def get_document_changes(self, after: Optional[int]) -> Tuple[int, List[str]]:
+        """
+        Read the documents committed or deleted since a position in the store's change log
+
+        Other processes writing to the same store (CLI ingestion, other app
+        instances) publish their changes here; a store without a log has none.
+
+        Args:
+            after: Log position returned by an earlier call, or None to start from the end
+
+        Returns:
+            Tuple: The new log position, and the IDs of documents changed after `after`
+        """
+        return 0, []
+
+    def get_embedding_versions(self) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Look up the embedding model of the stored vectors, and of a re-index being built
+
+        Returns:
+            Dict: "active" and "building" version rows (version, model, dimensions, status), or None
+        """
+        return {"active": None, "building": None}
+
+    def register_embedding_version(self, model: str, dimensions: int) -> Optional[Dict[str, Any]]:
+        """
+        Record the model of the stored vectors, for stores that have no active version yet
+
+        Args:
+            model: Embedding model
+            dimensions: Requested Matryoshka dimensions (0 for the model's full size)
+
+        Returns:
+            Dict: The active version row, None if versions are unsupported
+        """
+        return None
+
+    def begin_embedding_version(self, model: str, dimensions: int) -> int:
+        """
+        Start (or resume) building vectors of another model next to the active ones
+
+        Args:
+            model: Embedding model
+            dimensions: Requested Matryoshka dimensions (0 for the model's full size)
+
+        Returns:
+            int: Version being built
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support re-indexing")
+
+    def get_reindex_batch(self, after: Optional[str], limit: int) -> List[Dict[str, Any]]:
+        """
+        Read chunks that have no vector of the version being built yet
+
+        Args:
+            after: Chunk ID to continue after (keyset pagination), None to start over
+            limit: Maximum number of chunks
+
+        Returns:
+            List[Dict]: Chunks with id and content, ordered by ID
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support re-indexing")
+
+    def store_next_embeddings(self, embeddings: Dict[str, np.ndarray]) -> None:
+        """
+        Write vectors of the version being built; searches keep using the active ones
+
+        Args:
+            embeddings: Embedding by chunk ID
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support re-indexing")
+
+    def activate_embedding_version(self, version: int) -> bool:
+        """
+        Atomically swap in the vectors of the version being built
+
+        Args:
+            version: Version from begin_embedding_version
+
+        Returns:
+            bool: False, with nothing swapped, while some chunk still lacks a new vector
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support re-indexing")
+
+    def store_document(self, document_id: str, filename: str, chunks: List[Dict[str, Any]]) -> bool:
+        """
+        Store all chunks of a document behind a commit marker
+
+        Committed documents are skipped. A document left pending by an
+        earlier failure is resumed: only chunks missing from
+        get_stored_chunk_ids are written.
+
+        Args:
+            document_id: Document content hash
+            filename: Original file name
+            chunks: List of chunks with embeddings
+
+        Returns:
+            bool: Success status
+        """
+        status = self.get_document_status(document_id)
+        if status and status.get("status") == "committed":
+            return True
+
+        if status:
+            stored = set(self.get_stored_chunk_ids(document_id))
+            remaining = [chunk for chunk in chunks if chunk["id"] not in stored]
+        else:
+            remaining = chunks
+
+        self.mark_document_pending(document_id, filename, len(chunks))
+        self.store_document_chunks(remaining)
+        self.mark_document_committed(document_id)
+        notify_documents_changed([document_id])
+        return True
+
+
+def get_vector_store(backend: str = None) -> VectorStore:
+    """
+    Create the vector store selected by VECTOR_STORE_BACKEND
+
+    Args:
+        backend: "supabase" or "local", defaults to the configured backend
+
+    Returns:
+        VectorStore: Store instance
+    """
+    backend = (backend or VECTOR_STORE_BACKEND).lower()
+    if backend == "supabase":
+        from src.database.supabase_client import SupabaseClient
+        return SupabaseClient()
+    if backend == "local":
+        from src.database.local_vector_store import LocalVectorStore
+        return LocalVectorStore()
+    raise ValueError(f"Unknown vector store backend: {backend}")
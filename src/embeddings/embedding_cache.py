@@ -0,0 +1,180 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+
+_WHITESPACE = re.compile(r"\s+")
+
+# Keep IN (...) lists well under SQLite's bound variable limit
+_QUERY_BATCH = 500
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize text before hashing so trivially different copies share a key
+
+    Args:
+        text: Raw chunk or query text
+
+    Returns:
+        str: NFKC-normalized text with collapsed whitespace
+    """
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def cache_key(model: str, text: str) -> str:
+    """
+    Content address of an embedding
+
+    Args:
+        model: Embedding model name
+        text: Text that was embedded
+
+    Returns:
+        str: Hex digest of the model and normalized text
+    """
+    digest = hashlib.sha256()
+    digest.update(model.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(normalize_text(text).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Persistent, content-addressed embedding cache backed by SQLite.
+
+    Vectors are stored as packed float32 blobs. Entries are evicted in
+    least-recently-used order once the cache grows past max_entries.
+    """
+
+    def __init__(self, path: str, max_entries: int = 200000):
+        """
+        Open (or create) the cache database
+
+        Args:
+            path: SQLite file path, ":memory:" for a private in-memory cache
+            max_entries: Number of vectors kept before evicting
+        """
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY,"
+            " vector BLOB NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_lru ON embeddings (last_access)")
+        self._conn.commit()
+        self._size = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """
+        Look up cached embeddings
+
+        Args:
+            model: Embedding model name
+            texts: Texts to look up
+
+        Returns:
+            List: Cached float32 vector (read-only) for each text, or None on a miss
+        """
+        keys = [cache_key(model, text) for text in texts]
+        found: Dict[str, bytes] = {}
+        unique_keys = list(dict.fromkeys(keys))
+
+        with self._lock:
+            for start in range(0, len(unique_keys), _QUERY_BATCH):
+                batch = unique_keys[start:start + _QUERY_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                found.update(rows)
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                self._conn.commit()
+
+        results = [np.frombuffer(found[key], dtype=np.float32) if key in found else None for key in keys]
+        hits = sum(1 for vector in results if vector is not None)
+        with self._lock:
+            self.hits += hits
+            self.misses += len(results) - hits
+        return results
+
+    def put_many(self, model: str, texts: Sequence[str], vectors: Sequence[np.ndarray]) -> None:
+        """
+        Store embeddings, evicting the least recently used entries if needed
+
+        Args:
+            model: Embedding model name
+            texts: Embedded texts
+            vectors: Embedding for each text
+        """
+        if not texts:
+            return
+        now = time.time()
+        rows = [
+            (cache_key(model, text), np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for text, vector in zip(texts, vectors)
+        ]
+        with self._lock:
+            cursor = self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_access) VALUES (?, ?, ?)", rows
+            )
+            self._size += max(cursor.rowcount, 0)
+            if self._size > self.max_entries:
+                # Evict down to 90% so we don't pay for a delete on every insert
+                excess = self._size - int(self.max_entries * 0.9)
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN ("
+                    " SELECT key FROM embeddings ORDER BY last_access LIMIT ?)",
+                    (excess,)
+                )
+                self._size = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Hit/miss counters for this process
+
+        Returns:
+            Dict: hits, misses, hit_rate and number of stored entries
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": self._size,
+        }
+
+    def clear(self) -> None:
+        """Remove every cached embedding"""
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+            self._size = 0
+
+    def close(self) -> None:
+        """Close the underlying database connection"""
+        with self._lock:
+            self._conn.close()
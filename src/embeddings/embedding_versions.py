@@ -0,0 +1,83 @@
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+from config.settings import EMBEDDING_VERSION_CHECK_SECONDS
+from src.database.vector_store import VectorStore, add_embedding_version_listener, notify_embedding_version_changed
+from src.embeddings.embeddings_service import EmbeddingsService
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingVersionTracker:
+    """
+    Keeps an EmbeddingsService on the model the vector store's vectors come from.
+
+    Query and chunk vectors are only comparable within one model, so the
+    service follows the store's active embedding version rather than
+    EMBEDDING_MODEL: while a re-index to a new model is being built,
+    queries and new uploads go on using the old one. The store is checked
+    at most every EMBEDDING_VERSION_CHECK_SECONDS; a swap made in this
+    process reaches every tracker at once through the version listeners,
+    which also clear caches keyed by old query embeddings.
+
+    A store without an active version (created before versions were
+    recorded) is registered as holding vectors of the service's model.
+    """
+
+    def __init__(self, embeddings_service: EmbeddingsService, vector_store: VectorStore,
+                 check_seconds: float = EMBEDDING_VERSION_CHECK_SECONDS):
+        """
+        Initialize the tracker
+
+        Args:
+            embeddings_service: Service to keep on the active model
+            vector_store: Store whose active embedding version is followed
+            check_seconds: Minimum seconds between two reads of the store's version
+        """
+        self.embeddings_service = embeddings_service
+        self.vector_store = vector_store
+        self.check_seconds = check_seconds
+        self.active: Optional[Dict[str, Any]] = None
+        self._checked = float("-inf")
+        self._lock = threading.Lock()
+        add_embedding_version_listener(self._apply)
+
+    def _apply(self, version: Dict[str, Any]) -> bool:
+        """Switch the service to a version's model; returns whether it changed"""
+        self.active = version
+        model, dimensions = version["model"], version.get("dimensions") or 0
+        service = self.embeddings_service
+        if (service.model, service.dimensions) == (model, dimensions):
+            return False
+        logger.info("Switching embeddings from %s to %s", service.model, model)
+        service.use_model(model, dimensions)
+        return True
+
+    def sync(self, force: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Follow the store's active embedding version
+
+        Args:
+            force: Read the store even if it was read less than check_seconds ago
+
+        Returns:
+            Dict: The active version (model and dimensions), None if unknown
+        """
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._checked < self.check_seconds:
+                return self.active
+            self._checked = now
+        service = self.embeddings_service
+        try:
+            active = self.vector_store.get_embedding_versions()["active"]
+            if active is None:
+                active = self.vector_store.register_embedding_version(service.model, service.dimensions)
+        except Exception as e:
+            # Stores set up before versioning lack the table; keep the configured model
+            logger.warning("Could not read the embedding version: %s", e)
+            return self.active
+        if active is not None and self._apply(active):
+            notify_embedding_version_changed(active)
+        return active
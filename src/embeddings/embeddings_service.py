@@ -1,63 +1,430 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import time
+import numpy as np
 import openai
-from config.settings import OPENAI_API_KEY, EMBEDDING_MODEL
+from config.settings import (
+    OPENAI_API_KEY, OPENAI_BASE_URL, EMBEDDING_MODEL, EMBEDDING_DIMENSIONS,
+    EMBEDDING_BATCH_SIZE, EMBEDDING_BATCH_MAX_TOKENS, EMBEDDING_CONCURRENCY,
+    EMBEDDING_MAX_RETRIES, EMBEDDING_RPM_LIMIT, EMBEDDING_TPM_LIMIT,
+    EMBEDDING_CACHE_ENABLED, EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_ENTRIES, EMBEDDING_HEDGE_DELAY
+)
+from src.embeddings.embedding_cache import EmbeddingCache, cache_key
+from src.embeddings.rate_limiter import AdaptiveRateLimiter, parse_reset_duration
+from utils.http_pool import create_http_client, create_async_http_client
+from utils.resilience import (
+    DeadlineExceeded, ahedged, aretry_sleep, can_wait, get_circuit_breaker, hedged, request_timeout, retry_sleep
+)
+from utils.telemetry import get_telemetry
+from utils.tokenizer import get_encoding
+from utils.vectors import truncate
+
+# Errors worth retrying; anything else (bad request, auth) fails immediately
+RETRYABLE_ERRORS = (openai.APIConnectionError, openai.InternalServerError)
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Whether an OpenAI error is worth retrying
+
+    Args:
+        error: Raised exception
+
+    Returns:
+        bool: True for connection errors, timeouts, 5xx and rate limits
+    """
+    return isinstance(error, RETRYABLE_ERRORS + (openai.RateLimitError,))
+
+def create_openai_client() -> openai.OpenAI:
+    """
+    Create an OpenAI client on a pooled keep-alive HTTP connection
+
+    Returns:
+        openai.OpenAI: Client without built-in retries (callers retry themselves)
+    """
+    return openai.OpenAI(
+        api_key=OPENAI_API_KEY,
+        base_url=OPENAI_BASE_URL,
+        max_retries=0,
+        http_client=create_http_client()
+    )
 
 class EmbeddingsService:
     """
     Service for generating and managing embeddings using OpenAI
     """
-    
-    def __init__(self):
-        """Initialize the embedding service with API key"""
+
+    def __init__(self, client: Optional[openai.OpenAI] = None):
+        """
+        Initialize the embedding service with API key
+
+        Args:
+            client: Shared OpenAI client; a private one is created on first use if not given
+        """
         openai.api_key = OPENAI_API_KEY
-        self.model = EMBEDDING_MODEL
-    
-    def generate_embedding(self, text: str) -> List[float]:
+        self.use_model(EMBEDDING_MODEL, EMBEDDING_DIMENSIONS)
+        self.batch_size = EMBEDDING_BATCH_SIZE
+        self.max_batch_tokens = EMBEDDING_BATCH_MAX_TOKENS
+        self.concurrency = EMBEDDING_CONCURRENCY
+        self.max_retries = EMBEDDING_MAX_RETRIES
+        self.hedge_delay = EMBEDDING_HEDGE_DELAY
+        self.breaker = get_circuit_breaker("openai")
+        self.rate_limiter = AdaptiveRateLimiter(
+            EMBEDDING_CONCURRENCY, EMBEDDING_RPM_LIMIT, EMBEDDING_TPM_LIMIT
+        )
+        self.cache = (
+            EmbeddingCache(EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_ENTRIES)
+            if EMBEDDING_CACHE_ENABLED else None
+        )
+        self._client = client
+        self._async_client = None
+        self.telemetry = get_telemetry()
+
+    def use_model(self, model: str, dimensions: int = 0) -> None:
+        """
+        Switch the embedding model, e.g. to the one a vector store's vectors come from
+
+        Args:
+            model: Embedding model
+            dimensions: Matryoshka dimensions to request (0 for the model's full size)
+        """
+        self.model = model
+        self.dimensions = dimensions
+        # Shortened embeddings are cached apart from full-size ones
+        self.cache_model = f"{model}@{dimensions}" if dimensions else model
+
+    @property
+    def client(self) -> openai.OpenAI:
+        """OpenAI client, created on first use; retries are handled by this service"""
+        if self._client is None:
+            self._client = create_openai_client()
+        return self._client
+
+    @property
+    def async_client(self) -> openai.AsyncOpenAI:
+        """Async OpenAI client, created on first use inside the event loop"""
+        if self._async_client is None:
+            self._async_client = openai.AsyncOpenAI(
+                api_key=OPENAI_API_KEY,
+                base_url=OPENAI_BASE_URL,
+                max_retries=0,
+                http_client=create_async_http_client()
+            )
+        return self._async_client
+
+    def _request_params(self) -> Dict[str, Any]:
+        """Embedding request options: base64 float32 payloads, Matryoshka dimensions if configured"""
+        params = {"model": self.model, "encoding_format": "base64"}
+        if self.dimensions:
+            params["dimensions"] = self.dimensions
+        return params
+
+    def _decode(self, response) -> List[np.ndarray]:
+        """Embeddings of a response as float32 arrays, in input order"""
+        return [truncate(item.embedding, self.dimensions)
+                for item in sorted(response.data, key=lambda item: item.index)]
+
+    def generate_embedding(self, text: str) -> np.ndarray:
         """
         Generate embedding for a single text
-        
+
         Args:
             text: Text to embed
-            
+
         Returns:
-            List[float]: Vector embedding
+            np.ndarray: float32 embedding
         """
         try:
-            response = openai.embeddings.create(
-                model=self.model,
-                input=text
-            )
-            return response.data[0].embedding
+            return self.embed_texts([text])[0]
         except Exception as e:
             raise Exception(f"Error generating embedding: {str(e)}")
-    
+
+    def count_tokens(self, text: str) -> int:
+        """
+        Count the tokens the embedding model will see for a text
+
+        Args:
+            text: Text to measure
+
+        Returns:
+            int: Number of tokens
+        """
+        return len(get_encoding(self.model).encode_ordinary(text))
+
+    def plan_batches(self, token_counts: List[int]) -> List[List[int]]:
+        """
+        Group inputs into requests bounded by batch size and token budget
+
+        Args:
+            token_counts: Token count of each input, in order
+
+        Returns:
+            List[List[int]]: Input indices for each request, in order
+        """
+        batches = []
+        current = []
+        current_tokens = 0
+
+        for index, tokens in enumerate(token_counts):
+            if current and (len(current) >= self.batch_size
+                            or current_tokens + tokens > self.max_batch_tokens):
+                batches.append(current)
+                current = []
+                current_tokens = 0
+            current.append(index)
+            current_tokens += tokens
+
+        if current:
+            batches.append(current)
+        return batches
+
+    def _embed_with_retry(self, texts: List[str], tokens: int) -> List[np.ndarray]:
+        """
+        Embed one request worth of texts, retrying throttled and transient failures
+
+        Each request is bounded by the current query deadline, if any, and by
+        the OpenAI circuit breaker; a retry is only made if the deadline leaves
+        room for its backoff.
+
+        Args:
+            texts: Texts sent in a single API call
+            tokens: Token count of the request, used for TPM scheduling
+
+        Returns:
+            List[np.ndarray]: float32 embeddings in input order
+        """
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            self.rate_limiter.acquire(tokens)
+            start = time.perf_counter()
+            try:
+                raw = self.client.embeddings.with_raw_response.create(
+                    input=texts, timeout=request_timeout(), **self._request_params()
+                )
+                response = raw.parse()
+                self.telemetry.record_openai_call("embeddings", "ok", time.perf_counter() - start,
+                                                  response.usage.prompt_tokens if response.usage else tokens)
+                self.breaker.record_success()
+                self.rate_limiter.on_success(raw.headers)
+                return self._decode(response)
+            except openai.RateLimitError as e:
+                self.telemetry.record_openai_call("embeddings", "rate_limited", time.perf_counter() - start)
+                self.breaker.record_success()
+                headers = e.response.headers if e.response is not None else {}
+                retry_after = parse_reset_duration(headers.get("retry-after"))
+                if attempt >= self.max_retries or (retry_after and not can_wait(retry_after)):
+                    raise
+                self.rate_limiter.on_rate_limited(retry_after)
+                if not retry_after and not retry_sleep(attempt):
+                    raise
+            except RETRYABLE_ERRORS:
+                self.telemetry.record_openai_call("embeddings", "error", time.perf_counter() - start)
+                self.breaker.record_failure()
+                if attempt >= self.max_retries or not retry_sleep(attempt):
+                    raise
+            except DeadlineExceeded:
+                raise
+            except Exception:
+                self.telemetry.record_openai_call("embeddings", "error", time.perf_counter() - start)
+                self.breaker.record_success()
+                raise
+            finally:
+                self.rate_limiter.release()
+            attempt += 1
+
+    def embed_texts(self, texts: List[str], token_counts: Optional[List[int]] = None) -> List[np.ndarray]:
+        """
+        Embed many texts, serving repeats from the cache and sending only misses to the API
+
+        Args:
+            texts: Texts to embed
+            token_counts: Optional precomputed token count per text
+
+        Returns:
+            List[np.ndarray]: float32 embeddings in the same order as texts
+        """
+        if not texts:
+            return []
+        if self.cache is None:
+            return self._embed_uncached(texts, token_counts)
+
+        embeddings = self.cache.get_many(self.cache_model, texts)
+
+        # Send each distinct missing text once, even if it repeats in the input
+        missing: Dict[str, List[int]] = {}
+        for i, (text, embedding) in enumerate(zip(texts, embeddings)):
+            if embedding is None:
+                missing.setdefault(cache_key(self.cache_model, text), []).append(i)
+
+        if missing:
+            first = [indices[0] for indices in missing.values()]
+            miss_texts = [texts[i] for i in first]
+            miss_tokens = [token_counts[i] for i in first] if token_counts is not None else None
+            vectors = self._embed_uncached(miss_texts, miss_tokens)
+            self.cache.put_many(self.cache_model, miss_texts, vectors)
+            for indices, vector in zip(missing.values(), vectors):
+                for i in indices:
+                    embeddings[i] = vector
+
+        return embeddings
+
+    def cache_stats(self) -> Dict[str, float]:
+        """
+        Embedding cache counters
+
+        Returns:
+            Dict: Hit/miss statistics, empty when the cache is disabled
+        """
+        return self.cache.stats() if self.cache is not None else {}
+
+    def _embed_uncached(self, texts: List[str], token_counts: Optional[List[int]] = None) -> List[np.ndarray]:
+        """
+        Embed texts through the API with batched, concurrent requests
+
+        Args:
+            texts: Texts to embed
+            token_counts: Optional precomputed token count per text
+
+        Returns:
+            List[np.ndarray]: float32 embeddings in the same order as texts
+        """
+        if token_counts is None:
+            token_counts = [self.count_tokens(text) for text in texts]
+
+        batches = self.plan_batches(token_counts)
+        embeddings = [None] * len(texts)
+
+        def run(batch: List[int]) -> None:
+            vectors = self._embed_with_retry(
+                [texts[i] for i in batch],
+                sum(token_counts[i] for i in batch)
+            )
+            for i, vector in zip(batch, vectors):
+                embeddings[i] = vector
+
+        if len(batches) == 1 or self.concurrency <= 1:
+            for batch in batches:
+                run(batch)
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.concurrency, len(batches))) as executor:
+                # list() re-raises the first failure from any batch
+                list(executor.map(run, batches))
+
+        return embeddings
+
     def generate_batch_embeddings(self, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
         Generate embeddings for a list of text chunks
-        
+
         Args:
             chunks: List of chunk dictionaries with text
-            
+
         Returns:
             List[Dict]: Chunks with added embeddings
         """
-        result = []
-        
-        for chunk in chunks:
-            embedding = self.generate_embedding(chunk["text"])
+        # Token-chunked text already carries its count; reuse it instead of re-tokenizing
+        token_counts = [chunk.get("metadata", {}).get("token_count") for chunk in chunks]
+        if None in token_counts:
+            token_counts = None
+
+        try:
+            embeddings = self.embed_texts([chunk["text"] for chunk in chunks], token_counts)
+        except Exception as e:
+            raise Exception(f"Error generating embeddings: {str(e)}")
+
+        for chunk, embedding in zip(chunks, embeddings):
             chunk["embedding"] = embedding
-            result.append(chunk)
-            
-        return result
-    
-    def generate_query_embedding(self, query: str) -> List[float]:
+
+        return chunks
+
+    def generate_query_embedding(self, query: str) -> np.ndarray:
         """
         Generate embedding for a search query
-        
+
+        A cache miss is hedged: if the API has not answered within
+        EMBEDDING_HEDGE_DELAY, a duplicate request is sent and the first
+        answer wins, cutting the tail latency of the user's question.
+
         Args:
             query: Query text
-            
+
         Returns:
-            List[float]: Vector embedding for the query
+            np.ndarray: float32 embedding of the query
+        """
+        with self.telemetry.span("query_embed"):
+            if self.cache is not None:
+                cached = self.cache.get_many(self.cache_model, [query])[0]
+                if cached is not None:
+                    return cached
+            return hedged(lambda: self.generate_embedding(query), self.hedge_delay, "openai")
+
+    async def agenerate_query_embedding(self, query: str) -> np.ndarray:
         """
-        return self.generate_embedding(query)
+        Generate embedding for a search query without blocking the event loop
+
+        Hedged like generate_query_embedding; the slower request is cancelled.
+
+        Args:
+            query: Query text
+
+        Returns:
+            np.ndarray: float32 embedding of the query
+        """
+        with self.telemetry.span("query_embed"):
+            return await self._agenerate_query_embedding(query)
+
+    async def _agenerate_query_embedding(self, query: str) -> np.ndarray:
+        if self.cache is not None:
+            cached = self.cache.get_many(self.cache_model, [query])[0]
+            if cached is not None:
+                return cached
+
+        try:
+            embedding = await ahedged(lambda: self._aembed_query(query), self.hedge_delay, "openai")
+        except Exception as e:
+            raise Exception(f"Error generating embedding: {str(e)}")
+        if self.cache is not None:
+            self.cache.put_many(self.cache_model, [query], [embedding])
+        return embedding
+
+    async def _aembed_query(self, query: str) -> np.ndarray:
+        """One query embedding over async HTTP, with the retries, deadline and breaker of _embed_with_retry"""
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            start = time.perf_counter()
+            try:
+                response = await self.async_client.embeddings.create(
+                    input=[query], timeout=request_timeout(), **self._request_params()
+                )
+                self.telemetry.record_openai_call("embeddings", "ok", time.perf_counter() - start,
+                                                  response.usage.prompt_tokens if response.usage else 0)
+                self.breaker.record_success()
+                return self._decode(response)[0]
+            except openai.RateLimitError as e:
+                self.telemetry.record_openai_call("embeddings", "rate_limited", time.perf_counter() - start)
+                self.breaker.record_success()
+                if attempt >= self.max_retries:
+                    raise
+                headers = e.response.headers if e.response is not None else {}
+                retry_after = parse_reset_duration(headers.get("retry-after"))
+                if retry_after:
+                    if not can_wait(retry_after):
+                        raise
+                    await asyncio.sleep(retry_after)
+                elif not await aretry_sleep(attempt):
+                    raise
+            except RETRYABLE_ERRORS:
+                self.telemetry.record_openai_call("embeddings", "error", time.perf_counter() - start)
+                self.breaker.record_failure()
+                if attempt >= self.max_retries or not await aretry_sleep(attempt):
+                    raise
+            except DeadlineExceeded:
+                raise
+            except Exception:
+                self.telemetry.record_openai_call("embeddings", "error", time.perf_counter() - start)
+                self.breaker.record_success()
+                raise
+            attempt += 1
@@ -0,0 +1,163 @@
+import re
+import threading
+import time
+from collections import deque
+from typing import Mapping, Optional
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_reset_duration(value: Optional[str]) -> Optional[float]:
+    """
+    Parse OpenAI rate limit reset values such as "20ms", "1s" or "6m0s"
+
+    Args:
+        value: Header value
+
+    Returns:
+        float: Number of seconds, or None if the value can't be parsed
+    """
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+class AdaptiveRateLimiter:
+    """
+    Client side scheduler for concurrent API requests.
+
+    Combines three signals:
+    - a concurrency window that halves on every 429 and grows back by one
+      slot after a run of successful requests (AIMD)
+    - optional requests-per-minute and tokens-per-minute budgets tracked
+      over a sliding 60 second window
+    - the x-ratelimit-* and retry-after headers returned by the API, which
+      pause all workers until the server side window resets
+    """
+
+    WINDOW_SECONDS = 60.0
+
+    def __init__(self, max_concurrency: int, rpm_limit: int = 0, tpm_limit: int = 0,
+                 increase_after: int = 5):
+        """
+        Initialize the limiter
+
+        Args:
+            max_concurrency: Upper bound for requests in flight
+            rpm_limit: Requests per minute budget, 0 disables it
+            tpm_limit: Tokens per minute budget, 0 disables it
+            increase_after: Successful requests needed to widen the window by one
+        """
+        self.max_concurrency = max(1, max_concurrency)
+        self.rpm_limit = rpm_limit
+        self.tpm_limit = tpm_limit
+        self.increase_after = increase_after
+
+        self._limit = self.max_concurrency
+        self._in_flight = 0
+        self._success_streak = 0
+        self._paused_until = 0.0
+        self._requests = deque()
+        self._tokens = deque()
+        self._token_total = 0
+        self._cond = threading.Condition()
+
+    @property
+    def concurrency_limit(self) -> int:
+        """Current size of the concurrency window"""
+        return self._limit
+
+    def _prune(self, now: float) -> None:
+        cutoff = now - self.WINDOW_SECONDS
+        while self._requests and self._requests[0] <= cutoff:
+            self._requests.popleft()
+        while self._tokens and self._tokens[0][0] <= cutoff:
+            self._token_total -= self._tokens.popleft()[1]
+
+    def _wait_time(self, now: float, tokens: int) -> float:
+        """Seconds until a request of the given size may start, 0 if now"""
+        waits = [self._paused_until - now]
+        if self.rpm_limit and len(self._requests) >= self.rpm_limit:
+            waits.append(self._requests[0] + self.WINDOW_SECONDS - now)
+        if self.tpm_limit and self._tokens and self._token_total + tokens > self.tpm_limit:
+            # Wait until enough of the window has expired to fit this request
+            needed = self._token_total + tokens - self.tpm_limit
+            for timestamp, amount in self._tokens:
+                needed -= amount
+                if needed <= 0:
+                    waits.append(timestamp + self.WINDOW_SECONDS - now)
+                    break
+        return max(waits)
+
+    def acquire(self, tokens: int = 0) -> None:
+        """
+        Block until a request of the given token size may be sent
+
+        Args:
+            tokens: Estimated tokens consumed by the request
+        """
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._prune(now)
+                if self._in_flight < self._limit:
+                    wait = self._wait_time(now, tokens)
+                    if wait <= 0:
+                        break
+                    self._cond.wait(timeout=wait)
+                else:
+                    self._cond.wait()
+            self._in_flight += 1
+            self._requests.append(now)
+            if tokens:
+                self._tokens.append((now, tokens))
+                self._token_total += tokens
+
+    def release(self) -> None:
+        """Return a concurrency slot taken by acquire"""
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def on_success(self, headers: Optional[Mapping[str, str]] = None) -> None:
+        """
+        Record a successful request and apply any rate limit headers
+
+        Args:
+            headers: Response headers from the API
+        """
+        with self._cond:
+            self._success_streak += 1
+            if self._success_streak >= self.increase_after and self._limit < self.max_concurrency:
+                self._limit += 1
+                self._success_streak = 0
+
+            if headers:
+                for resource in ("requests", "tokens"):
+                    remaining = headers.get(f"x-ratelimit-remaining-{resource}")
+                    reset = parse_reset_duration(headers.get(f"x-ratelimit-reset-{resource}"))
+                    if remaining is not None and reset and remaining.strip() == "0":
+                        self._paused_until = max(self._paused_until, time.monotonic() + reset)
+            self._cond.notify_all()
+
+    def on_rate_limited(self, retry_after: Optional[float] = None) -> None:
+        """
+        Record a 429 response: shrink the window and pause if asked to
+
+        Args:
+            retry_after: Seconds the server asked us to wait
+        """
+        with self._cond:
+            self._limit = max(1, self._limit // 2)
+            self._success_streak = 0
+            if retry_after:
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            self._cond.notify_all()
@@ -0,0 +1,228 @@
+"""
+Headless batch ingestion.
+
+Queues PDFs from directories, files and glob patterns in the durable job
+queue and ingests them with the same pipeline the app uses. Interrupted
+runs resume: run the command again (with or without paths) and queued or
+abandoned jobs are picked up, with chunks already stored not embedded again.
+
+Run from the repository root:
+    python -m src.ingestion.cli run archive/ "scans/**/*.pdf" --parse-workers 8 --io-workers 4
+    python -m src.ingestion.cli enqueue archive/
+    python -m src.ingestion.cli work                # serve the queue (also used by the app)
+    python -m src.ingestion.cli status
+    python -m src.ingestion.cli documents           # stored documents with chunk counts
+    python -m src.ingestion.cli delete <document_id>
+    python -m src.ingestion.cli reindex             # re-embed stored chunks with EMBEDDING_MODEL
+"""
+from typing import Iterator, List
+import argparse
+import glob
+import os
+import signal
+import sys
+from config.settings import (
+    INGEST_BATCH_SIZE, INGEST_IO_WORKERS, INGEST_MAX_IN_FLIGHT, INGEST_PARSE_WORKERS, INGEST_QUEUE_PATH,
+    INGEST_QUEUE_SIZE
+)
+from src.database.vector_store import get_vector_store
+from src.embeddings.embeddings_service import EmbeddingsService, create_openai_client
+from src.ingestion.document_registry import DocumentRegistry
+from src.ingestion.job_queue import JobQueue
+from src.ingestion.orchestrator import IngestionOrchestrator
+from src.ingestion.reindexer import Reindexer
+from src.ingestion.worker import IngestionWorker, format_report
+from utils.telemetry import get_telemetry
+
+# Jobs queued per transaction while scanning
+_ENQUEUE_BATCH = 1000
+
+
+def find_pdfs(paths: List[str]) -> Iterator[str]:
+    """
+    Expand directories (recursively) and glob patterns into PDF files
+
+    Args:
+        paths: Files, directories or glob patterns ("**" matches nested directories)
+
+    Yields:
+        str: Path of each PDF, in sorted order per argument
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            for root, directories, files in os.walk(path):
+                directories.sort()
+                for name in sorted(files):
+                    if name.lower().endswith(".pdf"):
+                        yield os.path.join(root, name)
+        elif os.path.isfile(path):
+            yield path
+        else:
+            for match in sorted(glob.glob(path, recursive=True)):
+                if os.path.isfile(match) and match.lower().endswith(".pdf"):
+                    yield match
+
+
+def enqueue(job_queue: JobQueue, paths: List[str]) -> int:
+    """
+    Queue every PDF found under the paths
+
+    Args:
+        job_queue: Queue to add jobs to
+        paths: Files, directories or glob patterns
+
+    Returns:
+        int: Number of files found
+    """
+    found = 0
+    batch = []
+    for path in find_pdfs(paths):
+        # Documents are named by their path, which also keys revisions in the manifest
+        name = os.path.relpath(path)
+        batch.append((path, os.path.abspath(path) if name.startswith(os.pardir) else name))
+        found += 1
+        if len(batch) >= _ENQUEUE_BATCH:
+            job_queue.enqueue_many(batch)
+            batch = []
+    if batch:
+        job_queue.enqueue_many(batch)
+    return found
+
+
+def build_worker(args: argparse.Namespace, job_queue: JobQueue) -> IngestionWorker:
+    embeddings_service = EmbeddingsService(create_openai_client())
+    orchestrator = IngestionOrchestrator(
+        embeddings_service, get_vector_store(),
+        parse_workers=args.parse_workers, io_workers=args.io_workers,
+        batch_size=args.batch_size, queue_size=args.queue_size
+    )
+    return IngestionWorker(job_queue, orchestrator, max_in_flight=args.in_flight)
+
+
+def print_status(job_queue: JobQueue) -> None:
+    counts = job_queue.counts()
+    print("  ".join(f"{status}: {count}" for status, count in counts.items()))
+    for job in job_queue.errors():
+        print(f"  failed after {job['attempts']} attempt(s): {job['filename']}: {job['error']}")
+
+
+def print_stages() -> None:
+    """Print where ingestion time went, per pipeline stage"""
+    stages = [histogram for histogram in get_telemetry().snapshot()["histograms"]
+              if histogram["name"] == "stage_seconds" and histogram["count"]]
+    if stages:
+        print("stages:   " + ", ".join(f"{h['labels']['stage']} {h['sum']:.1f}s" for h in stages))
+
+
+def print_documents(registry: DocumentRegistry) -> None:
+    documents = registry.list_documents()
+    for document in documents:
+        chunks = document.get("chunk_count") or 0
+        print(f"{document['document_id']}  {document.get('status', ''):<9} {chunks:>7} chunks  "
+              f"{document.get('filename') or ''}")
+    print(f"{len(documents)} document(s), {sum(d.get('chunk_count') or 0 for d in documents)} chunks")
+
+
+def reindex() -> int:
+    """Re-embed every stored chunk with EMBEDDING_MODEL and swap the new vectors in"""
+    reindexer = Reindexer(get_vector_store(), EmbeddingsService(create_openai_client()))
+
+    def on_progress(progress):
+        print(f"\rpass {progress['passes']}: {progress['embedded']} chunks embedded", end="", flush=True)
+
+    try:
+        progress = reindexer.run(on_progress)
+    except KeyboardInterrupt:
+        reindexer.stop()
+        print("\nInterrupted; run the command again to resume", file=sys.stderr)
+        return 130
+    if progress["state"] == "current":
+        print(f"Stored vectors already come from {reindexer.model}")
+        return 0
+    print(f"\nRe-indexed {progress['embedded']} chunks to {reindexer.model} in {progress['seconds']:.1f}s "
+          f"(version {progress['version']})")
+    print_stages()
+    return 0
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queue", default=INGEST_QUEUE_PATH, help="Job queue database")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    enqueue_parser = commands.add_parser("enqueue", help="Queue PDFs without processing them")
+    enqueue_parser.add_argument("paths", nargs="+", help="Files, directories or glob patterns")
+
+    run_parser = commands.add_parser("run", help="Queue PDFs, then process the queue until it is empty")
+    run_parser.add_argument("paths", nargs="*", help="Files, directories or glob patterns (none: resume)")
+    work_parser = commands.add_parser("work", help="Process jobs as they are queued until interrupted")
+    for worker_parser in (run_parser, work_parser):
+        worker_parser.add_argument("--parse-workers", type=int, default=INGEST_PARSE_WORKERS,
+                                   help="Processes extracting and chunking PDFs")
+        worker_parser.add_argument("--io-workers", type=int, default=INGEST_IO_WORKERS,
+                                   help="Documents embedded and stored concurrently")
+        worker_parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE,
+                                   help="Chunks per embed/store batch")
+        worker_parser.add_argument("--queue-size", type=int, default=INGEST_QUEUE_SIZE,
+                                   help="Batches waiting between the embed and store stages")
+        worker_parser.add_argument("--in-flight", type=int, default=INGEST_MAX_IN_FLIGHT,
+                                   help="Files parsed or stored at once (0: twice the parse plus I/O workers)")
+        worker_parser.add_argument("--retry-failed", action="store_true", help="Queue failed jobs again first")
+
+    commands.add_parser("status", help="Show job counts and recent failures")
+    commands.add_parser("documents", help="List stored documents with their chunk counts")
+    delete_parser = commands.add_parser("delete", help="Delete documents from the vector store and indexes")
+    delete_parser.add_argument("document_ids", nargs="+", help="Document IDs, as listed by documents")
+    commands.add_parser("reindex", help="Re-embed stored chunks with EMBEDDING_MODEL, then swap them in")
+    args = parser.parse_args(argv)
+
+    if args.command == "reindex":
+        return reindex()
+    if args.command in ("documents", "delete"):
+        registry = DocumentRegistry(get_vector_store())
+        if args.command == "documents":
+            print_documents(registry)
+            return 0
+        for document_id in args.document_ids:
+            print(f"Deleted {document_id} ({registry.delete_document(document_id)} chunks)")
+        return 0
+
+    job_queue = JobQueue(args.queue)
+    if args.command == "status":
+        print_status(job_queue)
+        return 0
+
+    if getattr(args, "paths", None):
+        print(f"Queued {enqueue(job_queue, args.paths)} PDF(s)")
+    if args.command == "enqueue":
+        return 0
+
+    if args.retry_failed:
+        print(f"Re-queued {job_queue.retry_failed()} failed job(s)")
+    worker = build_worker(args, job_queue)
+
+    def on_event(job, stage, details):
+        if stage in ("done", "skipped"):
+            print(f"{stage:>8}  {job['filename']}  ({details.get('chunks', 0)} chunks)")
+            if details.get("name_taken"):
+                print(f"          another document is named {job['filename']}; both are kept")
+        elif stage in ("error", "retry"):
+            print(f"{stage:>8}  {job['filename']}  {details.get('error')}", file=sys.stderr)
+
+    # SIGTERM: stop claiming jobs, finish the ones in flight and report; Ctrl+C leaves them to resume
+    signal.signal(signal.SIGTERM, lambda *_: worker.stop(0))
+    try:
+        totals = worker.run(until_empty=args.command == "run", on_event=on_event)
+    except KeyboardInterrupt:
+        print("Interrupted; unfinished jobs stay queued and resume on the next run", file=sys.stderr)
+        return 130
+    finally:
+        worker.orchestrator.shutdown()
+    print(format_report(totals))
+    print_stages()
+    print_status(job_queue)
+    return 1 if totals["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
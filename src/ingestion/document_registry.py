@@ -0,0 +1,77 @@
+from typing import Any, Dict, List, Optional
+import logging
+from config.settings import INGEST_INCREMENTAL, LEXICAL_SEARCH_ENABLED
+from src.database.lexical_index import BM25Index, get_lexical_index
+from src.database.vector_store import VectorStore, notify_documents_changed
+from src.ingestion.manifest import DocumentManifest, get_manifest
+from utils.telemetry import get_telemetry
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentRegistry:
+    """
+    The documents stored in a vector store, and operations on whole documents.
+
+    The store's commit markers are the registry: one row per document with
+    its file name, chunk count and status, kept by the store itself, so
+    the list survives restarts and is shared by every app process and
+    worker. Deleting a document removes its chunks from the store in
+    batches, then from the lexical index and the ingestion manifest, and
+    tells the caches that cited it.
+    """
+
+    def __init__(self, vector_store: VectorStore, lexical_index: Optional[BM25Index] = None,
+                 manifest: Optional[DocumentManifest] = None):
+        """
+        Initialize the registry
+
+        Args:
+            vector_store: Store holding the documents
+            lexical_index: BM25 index to delete from, the process-wide one if not given and LEXICAL_SEARCH_ENABLED
+            manifest: Ingestion manifest to delete from, the process-wide one if not given and INGEST_INCREMENTAL
+        """
+        self.vector_store = vector_store
+        self.lexical_index = lexical_index or (get_lexical_index() if LEXICAL_SEARCH_ENABLED else None)
+        self.manifest = manifest or (get_manifest() if INGEST_INCREMENTAL else None)
+        self.telemetry = get_telemetry()
+
+    def list_documents(self, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        List the stored documents, most recently updated first
+
+        Args:
+            status: Only documents with this status ("committed", "pending" or "deleting")
+
+        Returns:
+            List[Dict]: document_id, filename, chunk_count, status and updated_at per document
+        """
+        with self.telemetry.span("list_documents"):
+            documents = self.vector_store.list_documents()
+        if status is not None:
+            documents = [document for document in documents if document.get("status") == status]
+        documents.sort(key=lambda document: str(document.get("updated_at") or ""), reverse=True)
+        return documents
+
+    def delete_document(self, document_id: str) -> int:
+        """
+        Delete a document from the vector store, the lexical index and the manifest
+
+        Args:
+            document_id: Document ID
+
+        Returns:
+            int: Number of chunks deleted from the vector store
+        """
+        with self.telemetry.span("delete_document"):
+            deleted = self.vector_store.delete_document(document_id)
+            if self.lexical_index is not None:
+                self.lexical_index.remove_document(document_id)
+            if self.manifest is not None:
+                # A later upload of the same file is ingested again instead of skipped
+                self.manifest.forget_document(document_id)
+        self.telemetry.inc("documents_deleted")
+        self.telemetry.inc("chunks_deleted", value=deleted)
+        logger.info("Deleted document %s (%d chunks)", document_id, deleted)
+        notify_documents_changed([document_id])
+        return deleted
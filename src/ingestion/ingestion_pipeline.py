@@ -0,0 +1,317 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional
+import queue
+import sys
+import threading
+import time
+from config.settings import (INGEST_BATCH_SIZE, INGEST_QUEUE_SIZE, INGEST_INCREMENTAL, LEXICAL_SEARCH_ENABLED,
+                             VECTOR_DIMENSION)
+from src.embeddings.embedding_versions import EmbeddingVersionTracker
+from src.embeddings.embeddings_service import EmbeddingsService
+from src.database.lexical_index import BM25Index, get_lexical_index
+from src.database.vector_store import VectorStore, notify_documents_changed
+from src.ingestion.manifest import DocumentManifest, DocumentRevision, get_manifest
+from src.pdf.pdf_processor import PDFProcessor
+from utils.memory import MemoryBudget, get_memory_budget
+from utils.telemetry import get_telemetry
+
+# Marks the end of a stage's input
+_DONE = object()
+
+# Estimated bytes of a chunk's dicts, metadata and embedding array header, besides its text
+_CHUNK_OVERHEAD_BYTES = 1024
+
+
+def estimate_batch_bytes(batch: List[Dict[str, Any]], dimension: int = VECTOR_DIMENSION) -> int:
+    """
+    Estimate the memory a batch of chunks takes once embedded
+
+    Args:
+        batch: Chunks
+        dimension: Embedding dimension (float32 values)
+
+    Returns:
+        int: Estimated bytes
+    """
+    return sum(sys.getsizeof(chunk["text"]) + 4 * dimension + _CHUNK_OVERHEAD_BYTES for chunk in batch)
+
+class IngestionPipeline:
+    """
+    Streaming ingestion: extract -> chunk -> embed -> store.
+
+    Chunks are produced lazily page by page on the calling thread, grouped
+    into batches and handed to an embedding thread and a storage thread
+    through bounded queues. When a downstream stage falls behind the queues
+    fill up and extraction pauses, so memory stays at roughly one page plus
+    the batches in flight regardless of document size. Batches also reserve
+    their estimated size in a memory budget shared by every pipeline of the
+    process, and give it back once stored, so concurrent documents together
+    stay under INGEST_MEMORY_LIMIT_MB. Stored batches are also added to the
+    local lexical index.
+
+    With a manifest, documents are ingested incrementally: only pages not
+    seen in the document's current revision are extracted, only chunks not
+    already stored are embedded, and chunks the new revision no longer has
+    are deleted.
+
+    Chunks are embedded with the model of the store's active embedding
+    version, checked as each document starts, so uploads during a re-index
+    match the vectors that are being searched.
+    """
+
+    def __init__(self, embeddings_service: EmbeddingsService, vector_store: VectorStore,
+                 batch_size: int = INGEST_BATCH_SIZE, queue_size: int = INGEST_QUEUE_SIZE,
+                 lexical_index: Optional[BM25Index] = None, manifest: Optional[DocumentManifest] = None,
+                 memory_budget: Optional[MemoryBudget] = None):
+        """
+        Initialize the pipeline
+
+        Args:
+            embeddings_service: Service used to embed chunk batches
+            vector_store: Store receiving the embedded chunks
+            batch_size: Chunks per embed/store batch
+            queue_size: Batches allowed to wait between two stages
+            lexical_index: BM25 index to update, the process-wide one if not given and LEXICAL_SEARCH_ENABLED
+            manifest: Ingestion manifest, the process-wide one if not given and INGEST_INCREMENTAL
+            memory_budget: Budget for the chunks in flight, the process-wide one if not given
+        """
+        self.embeddings_service = embeddings_service
+        self.vector_store = vector_store
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.lexical_index = lexical_index or (get_lexical_index() if LEXICAL_SEARCH_ENABLED else None)
+        self.manifest = manifest or (get_manifest() if INGEST_INCREMENTAL else None)
+        self.memory_budget = memory_budget or get_memory_budget()
+        self.embedding_versions = EmbeddingVersionTracker(embeddings_service, vector_store)
+
+    def run(self, chunks: Iterable[Dict[str, Any]],
+            on_progress: Optional[Callable[[Dict[str, int]], None]] = None) -> Dict[str, int]:
+        """
+        Embed and store a stream of chunks
+
+        Args:
+            chunks: Iterable of chunks, consumed lazily
+            on_progress: Called on the calling thread with the running counters
+
+        Returns:
+            Dict: Counters for chunks produced, embedded and stored
+        """
+        counters = {"chunks": 0, "embedded": 0, "stored": 0}
+        embed_queue: "queue.Queue" = queue.Queue(maxsize=self.queue_size)
+        store_queue: "queue.Queue" = queue.Queue(maxsize=self.queue_size)
+        errors: List[BaseException] = []
+        failed = threading.Event()
+        telemetry = get_telemetry()
+        # Bytes this run holds in the memory budget, given back on failure too
+        reserved = [0]
+        reserved_lock = threading.Lock()
+
+        def reserve(batch: List[Dict[str, Any]]) -> bool:
+            """Wait for room in the memory budget; gives up if another stage failed"""
+            size = estimate_batch_bytes(batch)
+            if not self.memory_budget.acquire(size, failed):
+                return False
+            with reserved_lock:
+                reserved[0] += size
+            return True
+
+        def unreserve(batch: List[Dict[str, Any]]) -> None:
+            size = estimate_batch_bytes(batch)
+            with reserved_lock:
+                reserved[0] -= size
+            self.memory_budget.release(size)
+
+        def put(target: "queue.Queue", item) -> bool:
+            """Blocking put that gives up if another stage failed"""
+            while not failed.is_set():
+                try:
+                    target.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def stage(source: "queue.Queue", work: Callable[[List[Dict[str, Any]]], None],
+                  target: Optional["queue.Queue"]) -> None:
+            try:
+                while not failed.is_set():
+                    try:
+                        batch = source.get(timeout=0.1)
+                    except queue.Empty:
+                        continue
+                    if batch is _DONE:
+                        if target is not None:
+                            put(target, _DONE)
+                        return
+                    work(batch)
+                    if target is not None:
+                        put(target, batch)
+            except BaseException as e:
+                errors.append(e)
+                failed.set()
+
+        def embed(batch: List[Dict[str, Any]]) -> None:
+            with telemetry.span("embed"):
+                self.embeddings_service.generate_batch_embeddings(batch)
+            counters["embedded"] += len(batch)
+
+        def store(batch: List[Dict[str, Any]]) -> None:
+            with telemetry.span("store"):
+                self.vector_store.store_document_chunks(batch)
+                if self.lexical_index is not None:
+                    self.lexical_index.add(batch)
+            counters["stored"] += len(batch)
+            unreserve(batch)
+            # Drop references so persisted chunks can be garbage collected
+            batch.clear()
+
+        workers = [
+            threading.Thread(target=stage, args=(embed_queue, embed, store_queue), daemon=True),
+            threading.Thread(target=stage, args=(store_queue, store, None), daemon=True),
+        ]
+        for worker in workers:
+            worker.start()
+
+        try:
+            batch = []
+            for chunk in chunks:
+                if failed.is_set():
+                    break
+                batch.append(chunk)
+                counters["chunks"] += 1
+                if len(batch) >= self.batch_size:
+                    if not reserve(batch) or not put(embed_queue, batch):
+                        break
+                    batch = []
+                    if on_progress:
+                        on_progress(dict(counters))
+            if batch and not failed.is_set() and reserve(batch):
+                put(embed_queue, batch)
+        except BaseException as e:
+            errors.append(e)
+            failed.set()
+        finally:
+            put(embed_queue, _DONE)
+            while any(worker.is_alive() for worker in workers):
+                for worker in workers:
+                    worker.join(timeout=0.2)
+                if on_progress:
+                    on_progress(dict(counters))
+            # Batches never stored (after a failure) are still reserved
+            self.memory_budget.release(reserved[0])
+
+        if errors:
+            raise errors[0]
+        return counters
+
+    def ingest_stream(self, document_id: str, filename: str, chunks: Iterable[Dict[str, Any]],
+                      on_progress: Optional[Callable[[Dict[str, int]], None]] = None,
+                      revision: Optional[DocumentRevision] = None) -> Dict[str, Any]:
+        """
+        Embed and store a document's chunks behind a commit marker
+
+        Committed documents are skipped without consuming the chunks; a
+        pending (interrupted) document only has its missing chunks embedded
+        and stored. With a revision, a committed document is updated
+        instead: chunks already stored are skipped, stored chunks the
+        revision no longer produces are deleted, and the revision is
+        recorded in the manifest.
+
+        Args:
+            document_id: Document content hash, or the revision's document ID
+            filename: Name of the PDF file
+            chunks: Iterable of the document's chunks, consumed lazily
+            on_progress: Called on the calling thread with the running counters
+            revision: Revision being ingested, from DocumentManifest.plan
+
+        Returns:
+            Dict: Counters plus document_id, skipped flag, elapsed seconds, unchanged
+                and deleted chunk counts and, with a revision, page counters
+        """
+        start = time.perf_counter()
+        self.embedding_versions.sync()
+        status = self.vector_store.get_document_status(document_id)
+        if revision is None and status and status.get("status") == "committed":
+            return {"document_id": document_id, "skipped": True, "chunks": status.get("chunk_count") or 0,
+                    "embedded": 0, "stored": 0, "unchanged": status.get("chunk_count") or 0, "deleted": 0,
+                    "seconds": time.perf_counter() - start}
+
+        stored_ids = set(self.vector_store.get_stored_chunk_ids(document_id)) if status else set()
+        seen = set()
+        total = 0
+
+        def pending_chunks():
+            nonlocal total
+            for chunk in chunks:
+                total += 1
+                seen.add(chunk["id"])
+                if chunk["id"] not in stored_ids:
+                    yield chunk
+
+        self.vector_store.mark_document_pending(document_id, filename, 0)
+        counters = self.run(pending_chunks(), on_progress)
+
+        stale = sorted(stored_ids - seen) if revision is not None else []
+        if stale:
+            self.vector_store.delete_chunks(stale)
+            if self.lexical_index is not None:
+                self.lexical_index.remove(stale)
+        self.vector_store.mark_document_committed(document_id, total)
+        if revision is not None and self.manifest is not None:
+            self.manifest.record(revision, total)
+        notify_documents_changed([document_id])
+
+        result = {**counters, "chunks": total, "document_id": document_id, "skipped": False,
+                  "unchanged": total - counters["chunks"], "deleted": len(stale),
+                  "seconds": time.perf_counter() - start}
+        if revision is not None:
+            result.update(revision.report())
+        return result
+
+    def skip_unchanged(self, revision: DocumentRevision) -> Optional[Dict[str, Any]]:
+        """
+        Report for a revision that is already fully stored, None if it needs ingesting
+
+        Args:
+            revision: Revision from DocumentManifest.plan
+
+        Returns:
+            Dict: Skip report shaped like ingest_stream's result, or None
+        """
+        if not revision.unchanged:
+            return None
+        status = self.vector_store.get_document_status(revision.document_id)
+        if not status or status.get("status") != "committed":
+            return None
+        chunks = status.get("chunk_count") or 0
+        pages = revision.current.get("page_count") or 0
+        return {"document_id": revision.document_id, "skipped": True, "chunks": chunks, "embedded": 0,
+                "stored": 0, "unchanged": chunks, "deleted": 0, "pages": pages, "pages_extracted": 0,
+                "pages_reused": pages, "seconds": 0.0}
+
+    def ingest(self, pdf_file, filename: str, document_id: str = None,
+               on_progress: Optional[Callable[[Dict[str, int]], None]] = None) -> Dict[str, Any]:
+        """
+        Stream a PDF into the vector store
+
+        Args:
+            pdf_file: File object of the uploaded PDF
+            filename: Name of the PDF file
+            document_id: Document content hash, computed from the file if not given
+                (ignored with a manifest, which assigns document IDs)
+            on_progress: Called on the calling thread with the running counters
+
+        Returns:
+            Dict: Counters plus document_id, skipped flag and elapsed seconds
+        """
+        if self.manifest is not None:
+            revision = self.manifest.plan(pdf_file, filename)
+            skipped = self.skip_unchanged(revision)
+            if skipped is not None:
+                return skipped
+            chunks = PDFProcessor.stream_revision(pdf_file, revision)
+            return self.ingest_stream(revision.document_id, filename, chunks, on_progress, revision)
+
+        if document_id is None:
+            document_id = PDFProcessor.compute_document_id(pdf_file)
+        chunks = PDFProcessor.stream_pdf(pdf_file, filename, document_id)
+        return self.ingest_stream(document_id, filename, chunks, on_progress)
@@ -0,0 +1,347 @@
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from config.settings import INGEST_QUEUE_PATH, INGEST_JOB_LEASE_SECONDS, INGEST_JOB_MAX_ATTEMPTS
+
+# Jobs that still have work to do
+ACTIVE_STATUSES = ("queued", "running")
+
+# Keep IN (...) lists well under SQLite's bound variable limit
+_QUERY_BATCH = 500
+
+_COLUMNS = ("id", "path", "filename", "status", "attempts", "worker", "progress", "result", "error",
+            "remove_after", "created_at", "started_at", "finished_at", "lease_until")
+
+
+def worker_name() -> str:
+    """
+    Identify this process as a queue worker
+
+    Returns:
+        str: "host:pid"
+    """
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobQueue:
+    """
+    Durable ingestion job queue in SQLite.
+
+    Each job is one PDF on disk. Workers (threads or processes, on the same
+    machine) claim jobs with a lease that they keep renewing; a job whose
+    lease runs out, or whose worker process has died, goes back to the
+    queue. The pipeline's commit markers make a retried job resume where it
+    stopped: chunks already stored are not embedded again. Jobs that keep
+    failing are given up after max_attempts.
+    """
+
+    def __init__(self, path: str = INGEST_QUEUE_PATH, lease_seconds: float = INGEST_JOB_LEASE_SECONDS,
+                 max_attempts: int = INGEST_JOB_MAX_ATTEMPTS):
+        """
+        Open (or create) the queue
+
+        Args:
+            path: SQLite database file
+            lease_seconds: How long a claimed job stays reserved without a renewal
+            max_attempts: Claims after which a failing job is marked as an error
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " path TEXT NOT NULL,"
+            " filename TEXT NOT NULL,"
+            " status TEXT NOT NULL DEFAULT 'queued',"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " worker TEXT,"
+            " progress TEXT,"
+            " result TEXT,"
+            " error TEXT,"
+            " remove_after INTEGER NOT NULL DEFAULT 0,"
+            " created_at REAL,"
+            " started_at REAL,"
+            " finished_at REAL,"
+            " lease_until REAL);"
+            "CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);"
+            "CREATE INDEX IF NOT EXISTS jobs_path ON jobs (path);"
+        )
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Write transaction; BEGIN IMMEDIATE takes the write lock up front, serializing claims across processes"""
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            yield self._db
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self._db.execute("COMMIT")
+
+    @staticmethod
+    def _row(row: Tuple) -> Dict[str, Any]:
+        job = dict(zip(_COLUMNS, row))
+        for key in ("progress", "result"):
+            job[key] = json.loads(job[key]) if job[key] else None
+        job["remove_after"] = bool(job["remove_after"])
+        return job
+
+    def enqueue(self, path: str, filename: Optional[str] = None, remove_after: bool = False) -> int:
+        """
+        Queue one PDF
+
+        Args:
+            path: Path of the PDF file
+            filename: Name the document is ingested under, the file's path if not given
+            remove_after: Delete the file once the job is finished (for spilled uploads)
+
+        Returns:
+            int: Job ID; the existing job if the file is already queued or running
+        """
+        return self.enqueue_many([(path, filename)], remove_after)[0]
+
+    def enqueue_many(self, files: Iterable[Tuple[str, Optional[str]]], remove_after: bool = False) -> List[int]:
+        """
+        Queue many PDFs in one transaction
+
+        Args:
+            files: (path, filename) pairs; filename defaults to the path
+            remove_after: Delete each file once its job is finished
+
+        Returns:
+            List[int]: Job ID per file, reusing active jobs for files already queued
+        """
+        job_ids = []
+        now = time.time()
+        with self._lock, self._transaction() as db:
+            for path, filename in files:
+                path = os.path.abspath(path)
+                row = db.execute(
+                    f"SELECT id FROM jobs WHERE path = ? AND status IN {ACTIVE_STATUSES} LIMIT 1", (path,)
+                ).fetchone()
+                if row:
+                    job_ids.append(row[0])
+                    continue
+                cursor = db.execute(
+                    "INSERT INTO jobs (path, filename, remove_after, created_at) VALUES (?, ?, ?, ?)",
+                    (path, filename or path, int(remove_after), now)
+                )
+                job_ids.append(cursor.lastrowid)
+        return job_ids
+
+    def claim(self, worker: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Reserve the oldest queued job (or one whose lease ran out)
+
+        Args:
+            worker: Name recorded on the job, worker_name() if not given
+
+        Returns:
+            Dict: The claimed job, or None if there is nothing to do
+        """
+        now = time.time()
+        with self._lock, self._transaction() as db:
+            # Jobs abandoned too often are given up rather than retried forever
+            db.execute(
+                "UPDATE jobs SET status = 'error', error = 'Abandoned by its worker too often', finished_at = ? "
+                "WHERE status = 'running' AND lease_until < ? AND attempts >= ?",
+                (now, now, self.max_attempts)
+            )
+            row = db.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' OR (status = 'running' AND lease_until < ?) "
+                "ORDER BY id LIMIT 1", (now,)
+            ).fetchone()
+            if row is None:
+                return None
+            db.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, worker = ?, started_at = ?, "
+                "lease_until = ?, error = NULL WHERE id = ?",
+                (worker or worker_name(), now, now + self.lease_seconds, row[0])
+            )
+            return self._row(db.execute(f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE id = ?", row).fetchone())
+
+    def renew(self, job_ids: Iterable[int], progress: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Extend the lease of running jobs, optionally saving their progress
+
+        Args:
+            job_ids: Jobs held by the caller
+            progress: Progress counters to record (for a single job)
+        """
+        job_ids = list(job_ids)
+        lease_until = time.time() + self.lease_seconds
+        with self._lock, self._transaction() as db:
+            for job_id in job_ids:
+                if progress is None:
+                    db.execute("UPDATE jobs SET lease_until = ? WHERE id = ? AND status = 'running'",
+                               (lease_until, job_id))
+                else:
+                    db.execute("UPDATE jobs SET lease_until = ?, progress = ? WHERE id = ? AND status = 'running'",
+                               (lease_until, json.dumps(progress), job_id))
+
+    def _close(self, job: Dict[str, Any]) -> None:
+        if job["remove_after"]:
+            try:
+                os.remove(job["path"])
+            except OSError:
+                pass
+
+    def complete(self, job_id: int, result: Dict[str, Any], skipped: bool = False) -> None:
+        """
+        Mark a job as finished
+
+        Args:
+            job_id: Job ID
+            result: Ingestion report of the document
+            skipped: Whether the document was already ingested
+        """
+        with self._lock, self._transaction() as db:
+            db.execute(
+                "UPDATE jobs SET status = ?, result = ?, finished_at = ?, lease_until = NULL WHERE id = ?",
+                ("skipped" if skipped else "done", json.dumps(result, default=str), time.time(), job_id)
+            )
+        job = self.get([job_id]).get(job_id)
+        if job:
+            self._close(job)
+
+    def fail(self, job_id: int, error: str, retry: bool = True) -> bool:
+        """
+        Record a failed attempt
+
+        Args:
+            job_id: Job ID
+            error: Error message
+            retry: Queue the job again if it has attempts left
+
+        Returns:
+            bool: Whether the job was queued again
+        """
+        with self._lock, self._transaction() as db:
+            attempts = db.execute("SELECT attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            requeue = retry and attempts is not None and attempts[0] < self.max_attempts
+            db.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ?, lease_until = NULL WHERE id = ?",
+                ("queued" if requeue else "error", error, None if requeue else time.time(), job_id)
+            )
+        if not requeue:
+            job = self.get([job_id]).get(job_id)
+            if job:
+                self._close(job)
+        return requeue
+
+    def release(self, job_id: int) -> None:
+        """
+        Put a claimed job back without counting the attempt
+
+        Args:
+            job_id: Job ID
+        """
+        with self._lock, self._transaction() as db:
+            db.execute(
+                "UPDATE jobs SET status = 'queued', attempts = MAX(attempts - 1, 0), lease_until = NULL "
+                "WHERE id = ? AND status = 'running'", (job_id,)
+            )
+
+    def recover(self) -> int:
+        """
+        Queue again the running jobs of dead worker processes on this host
+
+        Returns:
+            int: Number of jobs queued again
+        """
+        host = socket.gethostname()
+        with self._lock, self._transaction() as db:
+            orphans = []
+            for job_id, worker in db.execute("SELECT id, worker FROM jobs WHERE status = 'running'").fetchall():
+                worker_host, _, pid = (worker or "").rpartition(":")
+                if worker_host == host and pid.isdigit() and not _process_alive(int(pid)):
+                    orphans.append(job_id)
+            for job_id in orphans:
+                db.execute("UPDATE jobs SET status = 'queued', lease_until = NULL WHERE id = ?", (job_id,))
+        return len(orphans)
+
+    def retry_failed(self) -> int:
+        """
+        Queue every failed job again with a fresh attempt budget
+
+        Returns:
+            int: Number of jobs queued again
+        """
+        with self._lock, self._transaction() as db:
+            return db.execute(
+                "UPDATE jobs SET status = 'queued', attempts = 0, finished_at = NULL WHERE status = 'error'"
+            ).rowcount
+
+    def get(self, job_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        Look up jobs
+
+        Args:
+            job_ids: Job IDs
+
+        Returns:
+            Dict: Job by ID, for the IDs that exist
+        """
+        job_ids = list(job_ids)
+        jobs = {}
+        with self._lock:
+            for start in range(0, len(job_ids), _QUERY_BATCH):
+                batch = job_ids[start:start + _QUERY_BATCH]
+                for row in self._db.execute(
+                    f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE id IN ({','.join('?' * len(batch))})", batch
+                ).fetchall():
+                    jobs[row[0]] = self._row(row)
+        return jobs
+
+    def counts(self) -> Dict[str, int]:
+        """
+        Number of jobs per status
+
+        Returns:
+            Dict: Count by status (queued, running, done, skipped, error)
+        """
+        with self._lock:
+            counts = dict(self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return {status: counts.get(status, 0) for status in ("queued", "running", "done", "skipped", "error")}
+
+    def errors(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Most recently failed jobs
+
+        Args:
+            limit: Maximum number of jobs returned
+
+        Returns:
+            List[Dict]: Failed jobs, newest first
+        """
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE status = 'error' ORDER BY finished_at DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+        return [self._row(row) for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
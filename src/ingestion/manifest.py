@@ -0,0 +1,270 @@
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Dict, Generator, Iterable, List, Optional, Set, Tuple
+import os
+import sqlite3
+import threading
+from config.settings import INGEST_MANIFEST_PATH, INGEST_REVISION_MIN_OVERLAP
+from src.pdf.extractors import get_extractor, get_fingerprinter
+from src.pdf.pdf_processor import PDFProcessor
+
+
+class DocumentRevision:
+    """
+    One upload of a document, planned against what the manifest already holds.
+
+    Carries the text of the document's previously ingested pages by
+    fingerprint, so only new or edited pages are extracted, and records
+    every page it passes through for the manifest. Plain attributes only,
+    so it can be sent to and returned from a parsing worker process.
+    """
+
+    def __init__(self, file_hash: str, document_id: str, filename: str,
+                 known_texts: Dict[str, str], current: Optional[Dict[str, Any]],
+                 page_overlap: Optional[float] = None, name_taken: bool = False, fingerprints: str = "content"):
+        """
+        Initialize the revision
+
+        Args:
+            file_hash: SHA-256 of the uploaded file
+            document_id: Stable ID of the logical document
+            filename: Name of the uploaded file
+            known_texts: Text of the document's current pages by fingerprint
+            current: Manifest row of the document's current revision, None if it is new
+            page_overlap: Share of the current revision's pages the file contains, if matched by name
+            name_taken: Whether a document of the same name exists that this file is not a revision of
+            fingerprints: Kind of page fingerprint the extraction backend produces
+        """
+        self.file_hash = file_hash
+        self.document_id = document_id
+        self.filename = filename
+        self.known_texts = known_texts
+        self.current = current
+        self.page_overlap = page_overlap
+        self.name_taken = name_taken
+        self.fingerprints = fingerprints
+        self.pages: List[Tuple[int, str, str]] = []
+        self.pages_extracted = 0
+        self.pages_reused = 0
+
+    @property
+    def unchanged(self) -> bool:
+        """Whether this exact file is already the document's current revision"""
+        return self.current is not None and self.current["file_hash"] == self.file_hash
+
+    def track(self, pages: Iterable[Tuple[int, str, str, bool]]) -> Generator[Tuple[int, str], None, None]:
+        """
+        Record pages as they stream past
+
+        Args:
+            pages: (page number, fingerprint, text, extracted) from PDFProcessor.iter_fingerprinted_pages
+
+        Yields:
+            Tuple[int, str]: Page number and text
+        """
+        for page_number, fingerprint, text, extracted in pages:
+            self.pages.append((page_number, fingerprint, text))
+            if extracted:
+                self.pages_extracted += 1
+            else:
+                self.pages_reused += 1
+            yield page_number, text
+
+    def report(self) -> Dict[str, Any]:
+        report = {"pages": len(self.pages), "pages_extracted": self.pages_extracted,
+                  "pages_reused": self.pages_reused, "name_taken": self.name_taken}
+        if self.page_overlap is not None:
+            report["page_overlap"] = self.page_overlap
+        return report
+
+
+class DocumentManifest:
+    """
+    Persistent record of what has been ingested, in SQLite.
+
+    Maps every uploaded file's hash to its logical document, and keeps the
+    fingerprint and text of each page of a document's current revision.
+    Re-uploading the current revision (under any name) is recognised
+    without parsing; a new revision (a file under the same name sharing
+    enough pages) only has its new or edited pages extracted.
+    """
+
+    def __init__(self, path: str = INGEST_MANIFEST_PATH):
+        """
+        Open (or create) the manifest
+
+        Args:
+            path: SQLite database file
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " file_hash TEXT PRIMARY KEY,"
+            " document_id TEXT NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS documents ("
+            " document_id TEXT PRIMARY KEY,"
+            " file_hash TEXT NOT NULL,"
+            " filename TEXT,"
+            " page_count INTEGER,"
+            " chunk_count INTEGER,"
+            " updated_at TEXT,"
+            " fingerprints TEXT NOT NULL DEFAULT 'content');"
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " document_id TEXT NOT NULL,"
+            " page_number INTEGER NOT NULL,"
+            " fingerprint TEXT NOT NULL,"
+            " text TEXT,"
+            " PRIMARY KEY (document_id, page_number));"
+            "CREATE INDEX IF NOT EXISTS documents_filename ON documents (filename);"
+        )
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(documents)")}
+        if "fingerprints" not in columns:
+            # Manifests from before the extraction backends fingerprinted pages hold content fingerprints
+            self._db.execute("ALTER TABLE documents ADD COLUMN fingerprints TEXT NOT NULL DEFAULT 'content'")
+        self._db.commit()
+
+    def get_document(self, document_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the current revision of a document
+
+        Args:
+            document_id: Stable document ID
+
+        Returns:
+            Dict: document_id, file_hash, filename, page_count, chunk_count and updated_at, or None
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT document_id, file_hash, filename, page_count, chunk_count, updated_at "
+                "FROM documents WHERE document_id = ?", (document_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("document_id", "file_hash", "filename", "page_count", "chunk_count", "updated_at"), row))
+
+    def plan(self, pdf_file, filename: str, min_overlap: float = INGEST_REVISION_MIN_OVERLAP) -> DocumentRevision:
+        """
+        Work out which document an upload belongs to and what is already known about it
+
+        A file seen before belongs to the same document as before, whatever
+        its name. A new file is a revision of a document uploaded under the
+        same name only if it still contains at least min_overlap of that
+        document's pages (by fingerprint), so an unrelated file that happens
+        to share a name is stored as a separate document rather than
+        replacing the earlier one. Documents fingerprinted by another kind of
+        backend are compared with fingerprints of their kind.
+
+        Args:
+            pdf_file: File object of the uploaded PDF
+            filename: Name of the PDF file
+            min_overlap: Share of a same-name document's pages the file must contain to be its revision
+
+        Returns:
+            DocumentRevision: Plan for ingesting the upload
+        """
+        file_hash = PDFProcessor.compute_document_id(pdf_file)
+        with self._lock:
+            row = self._db.execute("SELECT document_id FROM files WHERE file_hash = ?", (file_hash,)).fetchone()
+            same_name = [document_id for document_id, in self._db.execute(
+                "SELECT document_id FROM documents WHERE filename = ?", (filename,)
+            ).fetchall()]
+        page_overlap = None
+        name_taken = False
+        if row:
+            document_id = row[0]
+        elif same_name:
+            document_id, page_overlap = self._closest_revision(pdf_file, same_name)
+            if page_overlap < min_overlap:
+                page_overlap = None
+                name_taken = True
+                # Keep the name-derived ID for the first upload of a name, so unrelated files get their hash
+                source_id = PDFProcessor.compute_source_id(filename)
+                document_id = source_id if self.get_document(source_id) is None else file_hash
+        else:
+            document_id = PDFProcessor.compute_source_id(filename)
+        current = self.get_document(document_id)
+        with self._lock:
+            known_texts = dict(self._db.execute(
+                "SELECT fingerprint, text FROM pages WHERE document_id = ?", (document_id,)
+            ).fetchall())
+        return DocumentRevision(file_hash, document_id, filename, known_texts, current, page_overlap, name_taken,
+                                get_extractor().fingerprints)
+
+    def _closest_revision(self, pdf_file, document_ids: List[str]) -> Tuple[str, float]:
+        """The document sharing the largest share of its pages with a file, and that share"""
+        fingerprints: Dict[str, Set[str]] = {}
+        best, best_overlap = document_ids[0], -1.0
+        for document_id in document_ids:
+            with self._lock:
+                kind, = self._db.execute(
+                    "SELECT fingerprints FROM documents WHERE document_id = ?", (document_id,)
+                ).fetchone()
+                # Pages that timed out have no fingerprint and match nothing
+                known = {fingerprint for fingerprint, in self._db.execute(
+                    "SELECT fingerprint FROM pages WHERE document_id = ? AND fingerprint != ''", (document_id,)
+                ).fetchall()}
+            if kind not in fingerprints:
+                # Usually the extraction backend's kind; another one only after PDF_EXTRACTOR changed
+                fingerprinter = get_fingerprinter(kind)
+                fingerprints[kind] = (set(PDFProcessor.page_fingerprints(pdf_file, fingerprinter))
+                                      if fingerprinter is not None else set())
+            overlap = len(known & fingerprints[kind]) / len(known) if known else 0.0
+            if overlap > best_overlap:
+                best, best_overlap = document_id, overlap
+        return best, best_overlap
+
+    def record(self, revision: DocumentRevision, chunk_count: int) -> None:
+        """
+        Make a fully stored revision the document's current one
+
+        Args:
+            revision: Revision whose pages have all been chunked and stored
+            chunk_count: Number of chunks of the revision
+        """
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO files (file_hash, document_id) VALUES (?, ?) "
+                "ON CONFLICT(file_hash) DO UPDATE SET document_id = excluded.document_id",
+                (revision.file_hash, revision.document_id)
+            )
+            self._db.execute(
+                "INSERT INTO documents (document_id, file_hash, filename, page_count, chunk_count, updated_at, "
+                "fingerprints) VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT(document_id) DO UPDATE SET "
+                "file_hash = excluded.file_hash, filename = excluded.filename, page_count = excluded.page_count, "
+                "chunk_count = excluded.chunk_count, updated_at = excluded.updated_at, "
+                "fingerprints = excluded.fingerprints",
+                (revision.document_id, revision.file_hash, revision.filename, len(revision.pages), chunk_count,
+                 datetime.now(timezone.utc).isoformat(), revision.fingerprints)
+            )
+            self._db.execute("DELETE FROM pages WHERE document_id = ?", (revision.document_id,))
+            self._db.executemany(
+                "INSERT INTO pages (document_id, page_number, fingerprint, text) VALUES (?, ?, ?, ?)",
+                [(revision.document_id, number, fingerprint, text) for number, fingerprint, text in revision.pages]
+            )
+
+    def forget_document(self, document_id: str) -> None:
+        """
+        Drop everything recorded about a document
+
+        Args:
+            document_id: Stable document ID
+        """
+        with self._lock, self._db:
+            for table in ("files", "documents", "pages"):
+                self._db.execute(f"DELETE FROM {table} WHERE document_id = ?", (document_id,))
+
+
+@lru_cache(maxsize=None)
+def get_manifest() -> DocumentManifest:
+    """
+    Process-wide ingestion manifest
+
+    Returns:
+        DocumentManifest: Shared manifest stored at INGEST_MANIFEST_PATH
+    """
+    return DocumentManifest()
@@ -0,0 +1,352 @@
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+import multiprocessing
+import os
+import queue
+import tempfile
+import threading
+from config.settings import (INGEST_BATCH_SIZE, INGEST_IO_WORKERS, INGEST_PARSE_WORKERS, INGEST_QUEUE_SIZE,
+                             PDF_PAGES_PER_TASK, PDF_PARALLEL_MIN_PAGES)
+from src.embeddings.embeddings_service import EmbeddingsService
+from src.database.vector_store import VectorStore
+from src.ingestion.ingestion_pipeline import IngestionPipeline
+from src.ingestion.manifest import DocumentRevision
+from src.pdf.pdf_processor import PDFProcessor
+from utils.memory import mapped_file
+from utils.telemetry import get_telemetry
+
+# Signature of progress callbacks: (filename, stage, details)
+ProgressCallback = Callable[[str, str, Dict[str, Any]], None]
+
+# A PDF to ingest: the path of a file on disk, or the file contents
+PDFInput = Union[str, bytes]
+
+
+def parse_pdf_file(path: str, filename: str, document_id: str) -> Tuple[List[Dict[str, Any]], None, List]:
+    """
+    Extract and chunk a PDF; runs inside a worker process
+
+    Args:
+        path: PDF file on disk, read through a memory map
+        filename: Name of the PDF file
+        document_id: Document content hash
+
+    Returns:
+        Tuple: Chunks with metadata, no revision, and the (stage, seconds) timings to record
+    """
+    with get_telemetry().capture() as timings, mapped_file(path) as pdf_file:
+        chunks = list(PDFProcessor.stream_pdf(pdf_file, filename, document_id))
+    return chunks, None, timings
+
+
+def parse_revision_file(path: str, revision: DocumentRevision) -> Tuple[List[Dict[str, Any]], DocumentRevision, List]:
+    """
+    Extract and chunk the new pages of a revision; runs inside a worker process
+
+    Args:
+        path: PDF file on disk, read through a memory map
+        revision: Revision planned by the manifest
+
+    Returns:
+        Tuple: Chunks with metadata, the revision with its pages recorded, and the
+            (stage, seconds) timings to record
+    """
+    with get_telemetry().capture() as timings, mapped_file(path) as pdf_file:
+        chunks = list(PDFProcessor.stream_revision(pdf_file, revision))
+    return chunks, revision, timings
+
+
+def extract_page_range(path: str, first: int, last: int,
+                       known_texts: Optional[Dict[str, str]] = None) -> Tuple[List[tuple], List]:
+    """
+    Extract a range of pages of a large PDF; runs inside a worker process
+
+    Args:
+        path: PDF file on disk, memory-mapped so workers read only the parts they need
+        first: 0-based index of the first page
+        last: Index one past the last page
+        known_texts: Text of the document's known pages by fingerprint for a revision
+            (pages come out as from iter_fingerprinted_pages), None for plain (page, text) pages
+
+    Returns:
+        Tuple: Pages in order and the (stage, seconds) timings to record
+    """
+    telemetry = get_telemetry()
+    with telemetry.capture() as timings, mapped_file(path) as pdf_file:
+        if known_texts is None:
+            pages = PDFProcessor.iter_pages(pdf_file, first, last)
+        else:
+            pages = PDFProcessor.iter_fingerprinted_pages(pdf_file, known_texts, first, last)
+        pages = list(telemetry.iterate(pages, "extract"))
+    return pages, timings
+
+
+def _drain(items: List[Any]) -> Iterator[Any]:
+    """Yield a list's items in order, removing each, so consumed items can be freed"""
+    items.reverse()
+    while items:
+        yield items.pop()
+
+
+class IngestionOrchestrator:
+    """
+    Ingests many PDFs at once.
+
+    Parsing (CPU-bound, pure Python) runs in a process pool so it scales
+    across cores; each parsed document is then embedded and stored by a
+    small thread pool (I/O-bound) while other documents are still being
+    parsed. PDFs of PDF_PARALLEL_MIN_PAGES pages or more are split into
+    page ranges extracted by several processes at once. Progress events are
+    delivered on the calling thread, so they can update Streamlit elements
+    directly.
+
+    Files are passed to the worker processes by path and read through memory
+    maps, so a PDF is never copied whole onto the heap of either process.
+    Parsed chunks are handed to the pipeline one by one and dropped from
+    the parse result as they go, so each is freed once it has been stored.
+    """
+
+    def __init__(self, embeddings_service: EmbeddingsService, vector_store: VectorStore,
+                 parse_workers: int = INGEST_PARSE_WORKERS, io_workers: int = INGEST_IO_WORKERS,
+                 batch_size: int = INGEST_BATCH_SIZE, queue_size: int = INGEST_QUEUE_SIZE,
+                 parallel_min_pages: int = PDF_PARALLEL_MIN_PAGES, pages_per_task: int = PDF_PAGES_PER_TASK):
+        """
+        Initialize the orchestrator
+
+        Args:
+            embeddings_service: Service used to embed chunks
+            vector_store: Store receiving the embedded chunks
+            parse_workers: Processes used for PDF parsing
+            io_workers: Documents embedded and stored concurrently
+            batch_size: Chunks per embed/store batch
+            queue_size: Batches allowed to wait between two pipeline stages
+            parallel_min_pages: Pages from which a PDF is extracted by several workers; 0 = never
+            pages_per_task: Smallest page range given to one worker
+        """
+        self.pipeline = IngestionPipeline(embeddings_service, vector_store, batch_size, queue_size)
+        self.vector_store = vector_store
+        self.parse_workers = max(1, parse_workers)
+        self.io_workers = max(1, io_workers)
+        self.parallel_min_pages = parallel_min_pages
+        self.pages_per_task = max(1, pages_per_task)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    def _process_pool(self) -> ProcessPoolExecutor:
+        """Process pool, started on first use and reused across runs"""
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn: forking a process that runs server threads is unsafe
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.parse_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+    def _page_ranges(self, pdf_file) -> List[Tuple[int, int]]:
+        """
+        Split a large PDF into page ranges for the workers
+
+        Args:
+            pdf_file: File object of the PDF
+
+        Returns:
+            List[Tuple[int, int]]: (first, last) page index ranges, empty to parse the PDF in one task
+        """
+        if self.parse_workers < 2 or self.parallel_min_pages <= 0:
+            return []
+        try:
+            page_count = PDFProcessor.count_pages(pdf_file)
+        except Exception:
+            return []  # parsing in one task reports the error
+        if page_count < self.parallel_min_pages:
+            return []
+        size = max(self.pages_per_task, -(-page_count // self.parse_workers))
+        return [(first, min(first + size, page_count)) for first in range(0, page_count, size)]
+
+    def shutdown(self) -> None:
+        """Stop the worker processes"""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+    def run(self, files: Iterable[Tuple[str, PDFInput]], on_progress: Optional[ProgressCallback] = None,
+            max_in_flight: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Ingest several PDFs concurrently
+
+        Args:
+            files: (filename, path or file contents) pairs; consumed lazily, so a generator
+                can hand out files as earlier ones finish. Contents are spilled to a
+                temporary file first
+            on_progress: Called on the calling thread as (filename, stage, details), with
+                stage one of "skipped", "parsing", "storing", "done" or "error"
+            max_in_flight: Files taken but not yet finished at any time, unlimited if None
+
+        Returns:
+            Dict: Result per filename; failed files carry an "error" message
+        """
+        events: "queue.Queue" = queue.Queue()
+        results: Dict[str, Dict[str, Any]] = {}
+        telemetry = get_telemetry()
+        outstanding = 0
+
+        def emit(filename: str, stage: str, details: Dict[str, Any]) -> None:
+            events.put((filename, stage, details))
+
+        def store(filename: str, document_id: str, chunks: List[Dict[str, Any]],
+                  revision: Optional[DocumentRevision] = None) -> None:
+            try:
+                emit(filename, "storing", {"chunks": len(chunks), "stored": 0})
+                result = self.pipeline.ingest_stream(
+                    document_id, filename, _drain(chunks),
+                    on_progress=lambda counters: emit(filename, "storing", counters),
+                    revision=revision
+                )
+                emit(filename, "done", result)
+            except Exception as e:
+                emit(filename, "error", {"error": str(e)})
+
+        def discard(spilled: Optional[str]) -> None:
+            """Remove a temporary copy made of file contents passed in memory"""
+            if spilled is not None:
+                os.unlink(spilled)
+
+        with ThreadPoolExecutor(max_workers=self.io_workers) as io_pool:
+
+            def on_parsed(future: Future, filename: str, document_id: str, spilled: Optional[str]) -> None:
+                discard(spilled)
+                try:
+                    chunks, revision, timings = future.result()
+                except Exception as e:
+                    emit(filename, "error", {"error": f"Error extracting text from PDF: {str(e)}", "stage": "parsing"})
+                    return
+                # Stage timings measured in the worker process count in this process's metrics
+                for stage, seconds in timings:
+                    telemetry.record(stage, seconds)
+                io_pool.submit(store, filename, document_id, chunks, revision)
+
+            def chunk_pages(filename: str, document_id: str, pages: List[tuple],
+                            revision: Optional[DocumentRevision]) -> None:
+                try:
+                    # Pages are dropped as they are chunked
+                    if revision is not None:
+                        chunks = list(PDFProcessor.stream_revision(None, revision, _drain(pages)))
+                    else:
+                        chunks = list(PDFProcessor.stream_pdf(None, filename, document_id, _drain(pages)))
+                except Exception as e:
+                    emit(filename, "error", {"error": str(e), "stage": "parsing"})
+                    return
+                store(filename, document_id, chunks, revision)
+
+            def on_ranges(futures: List[Future], filename: str, document_id: str,
+                          revision: Optional[DocumentRevision], spilled: Optional[str]) -> None:
+                discard(spilled)
+                pages: List[tuple] = []
+                try:
+                    for future in futures:
+                        part, timings = future.result()
+                        pages.extend(part)
+                        for stage, seconds in timings:
+                            telemetry.record(stage, seconds)
+                except Exception as e:
+                    emit(filename, "error", {"error": f"Error extracting text from PDF: {str(e)}", "stage": "parsing"})
+                    return
+                # Chunking is cheap next to extraction; it runs on the I/O thread that stores the result
+                io_pool.submit(chunk_pages, filename, document_id, pages, revision)
+
+            def submit_ranges(ranges: List[Tuple[int, int]], path: str, filename: str, document_id: str,
+                              revision: Optional[DocumentRevision], spilled: Optional[str]) -> None:
+                known_texts = revision.known_texts if revision is not None else None
+                futures = [
+                    self._process_pool().submit(extract_page_range, path, first, last, known_texts)
+                    for first, last in ranges
+                ]
+                remaining = [len(futures)]
+                lock = threading.Lock()
+
+                def on_range_done(_: Future) -> None:
+                    with lock:
+                        remaining[0] -= 1
+                        finished = remaining[0] == 0
+                    if finished:
+                        on_ranges(futures, filename, document_id, revision, spilled)
+
+                for future in futures:
+                    future.add_done_callback(on_range_done)
+
+            def submit_file(filename: str, path: str, spilled: Optional[str]) -> bool:
+                """Plan a file and hand it to the worker processes; False if it needs no parsing"""
+                revision = None
+                with mapped_file(path) as pdf_file:
+                    manifest = self.pipeline.manifest
+                    if manifest is not None:
+                        revision = manifest.plan(pdf_file, filename)
+                        document_id = revision.document_id
+                        skipped = self.pipeline.skip_unchanged(revision)
+                        if skipped is not None:
+                            emit(filename, "skipped", skipped)
+                            return False
+                    else:
+                        document_id = PDFProcessor.compute_document_id(pdf_file)
+                        status = self.vector_store.get_document_status(document_id)
+                        if status and status.get("status") == "committed":
+                            emit(filename, "skipped", {"document_id": document_id, "skipped": True,
+                                                       "chunks": status.get("chunk_count") or 0})
+                            return False
+                    emit(filename, "parsing", {"document_id": document_id})
+                    ranges = self._page_ranges(pdf_file)
+                if ranges:
+                    submit_ranges(ranges, path, filename, document_id, revision, spilled)
+                    return True
+                if revision is not None:
+                    future = self._process_pool().submit(parse_revision_file, path, revision)
+                else:
+                    future = self._process_pool().submit(parse_pdf_file, path, filename, document_id)
+                future.add_done_callback(
+                    lambda f, name=filename, doc=document_id: on_parsed(f, name, doc, spilled)
+                )
+                return True
+
+            def submit(filename: str, source: PDFInput) -> None:
+                spilled = None
+                if isinstance(source, str):
+                    path = source
+                else:
+                    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as spill:
+                        spill.write(source)
+                    path = spilled = spill.name
+                try:
+                    submitted = submit_file(filename, path, spilled)
+                except Exception:
+                    discard(spilled)
+                    raise
+                if not submitted:
+                    discard(spilled)
+
+            pending = iter(files)
+            exhausted = False
+            while True:
+                while not exhausted and (max_in_flight is None or outstanding < max_in_flight):
+                    item = next(pending, None)
+                    if item is None:
+                        exhausted = True
+                        break
+                    filename, source = item
+                    outstanding += 1
+                    try:
+                        submit(filename, source)
+                    except Exception as e:
+                        emit(filename, "error", {"error": str(e)})
+                if not outstanding:
+                    break
+
+                filename, stage, details = events.get()
+                if stage in ("done", "skipped", "error"):
+                    results[filename] = details
+                    outstanding -= 1
+                if on_progress:
+                    on_progress(filename, stage, details)
+
+        return results
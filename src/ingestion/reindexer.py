@@ -0,0 +1,180 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+import logging
+import threading
+import time
+from config.settings import EMBEDDING_DIMENSIONS, EMBEDDING_MODEL, REINDEX_BATCH_SIZE, VECTOR_DIMENSION
+from src.database.vector_store import VectorStore, notify_embedding_version_changed
+from src.embeddings.embeddings_service import EmbeddingsService
+from utils.telemetry import get_telemetry
+
+logger = logging.getLogger(__name__)
+
+
+class Reindexer:
+    """
+    Re-embeds every stored chunk with another embedding model and swaps the new vectors in at once.
+
+    New vectors are written next to the active ones (a second column in
+    Supabase, a second matrix file locally) while searches keep using the
+    active version. Chunks are read in batches ordered by ID, embedded with
+    the token-aware batching and concurrency of EmbeddingsService, and
+    written while the next batch is read and embedded. Chunks stored during
+    a pass (uploads keep using the old model until the swap) are picked up
+    by another pass; once none lacks a new vector, the store swaps the
+    versions in one transaction and services in this process switch models
+    (see EmbeddingVersionTracker). Other processes switch within
+    EMBEDDING_VERSION_CHECK_SECONDS.
+
+    An interrupted re-index resumes: the store keeps building the version
+    of the same model, and only chunks without a new vector are read again.
+    """
+
+    def __init__(self, vector_store: VectorStore, embeddings_service: Optional[EmbeddingsService] = None,
+                 model: str = EMBEDDING_MODEL, dimensions: int = EMBEDDING_DIMENSIONS,
+                 batch_size: int = REINDEX_BATCH_SIZE, max_passes: int = 5):
+        """
+        Initialize the re-indexer
+
+        Args:
+            vector_store: Store to re-index
+            embeddings_service: Service for the new vectors (switched to model); not the one serving queries
+            model: Embedding model to re-index to
+            dimensions: Matryoshka dimensions to request (0 for the model's full size)
+            batch_size: Chunks read and embedded per round
+            max_passes: Passes over chunks stored meanwhile before giving up on the swap
+        """
+        self.vector_store = vector_store
+        self.embeddings_service = embeddings_service or EmbeddingsService()
+        self.embeddings_service.use_model(model, dimensions)
+        self.model = model
+        self.dimensions = dimensions
+        self.batch_size = batch_size
+        self.max_passes = max_passes
+        self.progress: Dict[str, Any] = {"state": "idle"}
+        self.telemetry = get_telemetry()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def targets(self, version: Dict[str, Any]) -> bool:
+        """
+        Whether an embedding version's vectors come from the model re-indexed to
+
+        Args:
+            version: Version row with model and dimensions
+
+        Returns:
+            bool: True if model and dimensions match
+        """
+        return (version["model"], version.get("dimensions") or 0) == (self.model, self.dimensions)
+
+    def needed(self) -> bool:
+        """
+        Whether the stored vectors come from another model than the one re-indexed to
+
+        Returns:
+            bool: True if the store has an active version of another model or dimensions
+        """
+        active = self.vector_store.get_embedding_versions()["active"]
+        return active is not None and not self.targets(active)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _pass(self, writer: ThreadPoolExecutor, on_progress: Optional[Callable[[Dict[str, Any]], None]]) -> None:
+        """Embed every chunk that has no new vector yet, writing each batch while the next is embedded"""
+        after = None
+        pending: Optional[Future] = None
+        try:
+            while not self._stop.is_set():
+                with self.telemetry.span("reindex_read"):
+                    rows = self.vector_store.get_reindex_batch(after, self.batch_size)
+                if not rows:
+                    break
+                after = rows[-1]["id"]
+                with self.telemetry.span("reindex_embed"):
+                    vectors = self.embeddings_service.embed_texts([row["content"] for row in rows])
+                if len(vectors[0]) != VECTOR_DIMENSION:
+                    raise ValueError(f"{self.model} returned {len(vectors[0])}-dimensional vectors, the store holds "
+                                     f"{VECTOR_DIMENSION}; set EMBEDDING_DIMENSIONS to {VECTOR_DIMENSION}")
+                if pending is not None:
+                    pending.result()
+                pending = writer.submit(self.vector_store.store_next_embeddings,
+                                        {row["id"]: vector for row, vector in zip(rows, vectors)})
+                self.progress["embedded"] += len(rows)
+                self.telemetry.inc("chunks_reindexed", value=len(rows))
+                if on_progress is not None:
+                    on_progress(self.progress)
+        finally:
+            if pending is not None:
+                pending.result()
+
+    def run(self, on_progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Re-index the store and swap the new version in
+
+        Args:
+            on_progress: Called after each batch with the progress counters
+
+        Returns:
+            Dict: state ("done", "stopped" or "current"), model, version, passes, embedded and seconds
+        """
+        start = time.perf_counter()
+        self._stop.clear()
+        self.progress = {"state": "running", "model": self.model, "version": None, "passes": 0, "embedded": 0,
+                         "seconds": 0.0, "error": None}
+        try:
+            if not self.needed():
+                self.progress["state"] = "current"
+                return self.progress
+            version = self.progress["version"] = self.vector_store.begin_embedding_version(self.model,
+                                                                                           self.dimensions)
+            logger.info("Re-indexing to %s (version %s)", self.model, version)
+            with ThreadPoolExecutor(max_workers=1, thread_name_prefix="reindex-write") as writer:
+                while True:
+                    if self.progress["passes"] >= self.max_passes:
+                        raise RuntimeError(f"Chunks still lack {self.model} vectors after {self.max_passes} passes")
+                    self.progress["passes"] += 1
+                    self._pass(writer, on_progress)
+                    if self._stop.is_set():
+                        self.progress["state"] = "stopped"
+                        return self.progress
+                    with self.telemetry.span("reindex_swap"):
+                        if self.vector_store.activate_embedding_version(version):
+                            break
+            active = self.vector_store.get_embedding_versions()["active"]
+            notify_embedding_version_changed(active)
+            self.progress["state"] = "done"
+            logger.info("Re-indexed %d chunks to %s", self.progress["embedded"], self.model)
+            return self.progress
+        except Exception as e:
+            self.progress.update(state="failed", error=str(e))
+            raise
+        finally:
+            self.progress["seconds"] = time.perf_counter() - start
+
+    def _run_in_background(self) -> None:
+        try:
+            self.run()
+        except Exception as e:
+            logger.error("Re-index failed: %s", e)
+
+    def start(self) -> None:
+        """Re-index in a background thread; progress is readable from the progress attribute"""
+        if not self.running:
+            self.progress = {"state": "running", "model": self.model, "embedded": 0}
+            self._thread = threading.Thread(target=self._run_in_background, name="reindex", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Stop after the batch in flight; the re-index resumes on the next run
+
+        Args:
+            timeout: Seconds to wait for the background thread, forever if None
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
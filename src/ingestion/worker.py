@@ -0,0 +1,219 @@
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import logging
+import os
+import threading
+import time
+from config.settings import INGEST_MAX_IN_FLIGHT, INGEST_POLL_SECONDS
+from src.ingestion.job_queue import JobQueue, worker_name
+from src.ingestion.orchestrator import IngestionOrchestrator
+
+logger = logging.getLogger(__name__)
+
+# Signature of job event callbacks: (job, stage, details)
+JobCallback = Callable[[Dict[str, Any], str, Dict[str, Any]], None]
+
+
+class IngestionWorker:
+    """
+    Drains the ingestion job queue through an IngestionOrchestrator.
+
+    Jobs are claimed one at a time as capacity frees up, so at most
+    max_in_flight files are parsed or stored at once whatever the queue
+    length. Files are passed on by path and never read into memory here.
+    A job for a file already in flight is set aside until that one
+    finishes while other jobs keep being claimed.
+    Leases of the jobs in flight are renewed from a background thread
+    while they are parsed, and progress counters are saved on the job so
+    the UI (or another process) can poll it.
+    """
+
+    def __init__(self, job_queue: JobQueue, orchestrator: IngestionOrchestrator,
+                 max_in_flight: int = INGEST_MAX_IN_FLIGHT, poll_interval: float = INGEST_POLL_SECONDS):
+        """
+        Initialize the worker
+
+        Args:
+            job_queue: Queue to take jobs from
+            orchestrator: Orchestrator that parses, embeds and stores the PDFs
+            max_in_flight: Jobs held at once, twice the parse plus I/O workers if 0
+            poll_interval: Seconds between queue polls when it is empty
+        """
+        self.job_queue = job_queue
+        self.orchestrator = orchestrator
+        self.max_in_flight = max_in_flight or 2 * (orchestrator.parse_workers + orchestrator.io_workers)
+        self.poll_interval = poll_interval
+        self.name = worker_name()
+        self._in_flight: Dict[str, Dict[str, Any]] = {}
+        self._deferred: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _claimed(self, totals: Dict[str, Any]) -> Iterator[Tuple[str, str]]:
+        """Claim jobs and hand out their files until the queue is empty or the worker stops"""
+        try:
+            while not self._stop.is_set():
+                with self._lock:
+                    # Results are reported by filename: a job for a file in flight waits for it to finish
+                    job = next((job for job in self._deferred if job["filename"] not in self._in_flight), None)
+                    if job is not None:
+                        self._deferred.remove(job)
+                if job is None:
+                    job = self.job_queue.claim(self.name)
+                    if job is None:
+                        return
+                    with self._lock:
+                        if any(held["filename"] == job["filename"] for held in self._held()):
+                            self._deferred.append(job)
+                            continue
+                try:
+                    totals["bytes"] += os.path.getsize(job["path"])
+                except OSError as e:
+                    self.job_queue.fail(job["id"], f"Cannot read {job['path']}: {str(e)}", retry=False)
+                    totals["failed"] += 1
+                    continue
+                with self._lock:
+                    self._in_flight[job["filename"]] = job
+                yield job["filename"], job["path"]
+        finally:
+            self._release_deferred()
+
+    def _held(self) -> List[Dict[str, Any]]:
+        """Jobs claimed by this worker: in flight or set aside behind one for the same file"""
+        return list(self._in_flight.values()) + self._deferred
+
+    def _release_deferred(self) -> None:
+        """Put jobs set aside back in the queue, for a later round"""
+        with self._lock:
+            deferred, self._deferred = self._deferred, []
+        for job in deferred:
+            self.job_queue.release(job["id"])
+
+    def _renew_leases(self, finished: threading.Event) -> None:
+        while not finished.wait(self.job_queue.lease_seconds / 3):
+            with self._lock:
+                job_ids = [job["id"] for job in self._held()]
+            if job_ids:
+                try:
+                    self.job_queue.renew(job_ids)
+                except Exception as e:
+                    logger.error("Error renewing ingestion job leases: %s", e)
+
+    def run(self, until_empty: bool = True, on_event: Optional[JobCallback] = None) -> Dict[str, Any]:
+        """
+        Process jobs
+
+        Args:
+            until_empty: Return once the queue is empty instead of polling until stop() is called
+            on_event: Called as (job, stage, details) for every orchestrator progress event; failed
+                jobs that were queued again are reported with stage "retry"
+
+        Returns:
+            Dict: Totals for files done, skipped and failed, pages, chunks, embedded chunks,
+                bytes read and elapsed seconds
+        """
+        totals = {"files": 0, "done": 0, "skipped": 0, "failed": 0, "retried": 0, "pages": 0,
+                  "chunks": 0, "embedded": 0, "deleted": 0, "bytes": 0, "seconds": 0.0}
+        last_saved: Dict[int, float] = {}
+        start = time.perf_counter()
+        self.job_queue.recover()
+        # Renews until run() returns, so jobs still draining after stop() keep their leases
+        finished = threading.Event()
+        renewer = threading.Thread(target=self._renew_leases, args=(finished,), name="ingest-lease-renewal",
+                                   daemon=True)
+        renewer.start()
+
+        def handle(filename: str, stage: str, details: Dict[str, Any]) -> None:
+            with self._lock:
+                job = self._in_flight.get(filename)
+                if job is not None and stage in ("done", "skipped", "error"):
+                    del self._in_flight[filename]
+            if job is None:
+                return
+            if stage in ("parsing", "storing"):
+                # Progress is only a hint for pollers; save it at most once a second
+                now = time.monotonic()
+                if now - last_saved.get(job["id"], 0.0) >= 1.0:
+                    last_saved[job["id"]] = now
+                    self.job_queue.renew([job["id"]], {"stage": stage, **details})
+            elif stage == "error":
+                last_saved.pop(job["id"], None)
+                # A PDF that cannot be parsed will not parse on a retry either
+                retry = details.get("stage") != "parsing"
+                if self.job_queue.fail(job["id"], details.get("error", "unknown error"), retry):
+                    totals["retried"] += 1
+                    stage = "retry"
+                else:
+                    totals["failed"] += 1
+            else:
+                last_saved.pop(job["id"], None)
+                self.job_queue.complete(job["id"], details, skipped=stage == "skipped")
+                totals["files"] += 1
+                totals["skipped" if stage == "skipped" else "done"] += 1
+                for key in ("pages", "chunks", "embedded", "deleted"):
+                    totals[key] += details.get(key) or 0
+            if on_event:
+                on_event(job, stage, details)
+
+        try:
+            while not self._stop.is_set():
+                before = totals["files"] + totals["failed"] + totals["retried"]
+                self.orchestrator.run(self._claimed(totals), handle, self.max_in_flight)
+                idle = totals["files"] + totals["failed"] + totals["retried"] == before
+                if idle:
+                    if until_empty:
+                        break
+                    self._stop.wait(self.poll_interval)
+        finally:
+            finished.set()
+            renewer.join()
+            with self._lock:
+                abandoned = list(self._in_flight.values())
+                self._in_flight.clear()
+            for job in abandoned:
+                self.job_queue.release(job["id"])
+            self._release_deferred()
+            self._stop.clear()
+
+        totals["seconds"] = time.perf_counter() - start
+        return totals
+
+    def start(self) -> None:
+        """Process jobs in a background thread until stop() is called"""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self.run, args=(False,), name="ingest-worker", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Stop taking jobs and wait for the ones in flight
+
+        Args:
+            timeout: Seconds to wait for the background thread, forever if None
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+def format_report(totals: Dict[str, Any]) -> str:
+    """
+    Human-readable throughput report of a worker run
+
+    Args:
+        totals: Totals returned by IngestionWorker.run
+
+    Returns:
+        str: Multi-line report
+    """
+    seconds = max(totals["seconds"], 1e-9)
+    return "\n".join([
+        f"files:    {totals['files']} ({totals['done']} ingested, {totals['skipped']} already indexed), "
+        f"{totals['failed']} failed, {totals['retried']} retries",
+        f"pages:    {totals['pages']}",
+        f"chunks:   {totals['chunks']} ({totals['embedded']} embedded, {totals['deleted']} deleted)",
+        f"elapsed:  {totals['seconds']:.1f}s",
+        f"rate:     {totals['files'] / seconds:.2f} files/s, {totals['pages'] / seconds:.1f} pages/s, "
+        f"{totals['chunks'] / seconds:.1f} chunks/s, {totals['bytes'] / 2**20 / seconds:.2f} MiB/s",
+    ])
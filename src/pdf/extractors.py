@@ -0,0 +1,475 @@
+"""
+Pluggable PDF text extraction backends.
+
+PyPDF2 is always available. pypdfium2 (PDFium, native code), pypdf (the
+maintained successor of PyPDF2) and pdfminer.six are used when installed;
+PDF_EXTRACTOR picks one, and "auto" takes the fastest one present. The
+backend that extracts a document also fingerprints its pages, so only one
+parser reads the file.
+"""
+import hashlib
+import io
+import logging
+import mmap
+import signal
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple, Type, Union
+
+import PyPDF2
+from config.settings import PDF_EXTRACTOR, PDF_PAGE_TIMEOUT
+
+try:
+    import pypdfium2
+except ImportError:  # optional dependency
+    pypdfium2 = None
+
+try:
+    import pypdf
+except ImportError:  # optional dependency
+    pypdf = None
+
+try:
+    from pdfminer.converter import TextConverter
+    from pdfminer.layout import LAParams
+    from pdfminer.pdfdocument import PDFDocument
+    from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+    from pdfminer.pdfpage import PDFPage
+    from pdfminer.pdfparser import PDFParser
+    from pdfminer.pdftypes import resolve1
+except ImportError:  # optional dependency
+    PDFParser = None
+
+logger = logging.getLogger(__name__)
+
+# Bytes or a binary file object holding a PDF
+PDFSource = Union[bytes, io.IOBase]
+
+# PDFium is not thread-safe; documents opened on different threads share this lock
+_PDFIUM_LOCK = threading.Lock()
+
+
+class PageTimeout(Exception):
+    """Raised inside a page extraction that ran past PDF_PAGE_TIMEOUT"""
+
+
+@contextmanager
+def page_deadline(seconds: float):
+    """
+    Interrupt the enclosed block with PageTimeout after a number of seconds
+
+    Uses SIGALRM, so it only takes effect on the main thread of a POSIX
+    process (as in the ingestion worker processes) and elsewhere does
+    nothing. Native code is interrupted only once it returns to Python.
+
+    Args:
+        seconds: Time allowed; 0 or less disables the deadline
+    """
+    if (seconds <= 0 or not hasattr(signal, "setitimer")
+            or threading.current_thread() is not threading.main_thread()):
+        yield
+        return
+
+    def expire(signum, frame):
+        raise PageTimeout(f"page extraction exceeded {seconds:g}s")
+
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _as_stream(source: PDFSource):
+    return io.BytesIO(source) if isinstance(source, (bytes, bytearray, memoryview)) else source
+
+
+class _BufferStream(io.RawIOBase):
+    """
+    Read-only stream over a PDF's memory, with a file position of its own
+
+    Backends that seek freely get one each, so they can read the same
+    memory-mapped upload alongside a PyPDF2 reader without copying it.
+    Closing the stream releases the buffer, which the mmap needs before it
+    can be closed.
+    """
+
+    def __init__(self, buffer):
+        super().__init__()
+        self._view = memoryview(buffer)
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, target) -> int:
+        target = memoryview(target).cast("B")
+        count = max(0, min(len(target), len(self._view) - self._position))
+        target[:count] = self._view[self._position:self._position + count]
+        self._position += count
+        return count
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._position, io.SEEK_END: len(self._view)}[whence]
+        self._position = max(0, base + offset)
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+    def close(self) -> None:
+        if not self.closed:
+            self._view.release()
+        super().close()
+
+
+def _open_stream(source: PDFSource) -> _BufferStream:
+    """A stream of its own over the source; only file objects without a buffer (not an mmap or BytesIO) are copied"""
+    if isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+        return _BufferStream(source)
+    if isinstance(source, io.BytesIO):
+        return _BufferStream(source.getbuffer())
+    source.seek(0)
+    data = source.read()
+    source.seek(0)
+    return _BufferStream(data)
+
+
+def _open_document(source: PDFSource, document_type) -> "ExtractedDocument":
+    """Open a document on a stream of its own, closing the stream if the PDF cannot be opened"""
+    stream = _open_stream(source)
+    try:
+        return document_type(stream)
+    except BaseException:
+        stream.close()
+        raise
+
+
+class ExtractedDocument:
+    """
+    An open PDF whose pages are extracted on demand
+    """
+
+    page_count = 0
+
+    def page_text(self, index: int) -> str:
+        """
+        Extract the text of one page
+
+        Args:
+            index: 0-based page index
+
+        Returns:
+            str: Page text, possibly empty
+        """
+        raise NotImplementedError
+
+    def page_fingerprint(self, index: int) -> str:
+        """
+        Fingerprint one page, so an unchanged page of a new revision is recognised
+
+        Backends that can read a page's content stream hash it with the page
+        size, without extracting text; the default hashes the page's text.
+
+        Args:
+            index: 0-based page index
+
+        Returns:
+            str: SHA-256 hex digest
+        """
+        return hashlib.sha256(self.page_text(index).encode("utf-8")).hexdigest()
+
+    def close(self) -> None:
+        """Release the document"""
+
+
+class PDFExtractor:
+    """
+    Opens PDFs with one extraction library
+    """
+
+    name = ""
+    package = ""  # pip distribution providing the library
+    fingerprints = "content"  # how pages are fingerprinted; only fingerprints of the same kind are comparable
+
+    @classmethod
+    def available(cls) -> bool:
+        """Whether the backing library is installed"""
+        return True
+
+    def open(self, source: PDFSource) -> ExtractedDocument:
+        """
+        Open a PDF for extraction
+
+        Args:
+            source: PDF contents or binary file object
+
+        Returns:
+            ExtractedDocument: Open document
+        """
+        raise NotImplementedError
+
+
+class ReaderDocument(ExtractedDocument):
+    """
+    Document read through a PyPDF2 or pypdf PdfReader
+    """
+
+    def __init__(self, reader, stream: Optional[io.IOBase] = None):
+        self.reader = reader
+        self.stream = stream
+        self.page_count = len(reader.pages)
+
+    def page_text(self, index: int) -> str:
+        return self.reader.pages[index].extract_text() or ""
+
+    def page_fingerprint(self, index: int) -> str:
+        page = self.reader.pages[index]
+        digest = hashlib.sha256(repr([float(value) for value in page.mediabox]).encode("utf-8"))
+        contents = page.get("/Contents")
+        contents = contents.get_object() if contents is not None else []
+        for stream in contents if isinstance(contents, list) else [contents]:
+            digest.update(stream.get_object().get_data())
+        return digest.hexdigest()
+
+    def close(self) -> None:
+        if self.stream is not None:
+            self.stream.close()
+
+
+class PyPDF2Extractor(PDFExtractor):
+    """Pure-Python PyPDF2 3.x; always installed"""
+
+    name = "pypdf2"
+    package = "PyPDF2"
+
+    def open(self, source: PDFSource) -> ExtractedDocument:
+        return ReaderDocument(PyPDF2.PdfReader(_as_stream(source)))
+
+
+class PypdfExtractor(PDFExtractor):
+    """pypdf, PyPDF2's maintained successor with a much faster text extractor"""
+
+    name = "pypdf"
+    package = "pypdf"
+
+    @classmethod
+    def available(cls) -> bool:
+        return pypdf is not None
+
+    def open(self, source: PDFSource) -> ExtractedDocument:
+        # Own stream, so it can be read alongside a PyPDF2 reader of the same file
+        return _open_document(source, lambda stream: ReaderDocument(pypdf.PdfReader(stream), stream))
+
+
+class _PdfminerDocument(ExtractedDocument):
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.pages = list(PDFPage.create_pages(PDFDocument(PDFParser(stream))))
+        self.page_count = len(self.pages)
+        self.resources = PDFResourceManager(caching=True)
+        self.laparams = LAParams()
+
+    def page_text(self, index: int) -> str:
+        output = io.StringIO()
+        device = TextConverter(self.resources, output, laparams=self.laparams)
+        try:
+            PDFPageInterpreter(self.resources, device).process_page(self.pages[index])
+        finally:
+            device.close()
+        return output.getvalue()
+
+    def page_fingerprint(self, index: int) -> str:
+        page = self.pages[index]
+        digest = hashlib.sha256(repr([float(value) for value in page.mediabox]).encode("utf-8"))
+        for stream in page.contents:
+            digest.update(resolve1(stream).get_data())
+        return digest.hexdigest()
+
+    def close(self) -> None:
+        self.stream.close()
+
+
+class PdfminerExtractor(PDFExtractor):
+    """pdfminer.six: slowest, but the best reading order on multi-column layouts"""
+
+    name = "pdfminer"
+    package = "pdfminer.six"
+
+    @classmethod
+    def available(cls) -> bool:
+        return PDFParser is not None
+
+    def open(self, source: PDFSource) -> ExtractedDocument:
+        # Own stream: the parser seeks freely and must not share a file position
+        return _open_document(source, _PdfminerDocument)
+
+
+class _PdfiumDocument(ExtractedDocument):
+
+    def __init__(self, stream):
+        # PDFium pulls the blocks it needs through the stream instead of loading a copy of the file
+        self.stream = stream
+        self.fingerprinted: Optional[Tuple[int, str]] = None
+        with _PDFIUM_LOCK:
+            self.document = pypdfium2.PdfDocument(stream)
+            self.page_count = len(self.document)
+
+    @staticmethod
+    def _text(page) -> str:
+        textpage = page.get_textpage()
+        try:
+            return textpage.get_text_range()
+        finally:
+            textpage.close()
+
+    def page_text(self, index: int) -> str:
+        if self.fingerprinted is not None and self.fingerprinted[0] == index:
+            return self.fingerprinted[1]
+        with _PDFIUM_LOCK:
+            page = self.document[index]
+            try:
+                return self._text(page)
+            finally:
+                page.close()
+
+    def page_fingerprint(self, index: int) -> str:
+        # PDFium does not expose content streams: hash the page size, its number of objects and its text,
+        # keeping the text for the page_text call that usually follows
+        with _PDFIUM_LOCK:
+            page = self.document[index]
+            try:
+                shape = (page.get_size(), pypdfium2.raw.FPDFPage_CountObjects(page.raw))
+                text = self._text(page)
+            finally:
+                page.close()
+        digest = hashlib.sha256(repr(shape).encode("utf-8"))
+        digest.update(text.encode("utf-8"))
+        self.fingerprinted = (index, text)
+        return digest.hexdigest()
+
+    def close(self) -> None:
+        with _PDFIUM_LOCK:
+            self.document.close()
+        self.stream.close()
+
+
+class PdfiumExtractor(PDFExtractor):
+    """pypdfium2: Chrome's PDFium in native code, typically an order of magnitude faster"""
+
+    name = "pypdfium2"
+    package = "pypdfium2"
+    fingerprints = "pdfium"
+
+    @classmethod
+    def available(cls) -> bool:
+        return pypdfium2 is not None
+
+    def open(self, source: PDFSource) -> ExtractedDocument:
+        return _open_document(source, _PdfiumDocument)
+
+
+# Backends by name, fastest first: the order "auto" tries them in
+EXTRACTORS: Dict[str, Type[PDFExtractor]] = {
+    extractor.name: extractor
+    for extractor in (PdfiumExtractor, PypdfExtractor, PyPDF2Extractor, PdfminerExtractor)
+}
+
+
+def available_extractors() -> List[str]:
+    """
+    Names of the installed backends, fastest first
+
+    Returns:
+        List[str]: Backend names
+    """
+    return [name for name, extractor in EXTRACTORS.items() if extractor.available()]
+
+
+def get_extractor(name: Optional[str] = None) -> PDFExtractor:
+    """
+    Create an extraction backend
+
+    Args:
+        name: "auto", "pypdfium2", "pypdf", "pypdf2" or "pdfminer"; PDF_EXTRACTOR if None
+
+    Returns:
+        PDFExtractor: The backend
+    """
+    name = (name or PDF_EXTRACTOR).lower()
+    if name == "auto":
+        return EXTRACTORS[available_extractors()[0]]()
+    if name not in EXTRACTORS:
+        raise ValueError(f"Unknown PDF extractor {name!r}; expected auto or one of {', '.join(EXTRACTORS)}")
+    extractor = EXTRACTORS[name]
+    if not extractor.available():
+        raise ImportError(f"PDF_EXTRACTOR={name} requires the {extractor.package} package "
+                          f"(pip install {extractor.package})")
+    return extractor()
+
+
+def get_fingerprinter(fingerprints: str, name: Optional[str] = None) -> Optional[PDFExtractor]:
+    """
+    Create a backend that fingerprints pages a given way
+
+    Args:
+        fingerprints: Kind of fingerprint, as in PDFExtractor.fingerprints
+        name: Backend to prefer, PDF_EXTRACTOR if None
+
+    Returns:
+        PDFExtractor: The preferred backend if it fingerprints that way, else the fastest installed one
+            that does; None if none is installed
+    """
+    extractor = get_extractor(name)
+    if extractor.fingerprints == fingerprints:
+        return extractor
+    for name in available_extractors():
+        if EXTRACTORS[name].fingerprints == fingerprints:
+            return EXTRACTORS[name]()
+    return None
+
+
+def fingerprint_page(document: ExtractedDocument, index: int, timeout: float = PDF_PAGE_TIMEOUT) -> Optional[str]:
+    """
+    Fingerprint one page, giving up after a timeout
+
+    Args:
+        document: Open document
+        index: 0-based page index
+        timeout: Seconds allowed for the page; 0 for no limit
+
+    Returns:
+        Optional[str]: Page fingerprint, or None if the page timed out
+    """
+    try:
+        with page_deadline(timeout):
+            return document.page_fingerprint(index)
+    except PageTimeout:
+        logger.warning("Page %d not fingerprinted: it took longer than %gs", index + 1, timeout)
+        return None
+
+
+def extract_page(document: ExtractedDocument, index: int, timeout: float = PDF_PAGE_TIMEOUT) -> Optional[str]:
+    """
+    Extract one page, giving up after a timeout
+
+    Args:
+        document: Open document
+        index: 0-based page index
+        timeout: Seconds allowed for the page; 0 for no limit
+
+    Returns:
+        Optional[str]: Page text, or None if the page timed out
+    """
+    try:
+        with page_deadline(timeout):
+            return document.page_text(index)
+    except PageTimeout:
+        logger.warning("Skipped page %d: text extraction took longer than %gs", index + 1, timeout)
+        return None
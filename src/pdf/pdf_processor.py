@@ -1,8 +1,16 @@
 import os
-import PyPDF2
-from typing import List, Dict, Any, Generator
+import hashlib
+from bisect import bisect_right
+from collections import Counter
+from typing import List, Dict, Any, Generator, Iterable, Optional, Tuple
 import uuid
-from config.settings import CHUNK_SIZE, CHUNK_OVERLAP
+from config.settings import CHUNK_SIZE, CHUNK_OVERLAP, CHUNKING_STRATEGY
+from src.pdf.extractors import PDFExtractor, extract_page, fingerprint_page, get_extractor
+from src.pdf.token_chunker import TokenChunker
+from utils.telemetry import get_telemetry
+
+# Namespace for deterministic chunk IDs, so re-processing a document yields the same IDs
+CHUNK_ID_NAMESPACE = uuid.UUID("6f1c2a52-8a4e-4c0e-9a38-0f6d1f1f4b1e")
 
 class PDFProcessor:
     """
@@ -10,61 +18,410 @@ class PDFProcessor:
     """
     
     @staticmethod
-    def extract_text_from_pdf(pdf_file) -> str:
+    def iter_pages(pdf_file, first: int = 0, last: Optional[int] = None,
+                   extractor: Optional[PDFExtractor] = None) -> Generator[Tuple[int, str], None, None]:
+        """
+        Lazily extract text from a PDF one page at a time
+        
+        Args:
+            pdf_file: File object of the uploaded PDF
+            first: 0-based index of the first page to extract
+            last: Index one past the last page to extract, the end of the document if None
+            extractor: Extraction backend, the PDF_EXTRACTOR one if None
+            
+        Yields:
+            Tuple[int, str]: 1-based page number and the page text followed by a newline;
+                pages that exceed PDF_PAGE_TIMEOUT are empty
+        """
+        try:
+            document = (extractor or get_extractor()).open(pdf_file)
+            try:
+                for index in range(first, document.page_count if last is None else min(last, document.page_count)):
+                    yield index + 1, (extract_page(document, index) or "") + "\n"
+            finally:
+                document.close()
+        except Exception as e:
+            raise Exception(f"Error extracting text from PDF: {str(e)}")
+    
+    @staticmethod
+    def page_fingerprints(pdf_file, extractor: Optional[PDFExtractor] = None) -> List[str]:
         """
-        Extract text from a PDF file using PyPDF2
+        Fingerprint every page of a PDF, as iter_fingerprinted_pages does
         
         Args:
             pdf_file: File object of the uploaded PDF
+            extractor: Extraction backend, the PDF_EXTRACTOR one if None
             
         Returns:
-            str: Extracted text from the PDF
+            List[str]: Fingerprint per page, in page order; empty for pages that timed out
         """
+        pdf_file.seek(0)
+        document = (extractor or get_extractor()).open(pdf_file)
         try:
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            text = ""
-            
-            for page_num in range(len(pdf_reader.pages)):
-                page = pdf_reader.pages[page_num]
-                text += page.extract_text() + "\n"
-                
-            return text
+            return [fingerprint_page(document, index) or "" for index in range(document.page_count)]
+        finally:
+            document.close()
+            pdf_file.seek(0)
+    
+    @staticmethod
+    def iter_fingerprinted_pages(pdf_file, known_texts: Optional[Dict[str, str]] = None,
+                                 first: int = 0, last: Optional[int] = None,
+                                 extractor: Optional[PDFExtractor] = None
+                                 ) -> Generator[Tuple[int, str, str, bool], None, None]:
+        """
+        Lazily extract page text, reusing the text of pages seen before
+        
+        The extraction backend fingerprints the pages too, so only one parser
+        reads the file. Backends fingerprint differently: after PDF_EXTRACTOR
+        changes, the next revision of a document is extracted in full once. A
+        page that exceeds PDF_PAGE_TIMEOUT is yielded empty with an empty
+        fingerprint, so the next revision retries it.
+        
+        Args:
+            pdf_file: File object of the uploaded PDF
+            known_texts: Text of previously extracted pages by fingerprint
+            first: 0-based index of the first page
+            last: Index one past the last page, the end of the document if None
+            extractor: Extraction backend, the PDF_EXTRACTOR one if None
+            
+        Yields:
+            Tuple[int, str, str, bool]: Page number, fingerprint, text and whether it was extracted
+        """
+        known_texts = known_texts or {}
+        try:
+            document = (extractor or get_extractor()).open(pdf_file)
+            try:
+                for index in range(first, document.page_count if last is None else min(last, document.page_count)):
+                    fingerprint = fingerprint_page(document, index)
+                    text = known_texts.get(fingerprint)
+                    if text is not None:
+                        yield index + 1, fingerprint, text, False
+                        continue
+                    text = extract_page(document, index) if fingerprint is not None else None
+                    if text is None:
+                        yield index + 1, "", "\n", True
+                    else:
+                        yield index + 1, fingerprint, text + "\n", True
+            finally:
+                document.close()
         except Exception as e:
             raise Exception(f"Error extracting text from PDF: {str(e)}")
     
     @staticmethod
-    def create_chunks(text: str) -> List[Dict[str, Any]]:
+    def count_pages(pdf_file) -> int:
+        """
+        Count the pages of a PDF without extracting anything
+        
+        Args:
+            pdf_file: File object of the uploaded PDF
+            
+        Returns:
+            int: Number of pages
+        """
+        document = get_extractor().open(pdf_file)
+        try:
+            return document.page_count
+        finally:
+            document.close()
+    
+    @staticmethod
+    def extract_text_from_pdf(pdf_file) -> str:
+        """
+        Extract text from a PDF file with the configured backend (PDF_EXTRACTOR)
+        
+        Args:
+            pdf_file: File object of the uploaded PDF
+            
+        Returns:
+            str: Extracted text from the PDF
+        """
+        return "".join(text for _, text in PDFProcessor.iter_pages(pdf_file))
+    
+    @staticmethod
+    def compute_document_id(pdf_file) -> str:
+        """
+        Compute a content hash identifying a PDF file
+        
+        Args:
+            pdf_file: File object of the uploaded PDF
+            
+        Returns:
+            str: SHA-256 hex digest of the file contents
+        """
+        digest = hashlib.sha256()
+        pdf_file.seek(0)
+        for block in iter(lambda: pdf_file.read(1024 * 1024), b""):
+            digest.update(block)
+        pdf_file.seek(0)
+        return digest.hexdigest()
+    
+    @staticmethod
+    def compute_source_id(filename: str) -> str:
+        """
+        Compute the stable ID of a logical document
+        
+        Revisions uploaded under the same file name share this ID, so their
+        unchanged chunks keep their IDs across uploads.
+        
+        Args:
+            filename: Name of the PDF file
+            
+        Returns:
+            str: SHA-256 hex digest of the file name
+        """
+        return hashlib.sha256(f"source:{filename}".encode("utf-8")).hexdigest()
+    
+    @staticmethod
+    def make_content_chunk_id(document_id: str, page_number: int, text: str, occurrence: int) -> str:
+        """
+        Build a chunk ID from the chunk's content, so unchanged text keeps its ID across revisions
+        
+        Args:
+            document_id: ID of the source document
+            page_number: Page the chunk belongs to
+            text: Chunk text
+            occurrence: 1-based count of identical chunks on the page so far
+            
+        Returns:
+            str: UUID string for the chunk
+        """
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return str(uuid.uuid5(CHUNK_ID_NAMESPACE, f"{document_id}:{page_number}:{digest}:{occurrence}"))
+    
+    @staticmethod
+    def make_chunk_id(document_id: str, chunk_index: int) -> str:
+        """
+        Build a deterministic chunk ID so retried uploads overwrite instead of duplicating
+        
+        Args:
+            document_id: ID of the source document
+            chunk_index: Position of the chunk in the document
+            
+        Returns:
+            str: UUID string for the chunk
+        """
+        return str(uuid.uuid5(CHUNK_ID_NAMESPACE, f"{document_id}:{chunk_index}"))
+    
+    @staticmethod
+    def iter_chunks(pages: Iterable[Tuple[int, str]], document_id: str,
+                    strategy: str = CHUNKING_STRATEGY) -> Generator[Dict[str, Any], None, None]:
+        """
+        Split a stream of page texts into chunks as the text arrives
+        
+        Args:
+            pages: Iterable of (page number, page text)
+            document_id: ID of the source document
+            strategy: "tokens" for token-budgeted, boundary-aware chunks, "chars" for fixed-size slices
+            
+        Yields:
+            Dict: Chunk with id, text and metadata (including page_start/page_end)
+        """
+        if strategy == "chars":
+            yield from PDFProcessor.iter_char_chunks(pages, document_id)
+        elif strategy == "tokens":
+            yield from PDFProcessor.iter_token_chunks(pages, document_id)
+        else:
+            raise ValueError(f"Unknown chunking strategy: {strategy}")
+    
+    @staticmethod
+    def iter_page_chunks(pages: Iterable[Tuple[int, str]], document_id: str,
+                         strategy: str = CHUNKING_STRATEGY) -> Generator[Dict[str, Any], None, None]:
+        """
+        Chunk every page on its own, with content-derived IDs
+        
+        An edit to one page then changes only that page's chunks. Character
+        offsets and chunk_index are relative to the page (metadata offsets
+        is "page"), so chunks of unchanged pages stay identical even when
+        earlier pages grow or shrink.
+        
+        Args:
+            pages: Iterable of (page number, page text)
+            document_id: ID of the source document
+            strategy: "tokens" or "chars", as for iter_chunks
+            
+        Yields:
+            Dict: Chunk with id, text and metadata
+        """
+        for page_number, text in pages:
+            occurrences = Counter()
+            for chunk in PDFProcessor.iter_chunks([(page_number, text)], document_id, strategy):
+                occurrences[chunk["text"]] += 1
+                chunk["id"] = PDFProcessor.make_content_chunk_id(
+                    document_id, page_number, chunk["text"], occurrences[chunk["text"]]
+                )
+                chunk["metadata"]["offsets"] = "page"
+                yield chunk
+    
+    @staticmethod
+    def iter_token_chunks(pages: Iterable[Tuple[int, str]], document_id: str) -> Generator[Dict[str, Any], None, None]:
+        """
+        Split a stream of page texts into chunks of at most CHUNK_TOKENS tokens
+        
+        Chunks end at paragraph or sentence boundaries where possible and carry
+        their token count, so embedding batches need not re-tokenize them.
+        
+        Args:
+            pages: Iterable of (page number, page text)
+            document_id: ID of the source document
+            
+        Yields:
+            Dict: Chunk with id, text and metadata (including page_start/page_end and token_count)
+        """
+        for chunk_index, span in enumerate(TokenChunker().iter_spans(pages)):
+            yield {
+                "id": PDFProcessor.make_chunk_id(document_id, chunk_index),
+                "text": span.pop("text"),
+                "metadata": {"chunk_index": chunk_index, **span}
+            }
+    
+    @staticmethod
+    def iter_char_chunks(pages: Iterable[Tuple[int, str]], document_id: str) -> Generator[Dict[str, Any], None, None]:
+        """
+        Split a stream of page texts into overlapping fixed-size character chunks
+        
+        Produces the same chunks as slicing the concatenated text every
+        CHUNK_SIZE - CHUNK_OVERLAP characters, but only keeps roughly one
+        page plus one chunk of text in memory.
+        
+        Args:
+            pages: Iterable of (page number, page text)
+            document_id: ID of the source document
+            
+        Yields:
+            Dict: Chunk with id, text and metadata (including page_start/page_end)
+        """
+        step = CHUNK_SIZE - CHUNK_OVERLAP
+        buffer = ""
+        base = 0          # document offset of buffer[0]
+        pos = 0           # document offset of the next chunk
+        page_offsets = [] # document offset where each buffered page starts
+        page_numbers = []
+        chunk_index = 0
+        
+        def make_chunk(start: int, end: int):
+            chunk_text = buffer[start - base:end - base]
+            if not chunk_text.strip():
+                return None
+            first = page_numbers[bisect_right(page_offsets, start) - 1]
+            last = page_numbers[bisect_right(page_offsets, end - 1) - 1]
+            return {
+                "id": PDFProcessor.make_chunk_id(document_id, chunk_index),
+                "text": chunk_text,
+                "metadata": {
+                    "chunk_index": chunk_index,
+                    "char_start": start,
+                    "char_end": end,
+                    "page_start": first,
+                    "page_end": last
+                }
+            }
+        
+        for page_number, text in pages:
+            if not text:
+                continue
+            page_offsets.append(base + len(buffer))
+            page_numbers.append(page_number)
+            buffer += text
+            
+            while pos + CHUNK_SIZE <= base + len(buffer):
+                chunk = make_chunk(pos, pos + CHUNK_SIZE)
+                if chunk:
+                    chunk_index += 1
+                    yield chunk
+                pos += step
+            
+            # Drop text no future chunk can reach, and the pages that ended before it
+            if pos > base:
+                buffer = buffer[pos - base:]
+                base = pos
+                keep = bisect_right(page_offsets, base) - 1
+                del page_offsets[:keep]
+                del page_numbers[:keep]
+        
+        end = base + len(buffer)
+        while pos < end:
+            chunk = make_chunk(pos, min(pos + CHUNK_SIZE, end))
+            if chunk:
+                chunk_index += 1
+                yield chunk
+            pos += step
+    
+    @staticmethod
+    def create_chunks(text: str, document_id: str = None) -> List[Dict[str, Any]]:
         """
         Split text into chunks with specified size and overlap
         
         Args:
             text: Full text to be chunked
+            document_id: ID of the source document, derived from the text if not given
             
         Returns:
             List[Dict]: List of chunks with metadata
         """
         if not text:
             return []
+        
+        if document_id is None:
+            document_id = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        
+        return list(PDFProcessor.iter_chunks([(1, text)], document_id))
+    
+    @staticmethod
+    def stream_pdf(pdf_file, filename: str, document_id: str = None,
+                   pages: Optional[Iterable[Tuple[int, str]]] = None) -> Generator[Dict[str, Any], None, None]:
+        """
+        Lazily extract and chunk a PDF, yielding chunks as soon as they are complete
+        
+        Args:
+            pdf_file: File object of the uploaded PDF
+            filename: Name of the PDF file
+            document_id: Document content hash, computed from the file if not given
+            pages: Pages already extracted (e.g. in parallel) as from iter_pages, extracted here if None
             
-        chunks = []
+        Yields:
+            Dict: Chunk with metadata
+        """
+        if document_id is None:
+            document_id = PDFProcessor.compute_document_id(pdf_file)
         
-        # Generate overlapping chunks of text
-        for i in range(0, len(text), CHUNK_SIZE - CHUNK_OVERLAP):
-            chunk_text = text[i:i + CHUNK_SIZE]
+        # Time spent reading pages counts as "extract", the rest of producing chunks as "chunk"
+        telemetry = get_telemetry()
+        if pages is None:
+            pages = telemetry.iterate(PDFProcessor.iter_pages(pdf_file), "extract")
+        for chunk in telemetry.iterate(PDFProcessor.iter_chunks(pages, document_id), "chunk"):
+            # Add file metadata to each chunk
+            chunk["metadata"]["filename"] = filename
+            chunk["metadata"]["source"] = filename
+            chunk["metadata"]["document_id"] = document_id
+            yield chunk
+    
+    @staticmethod
+    def stream_revision(pdf_file, revision,
+                        pages: Optional[Iterable[Tuple[int, str, str, bool]]] = None
+                        ) -> Generator[Dict[str, Any], None, None]:
+        """
+        Lazily chunk a new revision of a document, extracting only pages not seen before
+        
+        Args:
+            pdf_file: File object of the uploaded PDF
+            revision: DocumentRevision planned by the ingestion manifest; records the pages it sees
+            pages: Pages already fingerprinted and extracted, as from iter_fingerprinted_pages;
+                read from pdf_file if None
             
-            if len(chunk_text.strip()) > 0:
-                chunk_id = str(uuid.uuid4())
-                chunks.append({
-                    "id": chunk_id,
-                    "text": chunk_text,
-                    "metadata": {
-                        "chunk_index": len(chunks),
-                        "char_start": i,
-                        "char_end": i + len(chunk_text)
-                    }
-                })
-                
-        return chunks
+        Yields:
+            Dict: Chunk with metadata
+        """
+        telemetry = get_telemetry()
+        if pages is None:
+            pages = telemetry.iterate(
+                PDFProcessor.iter_fingerprinted_pages(pdf_file, revision.known_texts), "extract"
+            )
+        pages = revision.track(pages)
+        for chunk in telemetry.iterate(PDFProcessor.iter_page_chunks(pages, revision.document_id), "chunk"):
+            chunk["metadata"]["filename"] = revision.filename
+            chunk["metadata"]["source"] = revision.filename
+            chunk["metadata"]["document_id"] = revision.document_id
+            yield chunk
     
     @staticmethod
     def process_pdf(pdf_file, filename: str) -> List[Dict[str, Any]]:
@@ -78,12 +435,4 @@ class PDFProcessor:
         Returns:
             List[Dict]: List of chunks with metadata
         """
-        text = PDFProcessor.extract_text_from_pdf(pdf_file)
-        chunks = PDFProcessor.create_chunks(text)
-        
-        # Add file metadata to each chunk
-        for chunk in chunks:
-            chunk["metadata"]["filename"] = filename
-            chunk["metadata"]["source"] = filename
-            
-        return chunks
+        return list(PDFProcessor.stream_pdf(pdf_file, filename))
@@ -0,0 +1,156 @@
+import re
+from typing import Any, Dict, Generator, Iterable, List, NamedTuple, Tuple
+from config.settings import EMBEDDING_MODEL, CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS
+from utils.tokenizer import get_encoding
+
+# A boundary is a blank line (paragraph) or whitespace after sentence punctuation
+_BOUNDARY = re.compile(r"\n[ \t]*\n\s*|(?<=[.!?])[\"')\]]*\s+")
+# Words with their leading whitespace, plus trailing whitespace; pieces concatenate back to the text
+_WORDS = re.compile(r"\s*\S+|\s+$")
+
+
+class _Segment(NamedTuple):
+    text: str
+    tokens: int
+    start: int          # document character offset
+    page: int
+    paragraph_end: bool
+
+
+class TokenChunker:
+    """
+    Token-budgeted chunker that prefers paragraph and sentence boundaries.
+
+    Each page is split into sentence-sized segments that are tokenized in a
+    single batch call, so text is never tokenized twice. Segments are packed
+    greedily up to max_tokens. A full chunk is cut at its last paragraph break
+    past the halfway point if there is one (the next chunk then starts at that
+    paragraph), otherwise after its last sentence, in which case the next chunk
+    repeats trailing sentences worth up to overlap_tokens.
+    """
+
+    def __init__(self, model: str = EMBEDDING_MODEL, max_tokens: int = CHUNK_TOKENS,
+                 overlap_tokens: int = CHUNK_OVERLAP_TOKENS):
+        """
+        Initialize the chunker
+
+        Args:
+            model: Model whose tokenizer defines the budget
+            max_tokens: Upper bound of tokens per chunk
+            overlap_tokens: Tokens repeated from the end of the previous chunk
+        """
+        self.encoding = get_encoding(model)
+        self.max_tokens = max_tokens
+        self.overlap_tokens = min(overlap_tokens, max_tokens // 2)
+
+    def _count(self, texts: List[str]) -> List[int]:
+        return [len(tokens) for tokens in self.encoding.encode_ordinary_batch(texts)]
+
+    def _segments(self, text: str, offset: int, page: int) -> List[_Segment]:
+        """Split a page into boundary-aligned segments and count their tokens in one call"""
+        pieces: List[Tuple[str, int, bool]] = []
+        previous = 0
+        for match in _BOUNDARY.finditer(text):
+            if match.end() > previous:
+                pieces.append((text[previous:match.end()], previous, match.group().count("\n") >= 2))
+                previous = match.end()
+        if previous < len(text):
+            pieces.append((text[previous:], previous, False))
+
+        segments = []
+        for (piece, start, paragraph_end), tokens in zip(pieces, self._count([p[0] for p in pieces])):
+            if tokens > self.max_tokens:
+                segments.extend(self._split_long(piece, offset + start, page, paragraph_end))
+            else:
+                segments.append(_Segment(piece, tokens, offset + start, page, paragraph_end))
+        return segments
+
+    def _split_long(self, text: str, start: int, page: int, paragraph_end: bool) -> List[_Segment]:
+        """Cut a segment longer than the budget at word boundaries (slow path, rare)"""
+        pieces: List[Tuple[str, int]] = []
+        words = _WORDS.findall(text)
+        for word, tokens in zip(words, self._count(words)):
+            if tokens > self.max_tokens:
+                # A single unbroken run of characters: cut it proportionally
+                step = max(1, len(word) * self.max_tokens // tokens)
+                parts = [word[i:i + step] for i in range(0, len(word), step)]
+                pieces.extend(zip(parts, self._count(parts)))
+            else:
+                pieces.append((word, tokens))
+
+        segments: List[_Segment] = []
+        current, current_tokens, offset = "", 0, start
+        for piece, tokens in pieces:
+            if current and current_tokens + tokens > self.max_tokens:
+                segments.append(_Segment(current, current_tokens, offset, page, False))
+                offset += len(current)
+                current, current_tokens = "", 0
+            current += piece
+            current_tokens += tokens
+        if current:
+            segments.append(_Segment(current, current_tokens, offset, page, paragraph_end))
+        return segments
+
+    @staticmethod
+    def _span(segments: List[_Segment]) -> Dict[str, Any]:
+        last = segments[-1]
+        return {
+            "text": "".join(segment.text for segment in segments),
+            "char_start": segments[0].start,
+            "char_end": last.start + len(last.text),
+            "page_start": segments[0].page,
+            "page_end": last.page,
+            "token_count": sum(segment.tokens for segment in segments)
+        }
+
+    def _cut(self, window: List[_Segment]) -> int:
+        """Number of segments to emit from a full window"""
+        tokens = 0
+        cut = len(window)
+        for i, segment in enumerate(window[:-1]):
+            tokens += segment.tokens
+            if segment.paragraph_end and tokens >= self.max_tokens // 2:
+                cut = i + 1
+        return cut
+
+    def _overlap(self, emitted: List[_Segment], room: int) -> List[_Segment]:
+        """Trailing segments of a chunk to repeat, never the whole chunk"""
+        budget = min(self.overlap_tokens, room)
+        carry: List[_Segment] = []
+        tokens = 0
+        for segment in reversed(emitted[1:]):
+            if tokens + segment.tokens > budget:
+                break
+            carry.insert(0, segment)
+            tokens += segment.tokens
+        return carry
+
+    def iter_spans(self, pages: Iterable[Tuple[int, str]]) -> Generator[Dict[str, Any], None, None]:
+        """
+        Chunk a stream of page texts
+
+        Args:
+            pages: Iterable of (page number, page text)
+
+        Yields:
+            Dict: text, char_start, char_end, page_start, page_end and token_count of each chunk
+        """
+        window: List[_Segment] = []
+        window_tokens = 0
+        offset = 0
+
+        for page_number, text in pages:
+            for segment in self._segments(text, offset, page_number):
+                while window and window_tokens + segment.tokens > self.max_tokens:
+                    cut = self._cut(window)
+                    emitted, rest = window[:cut], window[cut:]
+                    if any(s.text.strip() for s in emitted):
+                        yield self._span(emitted)
+                    window = rest or self._overlap(emitted, self.max_tokens - segment.tokens)
+                    window_tokens = sum(s.tokens for s in window)
+                window.append(segment)
+                window_tokens += segment.tokens
+            offset += len(text)
+
+        if any(s.text.strip() for s in window):
+            yield self._span(window)
@@ -0,0 +1,176 @@
+from functools import lru_cache
+from typing import Optional
+import logging
+import atexit
+import threading
+import openai
+from config.settings import SERVICE_WARMUP, CHAT_MODEL, EMBEDDING_MODEL, INGEST_EMBEDDED_WORKER
+from src.chat.chat_service import ChatService
+from src.database.vector_store import VectorStore, get_vector_store
+from src.embeddings.embedding_versions import EmbeddingVersionTracker
+from src.embeddings.embeddings_service import EmbeddingsService, create_openai_client
+from src.ingestion.document_registry import DocumentRegistry
+from src.ingestion.job_queue import JobQueue
+from src.ingestion.orchestrator import IngestionOrchestrator
+from src.ingestion.reindexer import Reindexer
+from src.ingestion.worker import IngestionWorker
+from utils.tokenizer import get_encoding
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceContainer:
+    """
+    Builds each service once per process and shares it between reruns.
+
+    Streamlit re-executes the page script on every interaction, but imported
+    modules persist, so services held here keep their HTTP connection pools,
+    caches and worker processes alive. Everything is built lazily on first
+    access; warm_up() does that in a background thread so the first question
+    does not pay for client construction, tokenizer loading or the initial
+    TLS handshakes.
+    """
+
+    def __init__(self):
+        """Initialize an empty container"""
+        self._lock = threading.RLock()
+        self._openai_client: Optional[openai.OpenAI] = None
+        self._embeddings_service: Optional[EmbeddingsService] = None
+        self._vector_store: Optional[VectorStore] = None
+        self._chat_service: Optional[ChatService] = None
+        self._ingestion: Optional[IngestionOrchestrator] = None
+        self._job_queue: Optional[JobQueue] = None
+        self._ingestion_worker: Optional[IngestionWorker] = None
+        self._embedding_versions: Optional[EmbeddingVersionTracker] = None
+        self._document_registry: Optional[DocumentRegistry] = None
+        self._reindexer: Optional[Reindexer] = None
+        self._warm_up_thread: Optional[threading.Thread] = None
+
+    @property
+    def openai_client(self) -> openai.OpenAI:
+        """OpenAI client on a pooled keep-alive connection, shared by all services"""
+        with self._lock:
+            if self._openai_client is None:
+                self._openai_client = create_openai_client()
+            return self._openai_client
+
+    @property
+    def embeddings_service(self) -> EmbeddingsService:
+        with self._lock:
+            if self._embeddings_service is None:
+                self._embeddings_service = EmbeddingsService(self.openai_client)
+            return self._embeddings_service
+
+    @property
+    def vector_store(self) -> VectorStore:
+        with self._lock:
+            if self._vector_store is None:
+                self._vector_store = get_vector_store()
+            return self._vector_store
+
+    @property
+    def embedding_versions(self) -> EmbeddingVersionTracker:
+        """Keeps the shared embeddings service on the model of the store's active embedding version"""
+        with self._lock:
+            if self._embedding_versions is None:
+                self._embedding_versions = EmbeddingVersionTracker(self.embeddings_service, self.vector_store)
+            return self._embedding_versions
+
+    @property
+    def document_registry(self) -> DocumentRegistry:
+        with self._lock:
+            if self._document_registry is None:
+                self._document_registry = DocumentRegistry(self.vector_store)
+            return self._document_registry
+
+    @property
+    def reindexer(self) -> Reindexer:
+        """Re-indexer to EMBEDDING_MODEL, on its own embeddings service so queries keep the active model"""
+        with self._lock:
+            if self._reindexer is None:
+                self._reindexer = Reindexer(self.vector_store, EmbeddingsService(self.openai_client))
+            return self._reindexer
+
+    @property
+    def chat_service(self) -> ChatService:
+        with self._lock:
+            if self._chat_service is None:
+                self._chat_service = ChatService(self.embeddings_service, self.vector_store, self.openai_client)
+            return self._chat_service
+
+    @property
+    def ingestion(self) -> IngestionOrchestrator:
+        """Ingestion orchestrator whose worker processes are reused across uploads"""
+        with self._lock:
+            if self._ingestion is None:
+                self._ingestion = IngestionOrchestrator(self.embeddings_service, self.vector_store)
+            return self._ingestion
+
+    @property
+    def job_queue(self) -> JobQueue:
+        """
+        Ingestion job queue; uploads are queued here and processed by a worker
+
+        With INGEST_EMBEDDED_WORKER a worker thread in this process serves the
+        queue; otherwise run `python -m src.ingestion.cli work` alongside the app.
+        """
+        with self._lock:
+            if self._job_queue is None:
+                self._job_queue = JobQueue()
+            if INGEST_EMBEDDED_WORKER and self._ingestion_worker is None:
+                self._ingestion_worker = IngestionWorker(self._job_queue, self.ingestion)
+                self._ingestion_worker.start()
+            return self._job_queue
+
+    def _warm_up(self, connect: bool) -> None:
+        try:
+            self.chat_service
+            get_encoding(EMBEDDING_MODEL)
+            get_encoding(CHAT_MODEL)
+            if connect:
+                # Open pooled connections now; failures surface later on real requests
+                self.embedding_versions.sync()
+                self.openai_client.models.list()
+        except Exception as e:
+            logger.error("Service warm-up incomplete: %s", e)
+
+    def warm_up(self, connect: bool = True) -> None:
+        """
+        Build the services in a background thread (once per process)
+
+        Args:
+            connect: Also open the HTTP connections to OpenAI and the vector store
+        """
+        with self._lock:
+            if self._warm_up_thread is None:
+                self._warm_up_thread = threading.Thread(
+                    target=self._warm_up, args=(connect,), name="service-warm-up", daemon=True
+                )
+                self._warm_up_thread.start()
+
+    def close(self) -> None:
+        """Stop worker processes and close HTTP connections"""
+        with self._lock:
+            if self._reindexer is not None:
+                self._reindexer.stop(timeout=5)
+            if self._ingestion_worker is not None:
+                self._ingestion_worker.stop(timeout=5)
+            if self._ingestion is not None:
+                self._ingestion.shutdown()
+            if self._openai_client is not None:
+                self._openai_client.close()
+
+
+@lru_cache(maxsize=None)
+def get_container() -> ServiceContainer:
+    """
+    Process-wide service container
+
+    Returns:
+        ServiceContainer: Shared container, warming up in the background if SERVICE_WARMUP is set
+    """
+    container = ServiceContainer()
+    atexit.register(container.close)
+    if SERVICE_WARMUP:
+        container.warm_up()
+    return container
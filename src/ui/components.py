@@ -1,4 +1,5 @@
 import streamlit as st
+from config.settings import CHAT_RENDER_MESSAGES
 
 class UIComponents:
     """
@@ -12,10 +13,13 @@ class UIComponents:
         st.write("Upload PDF documents and chat with them using AI")
     
     @staticmethod
-    def render_pdf_uploader():
+    def render_pdf_uploader(key=None):
         """
         Render the PDF file uploader
         
+        Args:
+            key: Widget key; a new key renders an empty uploader
+            
         Returns:
             uploaded_files: List of uploaded PDF files
         """
@@ -23,7 +27,8 @@ class UIComponents:
         uploaded_files = st.file_uploader(
             "Choose PDF files", 
             type="pdf", 
-            accept_multiple_files=True
+            accept_multiple_files=True,
+            key=key
         )
         return uploaded_files
     
@@ -34,6 +39,44 @@ class UIComponents:
         status_container.info(status_text)
         return status_container
     
+    @staticmethod
+    def render_ingest_job(job):
+        """
+        Render the status of an ingestion job
+        
+        Args:
+            job: Job from the ingestion job queue
+        """
+        filename = job["filename"]
+        progress = job.get("progress") or {}
+        details = job.get("result") or {}
+        if job["status"] == "queued":
+            st.info(f"Queued {filename}...")
+        elif job["status"] == "running" and progress.get("stage") == "storing":
+            st.info(f"Embedding and storing {filename}: "
+                    f"{progress.get('stored', 0)}/{progress.get('chunks', 0)} chunks...")
+        elif job["status"] == "running":
+            st.info(f"Extracting text from {filename}...")
+        elif job["status"] == "skipped":
+            st.success(f"{filename} is already indexed")
+        elif job["status"] == "done":
+            if details.get("page_overlap") is not None:
+                message = (f"Updated the earlier upload of {filename} ({details['page_overlap']:.0%} of its pages "
+                           f"unchanged) to this revision ({details.get('chunks', 0)} chunks)")
+            else:
+                message = f"Successfully processed {filename} ({details.get('chunks', 0)} chunks)"
+            if details.get("unchanged") or details.get("deleted"):
+                message += (f": {details['unchanged']} unchanged, {details['stored']} new, "
+                            f"{details['deleted']} removed")
+            if details.get("pages_reused"):
+                message += f"; {details['pages_reused']} of {details['pages']} pages reused without extraction"
+            st.success(message)
+            if details.get("name_taken"):
+                st.warning(f"Another document named {filename} is stored; this file shares too few of its pages "
+                           f"to be a revision, so both are kept. Delete the one you no longer need.")
+        else:
+            st.error(f"Error processing {filename}: {job.get('error')}")
+    
     @staticmethod
     def render_chat_interface():
         """
@@ -48,14 +91,19 @@ class UIComponents:
         if "chat_history" not in st.session_state:
             st.session_state.chat_history = []
         
-        # Display chat history
+        # Display chat history; every rerun redraws it, so only the latest messages
+        # are drawn unless the user asks for the rest
+        history = st.session_state.chat_history
         chat_container = st.container()
         with chat_container:
-            for message in st.session_state.chat_history:
-                if message["role"] == "user":
-                    st.markdown(f"**You:** {message['content']}")
-                else:
-                    st.markdown(f"**AI:** {message['content']}")
+            shown = history
+            if len(history) > CHAT_RENDER_MESSAGES and not st.session_state.get("show_full_history"):
+                shown = history[-CHAT_RENDER_MESSAGES:]
+                if st.button(f"Show {len(history) - len(shown)} earlier messages"):
+                    st.session_state.show_full_history = True
+                    st.rerun()
+            for message in shown:
+                UIComponents.render_message(message)
         
         # Chat input
         query = st.chat_input("Ask something about your documents")
@@ -63,28 +111,158 @@ class UIComponents:
         return query
     
     @staticmethod
-    def add_message_to_history(role, content):
+    def render_message(message):
+        """
+        Render one chat history message
+        
+        Args:
+            message: History entry with role, content and, for answers, metrics
+        """
+        if "markdown" not in message:
+            # Built once per message rather than on every rerun
+            speaker = "You" if message["role"] == "user" else "AI"
+            message["markdown"] = f"**{speaker}:** {message['content']}"
+        st.markdown(message["markdown"])
+        if message["role"] != "user":
+            UIComponents.render_latency(message.get("metrics"))
+    
+    @staticmethod
+    def render_streaming_answer(query, stream):
+        """
+        Render a question and its answer as the answer is generated
+        
+        Args:
+            query: User query
+            stream: AnswerStream of answer deltas
+            
+        Returns:
+            str: The complete (or partial, if cancelled) answer
+        """
+        st.markdown(f"**You:** {query}")
+        placeholder = st.empty()
+        placeholder.markdown("*Searching your documents...*")
+        try:
+            for _ in stream:
+                placeholder.markdown(f"**AI:** {stream.text}▌")
+        finally:
+            # A new question interrupts this script run; stop generating
+            stream.close()
+        placeholder.markdown(f"**AI:** {stream.text}")
+        UIComponents.render_latency(stream.metrics)
+        return stream.text
+    
+    @staticmethod
+    def render_latency(metrics):
+        """
+        Render the latency of an answer below it
+        
+        Args:
+            metrics: Dictionary with ttft_seconds and total_seconds
+        """
+        if metrics and metrics.get("total_seconds") is not None:
+            ttft = metrics.get("ttft_seconds")
+            first = f"first token {ttft:.2f}s · " if ttft is not None else ""
+            cached = {"answer": " · from cache", "context": " · reused context"}.get(metrics.get("cache"), "")
+            st.caption(f"{first}total {metrics['total_seconds']:.2f}s{cached}")
+    
+    @staticmethod
+    def add_message_to_history(role, content, metrics=None):
         """
         Add a message to the chat history
         
         Args:
             role: Role of the message sender (user/assistant)
             content: Content of the message
+            metrics: Optional latency metrics of an answer
         """
-        st.session_state.chat_history.append({
+        message = {
             "role": role,
             "content": content
-        })
+        }
+        if metrics:
+            message["metrics"] = metrics
+        st.session_state.chat_history.append(message)
+    
+    @staticmethod
+    def render_document_list(documents):
+        """
+        Render the stored documents, each with a delete button
+        
+        Args:
+            documents: Registry rows with document_id, filename, chunk_count and status
+            
+        Returns:
+            str: ID of the document whose delete button was clicked, or None
+        """
+        clicked = None
+        if documents:
+            st.sidebar.subheader("Documents")
+            for document in documents:
+                name, delete = st.sidebar.columns([5, 1])
+                status = "" if document.get("status") == "committed" else f" ({document.get('status')})"
+                name.text(f"• {document.get('filename') or document['document_id']}{status}")
+                name.caption(f"{document.get('chunk_count') or 0} chunks")
+                if delete.button("✕", key=f"delete_{document['document_id']}", help="Delete this document"):
+                    clicked = document["document_id"]
+        return clicked
+    
+    @staticmethod
+    def render_embedding_version(active, target_model, progress, needed):
+        """
+        Render the embedding model of the stored vectors and the re-index controls
+        
+        Args:
+            active: Active embedding version (model and dimensions), or None if unknown
+            target_model: Model a re-index would switch to (EMBEDDING_MODEL)
+            progress: Progress counters of the re-indexer
+            needed: Whether the stored vectors come from another model than target_model
+            
+        Returns:
+            bool: Whether a re-index was requested
+        """
+        state = progress.get("state")
+        if state == "running":
+            st.sidebar.info(f"Re-indexing to {progress['model']}: {progress.get('embedded', 0)} chunks embedded. "
+                            f"Answers use {active['model'] if active else 'the current model'} until it is done.")
+            return False
+        if state == "failed":
+            st.sidebar.error(f"Re-index failed: {progress.get('error')}")
+        if not needed:
+            return False
+        st.sidebar.warning(f"Documents are indexed with {active['model']}; EMBEDDING_MODEL is {target_model}.")
+        return st.sidebar.button(f"Re-index with {target_model}")
+    
+    @staticmethod
+    def render_cache_stats(stats, title="Embedding Cache"):
+        """
+        Render cache counters in the sidebar
+        
+        Args:
+            stats: Dictionary with hits, misses and hit_rate
+            title: Name of the cache
+        """
+        if stats and stats.get("hits", 0) + stats.get("misses", 0) > 0:
+            st.sidebar.subheader(title)
+            st.sidebar.text(f"Hits: {stats['hits']}  Misses: {stats['misses']}")
+            st.sidebar.text(f"Hit rate: {stats['hit_rate']:.0%}")
     
     @staticmethod
-    def render_document_list(document_names):
+    def render_debug_panel(traces):
         """
-        Render the list of processed documents
+        Render per-stage timings of recent queries in the sidebar
         
         Args:
-            document_names: List of document names
+            traces: Recent query traces, newest first
         """
-        if document_names:
-            st.sidebar.subheader("Processed Documents")
-            for doc in document_names:
-                st.sidebar.text(f"• {doc}")
+        if not traces:
+            return
+        with st.sidebar.expander("Query Timings", expanded=False):
+            rows = []
+            for trace in traces:
+                row = {"query": trace.attributes.get("query", "")}
+                for stage in ("summarize", "condense", "query_embed", "search", "rerank", "pack", "generate"):
+                    row[f"{stage} ms"] = round(trace.stages.get(stage, 0.0) * 1000)
+                row["total ms"] = round((trace.total or 0.0) * 1000)
+                row["cache"] = trace.attributes.get("cache", "")
+                rows.append(row)
+            st.dataframe(rows, hide_index=True)
@@ -1,9 +1,19 @@
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
 import streamlit as st
+from config.settings import (CONVERSATION_ENABLED, DEBUG_PANEL_ENABLED, EMBEDDING_MODEL, INGEST_POLL_SECONDS,
+                             INGEST_SESSION_MAX_MB, INGEST_UPLOAD_DIR)
+from src.chat.conversation import Conversation
 from src.ui.components import UIComponents
 from src.pdf.pdf_processor import PDFProcessor
-from src.embeddings.embeddings_service import EmbeddingsService
-from src.database.supabase_client import SupabaseClient
-from src.chat.chat_service import ChatService
+from src.services.container import get_container
+from utils.telemetry import get_telemetry
+
+logger = logging.getLogger(__name__)
 
 class AppPages:
     """
@@ -11,16 +21,161 @@ class AppPages:
     """
     
     def __init__(self):
-        """Initialize app dependencies"""
+        """Initialize app dependencies (shared across reruns by the service container)"""
+        self.services = get_container()
         self.pdf_processor = PDFProcessor()
-        self.embedding_service = EmbeddingsService()
-        self.db_client = SupabaseClient()
-        self.chat_service = ChatService()
         self.ui = UIComponents()
         
-        # Initialize session state
-        if "processed_docs" not in st.session_state:
-            st.session_state.processed_docs = []
+        # Initialize session state; the stored documents are read from the registry, not kept per session
+        if "documents" not in st.session_state:
+            st.session_state.documents = None
+        if "processed_uploads" not in st.session_state:
+            st.session_state.processed_uploads = set()
+        if "ingest_jobs" not in st.session_state:
+            st.session_state.ingest_jobs = []
+        if "ingest_job_bytes" not in st.session_state:
+            st.session_state.ingest_job_bytes = {}
+        if "uploader_key" not in st.session_state:
+            st.session_state.uploader_key = 0
+        if "conversation" not in st.session_state:
+            st.session_state.conversation = Conversation() if CONVERSATION_ENABLED else None
+    
+    # Services are resolved on first use so the page starts rendering while they warm up
+    @property
+    def embedding_service(self):
+        return self.services.embeddings_service
+    
+    @property
+    def db_client(self):
+        return self.services.vector_store
+    
+    @property
+    def chat_service(self):
+        return self.services.chat_service
+    
+    @property
+    def job_queue(self):
+        return self.services.job_queue
+    
+    @property
+    def document_registry(self):
+        return self.services.document_registry
+    
+    def stored_documents(self) -> list:
+        """
+        Documents in the vector store, read once per session and again after uploads or deletes
+        
+        Returns:
+            list: Registry rows, most recently updated first
+        """
+        if st.session_state.documents is None:
+            try:
+                st.session_state.documents = self.document_registry.list_documents()
+            except Exception as e:
+                logger.error("Could not list documents: %s", e)
+                return []
+        return st.session_state.documents
+    
+    def delete_document(self, document_id: str) -> None:
+        """
+        Delete a stored document and refresh the list
+        
+        Args:
+            document_id: Document ID
+        """
+        try:
+            with st.spinner("Deleting document..."):
+                deleted = self.document_registry.delete_document(document_id)
+        except Exception as e:
+            st.sidebar.error(f"Error deleting document: {str(e)}")
+            return
+        st.toast(f"Deleted {deleted} chunks")
+        st.session_state.documents = None
+        st.rerun()
+    
+    def render_reindex(self) -> bool:
+        """
+        Show the embedding model of the stored vectors and offer a re-index to EMBEDDING_MODEL
+        
+        Returns:
+            bool: Whether a re-index is running in this process
+        """
+        active = self.services.embedding_versions.sync()
+        reindexer = self.services.reindexer
+        needed = active is not None and not reindexer.targets(active)
+        if self.ui.render_embedding_version(active, EMBEDDING_MODEL, reindexer.progress, needed):
+            reindexer.start()
+        return reindexer.running
+    
+    @staticmethod
+    def spill_upload(pdf_file) -> str:
+        """
+        Write an upload to a temporary file in INGEST_UPLOAD_DIR so a worker can map it
+        
+        Args:
+            pdf_file: Streamlit UploadedFile
+            
+        Returns:
+            str: Path of the written file
+        """
+        os.makedirs(INGEST_UPLOAD_DIR, exist_ok=True)
+        pdf_file.seek(0)
+        with tempfile.NamedTemporaryFile(dir=INGEST_UPLOAD_DIR, prefix=f"{pdf_file.file_id}-", suffix=".pdf",
+                                         delete=False) as file:
+            # Copied in blocks: no second copy of the whole upload in memory
+            shutil.copyfileobj(pdf_file, file, 2**20)
+        return file.name
+    
+    def queue_uploads(self, files) -> list:
+        """
+        Queue uploads for ingestion, within the session's INGEST_SESSION_MAX_MB
+        
+        A file that would take the bytes this session has queued or in
+        ingestion over the ceiling waits for earlier jobs to finish. A file
+        is always queued when nothing else is, however large.
+        
+        Args:
+            files: New Streamlit UploadedFiles, in upload order
+            
+        Returns:
+            list: Files left waiting
+        """
+        limit = INGEST_SESSION_MAX_MB * 2**20
+        pending = sum(st.session_state.ingest_job_bytes.values())
+        for index, pdf_file in enumerate(files):
+            if limit and pending and pending + pdf_file.size > limit:
+                return files[index:]
+            job_id = self.job_queue.enqueue(self.spill_upload(pdf_file), pdf_file.name, remove_after=True)
+            st.session_state.ingest_jobs.append(job_id)
+            st.session_state.ingest_job_bytes[job_id] = pdf_file.size
+            st.session_state.processed_uploads.add(pdf_file.file_id)
+            pending += pdf_file.size
+        return []
+    
+    def render_ingest_jobs(self) -> bool:
+        """
+        Show the status of this session's ingestion jobs
+        
+        Finished jobs are shown once and then forgotten.
+        
+        Returns:
+            bool: Whether any job is still queued or running
+        """
+        jobs = self.job_queue.get(st.session_state.ingest_jobs)
+        active = []
+        for job_id in st.session_state.ingest_jobs:
+            job = jobs.get(job_id)
+            if job is None:
+                continue
+            if job["status"] in ("queued", "running"):
+                active.append(job_id)
+            else:
+                st.session_state.documents = None
+            self.ui.render_ingest_job(job)
+        st.session_state.ingest_jobs = active
+        st.session_state.ingest_job_bytes = {job_id: size for job_id, size in st.session_state.ingest_job_bytes.items()
+                                             if job_id in active}
+        return bool(active)
     
     def main_page(self):
         """Render the main application page"""
@@ -28,53 +183,65 @@ class AppPages:
         self.ui.render_header()
         
         # Handle PDF upload
-        uploaded_files = self.ui.render_pdf_uploader()
+        uploaded_files = self.ui.render_pdf_uploader(key=f"pdf_uploader_{st.session_state.uploader_key}")
         
-        # Process uploaded PDFs
-        if uploaded_files:
-            for pdf_file in uploaded_files:
-                if pdf_file.name not in st.session_state.processed_docs:
-                    status = self.ui.render_processing_status(f"Processing {pdf_file.name}...")
-                    
-                    try:
-                        # Process PDF
-                        chunks = self.pdf_processor.process_pdf(pdf_file, pdf_file.name)
-                        status.info(f"Generating embeddings for {pdf_file.name}...")
-                        
-                        # Generate embeddings
-                        chunks_with_embeddings = self.embedding_service.generate_batch_embeddings(chunks)
-                        status.info(f"Storing document in the database...")
-                        
-                        # Store in database
-                        self.db_client.store_document_chunks(chunks_with_embeddings)
-                        
-                        # Update processed documents list
-                        st.session_state.processed_docs.append(pdf_file.name)
-                        status.success(f"Successfully processed {pdf_file.name}")
-                    except Exception as e:
-                        status.error(f"Error processing {pdf_file.name}: {str(e)}")
+        # Queue new uploads; a worker ingests them outside this session and the page polls
+        # Uploads are told apart by upload ID, not name; the manifest recognises known content
+        new_files = [f for f in uploaded_files or [] if f.file_id not in st.session_state.processed_uploads]
+        waiting = self.queue_uploads(new_files)
+        ingesting = self.render_ingest_jobs() or bool(waiting)
+        for pdf_file in waiting:
+            st.info(f"Waiting to queue {pdf_file.name} until earlier uploads are ingested...")
+        if uploaded_files and not waiting:
+            # Every upload is on disk: a new, empty uploader lets Streamlit free the in-memory copies
+            st.session_state.uploader_key += 1
         
-        # Render document list in sidebar
-        self.ui.render_document_list(st.session_state.processed_docs)
+        # Render the stored documents in the sidebar
+        documents = self.stored_documents()
+        deleted = self.ui.render_document_list(documents)
+        if deleted:
+            self.delete_document(deleted)
+        reindexing = self.render_reindex()
+        self.ui.render_cache_stats(self.embedding_service.cache_stats())
+        chat_cache_stats = self.chat_service.cache_stats()
+        if chat_cache_stats:
+            self.ui.render_cache_stats(chat_cache_stats["answer"], "Answer Cache")
+            self.ui.render_cache_stats(chat_cache_stats["retrieval"], "Retrieval Cache")
+        if DEBUG_PANEL_ENABLED:
+            self.ui.render_debug_panel(get_telemetry().recent_traces("query"))
         
-        # Show chat interface only if there are processed documents
-        if st.session_state.processed_docs:
+        # Show chat interface only if there are stored documents
+        if any(document.get("status") == "committed" for document in documents):
             query = self.ui.render_chat_interface()
             
             if query:
+                # Stop an answer still being generated for the previous question
+                previous = st.session_state.get("answer_cancel")
+                if previous is not None:
+                    previous.set()
+                cancel_event = threading.Event()
+                st.session_state.answer_cancel = cancel_event
+                
                 # Add user query to chat history
                 self.ui.add_message_to_history("user", query)
                 
                 try:
-                    # Process query
-                    response = self.chat_service.process_query(query)
-                    
-                    # Add response to chat history
-                    self.ui.add_message_to_history("assistant", response["answer"])
-                    
-                    # Force a rerun to show the updated chat history
-                    st.rerun()
+                    # Stream the answer into the page as it is generated
+                    stream = self.chat_service.stream_query(query, cancel_event,
+                                                            conversation=st.session_state.conversation)
+                    try:
+                        self.ui.render_streaming_answer(query, stream)
+                    finally:
+                        # Add response to chat history, keeping partial answers of interrupted runs
+                        if stream.text:
+                            self.ui.add_message_to_history("assistant", stream.text, stream.metrics)
+                    logger.debug("Answer latency: %s", stream.metrics)
                 except Exception as e:
                     st.error(f"Error: {str(e)}")
-        else:
+        elif not ingesting:
             st.info("Upload and process PDF documents to start chatting")
+        
+        if ingesting or reindexing:
+            # Poll the queue by re-running the page; the session is never blocked on ingestion
+            time.sleep(INGEST_POLL_SECONDS)
+            st.rerun()
@@ -0,0 +1,88 @@
+import asyncio
+import concurrent.futures
+import contextvars
+import threading
+from functools import lru_cache
+from typing import Any, Awaitable, Optional
+
+
+def _copy_result(task: asyncio.Future, future: concurrent.futures.Future) -> None:
+    if future.done():
+        return
+    if task.cancelled():
+        future.cancel()
+    elif task.exception() is not None:
+        future.set_exception(task.exception())
+    else:
+        future.set_result(task.result())
+
+
+class BackgroundLoop:
+    """
+    An asyncio event loop running in a daemon thread.
+
+    Synchronous callers (Streamlit sessions each run on their own thread)
+    submit coroutines with run(); all of them share one loop, so concurrent
+    users are multiplexed over the same async HTTP connection pools instead
+    of each blocking a thread on I/O.
+    """
+
+    def __init__(self):
+        """Start the loop thread"""
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="async-io", daemon=True)
+        self._thread.start()
+
+    def run(self, coroutine: Awaitable, timeout: Optional[float] = None) -> Any:
+        """
+        Run a coroutine on the loop and wait for its result
+
+        Args:
+            coroutine: Coroutine to run
+            timeout: Seconds to wait before giving up (None waits forever)
+
+        Returns:
+            Any: The coroutine's result
+        """
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("BackgroundLoop.run() called from the loop thread; await the coroutine instead")
+        future: concurrent.futures.Future = concurrent.futures.Future()
+
+        def start() -> None:
+            # Created inside the caller's context, so context variables (e.g. the
+            # telemetry trace of the current query) follow the coroutine
+            task = self.loop.create_task(coroutine)
+            future.add_done_callback(lambda f: f.cancelled() and self.loop.call_soon_threadsafe(task.cancel))
+            task.add_done_callback(lambda t: _copy_result(t, future))
+
+        self.loop.call_soon_threadsafe(start, context=contextvars.copy_context())
+        try:
+            return future.result(timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+
+@lru_cache(maxsize=None)
+def get_background_loop() -> BackgroundLoop:
+    """
+    Process-wide background event loop
+
+    Returns:
+        BackgroundLoop: Shared loop
+    """
+    return BackgroundLoop()
+
+
+def run_async(coroutine: Awaitable, timeout: Optional[float] = None) -> Any:
+    """
+    Run a coroutine on the shared background loop from synchronous code
+
+    Args:
+        coroutine: Coroutine to run
+        timeout: Seconds to wait before giving up
+
+    Returns:
+        Any: The coroutine's result
+    """
+    return get_background_loop().run(coroutine, timeout)
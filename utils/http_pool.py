@@ -0,0 +1,84 @@
+import socket
+import httpcore
+import httpx
+from httpcore.backends.sync import SyncBackend
+from config.settings import (
+    HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE_CONNECTIONS, HTTP_KEEPALIVE_EXPIRY, HTTP_TIMEOUT
+)
+
+
+class _NoDelayBackend(SyncBackend):
+    """
+    Network backend that disables Nagle's algorithm on new connections.
+
+    httpcore writes request headers and body separately; on a reused
+    connection Nagle holds the body back until the server's delayed ACK for
+    the headers, adding ~40 ms to every request with a body.
+    """
+
+    def connect_tcp(self, *args, **kwargs):
+        stream = super().connect_tcp(*args, **kwargs)
+        sock = stream.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return stream
+
+
+def pool_limits() -> httpx.Limits:
+    """
+    Connection pool limits shared by every HTTP client of the app
+
+    Returns:
+        httpx.Limits: Limits built from the HTTP_* settings
+    """
+    return httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+    )
+
+
+def create_transport() -> httpx.HTTPTransport:
+    """
+    Create a keep-alive transport with the shared pool limits and TCP_NODELAY
+
+    Returns:
+        httpx.HTTPTransport: Pooled transport
+    """
+    transport = httpx.HTTPTransport(limits=pool_limits())
+    pool = getattr(transport, "_pool", None)
+    if isinstance(pool, httpcore.ConnectionPool) and hasattr(pool, "_network_backend"):
+        pool._network_backend = _NoDelayBackend()
+    return transport
+
+
+def create_http_client(**kwargs) -> httpx.Client:
+    """
+    Create a keep-alive HTTP client using the shared pool settings
+
+    Args:
+        **kwargs: Extra httpx.Client arguments (base_url, headers, timeout, ...)
+
+    Returns:
+        httpx.Client: Pooled client
+    """
+    kwargs.setdefault("timeout", HTTP_TIMEOUT)
+    return httpx.Client(transport=create_transport(), **kwargs)
+
+
+def create_async_http_client(**kwargs) -> httpx.AsyncClient:
+    """
+    Create a keep-alive async HTTP client using the shared pool settings
+
+    The client's connections belong to the event loop that first uses it,
+    so it should only be used from one loop (see utils.async_loop).
+    anyio already sets TCP_NODELAY on the connections it opens.
+
+    Args:
+        **kwargs: Extra httpx.AsyncClient arguments (base_url, headers, timeout, ...)
+
+    Returns:
+        httpx.AsyncClient: Pooled client
+    """
+    kwargs.setdefault("timeout", HTTP_TIMEOUT)
+    return httpx.AsyncClient(limits=pool_limits(), **kwargs)
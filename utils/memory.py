@@ -0,0 +1,134 @@
+"""
+Memory bounds for ingestion.
+
+- MemoryBudget: bytes of chunks and embeddings held by ingestion at once.
+  Producers wait for room before passing on more work and give it back once
+  the work is persisted, so concurrent uploads slow down instead of growing
+  the process without bound. One budget (INGEST_MEMORY_LIMIT_MB) is shared
+  by every pipeline in the process.
+- mapped_file(): a PDF on disk as a read-only memory map. Readers seek and
+  read it like a file, but its pages come from the OS page cache, which can
+  drop them under pressure, instead of from a private copy on the heap.
+- rss_bytes(): resident set size of the process, for reports and benchmarks.
+"""
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, Iterator, Optional
+import io
+import mmap
+import os
+import threading
+from config.settings import INGEST_MEMORY_LIMIT_MB
+from utils.telemetry import get_telemetry
+
+
+class MemoryBudget:
+    """
+    Byte budget shared by concurrent producers.
+
+    acquire() blocks while the bytes held would go over the limit. A request
+    larger than the whole limit is let through once nothing else is held, so
+    an oversized batch is slowed down rather than blocked for good.
+    """
+
+    def __init__(self, limit_bytes: int):
+        """
+        Initialize an empty budget
+
+        Args:
+            limit_bytes: Bytes that may be held at once; 0 for no limit
+        """
+        self.limit = limit_bytes
+        self.used = 0
+        self.peak = 0
+        self.waits = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, size: int, cancelled: Optional[threading.Event] = None) -> bool:
+        """
+        Reserve bytes, waiting until they fit
+
+        Args:
+            size: Bytes to reserve
+            cancelled: Stop waiting once this is set
+
+        Returns:
+            bool: Whether the bytes were reserved (False only if cancelled)
+        """
+        with self._condition:
+            waited = False
+            while self.limit > 0 and self.used and self.used + size > self.limit:
+                if cancelled is not None and cancelled.is_set():
+                    return False
+                if not waited:
+                    waited = True
+                    self.waits += 1
+                    get_telemetry().inc("ingest_memory_waits")
+                self._condition.wait(0.1)
+            self.used += size
+            self.peak = max(self.peak, self.used)
+            return True
+
+    def release(self, size: int) -> None:
+        """
+        Give back reserved bytes
+
+        Args:
+            size: Bytes reserved earlier
+        """
+        with self._condition:
+            self.used = max(0, self.used - size)
+            self._condition.notify_all()
+
+    def stats(self) -> Dict[str, int]:
+        """Limit, bytes held, peak bytes held and the number of waits"""
+        with self._condition:
+            return {"limit": self.limit, "used": self.used, "peak": self.peak, "waits": self.waits}
+
+
+@lru_cache(maxsize=None)
+def get_memory_budget() -> MemoryBudget:
+    """
+    Process-wide ingestion memory budget
+
+    Returns:
+        MemoryBudget: Budget of INGEST_MEMORY_LIMIT_MB
+    """
+    return MemoryBudget(INGEST_MEMORY_LIMIT_MB * 2**20)
+
+
+@contextmanager
+def mapped_file(path: str) -> Iterator[io.IOBase]:
+    """
+    Open a file as a read-only memory map
+
+    Args:
+        path: File to map
+
+    Yields:
+        File-like object (read, seek, tell) over the file's contents
+    """
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            # Empty files cannot be mapped
+            yield io.BytesIO(b"")
+            return
+        mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield mapping
+        finally:
+            mapping.close()
+
+
+def rss_bytes() -> int:
+    """
+    Resident set size of this process
+
+    Returns:
+        int: Bytes, or 0 where /proc is not available
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
@@ -0,0 +1,488 @@
+"""
+Deadlines, retries, hedging and circuit breaking for calls to OpenAI and Supabase.
+
+- Deadline: a question gets QUERY_DEADLINE_SECONDS overall. deadline_scope()
+  makes it current (in a context variable, so it follows the query into the
+  background event loop), stage_deadline() caps one stage at a share of it,
+  and request_timeout() turns what is left into the timeout of the next HTTP
+  request.
+- Retries: call_with_retry() retries transient failures with exponential
+  backoff and full jitter, and gives up early when the deadline could not
+  absorb the next wait.
+- Hedging: hedged() and ahedged() send a duplicate of a latency-critical
+  request when the first has not answered within a delay, and take
+  whichever answers first.
+- Circuit breaking: one CircuitBreaker per upstream. After
+  CIRCUIT_FAILURE_THRESHOLD consecutive transient failures, calls fail at once
+  with CircuitOpenError for CIRCUIT_RESET_SECONDS. Then a single trial call
+  decides whether the circuit closes again.
+
+Outside a deadline scope (e.g. ingestion), requests keep HTTP_TIMEOUT.
+"""
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Iterator, Optional
+import asyncio
+import contextvars
+import logging
+import random
+import threading
+import time
+from config.settings import (
+    HTTP_TIMEOUT, RETRY_BASE_DELAY, RETRY_MAX_DELAY, CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_SECONDS
+)
+from utils.telemetry import get_telemetry
+
+logger = logging.getLogger(__name__)
+
+# Threads that run hedged calls; a losing request keeps its thread until it ends
+_HEDGE_WORKERS = 16
+
+
+class DeadlineExceeded(TimeoutError):
+    """The query's deadline passed before a call could be made"""
+
+
+class CircuitOpenError(RuntimeError):
+    """An upstream's circuit breaker is open, so the call was not attempted"""
+
+
+class Deadline:
+    """
+    A point in time by which a query must be done.
+
+    Child deadlines made by split() expire no later than their parent; total
+    stays the parent's, so every stage's share is of the whole budget.
+    """
+
+    def __init__(self, seconds: float, parent: Optional["Deadline"] = None):
+        """
+        Start the clock
+
+        Args:
+            seconds: Time allowed from now
+            parent: Deadline this one may not outlive
+        """
+        self.total = parent.total if parent is not None else seconds
+        self.expires = time.monotonic() + seconds
+        if parent is not None:
+            self.expires = min(self.expires, parent.expires)
+
+    def remaining(self) -> float:
+        """Seconds left, never negative"""
+        return max(0.0, self.expires - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires
+
+    def split(self, share: float) -> "Deadline":
+        """
+        Deadline for one stage, allowed at most share of the total budget
+
+        Args:
+            share: Fraction of the total budget
+
+        Returns:
+            Deadline: Child deadline
+        """
+        return Deadline(self.total * share, parent=self)
+
+
+_current: contextvars.ContextVar = contextvars.ContextVar("deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    """The deadline of the running query, or None outside one"""
+    return _current.get()
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[Deadline]) -> Iterator[Optional[Deadline]]:
+    """
+    Make a deadline current for a block (no-op for None)
+
+    Args:
+        deadline: Deadline of the query
+
+    Yields:
+        Optional[Deadline]: The deadline
+    """
+    if deadline is None:
+        yield None
+        return
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def stage_deadline(share: float) -> Iterator[Optional[Deadline]]:
+    """
+    Cap a stage of the current query at a share of its deadline (no-op outside a query)
+
+    Args:
+        share: Fraction of the query's total budget the stage may use
+
+    Yields:
+        Optional[Deadline]: The stage's deadline
+    """
+    deadline = current_deadline()
+    with deadline_scope(deadline.split(share) if deadline is not None else None) as stage:
+        yield stage
+
+
+def request_timeout(default: float = HTTP_TIMEOUT) -> float:
+    """
+    Timeout for the next upstream request
+
+    Args:
+        default: Timeout outside a deadline, or when more time is left than this
+
+    Returns:
+        float: Seconds
+
+    Raises:
+        DeadlineExceeded: If the current deadline has passed
+    """
+    deadline = current_deadline()
+    if deadline is None:
+        return default
+    remaining = deadline.remaining()
+    if remaining <= 0:
+        get_telemetry().inc("deadline_exceeded")
+        raise DeadlineExceeded("Query deadline exceeded")
+    return min(default, remaining)
+
+
+def backoff_delay(attempt: int, base: float = RETRY_BASE_DELAY, cap: float = RETRY_MAX_DELAY) -> float:
+    """
+    Exponential backoff with full jitter
+
+    Args:
+        attempt: Number of failed attempts so far, from 0
+        base: Delay ceiling after the first failure
+        cap: Largest delay ceiling
+
+    Returns:
+        float: Seconds to wait, uniform in [0, min(cap, base * 2**attempt)]
+    """
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def can_wait(delay: float) -> bool:
+    """
+    Whether the current deadline leaves time to wait and try again
+
+    Args:
+        delay: Seconds to wait
+
+    Returns:
+        bool: True outside a deadline
+    """
+    deadline = current_deadline()
+    return deadline is None or deadline.remaining() > delay
+
+
+def retry_sleep(attempt: int, base: float = RETRY_BASE_DELAY, cap: float = RETRY_MAX_DELAY) -> bool:
+    """
+    Wait before a retry, unless the current deadline cannot afford it
+
+    Args:
+        attempt: Number of failed attempts so far, from 0
+        base: Delay ceiling after the first failure
+        cap: Largest delay ceiling
+
+    Returns:
+        bool: Whether to retry
+    """
+    delay = backoff_delay(attempt, base, cap)
+    if not can_wait(delay):
+        return False
+    time.sleep(delay)
+    return True
+
+
+async def aretry_sleep(attempt: int, base: float = RETRY_BASE_DELAY, cap: float = RETRY_MAX_DELAY) -> bool:
+    """Async retry_sleep"""
+    delay = backoff_delay(attempt, base, cap)
+    if not can_wait(delay):
+        return False
+    await asyncio.sleep(delay)
+    return True
+
+
+class CircuitBreaker:
+    """
+    Fails calls to an upstream fast while it is down.
+
+    closed: calls go through; failure_threshold consecutive transient
+    failures open the circuit.
+    open: calls raise CircuitOpenError without being attempted, for
+    reset_seconds.
+    half-open: one trial call goes through (another one only if the trial
+    never reports back within reset_seconds). Its success closes the circuit,
+    its failure opens it again.
+
+    Only transient failures (connection errors, timeouts, 5xx) count. A
+    rejected request or a rate limit shows the upstream is up.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 reset_seconds: float = CIRCUIT_RESET_SECONDS):
+        """
+        Initialize a closed breaker
+
+        Args:
+            name: Upstream name, used in errors and metrics
+            failure_threshold: Consecutive failures that open the circuit; 0 disables the breaker
+            reset_seconds: Time the circuit stays open before a trial call
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self._opened = 0.0
+        self._trial_started: Optional[float] = None
+        self._lock = threading.Lock()
+        self.telemetry = get_telemetry()
+
+    def _transition(self, state: str) -> None:
+        self.state = state
+        self.telemetry.inc("circuit_transitions", upstream=self.name, state=state)
+        if state == "open":
+            logger.warning("Circuit for %s opened after %d failures; failing fast for %.0fs",
+                           self.name, self.failures, self.reset_seconds)
+        else:
+            logger.info("Circuit for %s is %s", self.name, state)
+
+    def before_call(self) -> None:
+        """
+        Admit a call
+
+        Raises:
+            CircuitOpenError: If the circuit is open, or half-open with a trial call in flight
+        """
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if self.state == "open" and now - self._opened >= self.reset_seconds:
+                self._transition("half_open")
+            if self.state == "half_open":
+                if self._trial_started is None or now - self._trial_started >= self.reset_seconds:
+                    self._trial_started = now
+                    return
+            if self.state != "closed":
+                self.telemetry.inc("circuit_rejections", upstream=self.name)
+                raise CircuitOpenError(f"{self.name} is unavailable (circuit open)")
+
+    def record_success(self) -> None:
+        """Report a call the upstream answered"""
+        with self._lock:
+            self.failures = 0
+            self._trial_started = None
+            if self.state != "closed":
+                self._transition("closed")
+
+    def record_failure(self) -> None:
+        """Report a transient failure"""
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            self.failures += 1
+            self._trial_started = None
+            if self.state == "half_open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+                self._opened = time.monotonic()
+                self._transition("open")
+
+
+def _rate_limited(error: BaseException) -> bool:
+    """Whether an error is an HTTP 429 (openai and httpx errors alike)"""
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status == 429
+
+
+@lru_cache(maxsize=None)
+def get_circuit_breaker(upstream: str) -> CircuitBreaker:
+    """
+    Process-wide circuit breaker of an upstream
+
+    Args:
+        upstream: Upstream name, e.g. "openai" or "supabase"
+
+    Returns:
+        CircuitBreaker: Shared breaker
+    """
+    return CircuitBreaker(upstream)
+
+
+def call_with_retry(call: Callable[[], Any], retryable: Callable[[BaseException], bool], max_retries: int,
+                    upstream: str) -> Any:
+    """
+    Call an upstream through its circuit breaker, retrying transient failures
+
+    Args:
+        call: Function making one request; should take its timeout from request_timeout()
+        retryable: Whether an error is transient (retried, and counted by the breaker)
+        max_retries: Retries after the first attempt
+        upstream: Upstream name, selecting the circuit breaker
+
+    Returns:
+        Any: Result of the successful attempt
+
+    Raises:
+        CircuitOpenError: If the upstream's circuit is open
+        DeadlineExceeded: If the query's deadline has passed
+        Exception: The last error, once retries are used up or the deadline leaves no room for another
+    """
+    breaker = get_circuit_breaker(upstream)
+    attempt = 0
+    while True:
+        breaker.before_call()
+        try:
+            result = call()
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            if not retryable(e) or _rate_limited(e):
+                # The upstream answered; only outages count against the circuit
+                breaker.record_success()
+            else:
+                breaker.record_failure()
+            if not retryable(e):
+                raise
+            if attempt >= max_retries or not retry_sleep(attempt):
+                raise
+            get_telemetry().inc("retries", upstream=upstream)
+            attempt += 1
+            continue
+        breaker.record_success()
+        return result
+
+
+async def acall_with_retry(call: Callable[[], Awaitable[Any]], retryable: Callable[[BaseException], bool],
+                           max_retries: int, upstream: str) -> Any:
+    """
+    Async call_with_retry
+
+    Args:
+        call: Coroutine function making one request
+        retryable: Whether an error is transient
+        max_retries: Retries after the first attempt
+        upstream: Upstream name, selecting the circuit breaker
+
+    Returns:
+        Any: Result of the successful attempt
+    """
+    breaker = get_circuit_breaker(upstream)
+    attempt = 0
+    while True:
+        breaker.before_call()
+        try:
+            result = await call()
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            if not retryable(e) or _rate_limited(e):
+                # The upstream answered; only outages count against the circuit
+                breaker.record_success()
+            else:
+                breaker.record_failure()
+            if not retryable(e):
+                raise
+            if attempt >= max_retries or not await aretry_sleep(attempt):
+                raise
+            get_telemetry().inc("retries", upstream=upstream)
+            attempt += 1
+            continue
+        breaker.record_success()
+        return result
+
+
+@lru_cache(maxsize=None)
+def _hedge_pool() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=_HEDGE_WORKERS, thread_name_prefix="hedge")
+
+
+def hedged(call: Callable[[], Any], delay: float, upstream: str) -> Any:
+    """
+    Run a call, sending a duplicate if the first has not finished within delay
+
+    The first successful result wins. The other request cannot be
+    interrupted; it finishes in the background and its result is discarded.
+    Only idempotent calls should be hedged.
+
+    Args:
+        call: Function making the request
+        delay: Seconds before the duplicate is sent; 0 or less runs call directly
+        upstream: Upstream name, for metrics
+
+    Returns:
+        Any: Result of the first successful call
+
+    Raises:
+        Exception: The last error if both calls fail
+    """
+    if delay <= 0:
+        return call()
+    pool = _hedge_pool()
+    # Each call runs in a copy of the caller's context, so deadlines and traces apply to it
+    futures = [pool.submit(contextvars.copy_context().run, call)]
+    done, _ = wait(futures, timeout=delay)
+    if not done:
+        get_telemetry().inc("hedged_requests", upstream=upstream)
+        futures.append(pool.submit(contextvars.copy_context().run, call))
+    error: Optional[BaseException] = None
+    pending = set(futures)
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                if len(futures) > 1 and future is futures[1]:
+                    get_telemetry().inc("hedge_wins", upstream=upstream)
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+async def ahedged(call: Callable[[], Awaitable[Any]], delay: float, upstream: str) -> Any:
+    """
+    Async hedged(); the losing request is cancelled
+
+    Args:
+        call: Coroutine function making the request
+        delay: Seconds before the duplicate is sent; 0 or less awaits call directly
+        upstream: Upstream name, for metrics
+
+    Returns:
+        Any: Result of the first successful call
+    """
+    if delay <= 0:
+        return await call()
+    first = asyncio.ensure_future(call())
+    tasks = [first]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if not done:
+            get_telemetry().inc("hedged_requests", upstream=upstream)
+            tasks.append(asyncio.ensure_future(call()))
+        error: Optional[BaseException] = None
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is not first:
+                        get_telemetry().inc("hedge_wins", upstream=upstream)
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
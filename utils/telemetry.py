@@ -0,0 +1,483 @@
+import atexit
+import bisect
+import contextvars
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from config.settings import (
+    TELEMETRY_ENABLED, TELEMETRY_RECENT_QUERIES, TELEMETRY_JSONL_PATH, TELEMETRY_FLUSH_SECONDS,
+    TELEMETRY_PROMETHEUS_PORT
+)
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Exclusive time already spent in child spans of the innermost open span
+_open_span: contextvars.ContextVar = contextvars.ContextVar("telemetry_span", default=None)
+_active_trace: contextvars.ContextVar = contextvars.ContextVar("telemetry_trace", default=None)
+_capture: contextvars.ContextVar = contextvars.ContextVar("telemetry_capture", default=None)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+_EXHAUSTED = object()
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: Labels, extra: str = "") -> str:
+    parts = [f'{key}="{value}"' for key, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Histogram:
+    __slots__ = ("counts", "count", "sum")
+
+    def __init__(self, buckets: int):
+        self.counts = [0] * (buckets + 1)
+        self.count = 0
+        self.sum = 0.0
+
+
+class Trace:
+    """Stage breakdown of one query (or other unit of work)"""
+
+    def __init__(self, name: str, **attributes: Any):
+        self.name = name
+        self.attributes = attributes
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.total: Optional[float] = None
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def finish(self) -> None:
+        if self.total is None:
+            self.total = time.perf_counter() - self._start
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"type": "trace", "name": self.name, "started": self.started, "total_seconds": self.total,
+                "stages": dict(self.stages), **self.attributes}
+
+
+class Telemetry:
+    """
+    In-process timing spans, counters and latency histograms.
+
+    span(stage) times a block and records its exclusive time (minus time
+    spent in nested spans) in the stage_seconds histogram and in the
+    active trace, so the stages of a query add up to its total. The open
+    span and trace live in context variables, so they follow a query into
+    asyncio tasks. Metrics export as Prometheus text; finished traces and
+    periodic histogram snapshots can be appended to a JSONL file by a
+    background writer. When disabled every call returns immediately.
+    """
+
+    def __init__(self, enabled: bool = TELEMETRY_ENABLED, recent: int = TELEMETRY_RECENT_QUERIES,
+                 jsonl_path: str = TELEMETRY_JSONL_PATH, flush_seconds: float = TELEMETRY_FLUSH_SECONDS,
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        """
+        Initialize the registry
+
+        Args:
+            enabled: Record anything at all
+            recent: Finished traces kept for the debug panel
+            jsonl_path: File that traces and histogram snapshots are appended to ("" for none)
+            flush_seconds: Interval between histogram snapshots in the JSONL file
+            buckets: Upper bounds of the histogram buckets, in seconds
+        """
+        self.enabled = enabled
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._histograms: Dict[Tuple[str, Labels], _Histogram] = {}
+        self._recent: deque = deque(maxlen=recent)
+        self._sink: Optional["queue.Queue"] = None
+        self._flushed = threading.Event()
+        if enabled and jsonl_path:
+            self._sink = queue.Queue()
+            threading.Thread(target=self._write_jsonl, args=(jsonl_path, flush_seconds),
+                             name="telemetry-jsonl", daemon=True).start()
+            atexit.register(self.flush)
+
+    # Recording
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        """
+        Add to a counter
+
+        Args:
+            name: Counter name (exported with a _total suffix)
+            value: Amount to add
+            labels: Label values
+        """
+        if not self.enabled:
+            return
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels: Any) -> None:
+        """
+        Record a duration in a histogram
+
+        Args:
+            name: Histogram name
+            seconds: Observed duration
+            labels: Label values
+        """
+        if not self.enabled:
+            return
+        key = (name, _labels(labels))
+        bucket = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(len(self.buckets))
+            histogram.counts[bucket] += 1
+            histogram.count += 1
+            histogram.sum += seconds
+
+    def record(self, stage: str, seconds: float, trace: Optional[Trace] = None) -> None:
+        """
+        Record a stage duration measured elsewhere (e.g. in a worker process)
+
+        Args:
+            stage: Stage name
+            seconds: Exclusive duration of the stage
+            trace: Trace to add it to, the active one if not given
+        """
+        if not self.enabled:
+            return
+        self.observe("stage_seconds", seconds, stage=stage)
+        trace = trace or _active_trace.get()
+        if trace is not None:
+            trace.add(stage, seconds)
+        captured = _capture.get()
+        if captured is not None:
+            captured.append((stage, seconds))
+
+    def record_openai_call(self, endpoint: str, outcome: str, seconds: float,
+                           prompt_tokens: int = 0, completion_tokens: int = 0) -> None:
+        """
+        Count one OpenAI API request and the tokens it used
+
+        Args:
+            endpoint: "embeddings" or "chat"
+            outcome: "ok", "rate_limited" or "error"
+            seconds: Request duration
+            prompt_tokens: Input tokens billed
+            completion_tokens: Output tokens billed
+        """
+        if not self.enabled:
+            return
+        self.inc("openai_requests", endpoint=endpoint, outcome=outcome)
+        self.observe("openai_request_seconds", seconds, endpoint=endpoint)
+        if prompt_tokens:
+            self.inc("openai_tokens", prompt_tokens, endpoint=endpoint, kind="prompt")
+        if completion_tokens:
+            self.inc("openai_tokens", completion_tokens, endpoint=endpoint, kind="completion")
+
+    @contextmanager
+    def span(self, stage: str) -> Iterator[None]:
+        """
+        Time a block as one occurrence of a stage
+
+        Args:
+            stage: Stage name, e.g. "embed" or "search"
+        """
+        if not self.enabled:
+            yield
+            return
+        parent = _open_span.get()
+        children = [0.0]
+        token = _open_span.set(children)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            _open_span.reset(token)
+            if parent is not None:
+                parent[0] += elapsed
+            self.record(stage, max(elapsed - children[0], 0.0))
+
+    def iterate(self, items: Iterable, stage: str, per_item: bool = True,
+                trace: Optional[Trace] = None) -> Iterator:
+        """
+        Time the work done producing each item of a lazy iterable
+
+        Spans cannot stay open across a generator's yields, so each next()
+        call is timed on its own.
+
+        Args:
+            items: Iterable whose production is timed
+            stage: Stage name
+            per_item: Record every item separately, or one total when the iterable ends
+            trace: Trace to add the time to, the one active at each record if not given
+
+        Yields:
+            The items of the iterable
+        """
+        if not self.enabled:
+            yield from items
+            return
+        iterator = iter(items)
+        total = 0.0
+        try:
+            while True:
+                parent = _open_span.get()
+                children = [0.0]
+                token = _open_span.set(children)
+                start = time.perf_counter()
+                try:
+                    item = next(iterator, _EXHAUSTED)
+                finally:
+                    elapsed = time.perf_counter() - start
+                    _open_span.reset(token)
+                    if parent is not None:
+                        parent[0] += elapsed
+                exclusive = max(elapsed - children[0], 0.0)
+                if item is _EXHAUSTED:
+                    total += exclusive
+                    return
+                if per_item:
+                    self.record(stage, exclusive, trace)
+                else:
+                    total += exclusive
+                yield item
+        finally:
+            if not per_item:
+                self.record(stage, total, trace)
+
+    @contextmanager
+    def trace(self, name: str, **attributes: Any) -> Iterator[Trace]:
+        """
+        Collect the stages of one unit of work, e.g. a query
+
+        Args:
+            name: Kind of work ("query", "document")
+            attributes: Extra fields stored with the trace
+
+        Yields:
+            Trace: The trace, finished and kept for the debug panel on exit
+        """
+        current = Trace(name, **attributes)
+        with self.activate(current):
+            yield current
+        self.finish(current)
+
+    @contextmanager
+    def activate(self, current: Optional[Trace]) -> Iterator[None]:
+        """
+        Make spans in this block count towards a trace (for traces spanning generator yields)
+
+        Args:
+            current: Trace to activate, None to leave the active trace unchanged
+        """
+        if not self.enabled or current is None:
+            yield
+            return
+        token = _active_trace.set(current)
+        try:
+            yield
+        finally:
+            _active_trace.reset(token)
+
+    def finish(self, current: Trace) -> None:
+        """
+        Close a trace and keep it for the debug panel and the JSONL sink
+
+        Args:
+            current: Trace to close
+        """
+        if not self.enabled:
+            return
+        current.finish()
+        self.observe(f"{current.name}_seconds", current.total)
+        with self._lock:
+            self._recent.append(current)
+        if self._sink is not None:
+            self._sink.put(current.to_dict())
+
+    @contextmanager
+    def capture(self) -> Iterator[List[Tuple[str, float]]]:
+        """
+        Collect the stage durations recorded in this block, to replay them in another process
+
+        Yields:
+            List: (stage, seconds) pairs, filled in as spans finish
+        """
+        captured: List[Tuple[str, float]] = []
+        token = _capture.set(captured)
+        try:
+            yield captured
+        finally:
+            _capture.reset(token)
+
+    # Reading
+
+    def recent_traces(self, name: Optional[str] = None) -> List[Trace]:
+        """
+        Most recently finished traces, newest first
+
+        Args:
+            name: Only traces of this kind
+
+        Returns:
+            List[Trace]: Finished traces
+        """
+        with self._lock:
+            traces = list(self._recent)
+        return [trace for trace in reversed(traces) if name is None or trace.name == name]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Current counters and histograms as plain data
+
+        Returns:
+            Dict: {"counters": [...], "histograms": [...]} with names, labels and values
+        """
+        with self._lock:
+            counters = [{"name": name, "labels": dict(labels), "value": value}
+                        for (name, labels), value in sorted(self._counters.items())]
+            histograms = [{"name": name, "labels": dict(labels), "count": histogram.count, "sum": histogram.sum,
+                           "buckets": dict(zip([*map(str, self.buckets), "+Inf"], histogram.counts))}
+                          for (name, labels), histogram in sorted(self._histograms.items())]
+        return {"counters": counters, "histograms": histograms}
+
+    def prometheus_text(self) -> str:
+        """
+        Counters and histograms in the Prometheus text exposition format
+
+        Returns:
+            str: Exposition text
+        """
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, (list(h.counts), h.count, h.sum)) for key, h in self._histograms.items())
+        declared = set()
+        for (name, labels), value in counters:
+            if name not in declared:
+                declared.add(name)
+                lines.append(f"# TYPE {name}_total counter")
+            lines.append(f"{name}_total{_format_labels(labels)} {value:g}")
+        for (name, labels), (counts, count, total) in histograms:
+            if name not in declared:
+                declared.add(name)
+                lines.append(f"# TYPE {name} histogram")
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = 'le="%g"' % bound
+                lines.append(f"{name}_bucket{_format_labels(labels, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{name}_bucket{_format_labels(labels, le)} {count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total:.6f}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    # Export
+
+    def _write_jsonl(self, path: str, flush_seconds: float) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        next_snapshot = time.monotonic() + flush_seconds
+        while True:
+            try:
+                record = self._sink.get(timeout=max(next_snapshot - time.monotonic(), 0.01))
+            except queue.Empty:
+                record = None
+            records = [record] if record is not None else []
+            if time.monotonic() >= next_snapshot or record == "flush":
+                records = [r for r in records if r != "flush"]
+                records.append({"type": "metrics", "time": time.time(), **self.snapshot()})
+                next_snapshot = time.monotonic() + flush_seconds
+            try:
+                with open(path, "a", encoding="utf-8") as file:
+                    for item in records:
+                        file.write(json.dumps(item) + "\n")
+            except OSError as e:
+                logger.warning("Cannot write telemetry to %s: %s", path, e)
+            if record == "flush":
+                self._flushed.set()
+
+    def flush(self, timeout: float = 2.0) -> None:
+        """
+        Write a histogram snapshot to the JSONL sink now
+
+        Args:
+            timeout: Seconds to wait for the writer
+        """
+        if self._sink is None:
+            return
+        self._flushed = threading.Event()
+        self._sink.put("flush")
+        self._flushed.wait(timeout)
+
+    def serve_prometheus(self, port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+        """
+        Serve /metrics for Prometheus scrapes from a daemon thread
+
+        Args:
+            port: TCP port
+            host: Interface to listen on
+
+        Returns:
+            ThreadingHTTPServer: The running server
+        """
+        telemetry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = telemetry.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug("metrics scrape: " + format, *args)
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="telemetry-prometheus", daemon=True).start()
+        return server
+
+
+@lru_cache(maxsize=None)
+def get_telemetry() -> Telemetry:
+    """
+    Process-wide telemetry registry
+
+    Returns:
+        Telemetry: Shared registry, serving /metrics if TELEMETRY_PROMETHEUS_PORT is set
+    """
+    telemetry = Telemetry()
+    if telemetry.enabled and TELEMETRY_PROMETHEUS_PORT:
+        try:
+            telemetry.serve_prometheus(TELEMETRY_PROMETHEUS_PORT)
+        except OSError as e:
+            # Another process (e.g. a second worker) already serves the port
+            logger.warning("Cannot serve Prometheus metrics on port %d: %s", TELEMETRY_PROMETHEUS_PORT, e)
+    return telemetry
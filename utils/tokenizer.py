@@ -0,0 +1,68 @@
+import re
+from functools import lru_cache
+from typing import List
+
+import tiktoken
+
+# Rough split used when the tiktoken BPE files cannot be loaded (e.g. offline)
+_FALLBACK_PATTERN = re.compile(r"\s*\w{1,4}|\s*[^\w\s]|\s+")
+
+
+class ApproximateEncoding:
+    """
+    Regex based stand-in for a tiktoken encoding.
+
+    Produces roughly the same number of tokens as cl100k_base for English
+    text and supports the subset of the tiktoken API used in this project.
+    Tokens are the text pieces themselves, so decode is exact.
+    """
+
+    name = "approximate"
+
+    def encode_ordinary(self, text: str) -> List[str]:
+        return _FALLBACK_PATTERN.findall(text)
+
+    def encode(self, text: str, **kwargs) -> List[str]:
+        return self.encode_ordinary(text)
+
+    def encode_ordinary_batch(self, texts: List[str], **kwargs) -> List[List[str]]:
+        return [self.encode_ordinary(text) for text in texts]
+
+    def decode(self, tokens: List[str]) -> str:
+        return "".join(tokens)
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model: str):
+    """
+    Get the tokenizer for a model, falling back to an approximation
+
+    Args:
+        model: OpenAI model name
+
+    Returns:
+        Encoding object exposing encode/encode_ordinary_batch/decode
+    """
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        try:
+            return tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            return ApproximateEncoding()
+    except Exception:
+        return ApproximateEncoding()
+
+
+def count_tokens(text: str, model: str) -> int:
+    """
+    Count the tokens in a text for the given model
+
+    Args:
+        text: Text to measure
+        model: OpenAI model name
+
+    Returns:
+        int: Number of tokens
+    """
+    return len(get_encoding(model).encode_ordinary(text))